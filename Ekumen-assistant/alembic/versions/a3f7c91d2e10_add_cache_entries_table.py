@@ -0,0 +1,43 @@
+"""Add cache_entries table for the multi-layer cache database tier
+
+Revision ID: a3f7c91d2e10
+Revises: fe3bc5766b3c
+Create Date: 2026-10-16 10:12:41.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f7c91d2e10'
+down_revision: Union[str, Sequence[str], None] = 'fe3bc5766b3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_entries',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('cache_type', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.LargeBinary(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('tags', postgresql.ARRAY(sa.String(length=255)), server_default='{}', nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_cache_entries_cache_type'), 'cache_entries', ['cache_type'], unique=False)
+    op.create_index(op.f('ix_cache_entries_expires_at'), 'cache_entries', ['expires_at'], unique=False)
+    op.create_index('idx_cache_entries_tags', 'cache_entries', ['tags'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_cache_entries_tags', table_name='cache_entries', postgresql_using='gin')
+    op.drop_index(op.f('ix_cache_entries_expires_at'), table_name='cache_entries')
+    op.drop_index(op.f('ix_cache_entries_cache_type'), table_name='cache_entries')
+    op.drop_table('cache_entries')
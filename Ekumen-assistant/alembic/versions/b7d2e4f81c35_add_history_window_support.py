@@ -0,0 +1,29 @@
+"""Add conversation summary cursor and message keyset index
+
+Revision ID: b7d2e4f81c35
+Revises: a3f7c91d2e10
+Create Date: 2026-10-16 14:03:27.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f81c35'
+down_revision: Union[str, Sequence[str], None] = 'a3f7c91d2e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('summary_through', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('idx_messages_conversation_created', 'messages', ['conversation_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_messages_conversation_created', table_name='messages')
+    op.drop_column('conversations', 'summary_through')
@@ -0,0 +1,42 @@
+"""Add French full-text search columns and conversation statistics index
+
+Revision ID: c4e9a1b6d273
+Revises: b7d2e4f81c35
+Create Date: 2026-10-16 15:21:08.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a1b6d273'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4f81c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('french', coalesce(title, ''))", persisted=True), nullable=True
+    ))
+    op.add_column('messages', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('french', coalesce(content, ''))", persisted=True), nullable=True
+    ))
+    op.create_index('idx_conversations_search', 'conversations', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('idx_messages_search', 'messages', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('idx_conversations_user_status_agent', 'conversations', ['user_id', 'status', 'agent_type'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_conversations_user_status_agent', table_name='conversations')
+    op.drop_index('idx_messages_search', table_name='messages', postgresql_using='gin')
+    op.drop_index('idx_conversations_search', table_name='conversations', postgresql_using='gin')
+    op.drop_column('messages', 'search_vector')
+    op.drop_column('conversations', 'search_vector')
@@ -0,0 +1,51 @@
+"""Add llm_usage table for metered token usage
+
+Revision ID: e5a9c3d7f102
+Revises: d8f3b2c5e914
+Create Date: 2026-10-16 18:12:40.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9c3d7f102'
+down_revision: Union[str, Sequence[str], None] = 'd8f3b2c5e914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_usage',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('period_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('organization_id', sa.String(length=64), server_default='', nullable=False),
+    sa.Column('user_id', sa.String(length=64), server_default='', nullable=False),
+    sa.Column('agent_type', sa.String(length=50), server_default='', nullable=False),
+    sa.Column('tool_name', sa.String(length=100), server_default='', nullable=False),
+    sa.Column('request_type', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('calls', sa.Integer(), nullable=False),
+    sa.Column('errors', sa.Integer(), nullable=False),
+    sa.Column('estimated_calls', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('completion_tokens', sa.BigInteger(), nullable=False),
+    sa.Column('cost_usd', sa.Numeric(precision=12, scale=6), nullable=False),
+    sa.Column('latency_ms', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('period_start', 'organization_id', 'user_id', 'agent_type', 'tool_name', 'request_type', 'model',
+                        name='uq_llm_usage_period_dimensions')
+    )
+    op.create_index('idx_llm_usage_org_period', 'llm_usage', ['organization_id', 'period_start'], unique=False)
+    op.create_index('idx_llm_usage_agent_period', 'llm_usage', ['agent_type', 'period_start'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_llm_usage_agent_period', table_name='llm_usage')
+    op.drop_index('idx_llm_usage_org_period', table_name='llm_usage')
+    op.drop_table('llm_usage')
@@ -24,6 +24,7 @@ from .internet_agent import InternetAgent
 
 # Agent Management
 from .agent_manager import AgentManager, AgentType
+from .agent_pool import AgentPool, agent_pool
 
 __all__ = [
     # ReAct Agents
@@ -41,4 +42,6 @@ __all__ = [
     # Agent Management
     "AgentManager",
     "AgentType",
+    "AgentPool",
+    "agent_pool",
 ]
\ No newline at end of file
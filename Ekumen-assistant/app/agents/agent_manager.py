@@ -21,6 +21,8 @@ import asyncio
 from enum import Enum
 from dataclasses import dataclass
 
+from app.agents.agent_pool import agent_pool
+
 logger = logging.getLogger(__name__)
 
 # Demo agents that return canned responses (not yet implemented)
@@ -46,7 +48,7 @@ class AgentProfile:
     name: str
     description: str
     capabilities: List[str]
-    cost_per_request: float
+    cost_per_request: float  # Estimate; production runs report their metered cost
 
 class AgentManager:
     """
@@ -177,54 +179,21 @@ class AgentManager:
 
     async def _create_agent_instance(self, agent_type: str) -> Any:
         """
-        Create a new agent instance.
+        Get the process-wide agent instance from the agent pool.
+
+        Agents are built once per process (or at startup warm-up) and shared
+        by every AgentManager.
 
         Args:
             agent_type: Agent type string
 
         Returns:
-            New agent instance
+            Pooled agent instance
 
         Raises:
             ValueError: If agent type is not supported
         """
-        # Import agents lazily to avoid circular imports and missing dependencies
-        agent_type_lower = agent_type.lower()
-
-        if agent_type_lower == "weather":
-            from app.agents.weather_agent import WeatherIntelligenceAgent
-            return WeatherIntelligenceAgent()
-
-        elif agent_type_lower == "crop_health":
-            from app.agents.crop_health_agent import CropHealthIntelligenceAgent
-            return CropHealthIntelligenceAgent()
-
-        elif agent_type_lower == "farm_data":
-            from app.agents.farm_data_agent import FarmDataIntelligenceAgent
-            return FarmDataIntelligenceAgent()
-
-        elif agent_type_lower == "planning":
-            from app.agents.planning_agent import PlanningIntelligenceAgent
-            return PlanningIntelligenceAgent()
-
-        elif agent_type_lower == "regulatory":
-            from app.agents.regulatory_agent import RegulatoryIntelligenceAgent
-            return RegulatoryIntelligenceAgent()
-
-        elif agent_type_lower == "sustainability":
-            from app.agents.sustainability_agent import SustainabilityIntelligenceAgent
-            return SustainabilityIntelligenceAgent()
-
-        elif agent_type_lower in ["internet", "market_prices"]:
-            from app.agents.internet_agent import InternetAgent
-            return InternetAgent()
-
-        elif agent_type_lower == "supplier":
-            from app.agents.supplier_agent import SupplierAgent
-            return SupplierAgent()
-
-        else:
-            raise ValueError(f"Unknown production agent type: {agent_type}")
+        return agent_pool.get_agent(agent_type)
     
     def get_agent_capabilities(self, agent_type: AgentType) -> List[str]:
         """Get capabilities for a specific agent."""
@@ -308,8 +277,7 @@ class AgentManager:
             else:
                 # Production agent - execute actual agent
                 logger.info(f"Executing production agent: {agent_type_str}")
-                agent = await self._get_or_create_agent(agent_type_str)
-                result = await agent.process(message, context or {})
+                result = await agent_pool.execute(agent_type_str, message, context)
 
                 # result is a dict with 'response' and optionally 'sources'
                 return {
@@ -319,7 +287,7 @@ class AgentManager:
                     "agent_name": profile.name,
                     "capabilities": profile.capabilities,
                     "metadata": {
-                        "cost": profile.cost_per_request,
+                        "cost": result.get("metadata", {}).get("usage", {}).get("cost_usd", profile.cost_per_request),
                         "message_length": len(message),
                         "context_provided": bool(context),
                         "is_demo": False,
@@ -435,8 +403,10 @@ Décrivez vos pratiques actuelles pour des recommandations personnalisées."""
         """
         Synchronous wrapper for execute_agent (for backward compatibility).
 
-        This method handles event loop creation/management for calling async execute_agent
-        from synchronous code.
+        Only for synchronous code without a running event loop (scripts,
+        tests); async code must await execute_agent(). Pooled agents share
+        LLM clients with the application's loop, so this does not spin up a
+        private loop next to a running one.
 
         Args:
             agent_type: Type of agent to execute
@@ -445,25 +415,15 @@ Décrivez vos pratiques actuelles pour des recommandations personnalisées."""
 
         Returns:
             Dict containing the agent response
+
+        Raises:
+            RuntimeError: If called while an event loop is running
         """
         try:
-            # Try to get existing event loop
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If loop is already running, we can't use run_until_complete
-                # This happens when called from async context
-                logger.warning("Event loop already running, use execute_agent() instead of execute_agent_sync()")
-                # Create a new loop in a thread (not ideal, but works)
-                import concurrent.futures
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, self.execute_agent(agent_type, message, context))
-                    return future.result()
-            else:
-                # Loop exists but not running, use it
-                return loop.run_until_complete(self.execute_agent(agent_type, message, context))
+            asyncio.get_running_loop()
         except RuntimeError:
-            # No event loop exists, create one
             return asyncio.run(self.execute_agent(agent_type, message, context))
+        raise RuntimeError("execute_agent_sync() called from a running event loop, await execute_agent() instead")
 
     def cleanup(self):
         """
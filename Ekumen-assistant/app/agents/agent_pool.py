@@ -0,0 +1,237 @@
+"""
+Agent Pool - Process-wide pre-built agents and executors
+
+Building an agent (ChatOpenAI client, prompt lookup, create_*_agent and
+AgentExecutor) is slow compared to a short question, so every agent graph is
+built once per process and reused by all requests:
+
+- LLM clients are shared per (model, temperature, streaming), so agents reuse
+  the same OpenAI HTTP connection pool
+- Tools are the module-level tool instances / registry singleton
+- Streaming callbacks are passed per request (run config), never baked into
+  the executor
+- warm_up() builds the configured agents at FastAPI startup
+- Construction and execution times are tracked separately
+- Token usage of a run is metered under its agent type and returned in the
+  result's metadata
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.http_client import LatencyHistogram
+from app.services.usage_meter import usage_scope
+
+logger = logging.getLogger(__name__)
+
+# Pooled agent types -> (module, class); "market_prices" shares the internet agent
+AGENT_CLASSES: Dict[str, Tuple[str, str]] = {
+    "orchestrator": ("app.agents.orchestrator", "OrchestratorAgent"),
+    "weather": ("app.agents.weather_agent", "WeatherIntelligenceAgent"),
+    "crop_health": ("app.agents.crop_health_agent", "CropHealthIntelligenceAgent"),
+    "farm_data": ("app.agents.farm_data_agent", "FarmDataIntelligenceAgent"),
+    "planning": ("app.agents.planning_agent", "PlanningIntelligenceAgent"),
+    "regulatory": ("app.agents.regulatory_agent", "RegulatoryIntelligenceAgent"),
+    "sustainability": ("app.agents.sustainability_agent", "SustainabilityIntelligenceAgent"),
+    "internet": ("app.agents.internet_agent", "InternetAgent"),
+    "supplier": ("app.agents.supplier_agent", "SupplierAgent"),
+}
+AGENT_ALIASES = {"market_prices": "internet"}
+
+# LLM settings of the specialized ReAct agents
+REACT_AGENT_MODEL = "gpt-4"
+REACT_AGENT_TEMPERATURE = 0.1
+REACT_AGENT_TYPES = {"weather", "crop_health", "farm_data", "planning", "regulatory", "sustainability"}
+
+
+class AgentPool:
+    """
+    Process-wide cache of agent instances.
+
+    Agents are built lazily on first use (or by warm_up) and shared by all
+    requests; per-request state is limited to the inputs and callbacks.
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, Any] = {}
+        self._llms: Dict[Tuple[str, float, bool], Any] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._accepts_callbacks: Dict[str, bool] = {}
+
+        # Metrics
+        self.construction_seconds: Dict[str, float] = {}
+        self.execution: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.reuses = 0
+
+    @staticmethod
+    def normalize(agent_type: str) -> str:
+        """Pool key for an agent type"""
+        agent_type = agent_type.lower()
+        return AGENT_ALIASES.get(agent_type, agent_type)
+
+    def get_llm(self, model: str, temperature: float = 0, streaming: bool = False):
+        """Shared ChatOpenAI client for a model configuration"""
+        key = (model, temperature, streaming)
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                from langchain_openai import ChatOpenAI
+
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    streaming=streaming,
+                    openai_api_key=settings.OPENAI_API_KEY or None
+                )
+                self._llms[key] = llm
+            return llm
+
+    def get_agent(self, agent_type: str) -> Any:
+        """
+        Get the pooled agent, building it on first use.
+
+        Raises:
+            ValueError: If agent type is not supported
+        """
+        key = self.normalize(agent_type)
+        agent = self._agents.get(key)
+        if agent is not None:
+            self.reuses += 1
+            return agent
+
+        if key not in AGENT_CLASSES:
+            raise ValueError(f"Unknown production agent type: {agent_type}")
+
+        with self._lock:
+            build_lock = self._build_locks[key]
+        with build_lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                start_time = time.perf_counter()
+                agent = self._build(key)
+                self.construction_seconds[key] = time.perf_counter() - start_time
+                self._agents[key] = agent
+                logger.info(f"🏗️ Built {key} agent in {self.construction_seconds[key] * 1000:.0f}ms")
+            else:
+                self.reuses += 1
+        return agent
+
+    def get_orchestrator(self):
+        """Get the pooled orchestrator agent"""
+        return self.get_agent("orchestrator")
+
+    def _build(self, key: str) -> Any:
+        """Construct an agent with the shared LLM clients"""
+        module_name, class_name = AGENT_CLASSES[key]
+        agent_class = getattr(__import__(module_name, fromlist=[class_name]), class_name)
+
+        if key == "orchestrator":
+            return agent_class(llm=self.get_llm(settings.OPENAI_DEFAULT_MODEL, 0, streaming=True))
+        if key in REACT_AGENT_TYPES:
+            return agent_class(llm=self.get_llm(REACT_AGENT_MODEL, REACT_AGENT_TEMPERATURE))
+        return agent_class()
+
+    async def warm_up(self, agent_types: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """
+        Build agents ahead of the first request (call at application startup).
+
+        Construction runs in a worker thread so startup does not block the
+        event loop. Failures are logged; those agents are built on first use.
+
+        Returns:
+            Dict mapping agent type to whether it was built
+        """
+        agent_types = list(agent_types if agent_types is not None else settings.AGENT_POOL_WARM_UP)
+        start_time = time.perf_counter()
+        built = {}
+        for agent_type in agent_types:
+            try:
+                await asyncio.to_thread(self.get_agent, agent_type)
+                built[agent_type] = True
+            except Exception as e:
+                logger.error(f"Failed to warm up {agent_type} agent: {e}")
+                built[agent_type] = False
+
+        logger.info(
+            f"✅ Agent pool warmed up: {sum(built.values())}/{len(built)} agents "
+            f"in {time.perf_counter() - start_time:.2f}s"
+        )
+        return built
+
+    def _runner(self, key: str, agent: Any) -> Tuple[Callable, bool]:
+        """Async entry point of an agent and whether it accepts callbacks"""
+        run = getattr(agent, "aprocess", None) or agent.process
+        if key not in self._accepts_callbacks:
+            self._accepts_callbacks[key] = "callbacks" in inspect.signature(run).parameters
+        return run, self._accepts_callbacks[key]
+
+    async def execute(
+        self,
+        agent_type: str,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        callbacks: Optional[List[Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a pooled agent for one request.
+
+        Args:
+            agent_type: Agent type (e.g. "orchestrator", "weather")
+            message: User message
+            context: Request context
+            callbacks: Per-request callback handlers (LLM-backed agents only)
+
+        Returns:
+            The agent's result dict, with the run's token usage in metadata["usage"]
+        """
+        key = self.normalize(agent_type)
+        agent = self.get_agent(key)
+        run, accepts_callbacks = self._runner(key, agent)
+        kwargs = {"callbacks": callbacks} if callbacks and accepts_callbacks else {}
+        context = context or {}
+
+        start_time = time.perf_counter()
+        with usage_scope(
+            agent_type=key,
+            organization_id=context.get("organization_id"),
+            user_id=context.get("user_id")
+        ) as usage:
+            try:
+                result = await run(message, context, **kwargs)
+            except Exception:
+                self.execution[key].observe(time.perf_counter() - start_time, error=True)
+                raise
+        self.execution[key].observe(time.perf_counter() - start_time)
+        if isinstance(result, dict):
+            result["metadata"] = {**(result.get("metadata") or {}), "usage": usage.to_dict()}
+        return result
+
+    def clear(self):
+        """Drop all pooled agents and LLM clients (rebuilt on next use)"""
+        with self._lock:
+            self._agents.clear()
+            self._llms.clear()
+            self._accepts_callbacks.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Construction versus execution time per agent"""
+        return {
+            "agents": sorted(self._agents),
+            "llm_clients": len(self._llms),
+            "reuses": self.reuses,
+            "construction_ms": {
+                key: round(seconds * 1000, 1) for key, seconds in self.construction_seconds.items()
+            },
+            "execution": {key: histogram.to_dict() for key, histogram in self.execution.items()},
+        }
+
+
+# Process-wide pool
+agent_pool = AgentPool()
@@ -29,16 +29,23 @@ class OrchestratorAgent:
     
     Architecture:
     - Uses create_structured_chat_agent for complex JSON tool inputs
-    - Supports streaming via callbacks
+    - Supports streaming via callbacks (per request, see process())
     - Handles agent_scratchpad automatically via AgentExecutor
+    - Built once per process by app.agents.agent_pool
     """
     
-    def __init__(self, callbacks: Optional[List[BaseCallbackHandler]] = None):
+    def __init__(
+        self,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+        llm: Optional[ChatOpenAI] = None
+    ):
         """
         Initialize orchestrator agent.
         
         Args:
-            callbacks: Optional list of callback handlers for streaming
+            callbacks: Optional callback handlers attached to every run
+                (prefer passing callbacks to process() so the agent can be shared)
+            llm: Language model to use (if None, creates a streaming ChatOpenAI)
         """
         
         # Get tools from registry
@@ -48,7 +55,7 @@ class OrchestratorAgent:
         logger.info(f"🔧 Initializing orchestrator with {len(self.tools)} tools")
         
         # Initialize LLM
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             model=settings.OPENAI_DEFAULT_MODEL,
             temperature=0,
             streaming=True,
@@ -78,12 +85,12 @@ class OrchestratorAgent:
         logger.info(f"✅ Orchestrator initialized successfully")
         logger.info(f"   - Model: {settings.OPENAI_DEFAULT_MODEL}")
         logger.info(f"   - Tools: {len(self.tools)}")
-        logger.info(f"   - Streaming: {'Enabled' if callbacks else 'Disabled'}")
     
     async def process(
         self, 
         query: str, 
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        callbacks: Optional[List[BaseCallbackHandler]] = None
     ) -> Dict[str, Any]:
         """
         Process a query through the orchestrator.
@@ -91,6 +98,7 @@ class OrchestratorAgent:
         Args:
             query: User query
             context: Optional context (farm_siret, user_id, etc.)
+            callbacks: Optional callback handlers for this run only (streaming)
             
         Returns:
             Dict with:
@@ -138,7 +146,10 @@ class OrchestratorAgent:
                 logger.info(f"📤 Passing to agent_executor: {list(agent_input.keys())}")
             
             # Execute orchestrator (AgentExecutor manages agent_scratchpad automatically)
-            result = await self.agent_executor.ainvoke(agent_input)
+            result = await self.agent_executor.ainvoke(
+                agent_input,
+                config={"callbacks": callbacks} if callbacks else None
+            )
             
             # Extract response
             response_text = result.get("output", "Désolé, je n'ai pas pu générer une réponse.")
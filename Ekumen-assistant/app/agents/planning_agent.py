@@ -261,13 +261,19 @@ class PlanningIntelligenceAgent:
             "success": True
         }
     
-    async def aprocess(self, message: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def aprocess(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        callbacks: Optional[List] = None
+    ) -> Dict[str, Any]:
         """
         Process user message using production tools (async).
 
         Args:
             message: User message/question
             context: Additional context (siret, farm_id, millesime, etc.)
+            callbacks: Optional callback handlers for this run only (streaming)
 
         Returns:
             Dict with response and metadata
@@ -282,7 +288,10 @@ class PlanningIntelligenceAgent:
             }
 
             # Execute agent
-            result = await self.agent_executor.ainvoke(agent_input)
+            result = await self.agent_executor.ainvoke(
+                agent_input,
+                config={"callbacks": callbacks} if callbacks else None
+            )
 
             # Extract iterations count if available
             iterations = len(result.get("intermediate_steps", []))
@@ -3,7 +3,7 @@ Conversation management endpoints
 Handles conversation CRUD operations and agent listing
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
@@ -133,6 +133,9 @@ async def update_conversation(
 @router.get("/conversations/search", response_model=List[ConversationResponse])
 async def search_conversations(
     query: str,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 20,
     current_user: User = Depends(auth_service.get_current_user),
     org_id: Optional[str] = Depends(get_org_id_from_token),
     db: AsyncSession = Depends(get_async_db)
@@ -140,8 +143,13 @@ async def search_conversations(
     """
     Search conversations by title or content
 
+    Results are ranked by relevance; when more results exist, the cursor of
+    the next page is returned in the X-Next-Cursor header.
+
     Args:
         query: Search query
+        cursor: Cursor of the page to fetch (from X-Next-Cursor)
+        limit: Page size
         current_user: Current authenticated user
         db: Database session
 
@@ -152,12 +160,19 @@ async def search_conversations(
         if not org_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization not selected.")
         
-        conversations = await chat_service.search_conversations(
-            db=db,
-            user_id=current_user.id,
-            organization_id=org_id,
-            query=query
-        )
+        try:
+            conversations, next_cursor = await chat_service.search_conversations_page(
+                db=db,
+                user_id=current_user.id,
+                organization_id=org_id,
+                query=query,
+                limit=max(1, min(limit, 100)),
+                cursor=cursor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
 
         return [
             ConversationResponse(
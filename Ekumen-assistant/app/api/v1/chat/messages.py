@@ -9,10 +9,12 @@ from typing import List, Optional
 import logging
 
 from app.core.database import get_async_db
+from app.core.rate_limiting import check_rate_limit, check_token_quota
 from app.models.user import User
 from app.schemas.chat import ChatMessage, ChatResponse
 from app.services.auth_service import AuthService
 from app.services.chat_service import ChatService
+from app.services.usage_meter import bind_usage_scope
 
 from .dependencies import get_org_id_from_token
 from .schemas import PaginatedMessagesResponse
@@ -46,6 +48,9 @@ async def send_message(
     try:
         if not org_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization not selected.")
+        await check_rate_limit(None, current_user, policy="chat", organization_id=org_id)
+        check_token_quota(org_id)
+        bind_usage_scope(organization_id=org_id, user_id=current_user.id, request_type="chat")
         
         # Verify conversation belongs to user
         conversation = await chat_service.get_conversation(
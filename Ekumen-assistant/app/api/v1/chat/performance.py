@@ -3,12 +3,26 @@ Performance monitoring endpoints
 Handles performance statistics and cache management
 """
 
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.models.user import User
 from app.services.auth_service import AuthService
 from app.services.optimized_streaming_service import OptimizedStreamingService
 from app.services.tool_registry_service import get_tool_registry
+from app.core.http_client import get_http_client_stats
+from app.agents.agent_pool import agent_pool
+from app.services.weather_tile_cache import forecast_tile_cache
+from app.core.rate_limiting import rate_limiter
+from app.services.embedding_cache import embedding_cache
+from app.services.retrieval_analytics_writer import retrieval_analytics_writer
+from app.services.token_stream import stream_registry
+from app.services.semantic_answer_cache import semantic_answer_cache
+from app.services.model_router import model_router
+from app.services.usage_meter import usage_meter, usage_report
 from app.api.v1.knowledge_base.schemas import StandardErrorResponse
+from .dependencies import get_org_id_from_token
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,9 +47,28 @@ async def get_performance_stats(
         - Cache hit rate
         - LLM usage statistics
         - Cost savings
+        - External API latency histograms per provider
+        - Agent construction versus execution times
+        - Embedding cache hit rates
+        - Retrieval analytics buffer and flush metrics
+        - Rate limiter decisions per policy
+        - Open and resumed answer streams
+        - Semantic answer cache hit rates per freshness class
+        - Model routing, budget downgrades and shadow evaluations
+        - Metered token usage, latency and tokens per request type
     """
     try:
         stats = streaming_service.get_performance_stats()
+        stats["external_apis"] = get_http_client_stats()
+        stats["weather_tiles"] = forecast_tile_cache.get_stats()
+        stats["agent_pool"] = agent_pool.get_stats()
+        stats["embedding_cache"] = embedding_cache.get_stats()
+        stats["retrieval_analytics"] = retrieval_analytics_writer.get_stats()
+        stats["rate_limits"] = rate_limiter.get_stats()
+        stats["streams"] = stream_registry.get_stats()
+        stats["semantic_cache"] = semantic_answer_cache.get_stats()
+        stats["model_router"] = model_router.get_stats()
+        stats["usage"] = usage_meter.get_stats()
         
         return StandardErrorResponse.create_success_response(
             data={"stats": stats},
@@ -49,6 +82,44 @@ async def get_performance_stats(
             detail="Failed to retrieve performance stats"
         )
 
+@router.get("/performance/usage")
+async def get_usage_report(
+    group_by: str = "agent_type",
+    days: int = 7,
+    limit: int = 20,
+    current_user: User = Depends(auth_service.get_current_user),
+    org_id: Optional[str] = Depends(get_org_id_from_token),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Token usage of the last days grouped by agent_type, tool_name, request_type,
+    model, user_id or organization_id, most tokens first.
+
+    Superusers see every organization, other users their own.
+    """
+    if group_by not in ("agent_type", "tool_name", "request_type", "model", "user_id", "organization_id"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot group usage by {group_by}")
+    is_superuser = getattr(current_user, "is_superuser", False)
+    if not is_superuser and not org_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization not selected.")
+
+    try:
+        report = await usage_report(
+            db, group_by=group_by, days=days, limit=limit,
+            organization_id=None if is_superuser else org_id
+        )
+        return StandardErrorResponse.create_success_response(
+            data={"usage": report, "group_by": group_by, "days": days},
+            message="Usage retrieved successfully"
+        )
+
+    except Exception as e:
+        logger.error(f"Usage report error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve usage"
+        )
+
 @router.post("/performance/clear-cache")
 async def clear_performance_cache(
     current_user: User = Depends(auth_service.get_current_user)
@@ -67,7 +138,7 @@ async def clear_performance_cache(
             )
         
         # Clear cache
-        streaming_service.cache.clear_all()
+        await streaming_service.cache.clear_all()
         
         return StandardErrorResponse.create_success_response(
             message="Cache cleared successfully"
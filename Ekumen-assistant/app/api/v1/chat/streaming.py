@@ -3,18 +3,24 @@ Streaming chat endpoints
 Handles real-time streaming responses from AI agents
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import Optional
+import asyncio
 import logging
 import json
+import uuid
 
-from app.core.database import get_async_db
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.core.rate_limiting import check_rate_limit, check_token_quota
 from app.models.user import User
 from app.schemas.chat import ChatMessage
 from app.services.auth_service import AuthService
 from app.services.chat_service import ChatService
+from app.services.token_stream import StreamSession, collect_answer, stream_registry
+from app.services.usage_meter import bind_usage_scope
 
 from .dependencies import get_org_id_from_token
 
@@ -47,6 +53,9 @@ async def send_message_stream(
     try:
         if not org_id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization not selected.")
+        await check_rate_limit(None, current_user, policy="chat", organization_id=org_id)
+        check_token_quota(org_id)
+        bind_usage_scope(organization_id=org_id, user_id=current_user.id, request_type="chat")
         # Verify conversation belongs to user
         conversation = await chat_service.get_conversation(
             db=db,
@@ -69,6 +78,7 @@ async def send_message_stream(
             sender="user",
             message_type="text"
         )
+        await db.commit()  # The answer is generated on its own session
 
         # Create context for streaming
         context = {
@@ -78,86 +88,15 @@ async def send_message_stream(
             "user_id": current_user.id
         }
 
-        # Create streaming generator (LCEL astream with RAG + org scoping)
-        async def generate_stream():
-            try:
-                final_response = ""
-                source_docs = []
-                tokens_emitted = 0
+        # Generate the answer in the background (LCEL astream with RAG + org scoping);
+        # it is saved even if the client disconnects and can resume the stream
+        stream_id = f"msg-{uuid.uuid4().hex}"
+        session = stream_registry.open(stream_id, owner=conversation_id)
+        session.attach(asyncio.create_task(
+            _generate_answer(session, conversation_id, conversation.agent_type, message.content, org_id)
+        ))
 
-                async for event in chat_service.lcel_service.stream_message(
-                    db_session=db,
-                    conversation_id=conversation_id,
-                    message=message.content,
-                    use_rag=True,
-                    organization_id=org_id
-                ):
-                    # Final event carries full answer and context
-                    if isinstance(event, dict) and "final" in event:
-                        final_payload = event.get("final") or {}
-                        ans = final_payload.get("answer")
-                        if isinstance(ans, str) and ans:
-                            final_response = ans
-                        ctx = final_payload.get("context")
-                        if isinstance(ctx, list):
-                            source_docs = ctx
-                        continue
-
-                    # Token streaming (string chunks)
-                    if isinstance(event, str):
-                        final_response += event
-                        tokens_emitted += 1
-                        token_data = {"type": "token", "text": event}
-                        yield f"data: {json.dumps(token_data)}\n\n"
-
-                # If no incremental tokens were emitted but we have a final answer,
-                # send it as a single token so the UI displays the message.
-                if tokens_emitted == 0 and isinstance(final_response, str) and final_response:
-                    fallback_token = {"type": "token", "text": final_response}
-                    yield f"data: {json.dumps(fallback_token)}\n\n"
-
-                # Map citations using service methods
-                documents_retrieved = chat_service.map_citations_for_storage(source_docs)
-                sources = chat_service.map_citations_for_frontend(documents_retrieved)
-
-                # After stream completion, persist assistant message with citations
-                saved = await chat_service.save_message(
-                    db=db,
-                    conversation_id=conversation_id,
-                    content=final_response,
-                    sender="agent",
-                    agent_type=conversation.agent_type,
-                    message_type="text",
-                    metadata={
-                        "processing_method": "lcel_with_automatic_history",
-                        "use_rag": True,
-                        "knowledge_base_used": len(documents_retrieved) > 0,
-                        "documents_retrieved": documents_retrieved
-                    }
-                )
-
-                # Final SSE event indicating completion (unified format)
-                yield f"data: {json.dumps({'type': 'done', 'message_id': str(saved.id), 'citation_count': len(documents_retrieved), 'sources': sources})}\n\n"
-
-            except Exception as e:
-                logger.error(f"Streaming error: {e}")
-                error_chunk = {
-                    "type": "error",
-                    "message": f"Erreur de streaming: {str(e)}",
-                    "timestamp": "2024-01-01T00:00:00"
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
-
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*"
-            }
-        )
+        return _sse_response(session, 0, start_event=True)
 
     except HTTPException:
         raise
@@ -167,3 +106,121 @@ async def send_message_stream(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to setup streaming"
         )
+
+
+@router.get("/conversations/{conversation_id}/messages/stream/{stream_id}")
+async def resume_message_stream(
+    conversation_id: str,
+    stream_id: str,
+    offset: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(auth_service.get_current_user),
+    org_id: Optional[str] = Depends(get_org_id_from_token),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Resume a streamed answer after a disconnect
+
+    Args:
+        conversation_id: ID of the conversation
+        stream_id: message_id of the stream's llm_start event
+        offset: Answer length already received (defaults to Last-Event-ID)
+
+    Returns:
+        StreamingResponse: The rest of the answer, then its done event
+    """
+    if not org_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Organization not selected.")
+    conversation = await chat_service.get_conversation(
+        db=db,
+        conversation_id=conversation_id,
+        user_id=current_user.id,
+        organization_id=org_id
+    )
+    session = stream_registry.resume(stream_id, owner=conversation_id) if conversation else None
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream expired or unknown")
+
+    if offset is None:
+        offset = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return _sse_response(session, offset)
+
+
+def _sse_response(session: StreamSession, offset: int, start_event: bool = False) -> StreamingResponse:
+    """SSE of an answer's delta frames; each frame's id is the offset to resume from"""
+
+    async def generate_stream():
+        if start_event:
+            yield f"data: {json.dumps({'type': 'llm_start', 'message_id': session.message_id})}\n\n"
+        async for frame in session.frames(offset):
+            yield f"id: {frame['offset'] + len(frame['text'])}\ndata: {json.dumps(frame)}\n\n"
+        yield f"data: {json.dumps(session.final_event or {'type': 'done'})}\n\n"
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "*"
+        }
+    )
+
+
+async def _generate_answer(
+    session: StreamSession,
+    conversation_id: str,
+    agent_type: Optional[str],
+    content: str,
+    org_id: str
+):
+    """Stream the LCEL answer into the session and save it with its citations"""
+    try:
+        async with AsyncSessionLocal() as db:
+            final_response, source_docs = await collect_answer(
+                session,
+                chat_service.lcel_service.stream_message(
+                    db_session=db,
+                    conversation_id=conversation_id,
+                    message=content,
+                    use_rag=True,
+                    organization_id=org_id
+                )
+            )
+
+            # Map citations using service methods
+            documents_retrieved = chat_service.map_citations_for_storage(source_docs)
+            sources = chat_service.map_citations_for_frontend(documents_retrieved)
+
+            # After stream completion, persist assistant message with citations
+            saved = await chat_service.save_message(
+                db=db,
+                conversation_id=conversation_id,
+                content=final_response,
+                sender="agent",
+                agent_type=agent_type,
+                message_type="text",
+                metadata={
+                    "processing_method": "lcel_with_automatic_history",
+                    "use_rag": True,
+                    "knowledge_base_used": len(documents_retrieved) > 0,
+                    "documents_retrieved": documents_retrieved
+                }
+            )
+            await db.commit()
+
+        # Final SSE event indicating completion (unified format)
+        session.close({
+            "type": "done",
+            "message_id": str(saved.id),
+            "citation_count": len(documents_retrieved),
+            "sources": sources
+        })
+    except Exception as e:
+        logger.error(f"Streaming error: {e}")
+        session.close({
+            "type": "error",
+            "message": f"Erreur de streaming: {str(e)}",
+            "timestamp": datetime.now().isoformat()
+        })
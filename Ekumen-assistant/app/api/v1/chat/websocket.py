@@ -4,11 +4,15 @@ Handles real-time WebSocket communication for chat
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
+from typing import Optional
+from app.core.rate_limiting import rate_limiter
 from app.services.auth_service import AuthService
 from app.services.chat_service import ChatService
+from app.services.token_stream import StreamSession, collect_answer, stream_registry
+from app.services.usage_meter import bind_usage_scope, usage_meter
+import asyncio
 import logging
 import json
-import time
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -26,6 +30,10 @@ async def websocket_chat(
     """
     Enhanced WebSocket endpoint for real-time streaming chat
 
+    Answers are streamed as coalesced delta frames with seq and offset; after
+    a reconnect, {"type": "resume", "message_id": ..., "offset": ...} resends
+    the answer from offset.
+
     Args:
         websocket: WebSocket connection
         conversation_id: ID of the conversation
@@ -72,18 +80,57 @@ async def websocket_chat(
             return
 
         logger.info(f"Unified WebSocket connection established for conversation {conversation_id}")
+        bind_usage_scope(organization_id=org_id, user_id=user.id, request_type="chat")
 
         while True:
             # Receive message from client
             data = await websocket.receive_text()
             message_data = json.loads(data)
 
+            # After a reconnect the client resumes an answer from the length it already has
+            if message_data.get("type") == "resume":
+                session = stream_registry.resume(str(message_data.get("message_id")), owner=conversation_id)
+                if session is None:
+                    await websocket.send_json({
+                        "type": "error",
+                        "code": "stream_not_found",
+                        "message": "Stream expired or unknown",
+                        "message_id": message_data.get("message_id")
+                    })
+                    continue
+                await _send_stream(websocket, session, int(message_data.get("offset") or 0))
+                continue
+
             # Extract message content (handle both 'content' and 'message' keys)
             message_content = message_data.get("content") or message_data.get("message", "")
             if not message_content:
                 logger.error(f"No message content found in: {message_data}")
                 continue
 
+            if usage_meter.quota_exceeded(org_id):
+                await websocket.send_json({
+                    "type": "error",
+                    "code": "token_quota_exceeded",
+                    "message": "Daily token quota exceeded"
+                })
+                continue
+
+            # Same chat policy as the HTTP endpoints
+            decision = await rate_limiter.check(
+                "chat",
+                user_id=str(user.id),
+                organization_id=org_id,
+                client_ip=websocket.client.host if websocket.client else None
+            )
+            if not decision.allowed:
+                await websocket.send_json({
+                    "type": "error",
+                    "code": "rate_limited",
+                    "message": f"Rate limit exceeded. Maximum {decision.limit} requests.",
+                    "retry_after": max(int(decision.retry_after + 0.999), 1)
+                })
+                continue
+
             # Get thread_id from message data (frontend should provide this)
             thread_id = message_data.get("thread_id") or message_data.get("message_id") or str(uuid.uuid4())
             
@@ -92,114 +139,18 @@ async def websocket_chat(
             logger.info(f"🔍 Processing message with mode: {mode}")
             logger.info(f"🔍 Full message data: {message_data}")
 
-            # Create a new database session for this message processing
-            async with AsyncSessionLocal() as db:
-                # Save user message and get message ID
-                user_message = await chat_service.save_message(
-                    db=db,
-                    conversation_id=conversation_id,
-                    content=message_content,
-                    sender="user",
-                    message_type="text",
-                    thread_id=thread_id
-                )
-                user_message_id = str(user_message.id)
-                await db.commit()  # Commit the user message
-
-                # Stream LCEL response with unified events
-                final_response = ""
-                source_docs = []
-                tokens_emitted = 0
+            # Create assistant message ID upfront for streaming
+            assistant_message_id = f"msg-{uuid.uuid4().hex}"
 
-                # Create assistant message ID upfront for streaming
-                assistant_message_id = f"msg-{int(time.time() * 1000)}"
+            # The answer is generated (and saved) even if this connection drops
+            session = stream_registry.open(assistant_message_id, owner=conversation_id)
+            session.attach(asyncio.create_task(
+                _generate_answer(session, conversation_id, org_id, message_content, thread_id, mode)
+            ))
 
-                # Signal streaming start so frontend creates placeholder message
-                await websocket.send_json({"type": "llm_start", "message_id": assistant_message_id})
-
-                # Use LCEL service with mode-aware tools
-                async for event in chat_service.lcel_service.stream_message(
-                    db_session=db,
-                    conversation_id=conversation_id,
-                    message=message_content,
-                    use_rag=True,
-                    organization_id=org_id,
-                    mode=mode  # Pass mode to LCEL service for tool selection
-                ):
-                    # Final event carries full answer and context
-                    if isinstance(event, dict) and "final" in event:
-                        final_payload = event.get("final") or {}
-                        ans = final_payload.get("answer")
-                        if isinstance(ans, str) and ans:
-                            final_response = ans
-                        ctx = final_payload.get("context")
-                        if isinstance(ctx, list):
-                            source_docs = ctx
-                        continue
-
-                    # Token streaming (string chunks) - INCLUDE message_id!
-                    if isinstance(event, str):
-                        final_response += event
-                        tokens_emitted += 1
-                        await websocket.send_json({"type": "token", "text": event, "message_id": assistant_message_id})
-
-                # If no tokens were emitted but we have a final answer, emit it once
-                if tokens_emitted == 0 and isinstance(final_response, str) and final_response:
-                    await websocket.send_json({"type": "token", "text": final_response, "message_id": assistant_message_id})
-
-                # Save assistant message to database
-                if final_response:
-                    assistant_message = await chat_service.save_message(
-                        db=db,
-                        conversation_id=conversation_id,
-                        content=final_response,
-                        sender="agent",
-                        agent_type=mode if mode in ["internet", "supplier"] else "farm_data",
-                        message_type="text",
-                        thread_id=thread_id
-                    )
-                    await db.commit()
-
-                # Map citations using service methods
-                documents_retrieved = chat_service.map_citations_for_storage(source_docs)
-                sources = chat_service.map_citations_for_frontend(documents_retrieved)
-
-                # Update the existing assistant message with citations (don't create a new one)
-                if assistant_message:
-                    assistant_message.message_metadata = {
-                        "processing_method": "lcel_with_automatic_history",
-                        "use_rag": True,
-                        "knowledge_base_used": len(documents_retrieved) > 0,
-                        "documents_retrieved": documents_retrieved
-                    }
-                    await db.commit()
-                    saved = assistant_message
-                else:
-                    # Fallback: create new message if assistant_message doesn't exist
-                    saved = await chat_service.save_message(
-                        db=db,
-                        conversation_id=conversation_id,
-                        content=final_response,
-                        sender="agent",
-                        agent_type=mode if mode in ["internet", "supplier"] else "farm_data",
-                        message_type="text",
-                        metadata={
-                            "processing_method": "lcel_with_automatic_history",
-                            "use_rag": True,
-                            "knowledge_base_used": len(documents_retrieved) > 0,
-                            "documents_retrieved": documents_retrieved
-                        }
-                    )
-                message_id = str(saved.id)
-                await db.commit()  # Commit the agent message
-
-                # Unified completion event
-                await websocket.send_json({
-                    "type": "done",
-                    "message_id": message_id,
-                    "citation_count": len(documents_retrieved),
-                    "sources": sources
-                })
+            # Signal streaming start so frontend creates placeholder message
+            await websocket.send_json({"type": "llm_start", "message_id": assistant_message_id})
+            await _send_stream(websocket, session)
 
     except WebSocketDisconnect:
         logger.info(f"Unified WebSocket disconnected for conversation {conversation_id}")
@@ -213,3 +164,81 @@ async def websocket_chat(
     finally:
         # No connection registry to clean up in unified LCEL streaming
         pass
+
+
+async def _send_stream(websocket: WebSocket, session: StreamSession, offset: int = 0):
+    """Send an answer's delta frames from offset, then its done (or error) event"""
+    async for frame in session.frames(offset):
+        await websocket.send_json(frame)
+    await websocket.send_json(session.final_event or {"type": "done", "message_id": session.message_id})
+
+
+async def _generate_answer(
+    session: StreamSession,
+    conversation_id: str,
+    org_id: str,
+    message_content: str,
+    thread_id: str,
+    mode: Optional[str]
+):
+    """Stream the LCEL answer into the session and save both messages"""
+    from app.core.database import AsyncSessionLocal
+
+    try:
+        async with AsyncSessionLocal() as db:
+            # Save user message
+            await chat_service.save_message(
+                db=db,
+                conversation_id=conversation_id,
+                content=message_content,
+                sender="user",
+                message_type="text",
+                thread_id=thread_id
+            )
+            await db.commit()  # Commit the user message
+
+            # Use LCEL service with mode-aware tools
+            final_response, source_docs = await collect_answer(
+                session,
+                chat_service.lcel_service.stream_message(
+                    db_session=db,
+                    conversation_id=conversation_id,
+                    message=message_content,
+                    use_rag=True,
+                    organization_id=org_id,
+                    mode=mode  # Pass mode to LCEL service for tool selection
+                )
+            )
+
+            # Map citations using service methods
+            documents_retrieved = chat_service.map_citations_for_storage(source_docs)
+            sources = chat_service.map_citations_for_frontend(documents_retrieved)
+
+            # Save assistant message with citations
+            saved = await chat_service.save_message(
+                db=db,
+                conversation_id=conversation_id,
+                content=final_response,
+                sender="agent",
+                agent_type=mode if mode in ["internet", "supplier"] else "farm_data",
+                message_type="text",
+                thread_id=thread_id,
+                metadata={
+                    "processing_method": "lcel_with_automatic_history",
+                    "use_rag": True,
+                    "knowledge_base_used": len(documents_retrieved) > 0,
+                    "documents_retrieved": documents_retrieved
+                }
+            )
+            await db.commit()  # Commit the agent message
+
+        # Unified completion event
+        session.close({
+            "type": "done",
+            "message_id": str(saved.id),
+            "citation_count": len(documents_retrieved),
+            "sources": sources
+        })
+    except Exception as e:
+        logger.error(f"Answer generation error: {e}")
+        session.close({"type": "error", "message": str(e), "message_id": session.message_id})
@@ -12,6 +12,7 @@ from app.core.database import get_async_db
 from app.models.user import User
 from app.core.permissions import get_superuser
 from app.services.knowledge_base_workflow_service import KnowledgeBaseWorkflowService
+from app.services.document_ingestion_service import document_ingestion_service
 from app.api.v1.knowledge_base.schemas import StandardErrorResponse
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,10 @@ async def approve_document(
             db=db
         )
         
+        # Embedding runs on the background worker; processing_status tracks it
+        if result.get("success"):
+            result["ingestion_queued"] = document_ingestion_service.enqueue(document_id)
+        
         return result
         
     except Exception as e:
@@ -78,8 +78,8 @@ async def get_source_attribution(
         organization_id = await require_user_organization(current_user, db)
         
         # Get relevant documents using RAG service
-        from app.services.rag_service import RAGService
-        rag_service = RAGService()
+        from app.services.rag_service import get_rag_service
+        rag_service = get_rag_service()
         
         # Search for relevant documents
         search_results = await rag_service.get_relevant_documents(
@@ -164,9 +164,9 @@ async def get_document_chunk_analytics(
     Shows which chunks are most frequently accessed and their performance
     """
     try:
-        from app.services.rag_service import RAGService
+        from app.services.rag_service import get_rag_service
         
-        rag_service = RAGService()
+        rag_service = get_rag_service()
         
         chunk_analytics = await rag_service.get_chunk_analytics(
             document_id=document_id,
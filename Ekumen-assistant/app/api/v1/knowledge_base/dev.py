@@ -49,8 +49,8 @@ async def get_source_attribution_dev(
         mock_organization_id = "48359c04-d103-4cdd-b165-502ceefda04a"
         
         # Get relevant documents using RAG service
-        from app.services.rag_service import RAGService
-        rag_service = RAGService()
+        from app.services.rag_service import get_rag_service
+        rag_service = get_rag_service()
         
         # Search for relevant documents
         search_results = await rag_service.get_relevant_documents(
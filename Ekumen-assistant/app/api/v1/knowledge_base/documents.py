@@ -4,6 +4,7 @@ Document operations and workflow endpoints for the Knowledge Base API
 
 import logging
 from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
@@ -43,9 +44,9 @@ async def search_knowledge_base(
     Returns public, shared, and organization-specific content
     """
     try:
-        from app.services.rag_service import RAGService
+        from app.services.rag_service import get_rag_service
         
-        rag_service = RAGService()
+        rag_service = get_rag_service()
         
         # Get user's organization using reusable function
         user_org = await require_user_organization(current_user, db)
@@ -179,9 +180,11 @@ async def submit_document(
     Submit a document for knowledge base contribution
     """
     try:
-        # RATE LIMITING: Check upload rate limits
-        if request:
-            check_rate_limit(request, current_user, limit=5, window_seconds=300)  # 5 uploads per 5 minutes
+        # Get user's organization using reusable function
+        user_org = await require_user_organization(current_user, db)
+        
+        # RATE LIMITING: Per-user and per-organization upload limits, shared by all workers
+        await check_rate_limit(request, current_user, policy="kb_upload", organization_id=user_org)
         
         # SECURITY: Validate file upload
         validate_file_upload(file)
@@ -230,9 +233,6 @@ async def submit_document(
                 detail="Visibility must be one of: internal, shared, public"
             )
         
-        # Get user's organization using reusable function
-        user_org = await require_user_organization(current_user, db)
-        
         # Submit document
         result = await workflow_service.submit_document(
             organization_id=str(user_org),
@@ -333,8 +333,8 @@ async def renew_document(
     try:
         result = await workflow_service.renew_document(
             document_id=document_id,
-            months=months,
-            user_id=str(current_user.id),
+            renewed_by=str(current_user.id),
+            new_expiry_date=datetime.utcnow() + timedelta(days=30 * months),
             db=db
         )
         
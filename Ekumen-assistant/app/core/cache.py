@@ -9,12 +9,13 @@ import functools
 import hashlib
 import json
 import logging
-from typing import Any, Callable, Optional, Type
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple, Type
 from pydantic import BaseModel
 from cachetools import TTLCache
 import redis
 
 from app.core.config import settings
+from app.core.single_flight import SingleFlight, RedisLease
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +92,19 @@ except Exception as e:
     redis_client = None
 
 
+# Request coalescing: one in-flight computation per cache key
+_single_flight = SingleFlight(name="redis_cache")
+_redis_lease: Optional[RedisLease] = (
+    RedisLease(redis_client, prefix=f"{settings.CACHE_PREFIX}lock:") if redis_client else None
+)
+
+# Sentinel distinguishing "not cached" from a cached falsy value
+_MISS = object()
+
+# Tag -> (category, cache key) of memory entries, for targeted invalidation
+_tag_index: Dict[str, Set[Tuple[str, str]]] = {}
+
+
 def _generate_cache_key(func: Callable, args: tuple, kwargs: dict) -> str:
     """
     Generate cache key from function and arguments
@@ -146,10 +160,123 @@ def _deserialize_pydantic(data: str, model_class: Optional[Type[BaseModel]] = No
     return json.loads(data)
 
 
+def _read_cache(cache_key: str, category: str, model_class: Optional[Type[BaseModel]], func_name: str) -> Any:
+    """
+    Look up a key in Redis, then in the category memory cache
+
+    Returns:
+        Cached value, or _MISS if not found in any layer
+    """
+    if redis_client:
+        try:
+            cached = redis_client.get(cache_key)
+            if cached:
+                logger.debug(f"🎯 Redis cache hit: {func_name}")
+                return _deserialize_pydantic(cached, model_class)
+        except Exception as e:
+            logger.warning(f"Redis read error: {e}")
+
+    memory_cache = get_memory_cache(category)
+    if cache_key in memory_cache:
+        logger.debug(f"🎯 Memory cache hit ({category}): {func_name}")
+        return memory_cache[cache_key]
+
+    return _MISS
+
+
+def _tag_key(tag: str) -> str:
+    return f"{settings.CACHE_PREFIX}tag:{tag}"
+
+
+def _write_cache(
+    cache_key: str,
+    category: str,
+    ttl: int,
+    result: Any,
+    func_name: str,
+    tags: Iterable[str] = ()
+):
+    """Store a result in Redis (if available) and the category memory cache"""
+    try:
+        serialized = _serialize_pydantic(result)
+        tags = list(tags)
+
+        # Store in Redis
+        if redis_client:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.setex(cache_key, ttl, serialized)
+                for tag in tags:
+                    pipe.sadd(_tag_key(tag), cache_key)
+                    pipe.expire(_tag_key(tag), ttl)
+                pipe.execute()
+                logger.debug(f"💾 Cached in Redis: {func_name} (TTL: {ttl}s)")
+            except Exception as e:
+                logger.warning(f"Redis write error: {e}")
+
+        # Store in category-specific memory cache
+        memory_cache = get_memory_cache(category)
+        memory_cache[cache_key] = result
+        for tag in tags:
+            _tag_index.setdefault(tag, set()).add((category, cache_key))
+        if tags and len(_tag_index) > 10 * sum(c.maxsize for c in _caches.values()):
+            _prune_tag_index()
+        logger.debug(f"💾 Cached in memory ({category}): {func_name}")
+
+    except Exception as e:
+        logger.warning(f"Cache write error: {e}")
+
+
+def _prune_tag_index():
+    """Drop tag entries whose memory cache entry has expired"""
+    for tag in list(_tag_index):
+        live = {(cat, key) for cat, key in _tag_index[tag] if key in get_memory_cache(cat)}
+        if live:
+            _tag_index[tag] = live
+        else:
+            del _tag_index[tag]
+
+
+def invalidate_tags(tags: Iterable[str]) -> int:
+    """
+    Remove every cached result carrying one of the tags
+
+    Used to invalidate only the entries affected by a data change (e.g. the
+    AMM numbers in an EPHY import change-set) instead of a whole category.
+
+    Args:
+        tags: Tags given to redis_cache(tags=...) results
+
+    Returns:
+        Number of cache entries removed (Redis + memory)
+    """
+    removed = 0
+    for tag in set(tags):
+        if redis_client:
+            try:
+                keys = redis_client.smembers(_tag_key(tag))
+                if keys:
+                    removed += redis_client.delete(*keys)
+                redis_client.delete(_tag_key(tag))
+            except Exception as e:
+                logger.warning(f"Redis tag invalidation error: {e}")
+
+        for category, cache_key in _tag_index.pop(tag, ()):
+            if get_memory_cache(category).pop(cache_key, None) is not None:
+                removed += 1
+
+    if removed:
+        logger.info(f"✅ Invalidated {removed} cache entries by tag")
+    return removed
+
+
 def redis_cache(
     ttl: int = 300,
     model_class: Optional[Type[BaseModel]] = None,
-    category: str = "default"
+    category: str = "default",
+    single_flight: bool = True,
+    distributed_lock: bool = False,
+    tags: Optional[Callable[[Any], Iterable[str]]] = None
 ):
     """
     Decorator for caching with Pydantic support and category-specific fallback
@@ -157,14 +284,23 @@ def redis_cache(
     Caches function results in Redis (if available) and category-specific in-memory cache.
     Properly handles Pydantic model serialization/deserialization.
 
+    Concurrent misses on the same key are coalesced (single-flight): one
+    call computes the value and the others await it. With distributed_lock,
+    workers in other processes also wait on a Redis lease instead of
+    recomputing.
+
     Args:
         ttl: Time to live in seconds (default: 5 minutes)
         model_class: Optional Pydantic model class for deserialization
         category: Tool category for memory cache (weather, regulatory, farm_data, etc.)
+        single_flight: Coalesce concurrent in-process misses on the same key
+        distributed_lock: Also coalesce across processes with a Redis lease
+        tags: Optional function returning invalidation tags for a result
+            (see invalidate_tags)
 
     Example:
         ```python
-        @redis_cache(ttl=3600, model_class=WeatherOutput, category="weather")
+        @redis_cache(ttl=3600, model_class=WeatherOutput, category="weather", distributed_lock=True)
         async def get_weather(...) -> WeatherOutput:
             return WeatherOutput(...)
         ```
@@ -177,46 +313,33 @@ def redis_cache(
         async def wrapper(*args, **kwargs) -> Any:
             cache_key = _generate_cache_key(func, args, kwargs)
 
-            # Try Redis first
-            if redis_client:
-                try:
-                    cached = redis_client.get(cache_key)
-                    if cached:
-                        logger.debug(f"🎯 Redis cache hit: {func.__name__}")
-                        return _deserialize_pydantic(cached, model_class)
-                except Exception as e:
-                    logger.warning(f"Redis read error: {e}")
-
-            # Try category-specific memory cache
-            memory_cache = get_memory_cache(category)
-            if cache_key in memory_cache:
-                logger.debug(f"🎯 Memory cache hit ({category}): {func.__name__}")
-                return memory_cache[cache_key]
+            cached = _read_cache(cache_key, category, model_class, func.__name__)
+            if cached is not _MISS:
+                return cached
 
             # Cache miss - execute function
             logger.debug(f"❌ Cache miss: {func.__name__}")
-            result = await func(*args, **kwargs)
-
-            # Store in both caches
-            try:
-                serialized = _serialize_pydantic(result)
 
-                # Store in Redis
-                if redis_client:
-                    try:
-                        redis_client.setex(cache_key, ttl, serialized)
-                        logger.debug(f"💾 Cached in Redis: {func.__name__} (TTL: {ttl}s)")
-                    except Exception as e:
-                        logger.warning(f"Redis write error: {e}")
+            async def compute() -> Any:
+                result = await func(*args, **kwargs)
+                _write_cache(
+                    cache_key, category, ttl, result, func.__name__,
+                    tags=tags(result) if tags else ()
+                )
+                return result
 
-                # Store in category-specific memory cache
-                memory_cache[cache_key] = result
-                logger.debug(f"💾 Cached in memory ({category}): {func.__name__}")
+            async def compute_coalesced() -> Any:
+                if distributed_lock and _redis_lease:
+                    def read_shared() -> Any:
+                        value = _read_cache(cache_key, category, model_class, func.__name__)
+                        return None if value is _MISS else value
 
-            except Exception as e:
-                logger.warning(f"Cache write error: {e}")
+                    return await _redis_lease.run(cache_key, compute, read_shared)
+                return await compute()
 
-            return result
+            if single_flight:
+                return await _single_flight.do(cache_key, compute_coalesced)
+            return await compute_coalesced()
 
         return wrapper
     return decorator
@@ -266,6 +389,19 @@ def clear_cache(pattern: str = "*", category: Optional[str] = None):
         logger.info("✅ Cleared all memory caches")
 
 
+def get_single_flight_stats() -> dict:
+    """
+    Get request coalescing statistics
+
+    Returns:
+        In-process and cross-process counts of deduplicated calls
+    """
+    return {
+        "in_process": _single_flight.get_stats(),
+        "cross_process": _redis_lease.get_stats() if _redis_lease else None,
+    }
+
+
 def get_cache_stats() -> dict:
     """
     Get cache statistics for all categories
@@ -277,6 +413,7 @@ def get_cache_stats() -> dict:
         "redis_available": redis_client is not None,
         "memory_caches": {},
         "total_memory_items": 0,
+        "single_flight": get_single_flight_stats(),
     }
 
     # Get stats for each category
@@ -58,6 +58,12 @@ class Settings(BaseSettings):
     OPENAI_DEFAULT_MODEL: str = "gpt-4-turbo-preview"
     OPENAI_FALLBACK_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 4000
+    
+    # Agents built by the agent pool at startup (the rest are built on first use)
+    AGENT_POOL_WARM_UP: List[str] = [
+        "orchestrator", "weather", "crop_health", "farm_data", "planning",
+        "regulatory", "sustainability", "internet", "supplier"
+    ]
     OPENAI_REQUEST_TIMEOUT: int = 60
     OPENAI_MAX_RETRIES: int = 3
     
@@ -114,10 +120,29 @@ class Settings(BaseSettings):
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "")
     WEATHER_BASE_URL: str = "http://api.weatherapi.com/v1"
     METEO_FRANCE_API_KEY: str = os.getenv("METEO_FRANCE_API_KEY", "")
-    
+    # Delay before firing the backup weather provider (hedged request)
+    WEATHER_HEDGE_DELAY_SECONDS: float = 1.5
+    # Forecast tile cache grid size in degrees (~11 km, commune scale)
+    WEATHER_TILE_RESOLUTION_DEG: float = 0.1
+
+    # Shared outbound HTTP client (connection pool)
+    HTTP_CLIENT_TIMEOUT: float = 10.0
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 3.0
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 20
+
     # Regulatory API Configuration
     E_PHY_API_URL: str = "https://ephy.anses.fr/ws/rest"
     AMM_API_URL: str = "https://ephy.anses.fr/ws/rest/amm"
+    # Redis channel where the backend publishes EPHY import change-sets
+    EPHY_CHANGES_CHANNEL: str = "ephy:changes"
+    # In-memory EPHY index snapshot, rebuilt from the database when older than max age
+    REGULATORY_INDEX_SNAPSHOT: str = "data/regulatory_index.json.z"
+    REGULATORY_INDEX_MAX_AGE: int = 86400
+    # Disease/pest scoring index: re-validated against the tables after this many seconds
+    KNOWLEDGE_INDEX_TTL: int = 600
+    # Per-organization accessible knowledge base documents for RAG retrieval
+    RAG_ACCESS_CACHE_TTL: int = 300
     
     # Farm Data API Configuration
     MES_PARCELLES_API_URL: str = os.getenv("MES_PARCELLES_API_URL", "")
@@ -137,10 +162,79 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
     RATE_LIMIT_BURST: int = 10
+    # In-process windows kept when Redis is down; organization ID -> {policy: limit}
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10000
+    RATE_LIMIT_ORGANIZATION_LIMITS: Dict[str, Dict[str, int]] = {}
     
     # Cache Configuration
     CACHE_TTL: int = 3600  # 1 hour
     CACHE_PREFIX: str = "agricultural_chatbot:"
+    # Multi-layer cache: memory tier size, values from this size on go to Postgres instead of Redis
+    MULTI_LAYER_CACHE_MEMORY_SIZE: int = 1000
+    MULTI_LAYER_CACHE_SPILL_BYTES: int = 262144
+    MULTI_LAYER_CACHE_CHANNEL: str = "cache:invalidate"
+    # Conversation history: recent messages loaded per turn, older ones folded into a summary
+    HISTORY_WINDOW_MESSAGES: int = 20
+    HISTORY_SUMMARY_BATCH: int = 20  # Messages beyond the window before the summary is refreshed
+    HISTORY_CACHE_TTL: int = 1800
+    HISTORY_SUMMARY_ENABLED: bool = True
+    # Knowledge base ingestion: chunks per embedding request, requests in flight, attempts per batch
+    RAG_EMBED_BATCH_SIZE: int = 64
+    RAG_EMBED_CONCURRENCY: int = 4
+    RAG_EMBED_MAX_RETRIES: int = 3
+    RAG_INGESTION_QUEUE_SIZE: int = 100
+    RAG_INGESTION_STALE_AFTER: int = 1800  # Seconds in PROCESSING before startup re-queues a document
+    # Knowledge base chunking: token budget per chunk and tokens repeated between chunks
+    RAG_CHUNK_TOKENS: int = 256
+    RAG_CHUNK_OVERLAP_TOKENS: int = 48
+    # Embedding cache: vectors kept in process (the embedding_cache table holds the rest)
+    EMBEDDING_CACHE_LRU_SIZE: int = 10000
+    # Prompt matcher embeddings, memory-mapped by every worker (rebuilt when prompts change)
+    PROMPT_EMBEDDINGS_PATH: str = "data/prompt_embeddings.npy"
+    # Retrieval analytics: seconds between flushes, events that trigger an early flush, buffer bound
+    RETRIEVAL_ANALYTICS_FLUSH_INTERVAL: float = 5.0
+    RETRIEVAL_ANALYTICS_BATCH_SIZE: int = 500
+    RETRIEVAL_ANALYTICS_MAX_EVENTS: int = 10000
+    # Answer streaming: ms between delta frames, characters that force an early frame, seconds a finished stream stays resumable
+    STREAM_FRAME_INTERVAL_MS: int = 60
+    STREAM_FRAME_MAX_CHARS: int = 512
+    STREAM_RESUME_TTL: int = 300
+    # Semantic answer cache: answers served to paraphrases above a cosine similarity, per freshness class
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+    SEMANTIC_CACHE_THRESHOLDS: Dict[str, float] = {
+        "weather": 0.95,
+        "farm_data": 0.94,
+        "regulatory": 0.93,
+        "general": 0.92
+    }
+    SEMANTIC_CACHE_TTLS: Dict[str, int] = {
+        "weather": 900,        # 15 minutes
+        "farm_data": 3600,     # 1 hour
+        "regulatory": 86400,   # 24 hours
+        "general": 1800        # 30 minutes
+    }
+    # Model routing: cheap and strong model, probability above which a query goes to the strong one
+    MODEL_ROUTER_CHEAP_MODEL: str = "gpt-3.5-turbo"
+    MODEL_ROUTER_STRONG_MODEL: str = "gpt-4"
+    MODEL_ROUTER_STRONG_THRESHOLD: float = 0.5
+    MODEL_ROUTER_CLASSIFIER_PATH: str = "app/data/complexity_model.json"
+    # Budgets: seconds per answer and USD per organization per day (0 = no cap), overridable per organization
+    MODEL_ROUTER_LATENCY_SLO: float = 20.0
+    MODEL_ROUTER_DAILY_COST_CAP: float = 0.0
+    MODEL_ROUTER_ORG_POLICIES: Dict[str, Dict[str, float]] = {}
+    # Share of latency downgrades still sent to the strong model to re-measure its latency
+    MODEL_ROUTER_LATENCY_PROBE_RATE: float = 0.05
+    # Shadow mode: share of strong-model calls also answered by the cheap model, agreement that counts as enough
+    MODEL_ROUTER_SHADOW_RATE: float = 0.0
+    MODEL_ROUTER_SHADOW_AGREEMENT: float = 0.6
+    # Usage metering: seconds between flushes to llm_usage, buffered aggregates that trigger an early flush
+    USAGE_FLUSH_INTERVAL: float = 30.0
+    USAGE_FLUSH_BATCH_SIZE: int = 1000
+    # Token quotas per organization per UTC day (0 = none), overridable per organization
+    USAGE_DAILY_TOKEN_QUOTA: int = 0
+    USAGE_ORG_TOKEN_QUOTAS: Dict[str, int] = {}
     
     # File Upload Configuration
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -0,0 +1,185 @@
+"""
+Shared async HTTP client with connection pooling and latency histograms
+
+Provides a single process-wide httpx.AsyncClient so outbound API calls
+(weather providers, etc.) reuse keep-alive connections instead of opening
+a new TCP/TLS session per request, and never block the event loop.
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, last bucket is +Inf)
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram
+
+    Records observations in O(log buckets) and reports cumulative bucket
+    counts plus approximate p50/p95/p99 without storing raw samples.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Extra slot for +Inf
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, duration: float, error: bool = False):
+        """Record one request duration (seconds)"""
+        self.counts[bisect_left(self.buckets, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if error:
+            self.errors += 1
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Approximate percentile as the upper bound of the matching bucket"""
+        if self.count == 0:
+            return None
+        target = self.count * percentile / 100
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Export histogram as a JSON-friendly dict"""
+        cumulative = 0
+        buckets = {}
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            label = f"le_{self.buckets[index]}" if index < len(self.buckets) else "le_inf"
+            buckets[label] = cumulative
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_seconds": round(self.total / self.count, 4) if self.count else 0,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "p99_seconds": self.percentile(99),
+            "buckets": buckets,
+        }
+
+
+# Per-provider latency histograms (e.g. "weatherapi", "openweathermap")
+_latency_histograms: Dict[str, LatencyHistogram] = {}
+
+# One client per event loop: httpx connection pools are bound to the loop
+# that opened them, so a worker thread running its own loop gets its own
+# client instead of replacing (and leaking) the main loop's one
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client of the running event loop (created lazily)
+
+    Returns:
+        Shared httpx.AsyncClient with keep-alive connection pool
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # Clients of loops that were closed without close_http_client()
+        # can no longer be closed on their loop; just drop them
+        for stale_loop in [other for other in _clients if other.is_closed()]:
+            del _clients[stale_loop]
+
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+            headers={"User-Agent": f"{settings.PROJECT_NAME}/{settings.VERSION}"},
+        )
+        _clients[loop] = client
+        logger.info("✅ Shared async HTTP client initialized")
+    return client
+
+
+async def close_http_client():
+    """
+    Close the shared HTTP clients (call on application shutdown)
+
+    The running loop's client is awaited; clients of other loops that are
+    still running are closed on their own loop.
+    """
+    current_loop = asyncio.get_running_loop()
+    for loop, client in list(_clients.items()):
+        if client.is_closed:
+            continue
+        if loop is current_loop:
+            await client.aclose()
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    if _clients:
+        logger.info("Shared async HTTP client closed")
+    _clients.clear()
+
+
+def get_latency_histogram(provider: str) -> LatencyHistogram:
+    """Get (or create) the latency histogram for a provider"""
+    if provider not in _latency_histograms:
+        _latency_histograms[provider] = LatencyHistogram()
+    return _latency_histograms[provider]
+
+
+@asynccontextmanager
+async def track_latency(provider: str):
+    """
+    Context manager recording the duration of an outbound call
+
+    Example:
+        ```python
+        async with track_latency("weatherapi"):
+            response = await get_http_client().get(url, params=params)
+        ```
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        # Losing a hedged race is not a provider failure - don't record it
+        raise
+    except Exception:
+        get_latency_histogram(provider).observe(time.perf_counter() - start_time, error=True)
+        raise
+    get_latency_histogram(provider).observe(time.perf_counter() - start_time)
+
+
+def get_http_client_stats() -> Dict[str, Any]:
+    """
+    Get per-provider latency histograms and pool state
+
+    Returns:
+        Dictionary with provider histograms
+    """
+    return {
+        "client_open": any(not client.is_closed for client in _clients.values()),
+        "clients": len(_clients),
+        "providers": {
+            provider: histogram.to_dict()
+            for provider, histogram in _latency_histograms.items()
+        },
+    }
@@ -1,88 +1,362 @@
 """
 Rate limiting utilities for the application
+
+Sliding-window counters shared by every worker through Redis:
+
+- Each key holds two counters (current and previous fixed window); the
+  previous one is weighted by how much of it still overlaps the sliding
+  window, so memory per key is O(1)
+- The check-and-increment runs as one Lua script on the Redis clock, so
+  workers cannot race past a limit or disagree about the window
+- When Redis is unreachable the same algorithm runs in process (bounded
+  LRU of keys) and Redis is retried after RETRY_AFTER seconds
+- Limits are named policies of per-user, per-organization or per-IP rules;
+  organizations can have their own limits (RATE_LIMIT_ORGANIZATION_LIMITS)
+- A request denied by one rule is refunded to the rules it already passed,
+  so denied requests use no quota
 """
 
 import os
 import logging
-from datetime import datetime, timedelta
-from collections import defaultdict
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
 from fastapi import HTTPException, status, Request
+
+from app.core.config import settings
 from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT = object()
+
 def is_development_mode() -> bool:
     """Check if we're running in development mode"""
     return os.getenv("ENVIRONMENT", "production").lower() in ["development", "dev", "local"]
 
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """At most `limit` requests per `window_seconds` for each user, organization or IP"""
+
+    limit: int
+    window_seconds: int
+    scope: str = "user"  # user, organization or ip
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until a request would be allowed (0 when allowed)
+    backend: str  # redis or local
+
+
+# Named policies; a request must pass every rule of its policy
+RATE_LIMIT_POLICIES: Dict[str, Tuple[RateLimitRule, ...]] = {
+    "kb_upload": (
+        RateLimitRule(limit=5, window_seconds=300, scope="user"),
+        RateLimitRule(limit=50, window_seconds=300, scope="organization"),
+    ),
+    "chat": (
+        RateLimitRule(limit=20, window_seconds=60, scope="user"),
+        RateLimitRule(limit=300, window_seconds=60, scope="organization"),
+    ),
+}
+
+
+def slide_window(
+    state: Optional[Tuple[int, float, float]],
+    now_ms: int,
+    window_ms: int,
+    limit: int,
+    cost: int = 1,
+) -> Tuple[bool, float, float, Tuple[int, float, float]]:
+    """
+    One sliding-window check (the Lua script below is the same algorithm)
+
+    Args:
+        state: (window start ms, current count, previous count) or None
+
+    Returns:
+        (allowed, estimated count after the request, retry after ms, new state)
+    """
+    start = now_ms - now_ms % window_ms
+    window_start, current, previous = state or (start, 0, 0)
+    if window_start != start:
+        previous = current if window_start == start - window_ms else 0
+        current = 0
+
+    elapsed = now_ms - start
+    estimated = previous * (window_ms - elapsed) / window_ms + current
+    if estimated + cost <= limit:
+        current += cost
+        return True, estimated + cost, 0.0, (start, current, previous)
+
+    if current + cost > limit or previous <= 0:
+        # Not before the next window, where this one becomes the previous
+        retry_ms = window_ms - elapsed
+    else:
+        # Once enough of the previous window has slid out
+        retry_ms = window_ms - (limit - current - cost) * window_ms / previous - elapsed
+    return False, estimated, max(retry_ms, 1.0), (start, current, previous)
+
+
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local start = now_ms - now_ms % window
+
+local state = redis.call('HMGET', KEYS[1], 'start', 'current', 'previous')
+local window_start = tonumber(state[1]) or start
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if window_start ~= start then
+    if window_start == start - window then previous = current else previous = 0 end
+    current = 0
+end
+
+local elapsed = now_ms - start
+local estimated = previous * (window - elapsed) / window + current
+local allowed = 0
+local retry = 0
+if estimated + cost <= limit then
+    allowed = 1
+    current = current + cost
+    estimated = estimated + cost
+elseif current + cost > limit or previous <= 0 then
+    retry = window - elapsed
+else
+    retry = window - (limit - current - cost) * window / previous - elapsed
+end
+
+redis.call('HSET', KEYS[1], 'start', start, 'current', current, 'previous', previous)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {allowed, tostring(estimated), tostring(math.max(retry, allowed == 1 and 0 or 1))}
+"""
+
+# Give back a counted request, unless its window has already rolled over
+REFUND_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local window = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local start = now_ms - now_ms % window
+
+if tonumber(redis.call('HGET', KEYS[1], 'start')) == start then
+    local current = tonumber(redis.call('HGET', KEYS[1], 'current')) or 0
+    redis.call('HSET', KEYS[1], 'current', math.max(current - cost, 0))
+end
+return 1
+"""
+
+
+class LocalWindowStore:
+    """In-process sliding windows, an LRU bounded to max_keys"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.windows: "OrderedDict[str, Tuple[int, float, float]]" = OrderedDict()
+
+    def hit(self, key: str, limit: int, window_ms: int, cost: int = 1) -> Tuple[bool, float, float]:
+        allowed, estimated, retry_ms, state = slide_window(
+            self.windows.get(key), int(time.time() * 1000), window_ms, limit, cost
+        )
+        self.windows[key] = state
+        self.windows.move_to_end(key)
+        if len(self.windows) > self.max_keys:
+            self.windows.popitem(last=False)
+        return allowed, estimated, retry_ms
+
+    def refund(self, key: str, window_ms: int, cost: int = 1):
+        state = self.windows.get(key)
+        now_ms = int(time.time() * 1000)
+        if state is not None and state[0] == now_ms - now_ms % window_ms:
+            start, current, previous = state
+            self.windows[key] = (start, max(current - cost, 0), previous)
+
+
 class RateLimiter:
-    """Simple in-memory rate limiter (for production, use Redis)"""
-    
-    def __init__(self):
-        self.requests = defaultdict(list)
-        self.cleanup_interval = 300  # 5 minutes
-        self.last_cleanup = datetime.utcnow()
-    
-    def is_allowed(
-        self, 
-        key: str, 
-        limit: int, 
-        window_seconds: int = 60
-    ) -> bool:
-        """Check if request is allowed based on rate limit"""
-        now = datetime.utcnow()
-        
-        # Cleanup old entries periodically
-        if (now - self.last_cleanup).total_seconds() > self.cleanup_interval:
-            self._cleanup_old_entries(now)
-            self.last_cleanup = now
-        
-        # Remove old entries for this key
-        cutoff = now - timedelta(seconds=window_seconds)
-        self.requests[key] = [
-            req_time for req_time in self.requests[key] 
-            if req_time > cutoff
-        ]
-        
-        # Check if under limit
-        if len(self.requests[key]) >= limit:
-            return False
-        
-        # Add current request
-        self.requests[key].append(now)
-        return True
-    
-    def _cleanup_old_entries(self, now: datetime):
-        """Clean up old entries to prevent memory leaks"""
-        cutoff = now - timedelta(hours=1)
-        keys_to_remove = []
-        
-        for key, requests in self.requests.items():
-            self.requests[key] = [req for req in requests if req > cutoff]
-            if not self.requests[key]:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.requests[key]
+    """Sliding-window rate limiter on Redis with an in-process fallback"""
+
+    RETRY_AFTER = 30.0  # Seconds before retrying Redis after a failure
+
+    def __init__(self, redis_client=_DEFAULT, max_local_keys: Optional[int] = None):
+        self.redis = self._create_redis_client() if redis_client is _DEFAULT else redis_client
+        self.local = LocalWindowStore(max_local_keys or settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+        self.prefix = f"{settings.CACHE_PREFIX}ratelimit:"
+        self._script = None
+        self._refund_script = None
+        self._disabled_until = 0.0
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.redis_errors = 0
+
+    @staticmethod
+    def _create_redis_client():
+        """redis.asyncio client (connects lazily)"""
+        try:
+            import redis.asyncio as aioredis
+
+            return aioredis.from_url(
+                settings.REDIS_URL,
+                password=settings.REDIS_PASSWORD,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Shared rate limiting unavailable, limits are per process: {e}")
+            return None
+
+    async def hit(self, key: str, limit: int, window_seconds: int, cost: int = 1) -> RateLimitDecision:
+        """Count a request against `key` if it fits in the limit"""
+        window_ms = int(window_seconds * 1000)
+        if self.redis is not None and self._disabled_until <= time.time():
+            try:
+                if self._script is None:
+                    self._script = self.redis.register_script(SLIDING_WINDOW_SCRIPT)
+                allowed, estimated, retry_ms = await self._script(
+                    keys=[f"{self.prefix}{key}"], args=[limit, window_ms, cost]
+                )
+                return self._decision(bool(int(allowed)), limit, float(estimated), float(retry_ms), "redis")
+            except Exception as e:
+                self.redis_errors += 1
+                self._disabled_until = time.time() + self.RETRY_AFTER
+                logger.warning(f"⚠️ Redis rate limiting failed, limiting per process for {self.RETRY_AFTER:.0f}s: {e}")
+
+        allowed, estimated, retry_ms = self.local.hit(key, limit, window_ms, cost)
+        return self._decision(allowed, limit, estimated, retry_ms, "local")
+
+    async def refund(self, key: str, window_seconds: int, backend: str, cost: int = 1):
+        """Give back a request counted by hit() on `backend`"""
+        window_ms = int(window_seconds * 1000)
+        if backend == "redis":
+            try:
+                if self._refund_script is None:
+                    self._refund_script = self.redis.register_script(REFUND_SCRIPT)
+                await self._refund_script(keys=[f"{self.prefix}{key}"], args=[window_ms, cost])
+            except Exception as e:
+                self.redis_errors += 1
+                logger.warning(f"⚠️ Redis rate limit refund failed: {e}")
+        else:
+            self.local.refund(key, window_ms, cost)
+
+    @staticmethod
+    def _decision(allowed: bool, limit: int, estimated: float, retry_ms: float, backend: str) -> RateLimitDecision:
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(int(limit - estimated), 0),
+            retry_after=0.0 if allowed else retry_ms / 1000,
+            backend=backend,
+        )
+
+    async def check(
+        self,
+        policy: str,
+        user_id: Optional[str] = None,
+        organization_id: Optional[str] = None,
+        client_ip: Optional[str] = None,
+    ) -> RateLimitDecision:
+        """
+        Apply every rule of a policy
+
+        A denied request is refunded to the rules it passed before the
+        denying one, so it counts against no limit.
+
+        Returns:
+            The first denying decision, else the most restrictive allowing one
+        """
+        subjects = {"user": user_id, "organization": organization_id, "ip": client_ip}
+        organization_limits = settings.RATE_LIMIT_ORGANIZATION_LIMITS.get(str(organization_id), {})
+        decision: Optional[RateLimitDecision] = None
+        counted = []
+
+        for rule in RATE_LIMIT_POLICIES[policy]:
+            subject = subjects.get(rule.scope)
+            if not subject:
+                continue
+            limit = rule.limit
+            if rule.scope == "organization":
+                limit = organization_limits.get(policy, limit)
+            key = f"{policy}:{rule.scope}:{subject}:{rule.window_seconds}"
+            result = await self.hit(key, limit, rule.window_seconds)
+            if not result.allowed:
+                decision = result
+                for counted_key, window_seconds, backend in counted:
+                    await self.refund(counted_key, window_seconds, backend)
+                break
+            counted.append((key, rule.window_seconds, result.backend))
+            if decision is None or result.remaining < decision.remaining:
+                decision = result
+
+        decision = decision or RateLimitDecision(True, 0, 0, 0.0, "none")
+        self._record(policy, decision)
+        return decision
+
+    def _record(self, policy: str, decision: RateLimitDecision):
+        stats = self.stats.setdefault(policy, {"allowed": 0, "denied": 0, "redis": 0, "local": 0})
+        stats["allowed" if decision.allowed else "denied"] += 1
+        if decision.backend in stats:
+            stats[decision.backend] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "policies": {name: dict(counts) for name, counts in self.stats.items()},
+            "redis_errors": self.redis_errors,
+            "redis_available": self.redis is not None and self._disabled_until <= time.time(),
+            "local_keys": len(self.local.windows),
+        }
+
 
 # Global rate limiter instance
 rate_limiter = RateLimiter()
 
-def check_rate_limit(
-    request: Request,
+async def check_rate_limit(
+    request: Optional[Request],
     user: User,
-    limit: int = 10,
-    window_seconds: int = 60
-) -> None:
+    policy: str = "kb_upload",
+    organization_id: Optional[str] = None
+) -> RateLimitDecision:
     """
-    Check rate limit and raise HTTPException if exceeded
+    Check a rate limit policy and raise HTTPException if exceeded
     Utility function - not a FastAPI dependency
     """
-    client_ip = request.client.host if request.client else "unknown"
-    rate_key = f"upload:{client_ip}:{user.id}"
-    
-    if not rate_limiter.is_allowed(rate_key, limit, window_seconds):
+    client_ip = request.client.host if request is not None and request.client else None
+    decision = await rate_limiter.check(
+        policy,
+        user_id=str(user.id),
+        organization_id=str(organization_id) if organization_id else None,
+        client_ip=client_ip
+    )
+
+    if not decision.allowed:
+        retry_after = max(int(decision.retry_after + 0.999), 1)
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Maximum {limit} requests per {window_seconds} seconds."
+            detail=f"Rate limit exceeded. Maximum {decision.limit} requests, retry in {retry_after} seconds.",
+            headers={"Retry-After": str(retry_after)}
         )
+    return decision
+
+
+def check_token_quota(organization_id: Optional[str]):
+    """
+    Raise HTTPException once the organization used its daily token quota
+    Checked against metered usage in memory - no database query
+    """
+    from app.services.usage_meter import usage_meter
+
+    if not usage_meter.quota_exceeded(organization_id):
+        return
+    retry_after = 86400 - int(time.time()) % 86400  # Quotas reset at midnight UTC
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Daily token quota of {usage_meter.token_quota(organization_id)} tokens exceeded.",
+        headers={"Retry-After": str(retry_after)}
+    )
@@ -0,0 +1,193 @@
+"""
+Request coalescing (single-flight) for cache misses
+
+When many callers miss the cache on the same key at once (e.g. 50 farmers
+asking for the same département's weather at 7am), only one computation
+runs; every other caller awaits its result.
+
+Two levels:
+- SingleFlight: in-process, concurrent coroutines share one asyncio task
+- RedisLease: cross-process, workers agree on a single leader via a Redis
+  lease (SET NX PX) while the others poll the shared cache
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Release the lease only if we still own it (compare-and-delete)
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def _resolve(value: Any) -> Any:
+    """Await results of redis.asyncio clients and async callbacks"""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class SingleFlight:
+    """
+    In-process request coalescing keyed by cache key
+
+    The computation runs in its own task, so a caller being cancelled
+    does not cancel the result other callers are waiting for.
+    """
+
+    def __init__(self, name: str = "default"):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers of the same key
+
+        Args:
+            key: Coalescing key (usually the cache key)
+            fn: Zero-argument coroutine factory computing the value
+
+        Returns:
+            Result of the shared computation (exceptions are shared too)
+        """
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.deduplicated += 1
+            logger.debug(f"🔗 Single-flight join ({self.name}): {key}")
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda done, k=key: self._on_done(k, done))
+        self.executions += 1
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        """Forget the finished task and mark its exception as retrieved"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        total = self.executions + self.deduplicated
+        return {
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+            "dedup_rate": self.deduplicated / total if total else 0.0,
+        }
+
+
+class RedisLease:
+    """
+    Cross-process single-flight using a Redis lease
+
+    The first worker to SET the lock key (NX, with expiry) computes the
+    value; the others poll the shared cache until the value appears or the
+    lease expires, in which case they compute it themselves.
+
+    Works with blocking and redis.asyncio clients; read_cached may be a
+    plain function or a coroutine function.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        lease_ttl: float = 30.0,
+        poll_interval: float = 0.05,
+        prefix: str = "lock:"
+    ):
+        self.redis_client = redis_client
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.leader_runs = 0
+        self.follower_hits = 0
+        self.lease_timeouts = 0
+        self.errors = 0
+
+    async def run(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        read_cached: Callable[[], Optional[Any]],
+        wait_timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Compute once across processes
+
+        Args:
+            key: Cache key to protect
+            compute: Coroutine factory computing and caching the value
+            read_cached: Returns (or resolves to) the cached value or None, called while waiting
+            wait_timeout: Max seconds to wait for another worker (default: lease TTL)
+
+        Returns:
+            Computed or cached value
+        """
+        lock_key = f"{self.prefix}{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = await _resolve(self.redis_client.set(
+                lock_key, token, nx=True, px=int(self.lease_ttl * 1000)
+            ))
+        except Exception as e:
+            # Redis trouble must never block the request - compute locally
+            self.errors += 1
+            logger.warning(f"Redis lease error: {e}")
+            return await compute()
+
+        if acquired:
+            self.leader_runs += 1
+            try:
+                return await compute()
+            finally:
+                try:
+                    await _resolve(self.redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token))
+                except Exception as e:
+                    logger.warning(f"Redis lease release error: {e}")
+
+        # Another worker holds the lease - wait for its result
+        deadline = time.monotonic() + (wait_timeout or self.lease_ttl)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                cached = await _resolve(read_cached())
+                if cached is not None:
+                    self.follower_hits += 1
+                    return cached
+                if not await _resolve(self.redis_client.exists(lock_key)):
+                    # Leader finished (or failed) without caching - stop waiting
+                    break
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Redis lease poll error: {e}")
+                break
+        else:
+            self.lease_timeouts += 1
+
+        return await compute()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cross-process coalescing statistics"""
+        return {
+            "leader_runs": self.leader_runs,
+            "deduplicated": self.follower_hits,
+            "lease_timeouts": self.lease_timeouts,
+            "errors": self.errors,
+        }
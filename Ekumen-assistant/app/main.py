@@ -124,6 +124,74 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start knowledge base scheduler: {e}")
 
+    # Invalidate regulatory caches when the backend imports EPHY changes
+    try:
+        from app.services.ephy_change_service import ephy_change_listener
+        from app.services.regulatory_index import regulatory_index_store
+        ephy_change_listener.add_callback(regulatory_index_store.schedule_refresh)
+        ephy_change_listener.start()
+    except Exception as e:
+        logger.error(f"Failed to start EPHY change-set listener: {e}")
+
+    # Load the in-memory EPHY index in the background (lookups fall back to SQL until ready)
+    try:
+        from app.services.regulatory_index import regulatory_index_store
+        regulatory_index_store.start()
+    except Exception as e:
+        logger.error(f"Failed to load regulatory index: {e}")
+
+    # Build agent executors before the first request
+    try:
+        from app.agents.agent_pool import agent_pool
+        await agent_pool.warm_up()
+    except Exception as e:
+        logger.error(f"Failed to warm up agent pool: {e}")
+
+    # Load the prompt matcher (memory-mapped prompt embeddings) off the event loop
+    try:
+        import importlib
+        await asyncio.to_thread(importlib.import_module, "app.prompts.embedding_system")
+        logger.info("Prompt embeddings loaded")
+    except Exception as e:
+        logger.error(f"Failed to load prompt embeddings: {e}")
+
+    # Drop memory cache entries invalidated by other workers
+    try:
+        from app.services.multi_layer_cache_service import multi_layer_cache
+        await multi_layer_cache.start()
+    except Exception as e:
+        logger.error(f"Failed to start cache invalidation listener: {e}")
+
+    # Embed approved knowledge base documents in the background, re-queueing
+    # those a previous process did not finish
+    try:
+        from app.services.document_ingestion_service import document_ingestion_service
+        document_ingestion_service.start(recover=True)
+    except Exception as e:
+        logger.error(f"Failed to start document ingestion worker: {e}")
+
+    # Add ACL metadata to knowledge base chunks ingested before it existed
+    try:
+        from app.services.rag_service import get_rag_service
+        get_rag_service().start_acl_backfill()
+    except Exception as e:
+        logger.error(f"Failed to start ACL metadata backfill: {e}")
+
+    # Flush retrieval analytics in batches off the request path
+    try:
+        from app.services.retrieval_analytics_writer import retrieval_analytics_writer
+        retrieval_analytics_writer.start()
+    except Exception as e:
+        logger.error(f"Failed to start retrieval analytics writer: {e}")
+
+    # Meter token usage of every LLM call, flushed in batches
+    try:
+        from app.services.usage_meter import install_usage_metering, usage_meter
+        install_usage_metering()
+        usage_meter.start()
+    except Exception as e:
+        logger.error(f"Failed to start usage metering: {e}")
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -137,6 +205,48 @@ async def shutdown_event():
         logger.info("Knowledge base scheduler stopped")
     except Exception as e:
         logger.error(f"Failed to stop knowledge base scheduler: {e}")
+
+    try:
+        from app.services.ephy_change_service import ephy_change_listener
+        ephy_change_listener.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop EPHY change-set listener: {e}")
+
+    try:
+        from app.services.multi_layer_cache_service import multi_layer_cache
+        await multi_layer_cache.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop cache invalidation listener: {e}")
+
+    try:
+        from app.services.document_ingestion_service import document_ingestion_service
+        await document_ingestion_service.stop()
+    except Exception as e:
+        logger.error(f"Failed to stop document ingestion worker: {e}")
+
+    try:
+        from app.services.retrieval_analytics_writer import retrieval_analytics_writer
+        await retrieval_analytics_writer.stop()
+    except Exception as e:
+        logger.error(f"Failed to flush retrieval analytics: {e}")
+
+    try:
+        from app.services.usage_meter import usage_meter
+        await usage_meter.stop()
+    except Exception as e:
+        logger.error(f"Failed to flush usage: {e}")
+
+    try:
+        import sys
+        embedding_system = sys.modules.get("app.prompts.embedding_system")
+        if embedding_system is not None:
+            embedding_system.embedding_matcher.shutdown()
+    except Exception as e:
+        logger.error(f"Failed to stop prompt matcher: {e}")
+
+    # Close shared outbound HTTP connection pool
+    from app.core.http_client import close_http_client
+    await close_http_client()
     
     await close_db()
     logger.info("Database connections closed")
@@ -20,6 +20,8 @@ from .analytics import (
     UserSegmentAnalytics, AnalyticsAlert, AnalyticsEventType,
     DocumentAudience, UserRole
 )
+from .cache import CachedResult, CachedEmbedding
+from .usage import LLMUsage
 
 __all__ = [
     "User", "UserSession", "UserActivity",
@@ -36,5 +38,7 @@ __all__ = [
     "Exploitation", "Parcelle", "Intervention", "Intrant",
     "AnalyticsEvent", "DocumentAnalytics", "QueryAnalytics", "ContentGap",
     "UserSegmentAnalytics", "AnalyticsAlert", "AnalyticsEventType",
-    "DocumentAudience", "UserRole"
+    "DocumentAudience", "UserRole",
+    "CachedResult", "CachedEmbedding",
+    "LLMUsage"
 ]
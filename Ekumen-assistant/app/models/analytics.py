@@ -27,6 +27,7 @@ class AnalyticsEventType(str, PyEnum):
     SATISFACTION_FEEDBACK = "satisfaction_feedback"
     EXPORT_ACTION = "export_action"
     SHARE_ACTION = "share_action"
+    MODEL_SHADOW_EVALUATION = "model_shadow_evaluation"
 
 
 class DocumentAudience(str, PyEnum):
@@ -0,0 +1,47 @@
+"""
+Persistent cache entries for the database tier of MultiLayerCacheService
+and the embedding cache
+"""
+
+from sqlalchemy import Column, String, DateTime, Integer, LargeBinary, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CachedResult(Base):
+    """Serialized cache value spilled to Postgres (large or expensive results)"""
+
+    __tablename__ = "cache_entries"
+
+    key = Column(String(255), primary_key=True)
+    cache_type = Column(String(50), nullable=False, index=True)
+    value = Column(LargeBinary, nullable=False)  # Output of encode_value()
+    size_bytes = Column(Integer, nullable=False)
+    tags = Column(ARRAY(String(255)), nullable=False, server_default="{}")
+
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("idx_cache_entries_tags", "tags", postgresql_using="gin"),
+    )
+
+    def __repr__(self):
+        return f"<CachedResult(key={self.key}, cache_type={self.cache_type}, size={self.size_bytes})>"
+
+
+class CachedEmbedding(Base):
+    """Embedding vector of a text, keyed by model and SHA-256 of the text"""
+
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(100), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    dimensions = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float16 array
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CachedEmbedding(model={self.model}, content_hash={self.content_hash[:12]})>"
@@ -3,9 +3,9 @@ Conversation models for agricultural chatbot
 Handles chat conversations with AI agents
 """
 
-from sqlalchemy import Column, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum, Integer, Numeric
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum, Integer, Numeric, Index, Computed
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 import enum
@@ -30,10 +30,19 @@ class ConversationStatus(str, enum.Enum):
     DELETED = "deleted"
 
 
+# Text search configuration of conversation titles and message contents
+SEARCH_CONFIG = "french"
+
+
 class Conversation(Base):
     """Conversation model for chat sessions with AI agents"""
 
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Covers per-user statistics (counts by status and agent type)
+        Index("idx_conversations_user_status_agent", "user_id", "status", "agent_type"),
+        Index("idx_conversations_search", "search_vector", postgresql_using="gin"),
+    )
 
     # Primary key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
@@ -53,6 +62,13 @@ class Conversation(Base):
     # Context and metadata
     context_data = Column(JSONB, nullable=True)  # Additional context for the agent
     summary = Column(Text, nullable=True)  # Conversation summary
+    summary_through = Column(DateTime(timezone=True), nullable=True)  # Newest message covered by the summary
+
+    # Full-text search (maintained by PostgreSQL on insert/update)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(title, ''))", persisted=True)
+    ))
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -82,6 +98,11 @@ class Message(Base):
     """Message model for individual chat messages"""
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of a conversation's history
+        Index("idx_messages_conversation_created", "conversation_id", "created_at", "id"),
+        Index("idx_messages_search", "search_vector", postgresql_using="gin"),
+    )
 
     # Primary key
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
@@ -108,6 +129,12 @@ class Message(Base):
     token_count = Column(Integer, nullable=True)  # Number of tokens used
     cost_usd = Column(Numeric(10, 6), nullable=True)  # Cost of processing
 
+    # Full-text search (maintained by PostgreSQL on insert/update)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(f"to_tsvector('{SEARCH_CONFIG}', coalesce(content, ''))", persisted=True)
+    ))
+
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -0,0 +1,55 @@
+"""
+Metered LLM and embedding usage, aggregated per hour and dimension
+"""
+
+from sqlalchemy import Column, String, Integer, BigInteger, Numeric, DateTime, Index, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class LLMUsage(Base):
+    """
+    Token usage of one hour for one (organization, user, agent, tool,
+    request type, model); rows are upserted by the usage meter's flushes.
+    Unknown dimensions are '' so the unique key also matches them.
+    """
+
+    __tablename__ = "llm_usage"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    period_start = Column(DateTime(timezone=True), nullable=False)  # Start of the hour (UTC)
+
+    # Dimensions
+    organization_id = Column(String(64), nullable=False, server_default="")
+    user_id = Column(String(64), nullable=False, server_default="")
+    agent_type = Column(String(50), nullable=False, server_default="")
+    tool_name = Column(String(100), nullable=False, server_default="")
+    request_type = Column(String(50), nullable=False)  # chat, synthesis, classification, embedding...
+    model = Column(String(100), nullable=False)
+
+    # Metrics
+    calls = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    estimated_calls = Column(Integer, nullable=False, default=0)  # Provider reported no usage
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Numeric(12, 6), nullable=False, default=0)
+    latency_ms = Column(BigInteger, nullable=False, default=0)  # Sum, divide by calls
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "period_start", "organization_id", "user_id", "agent_type", "tool_name", "request_type", "model",
+            name="uq_llm_usage_period_dimensions"
+        ),
+        Index("idx_llm_usage_org_period", "organization_id", "period_start"),
+        Index("idx_llm_usage_agent_period", "agent_type", "period_start"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<LLMUsage(period={self.period_start}, org={self.organization_id}, agent={self.agent_type}, "
+            f"model={self.model}, tokens={self.prompt_tokens}+{self.completion_tokens})>"
+        )
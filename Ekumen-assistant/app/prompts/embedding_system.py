@@ -5,29 +5,110 @@ This module provides embedding-based prompt matching, semantic search,
 and intelligent prompt selection using vector similarity.
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Sequence
+import asyncio
 import logging
 import json
+import threading
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-import pickle
 import os
 
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, embedding_cache as shared_embedding_cache
+
+_SHARED_CACHE = object()
+
 # Optional semantic imports with graceful fallbacks
 try:
     from sentence_transformers import SentenceTransformer
-    from sklearn.metrics.pairwise import cosine_similarity
     from sklearn.feature_extraction.text import TfidfVectorizer
     SEMANTIC_AVAILABLE = True
 except ImportError:
     SentenceTransformer = None
-    cosine_similarity = None
     TfidfVectorizer = None
     SEMANTIC_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Descriptions embedded for each prompt
+PROMPT_DESCRIPTIONS = {
+    # Farm Data Prompts
+    "FARM_DATA_CHAT_PROMPT": "Analyse générale des données d'exploitation agricole, parcelles, interventions, bilans de performance",
+    "PARCEL_ANALYSIS_PROMPT": "Analyse spécifique d'une parcelle agricole, surface, cultures, rotations, historique, performance",
+    "PERFORMANCE_METRICS_PROMPT": "Calcul et analyse des métriques de performance, rendements, coûts, marges par parcelle",
+    "INTERVENTION_TRACKING_PROMPT": "Suivi des interventions agricoles, traitements, doses, dates, conformité",
+    "COST_ANALYSIS_PROMPT": "Analyse des coûts de production, intrants, main-d'œuvre, matériel, optimisation",
+    "TREND_ANALYSIS_PROMPT": "Analyse des tendances, évolutions, comparaisons temporelles, projections",
+    
+    # Regulatory Prompts
+    "REGULATORY_CHAT_PROMPT": "Conseil réglementaire général, autorisations, conformité, sécurité des produits phytosanitaires",
+    "AMM_LOOKUP_PROMPT": "Vérification des autorisations AMM, numéros d'autorisation, statuts des produits",
+    "USAGE_CONDITIONS_PROMPT": "Conditions d'emploi des produits, doses, stades, délais, restrictions",
+    "SAFETY_CLASSIFICATIONS_PROMPT": "Classifications de sécurité, pictogrammes, phrases de risque, équipements",
+    "PRODUCT_SUBSTITUTION_PROMPT": "Alternatives aux produits, substitutions, équivalences, biocontrôle",
+    "COMPLIANCE_CHECK_PROMPT": "Vérification de conformité, respect des réglementations, audits",
+    "ENVIRONMENTAL_REGULATIONS_PROMPT": "Réglementation environnementale, ZNT, protection de l'environnement",
+    
+    # Weather Prompts
+    "WEATHER_CHAT_PROMPT": "Conseil météorologique général, conditions d'intervention, fenêtres météo",
+    "WEATHER_FORECAST_PROMPT": "Prévisions météorologiques, température, pluie, vent, humidité",
+    "INTERVENTION_WINDOW_PROMPT": "Fenêtres d'intervention optimales, conditions météo favorables",
+    "WEATHER_RISK_ANALYSIS_PROMPT": "Analyse des risques météorologiques, gel, grêle, tempêtes",
+    "IRRIGATION_PLANNING_PROMPT": "Planification de l'irrigation, besoins en eau, ETR, bilan hydrique",
+    "EVAPOTRANSPIRATION_PROMPT": "Calcul de l'évapotranspiration, coefficients culturaux, besoins hydriques",
+    "CLIMATE_ADAPTATION_PROMPT": "Adaptation au changement climatique, variétés résistantes, pratiques",
+    
+    # Crop Health Prompts
+    "CROP_HEALTH_CHAT_PROMPT": "Conseil phytosanitaire général, diagnostic, protection des cultures",
+    "DISEASE_DIAGNOSIS_PROMPT": "Diagnostic des maladies, symptômes, identification, traitement",
+    "PEST_IDENTIFICATION_PROMPT": "Identification des ravageurs, dégâts, seuils, lutte",
+    "NUTRIENT_DEFICIENCY_PROMPT": "Analyse des carences nutritionnelles, symptômes, fertilisation",
+    "TREATMENT_PLAN_PROMPT": "Plan de traitement, stratégie de protection, produits, calendrier",
+    "RESISTANCE_MANAGEMENT_PROMPT": "Gestion de la résistance, alternance, rotation des modes d'action",
+    "BIOLOGICAL_CONTROL_PROMPT": "Lutte biologique, auxiliaires, produits de biocontrôle",
+    "THRESHOLD_MANAGEMENT_PROMPT": "Gestion des seuils d'intervention, comptage, surveillance",
+    
+    # Planning Prompts
+    "PLANNING_CHAT_PROMPT": "Planification agricole générale, organisation des travaux, optimisation",
+    "TASK_PLANNING_PROMPT": "Planification des tâches, séquencement, priorisation, calendrier",
+    "RESOURCE_OPTIMIZATION_PROMPT": "Optimisation des ressources, matériel, main-d'œuvre, intrants",
+    "SEASONAL_PLANNING_PROMPT": "Planification saisonnière, calendrier cultural, gestion des pics",
+    "WEATHER_DEPENDENT_PLANNING_PROMPT": "Planification météo-dépendante, adaptation aux conditions",
+    "COST_OPTIMIZATION_PROMPT": "Optimisation des coûts, minimisation des dépenses, efficience",
+    "EMERGENCY_PLANNING_PROMPT": "Planification d'urgence, réorganisation, gestion des aléas",
+    "WORKFLOW_OPTIMIZATION_PROMPT": "Optimisation des workflows, amélioration des processus",
+    
+    # Sustainability Prompts
+    "SUSTAINABILITY_CHAT_PROMPT": "Conseil en durabilité général, performance environnementale, certifications",
+    "CARBON_FOOTPRINT_PROMPT": "Calcul de l'empreinte carbone, émissions, stockage, bilan",
+    "BIODIVERSITY_ASSESSMENT_PROMPT": "Évaluation de la biodiversité, auxiliaires, habitats, diversité",
+    "SOIL_HEALTH_PROMPT": "Analyse de la santé des sols, matière organique, structure, vie biologique",
+    "WATER_MANAGEMENT_PROMPT": "Gestion de l'eau, consommation, efficience, protection des ressources",
+    "ENERGY_EFFICIENCY_PROMPT": "Efficacité énergétique, consommation, énergies renouvelables",
+    "CERTIFICATION_SUPPORT_PROMPT": "Support à la certification, bio, HVE, préparation aux audits",
+    "CIRCULAR_ECONOMY_PROMPT": "Économie circulaire, valorisation des déchets, autonomie",
+    "CLIMATE_ADAPTATION_PROMPT": "Adaptation climatique, résilience, variétés, pratiques"
+}
+
+
+# Direct mapping for common intents
+INTENT_PROMPTS = {
+    "AMM_LOOKUP": "AMM_LOOKUP_PROMPT",
+    "WEATHER_FORECAST": "WEATHER_FORECAST_PROMPT",
+    "DISEASE_DIAGNOSIS": "DISEASE_DIAGNOSIS_PROMPT",
+    "TASK_PLANNING": "TASK_PLANNING_PROMPT",
+    "CARBON_FOOTPRINT": "CARBON_FOOTPRINT_PROMPT",
+    "PERFORMANCE_METRICS": "PERFORMANCE_METRICS_PROMPT",
+    "PARCEL_ANALYSIS": "PARCEL_ANALYSIS_PROMPT",
+    "INTERVENTION_WINDOW": "INTERVENTION_WINDOW_PROMPT",
+    "TREATMENT_PLAN": "TREATMENT_PLAN_PROMPT",
+    "SOIL_HEALTH": "SOIL_HEALTH_PROMPT"
+}
+
 @dataclass
 class PromptEmbedding:
     """Embedding representation of a prompt."""
@@ -55,16 +136,50 @@ class EmbeddingPromptMatcher:
     Job: Match user queries to appropriate prompts using semantic similarity.
     Input: User query and context
     Output: Best matching prompt with similarity score
+
+    Prompt embeddings are kept as one L2-normalized (prompts x dim) matrix so
+    ranking a query is a single matrix-vector product. Query embeddings are
+    memoized in an LRU, and encoding can be offloaded to a worker thread with
+    afind_best_prompt so the event loop is not blocked. Model outputs go
+    through the shared embedding cache, so prompt descriptions and frequent
+    queries are not re-encoded after a restart.
     """
-    
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 query_cache_size: int = 1024, embeddings_path: Optional[str] = None,
+                 embedding_cache: Optional[EmbeddingCache] = _SHARED_CACHE,
+                 descriptions: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            embeddings_path: Snapshot written by save_embeddings; loaded
+                (memory-mapped) when it matches the current prompts, written
+                after encoding them otherwise
+            descriptions: Prompt name -> description to embed (defaults to
+                PROMPT_DESCRIPTIONS)
+        """
         self.model_name = model_name
+        self.descriptions = PROMPT_DESCRIPTIONS if descriptions is None else descriptions
+        # Persistent content-hash cache below the query LRU (None disables it)
+        self.embedding_cache = shared_embedding_cache if embedding_cache is _SHARED_CACHE else embedding_cache
         self.embedding_model = None
         self.prompt_embeddings: Dict[str, PromptEmbedding] = {}
         self.tfidf_vectorizer = None
         self.tfidf_embeddings = None
         self.prompt_descriptions = []
-        
+
+        # Normalized prompt matrix, rebuilt lazily after prompt changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_names: List[str] = []
+        self._matrix_agent_types: Optional[np.ndarray] = None
+
+        # LRU of normalized query embeddings, shared with the encode thread
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
         if SEMANTIC_AVAILABLE:
             try:
                 self.embedding_model = SentenceTransformer(model_name)
@@ -73,73 +188,31 @@ class EmbeddingPromptMatcher:
             except Exception as e:
                 logger.warning(f"Could not load embedding model: {e}")
                 self.embedding_model = None
-        
+
+        if embeddings_path and self.load_embeddings(embeddings_path) and self._snapshot_is_current():
+            return
+        self.prompt_embeddings = {}
+        self._matrix = None
         self._initialize_prompt_embeddings()
+        # Later workers memory-map this snapshot instead of encoding again
+        if embeddings_path and self.prompt_embeddings:
+            self.save_embeddings(embeddings_path)
+
+    def _snapshot_is_current(self) -> bool:
+        """Whether loaded embeddings were built from the current prompt descriptions."""
+        descriptions = {
+            name: embedding.metadata.get("description")
+            for name, embedding in self.prompt_embeddings.items()
+        }
+        if descriptions != self.descriptions:
+            logger.info("Prompt descriptions changed, re-encoding prompt embeddings")
+            return False
+        return True
     
     def _initialize_prompt_embeddings(self):
         """Initialize embeddings for all available prompts."""
-        # Define prompt descriptions for embedding
-        prompt_descriptions = {
-            # Farm Data Prompts
-            "FARM_DATA_CHAT_PROMPT": "Analyse générale des données d'exploitation agricole, parcelles, interventions, bilans de performance",
-            "PARCEL_ANALYSIS_PROMPT": "Analyse spécifique d'une parcelle agricole, surface, cultures, rotations, historique, performance",
-            "PERFORMANCE_METRICS_PROMPT": "Calcul et analyse des métriques de performance, rendements, coûts, marges par parcelle",
-            "INTERVENTION_TRACKING_PROMPT": "Suivi des interventions agricoles, traitements, doses, dates, conformité",
-            "COST_ANALYSIS_PROMPT": "Analyse des coûts de production, intrants, main-d'œuvre, matériel, optimisation",
-            "TREND_ANALYSIS_PROMPT": "Analyse des tendances, évolutions, comparaisons temporelles, projections",
-            
-            # Regulatory Prompts
-            "REGULATORY_CHAT_PROMPT": "Conseil réglementaire général, autorisations, conformité, sécurité des produits phytosanitaires",
-            "AMM_LOOKUP_PROMPT": "Vérification des autorisations AMM, numéros d'autorisation, statuts des produits",
-            "USAGE_CONDITIONS_PROMPT": "Conditions d'emploi des produits, doses, stades, délais, restrictions",
-            "SAFETY_CLASSIFICATIONS_PROMPT": "Classifications de sécurité, pictogrammes, phrases de risque, équipements",
-            "PRODUCT_SUBSTITUTION_PROMPT": "Alternatives aux produits, substitutions, équivalences, biocontrôle",
-            "COMPLIANCE_CHECK_PROMPT": "Vérification de conformité, respect des réglementations, audits",
-            "ENVIRONMENTAL_REGULATIONS_PROMPT": "Réglementation environnementale, ZNT, protection de l'environnement",
-            
-            # Weather Prompts
-            "WEATHER_CHAT_PROMPT": "Conseil météorologique général, conditions d'intervention, fenêtres météo",
-            "WEATHER_FORECAST_PROMPT": "Prévisions météorologiques, température, pluie, vent, humidité",
-            "INTERVENTION_WINDOW_PROMPT": "Fenêtres d'intervention optimales, conditions météo favorables",
-            "WEATHER_RISK_ANALYSIS_PROMPT": "Analyse des risques météorologiques, gel, grêle, tempêtes",
-            "IRRIGATION_PLANNING_PROMPT": "Planification de l'irrigation, besoins en eau, ETR, bilan hydrique",
-            "EVAPOTRANSPIRATION_PROMPT": "Calcul de l'évapotranspiration, coefficients culturaux, besoins hydriques",
-            "CLIMATE_ADAPTATION_PROMPT": "Adaptation au changement climatique, variétés résistantes, pratiques",
-            
-            # Crop Health Prompts
-            "CROP_HEALTH_CHAT_PROMPT": "Conseil phytosanitaire général, diagnostic, protection des cultures",
-            "DISEASE_DIAGNOSIS_PROMPT": "Diagnostic des maladies, symptômes, identification, traitement",
-            "PEST_IDENTIFICATION_PROMPT": "Identification des ravageurs, dégâts, seuils, lutte",
-            "NUTRIENT_DEFICIENCY_PROMPT": "Analyse des carences nutritionnelles, symptômes, fertilisation",
-            "TREATMENT_PLAN_PROMPT": "Plan de traitement, stratégie de protection, produits, calendrier",
-            "RESISTANCE_MANAGEMENT_PROMPT": "Gestion de la résistance, alternance, rotation des modes d'action",
-            "BIOLOGICAL_CONTROL_PROMPT": "Lutte biologique, auxiliaires, produits de biocontrôle",
-            "THRESHOLD_MANAGEMENT_PROMPT": "Gestion des seuils d'intervention, comptage, surveillance",
-            
-            # Planning Prompts
-            "PLANNING_CHAT_PROMPT": "Planification agricole générale, organisation des travaux, optimisation",
-            "TASK_PLANNING_PROMPT": "Planification des tâches, séquencement, priorisation, calendrier",
-            "RESOURCE_OPTIMIZATION_PROMPT": "Optimisation des ressources, matériel, main-d'œuvre, intrants",
-            "SEASONAL_PLANNING_PROMPT": "Planification saisonnière, calendrier cultural, gestion des pics",
-            "WEATHER_DEPENDENT_PLANNING_PROMPT": "Planification météo-dépendante, adaptation aux conditions",
-            "COST_OPTIMIZATION_PROMPT": "Optimisation des coûts, minimisation des dépenses, efficience",
-            "EMERGENCY_PLANNING_PROMPT": "Planification d'urgence, réorganisation, gestion des aléas",
-            "WORKFLOW_OPTIMIZATION_PROMPT": "Optimisation des workflows, amélioration des processus",
-            
-            # Sustainability Prompts
-            "SUSTAINABILITY_CHAT_PROMPT": "Conseil en durabilité général, performance environnementale, certifications",
-            "CARBON_FOOTPRINT_PROMPT": "Calcul de l'empreinte carbone, émissions, stockage, bilan",
-            "BIODIVERSITY_ASSESSMENT_PROMPT": "Évaluation de la biodiversité, auxiliaires, habitats, diversité",
-            "SOIL_HEALTH_PROMPT": "Analyse de la santé des sols, matière organique, structure, vie biologique",
-            "WATER_MANAGEMENT_PROMPT": "Gestion de l'eau, consommation, efficience, protection des ressources",
-            "ENERGY_EFFICIENCY_PROMPT": "Efficacité énergétique, consommation, énergies renouvelables",
-            "CERTIFICATION_SUPPORT_PROMPT": "Support à la certification, bio, HVE, préparation aux audits",
-            "CIRCULAR_ECONOMY_PROMPT": "Économie circulaire, valorisation des déchets, autonomie",
-            "CLIMATE_ADAPTATION_PROMPT": "Adaptation climatique, résilience, variétés, pratiques"
-        }
-        
         if self.embedding_model:
-            self._compute_prompt_embeddings(prompt_descriptions)
+            self._compute_prompt_embeddings(self.descriptions)
         else:
             logger.warning("No embedding model available, using fallback matching")
     
@@ -150,7 +223,7 @@ class EmbeddingPromptMatcher:
             prompt_names = list(prompt_descriptions.keys())
             
             # Compute sentence transformer embeddings
-            embeddings = self.embedding_model.encode(descriptions)
+            embeddings = self._encode(descriptions)
             
             # Compute TF-IDF embeddings as backup
             self.tfidf_embeddings = self.tfidf_vectorizer.fit_transform(descriptions)
@@ -172,12 +245,114 @@ class EmbeddingPromptMatcher:
                     },
                     created_at=datetime.now()
                 )
-            
+
+            self._matrix = None
             logger.info(f"Computed embeddings for {len(self.prompt_embeddings)} prompts")
-            
+
         except Exception as e:
             logger.error(f"Error computing prompt embeddings: {e}")
             self.prompt_embeddings = {}
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Raw model embeddings, served from the embedding cache when possible."""
+        if self.embedding_cache is None:
+            return np.asarray(self.embedding_model.encode(list(texts)))
+        return np.stack(self.embedding_cache.embed(self.model_name, list(texts), self.embedding_model.encode))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows so a dot product is a cosine similarity."""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _prompt_matrix(self) -> np.ndarray:
+        """Get the normalized prompt matrix, stacking it on first use."""
+        if self._matrix is None:
+            names = list(self.prompt_embeddings)
+            embeddings = [self.prompt_embeddings[name] for name in names]
+            self._matrix = self._normalize(np.stack([e.embedding for e in embeddings]))
+            self._matrix_names = names
+            self._matrix_agent_types = np.array([e.agent_type for e in embeddings])
+        return self._matrix
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encode query texts into normalized embeddings.
+
+        Cached texts are served from the LRU; the rest are encoded in a
+        single model call.
+
+        Args:
+            texts: Query texts
+
+        Returns:
+            (len(texts) x dim) array of normalized embeddings
+        """
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._query_cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._query_cache.get(text)
+                if cached is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    self._query_cache.move_to_end(text)
+                    vectors[i] = cached
+            self.query_cache_hits += len(texts) - sum(len(v) for v in missing.values())
+            self.query_cache_misses += len(missing)
+
+        if missing:
+            encoded = self._normalize(self._encode(list(missing)))
+            with self._query_cache_lock:
+                for (text, positions), vector in zip(missing.items(), encoded):
+                    vector.flags.writeable = False
+                    for i in positions:
+                        vectors[i] = vector
+                    self._query_cache[text] = vector
+                    self._query_cache.move_to_end(text)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+        return np.stack(vectors)
+
+    def encode_query(self, query: str, context: str = "") -> np.ndarray:
+        """Encode a single query (with optional context) through the LRU."""
+        return self.encode_batch([f"{query} {context}"])[0]
+
+    def _rank(self, scores: np.ndarray, agent_type: Optional[str], top_k: int) -> List[PromptMatch]:
+        """Turn one row of prompt similarities into the top_k PromptMatch results."""
+        candidates = np.arange(len(scores))
+        if agent_type:
+            candidates = np.flatnonzero(self._matrix_agent_types == agent_type)
+        if top_k <= 0 or not len(candidates):
+            return []
+
+        subset = scores[candidates]
+        if top_k < len(candidates):
+            # Everything above the k-th score, then ties at the cut in prompt order
+            cutoff = -np.partition(-subset, top_k - 1)[top_k - 1]
+            above = np.flatnonzero(subset > cutoff)
+            ties = np.flatnonzero(subset == cutoff)[:top_k - len(above)]
+            keep = np.concatenate([above, ties])
+            candidates, subset = candidates[keep], subset[keep]
+        # Highest score first, prompt order on ties
+        order = np.lexsort((candidates, -subset))
+
+        matches = []
+        for i in candidates[order]:
+            embedding = self.prompt_embeddings[self._matrix_names[i]]
+            similarity = float(scores[i])
+            matches.append(PromptMatch(
+                prompt_name=embedding.prompt_name,
+                similarity_score=similarity,
+                agent_type=embedding.agent_type,
+                prompt_type=embedding.prompt_type,
+                reasoning=f"Semantic similarity: {similarity:.3f}",
+                metadata=embedding.metadata
+            ))
+        return matches
     
     def _get_agent_type(self, prompt_name: str) -> str:
         """Get agent type from prompt name."""
@@ -229,37 +404,78 @@ class EmbeddingPromptMatcher:
             return self._fallback_matching(query, context, agent_type, top_k)
         
         try:
-            # Encode the query
-            query_text = f"{query} {context}"
-            query_embedding = self.embedding_model.encode([query_text])[0]
-            
-            # Compute similarities
-            similarities = []
-            for prompt_name, prompt_embedding in self.prompt_embeddings.items():
-                # Filter by agent type if specified
-                if agent_type and prompt_embedding.agent_type != agent_type:
-                    continue
-                
-                # Compute cosine similarity
-                similarity = cosine_similarity([query_embedding], [prompt_embedding.embedding])[0][0]
-                
-                similarities.append(PromptMatch(
-                    prompt_name=prompt_name,
-                    similarity_score=float(similarity),
-                    agent_type=prompt_embedding.agent_type,
-                    prompt_type=prompt_embedding.prompt_type,
-                    reasoning=f"Semantic similarity: {similarity:.3f}",
-                    metadata=prompt_embedding.metadata
-                ))
-            
-            # Sort by similarity and return top_k
-            similarities.sort(key=lambda x: x.similarity_score, reverse=True)
-            return similarities[:top_k]
-            
+            query_embedding = self.encode_query(query, context)
+            return self._rank(self._prompt_matrix() @ query_embedding, agent_type, top_k)
+
         except Exception as e:
             logger.error(f"Error in semantic matching: {e}")
             return self._fallback_matching(query, context, agent_type, top_k)
-    
+
+    def find_best_prompts_batch(self, queries: Sequence[str], contexts: Optional[Sequence[str]] = None,
+                                agent_type: str = None, top_k: int = 5) -> List[List[PromptMatch]]:
+        """
+        Find the best matching prompts for several queries at once.
+
+        Args:
+            queries: User queries
+            contexts: Additional context per query (optional)
+            agent_type: Filter by agent type (optional)
+            top_k: Number of top matches to return per query
+
+        Returns:
+            One list of best matching prompts per query
+        """
+        contexts = list(contexts) if contexts is not None else [""] * len(queries)
+        if not self.embedding_model or not self.prompt_embeddings:
+            return [self._fallback_matching(q, c, agent_type, top_k) for q, c in zip(queries, contexts)]
+
+        try:
+            query_embeddings = self.encode_batch([f"{q} {c}" for q, c in zip(queries, contexts)])
+            scores = query_embeddings @ self._prompt_matrix().T
+            return [self._rank(row, agent_type, top_k) for row in scores]
+
+        except Exception as e:
+            logger.error(f"Error in batch semantic matching: {e}")
+            return [self._fallback_matching(q, c, agent_type, top_k) for q, c in zip(queries, contexts)]
+
+    async def afind_best_prompt(self, query: str, context: str = "",
+                                agent_type: str = None, top_k: int = 5) -> List[PromptMatch]:
+        """
+        Async version of find_best_prompt.
+
+        Query encoding runs on a dedicated worker thread unless the query is
+        already cached; ranking is cheap and stays on the event loop.
+        """
+        if not self.embedding_model or not self.prompt_embeddings:
+            return self._fallback_matching(query, context, agent_type, top_k)
+
+        query_text = f"{query} {context}"
+        with self._query_cache_lock:
+            cached = query_text in self._query_cache
+        if not cached:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompt-encoder")
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.encode_batch, [query_text]
+                )
+            except Exception as e:
+                logger.error(f"Error encoding query: {e}")
+                return self._fallback_matching(query, context, agent_type, top_k)
+
+        return self.find_best_prompt(query, context, agent_type, top_k)
+
+    def clear_query_cache(self):
+        """Drop all cached query embeddings."""
+        with self._query_cache_lock:
+            self._query_cache.clear()
+
+    def shutdown(self):
+        """Stop the encoding worker thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
     def find_prompt_by_intent(self, intent: str, context: str = "") -> Optional[PromptMatch]:
         """
         Find prompt by specific intent.
@@ -271,35 +487,36 @@ class EmbeddingPromptMatcher:
         Returns:
             Best matching prompt or None
         """
-        # Direct mapping for common intents
-        intent_mapping = {
-            "AMM_LOOKUP": "AMM_LOOKUP_PROMPT",
-            "WEATHER_FORECAST": "WEATHER_FORECAST_PROMPT",
-            "DISEASE_DIAGNOSIS": "DISEASE_DIAGNOSIS_PROMPT",
-            "TASK_PLANNING": "TASK_PLANNING_PROMPT",
-            "CARBON_FOOTPRINT": "CARBON_FOOTPRINT_PROMPT",
-            "PERFORMANCE_METRICS": "PERFORMANCE_METRICS_PROMPT",
-            "PARCEL_ANALYSIS": "PARCEL_ANALYSIS_PROMPT",
-            "INTERVENTION_WINDOW": "INTERVENTION_WINDOW_PROMPT",
-            "TREATMENT_PLAN": "TREATMENT_PLAN_PROMPT",
-            "SOIL_HEALTH": "SOIL_HEALTH_PROMPT"
-        }
-        
-        prompt_name = intent_mapping.get(intent)
-        if prompt_name and prompt_name in self.prompt_embeddings:
-            prompt_embedding = self.prompt_embeddings[prompt_name]
-            return PromptMatch(
-                prompt_name=prompt_name,
-                similarity_score=1.0,
-                agent_type=prompt_embedding.agent_type,
-                prompt_type=prompt_embedding.prompt_type,
-                reasoning=f"Direct intent mapping: {intent}",
-                metadata=prompt_embedding.metadata
-            )
+        match = self._intent_match(intent)
+        if match is not None:
+            return match
         
         # Fallback to semantic search
         matches = self.find_best_prompt(intent, context, top_k=1)
         return matches[0] if matches else None
+
+    async def afind_prompt_by_intent(self, intent: str, context: str = "") -> Optional[PromptMatch]:
+        """Async version of find_prompt_by_intent (semantic fallback encoded off the event loop)."""
+        match = self._intent_match(intent)
+        if match is not None:
+            return match
+        matches = await self.afind_best_prompt(intent, context, top_k=1)
+        return matches[0] if matches else None
+
+    def _intent_match(self, intent: str) -> Optional[PromptMatch]:
+        """Prompt directly mapped to an intent, if it has an embedding."""
+        prompt_name = INTENT_PROMPTS.get(intent)
+        if not (prompt_name and prompt_name in self.prompt_embeddings):
+            return None
+        prompt_embedding = self.prompt_embeddings[prompt_name]
+        return PromptMatch(
+            prompt_name=prompt_name,
+            similarity_score=1.0,
+            agent_type=prompt_embedding.agent_type,
+            prompt_type=prompt_embedding.prompt_type,
+            reasoning=f"Direct intent mapping: {intent}",
+            metadata=prompt_embedding.metadata
+        )
     
     def _fallback_matching(self, query: str, context: str = "", 
                           agent_type: str = None, top_k: int = 5) -> List[PromptMatch]:
@@ -347,7 +564,7 @@ class EmbeddingPromptMatcher:
             return False
         
         try:
-            embedding = self.embedding_model.encode([description])[0]
+            embedding = self._encode([description])[0]
             
             self.prompt_embeddings[prompt_name] = PromptEmbedding(
                 prompt_name=prompt_name,
@@ -360,40 +577,98 @@ class EmbeddingPromptMatcher:
                 },
                 created_at=datetime.now()
             )
-            
+            self._matrix = None
+
             logger.info(f"Added embedding for prompt: {prompt_name}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error adding prompt embedding: {e}")
             return False
-    
+
     def save_embeddings(self, filepath: str) -> bool:
-        """Save embeddings to file."""
+        """
+        Save embeddings to file.
+
+        The normalized prompt matrix is written as a .npy array at filepath
+        and the prompt metadata as JSON at filepath + ".json".
+        """
         try:
-            with open(filepath, 'wb') as f:
-                pickle.dump(self.prompt_embeddings, f)
+            matrix = self._prompt_matrix()
+            meta = {
+                "model": self.model_name,
+                "prompts": [
+                    {
+                        "prompt_name": e.prompt_name,
+                        "agent_type": e.agent_type,
+                        "prompt_type": e.prompt_type,
+                        "metadata": e.metadata,
+                        "created_at": e.created_at.isoformat(),
+                    }
+                    for e in (self.prompt_embeddings[name] for name in self._matrix_names)
+                ],
+            }
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{filepath}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+            with open(f"{tmp_path}.json", 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp_path, filepath)
+            os.replace(f"{tmp_path}.json", f"{filepath}.json")
             logger.info(f"Saved embeddings to {filepath}")
             return True
         except Exception as e:
             logger.error(f"Error saving embeddings: {e}")
             return False
-    
-    def load_embeddings(self, filepath: str) -> bool:
-        """Load embeddings from file."""
+
+    def load_embeddings(self, filepath: str, mmap: bool = True) -> bool:
+        """
+        Load embeddings saved by save_embeddings.
+
+        With mmap the matrix is memory-mapped read-only instead of read into
+        memory, so several workers share the same pages. Snapshots written
+        with a different model are ignored.
+        """
         try:
-            if os.path.exists(filepath):
-                with open(filepath, 'rb') as f:
-                    self.prompt_embeddings = pickle.load(f)
-                logger.info(f"Loaded embeddings from {filepath}")
-                return True
-            return False
+            if not (os.path.exists(filepath) and os.path.exists(f"{filepath}.json")):
+                return False
+            with open(f"{filepath}.json", encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("model") != self.model_name:
+                logger.warning(f"Embeddings in {filepath} were built with {meta.get('model')}, not {self.model_name}")
+                return False
+
+            matrix = np.load(filepath, mmap_mode="r" if mmap else None)
+            prompts = meta["prompts"]
+            if matrix.ndim != 2 or matrix.shape[0] != len(prompts):
+                logger.warning(f"Embeddings in {filepath} do not match their metadata")
+                return False
+
+            self.prompt_embeddings = {
+                p["prompt_name"]: PromptEmbedding(
+                    prompt_name=p["prompt_name"],
+                    agent_type=p["agent_type"],
+                    prompt_type=p["prompt_type"],
+                    embedding=matrix[i],
+                    metadata=p["metadata"],
+                    created_at=datetime.fromisoformat(p["created_at"])
+                )
+                for i, p in enumerate(prompts)
+            }
+            self._matrix = matrix
+            self._matrix_names = [p["prompt_name"] for p in prompts]
+            self._matrix_agent_types = np.array([p["agent_type"] for p in prompts])
+            logger.info(f"Loaded embeddings from {filepath}")
+            return True
         except Exception as e:
             logger.error(f"Error loading embeddings: {e}")
             return False
 
-# Global embedding matcher instance
-embedding_matcher = EmbeddingPromptMatcher()
+# Global embedding matcher instance (loaded in app startup)
+embedding_matcher = EmbeddingPromptMatcher(embeddings_path=settings.PROMPT_EMBEDDINGS_PATH)
 
 # Convenience functions
 def find_best_prompt(query: str, context: str = "", agent_type: str = None) -> Optional[PromptMatch]:
@@ -401,15 +676,29 @@ def find_best_prompt(query: str, context: str = "", agent_type: str = None) -> O
     matches = embedding_matcher.find_best_prompt(query, context, agent_type, top_k=1)
     return matches[0] if matches else None
 
+async def afind_best_prompt(query: str, context: str = "", agent_type: str = None) -> Optional[PromptMatch]:
+    """Find the best matching prompt for a query without blocking the event loop."""
+    matches = await embedding_matcher.afind_best_prompt(query, context, agent_type, top_k=1)
+    return matches[0] if matches else None
+
 def find_prompt_by_intent(intent: str, context: str = "") -> Optional[PromptMatch]:
     """Find prompt by specific intent."""
     return embedding_matcher.find_prompt_by_intent(intent, context)
 
+async def afind_prompt_by_intent(intent: str, context: str = "") -> Optional[PromptMatch]:
+    """Find prompt by specific intent without blocking the event loop."""
+    return await embedding_matcher.afind_prompt_by_intent(intent, context)
+
 def get_prompt_name_for_query(query: str, context: str = "") -> str:
     """Get the prompt name for a user query."""
     match = find_best_prompt(query, context)
     return match.prompt_name if match else "FARM_DATA_CHAT_PROMPT"
 
+async def aget_prompt_name_for_query(query: str, context: str = "") -> str:
+    """Get the prompt name for a user query without blocking the event loop."""
+    match = await afind_best_prompt(query, context)
+    return match.prompt_name if match else "FARM_DATA_CHAT_PROMPT"
+
 # Export all classes and functions
 __all__ = [
     "EmbeddingPromptMatcher",
@@ -417,6 +706,9 @@ __all__ = [
     "PromptMatch",
     "embedding_matcher",
     "find_best_prompt",
+    "afind_best_prompt",
     "find_prompt_by_intent",
-    "get_prompt_name_for_query"
+    "afind_prompt_by_intent",
+    "get_prompt_name_for_query",
+    "aget_prompt_name_for_query"
 ]
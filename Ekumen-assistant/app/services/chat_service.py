@@ -5,10 +5,10 @@ Handles conversation management and message processing
 
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc
+from sqlalchemy import select, and_, desc, func, text
 from sqlalchemy.orm import selectinload
 
-from app.models.conversation import Conversation, Message, ConversationStatus
+from app.models.conversation import Conversation, Message, ConversationStatus, SEARCH_CONFIG
 from app.models.user import User
 from app.schemas.chat import ConversationCreate, ChatMessage
 from app.services.advanced_langchain_service import AdvancedLangChainService
@@ -17,12 +17,39 @@ from app.services.memory_service import MemoryService
 from app.services.multi_agent_service import MultiAgentService
 from app.services.performance_optimization_service import PerformanceOptimizationService, performance_monitor
 from app.services.lcel_chat_service import get_lcel_chat_service
+from app.services.postgres_chat_history import StoredMessage, history_window_cache
+import base64
+import json
 import logging
 from datetime import datetime
+from uuid import UUID
 
 
 logger = logging.getLogger(__name__)
 
+# Title matches rank above equally relevant message matches
+TITLE_RANK_WEIGHT = 2.0
+
+
+def encode_search_cursor(rank: float, conversation_id) -> str:
+    """Opaque keyset cursor of a search result page"""
+    payload = json.dumps([rank, str(conversation_id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, UUID]:
+    """
+    Decode a search cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        rank, conversation_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), UUID(conversation_id)
+    except Exception as e:
+        raise ValueError(f"Invalid search cursor: {cursor}") from e
+
 
 class ChatService:
     """Service for managing chat conversations and messages"""
@@ -221,6 +248,12 @@ class ChatService:
         await db.commit()
         await db.refresh(message)
 
+        # Keep the cached history window in step (no-op if it is not cached)
+        await history_window_cache.append(
+            str(message.conversation_id),
+            [StoredMessage(str(message.id), message.sender, message.content, message.created_at)]
+        )
+
         return message
 
     def _generate_conversation_title(self, first_message: str) -> str:
@@ -338,17 +371,16 @@ class ChatService:
             return None
 
         # Get message count
-        result = await db.execute(
-            select(Message)
+        message_count = await db.scalar(
+            select(func.count(Message.id))
             .where(Message.conversation_id == conversation_id)
         )
-        messages = result.scalars().all()
 
         return {
             "id": str(conversation.id),
             "title": conversation.title,
             "agent_type": conversation.agent_type,
-            "message_count": len(messages),
+            "message_count": message_count or 0,
             "last_message_at": conversation.last_message_at,
             "created_at": conversation.created_at,
             "status": conversation.status
@@ -361,9 +393,98 @@ class ChatService:
         query: str,
         agent_type: Optional[str] = None,
         limit: int = 20,
-        organization_id: str = None
+        organization_id: str = None,
+        cursor: Optional[str] = None
     ) -> List[Conversation]:
         """Search conversations by title or content, scoped by organization"""
+        conversations, _ = await self.search_conversations_page(
+            db, user_id, query, agent_type=agent_type, limit=limit,
+            organization_id=organization_id, cursor=cursor
+        )
+        return conversations
+
+    async def search_conversations_page(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        query: str,
+        agent_type: Optional[str] = None,
+        limit: int = 20,
+        organization_id: str = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Full-text search over conversation titles and message contents.
+
+        Matches use the French tsvector indexes; conversations are ranked by
+        their best match (title matches weigh TITLE_RANK_WEIGHT times more)
+        and paginated by keyset on (rank, id).
+
+        Returns:
+            Tuple of (conversations, cursor of the next page or None)
+        """
+        if not query or not query.strip():
+            return await self._list_active_conversations(db, user_id, agent_type, limit, organization_id), None
+
+        params = {
+            "query": query,
+            "user_id": user_id,
+            "organization_id": organization_id,
+            "status": ConversationStatus.ACTIVE.value,
+            "title_weight": TITLE_RANK_WEIGHT,
+            "limit": limit + 1,
+        }
+        filters = "c.user_id = :user_id AND c.organization_id = :organization_id AND c.status = :status"
+        if agent_type:
+            filters += " AND c.agent_type = :agent_type"
+            params["agent_type"] = agent_type
+        keyset = ""
+        if cursor:
+            params["after_rank"], params["after_id"] = decode_search_cursor(cursor)
+            keyset = "HAVING (max(rank), id) < (:after_rank, :after_id)"
+
+        result = await db.execute(
+            text(f"""
+                WITH q AS (SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS query),
+                hits AS (
+                    SELECT c.id, ts_rank(c.search_vector, q.query) * :title_weight AS rank
+                    FROM conversations c, q
+                    WHERE {filters} AND c.search_vector @@ q.query
+                    UNION ALL
+                    SELECT c.id, ts_rank(m.search_vector, q.query) AS rank
+                    FROM messages m JOIN conversations c ON c.id = m.conversation_id, q
+                    WHERE {filters} AND m.search_vector @@ q.query
+                )
+                SELECT id, max(rank) AS rank
+                FROM hits
+                GROUP BY id
+                {keyset}
+                ORDER BY rank DESC, id DESC
+                LIMIT :limit
+            """),
+            params
+        )
+        ranked = result.fetchall()
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_cursor = encode_search_cursor(ranked[-1].rank, ranked[-1].id)
+        if not ranked:
+            return [], None
+
+        loaded = await db.execute(select(Conversation).where(Conversation.id.in_([row.id for row in ranked])))
+        by_id = {conversation.id: conversation for conversation in loaded.scalars().all()}
+        return [by_id[row.id] for row in ranked if row.id in by_id], next_cursor
+
+    async def _list_active_conversations(
+        self,
+        db: AsyncSession,
+        user_id: str,
+        agent_type: Optional[str],
+        limit: int,
+        organization_id: str
+    ) -> List[Conversation]:
+        """Most recently updated active conversations"""
         search_query = select(Conversation).where(
             and_(
                 Conversation.user_id == user_id,
@@ -372,11 +493,6 @@ class ChatService:
             )
         )
 
-        if query:
-            search_query = search_query.where(
-                Conversation.title.ilike(f"%{query}%")
-            )
-
         if agent_type:
             search_query = search_query.where(
                 Conversation.agent_type == agent_type
@@ -392,38 +508,34 @@ class ChatService:
         db: AsyncSession,
         user_id: str
     ) -> dict:
-        """Get conversation statistics for a user"""
-        # Total conversations
-        total_result = await db.execute(
-            select(Conversation)
+        """Get conversation statistics for a user (SQL aggregates, index-only)"""
+        # Conversation counts by status and agent type
+        by_group = await db.execute(
+            select(Conversation.status, Conversation.agent_type, func.count())
             .where(Conversation.user_id == user_id)
+            .group_by(Conversation.status, Conversation.agent_type)
         )
-        total_conversations = len(total_result.scalars().all())
-
-        # Active conversations
-        active_result = await db.execute(
-            select(Conversation)
-            .where(
-                and_(
-                    Conversation.user_id == user_id,
-                    Conversation.status == ConversationStatus.ACTIVE
-                )
-            )
-        )
-        active_conversations = len(active_result.scalars().all())
+        total_conversations = 0
+        active_conversations = 0
+        conversations_by_agent: Dict[str, int] = {}
+        for status, agent_type, count in by_group.all():
+            total_conversations += count
+            if status == ConversationStatus.ACTIVE.value:
+                active_conversations += count
+            conversations_by_agent[agent_type] = conversations_by_agent.get(agent_type, 0) + count
 
         # Messages count
-        messages_result = await db.execute(
-            select(Message)
+        total_messages = await db.scalar(
+            select(func.count(Message.id))
             .join(Conversation)
             .where(Conversation.user_id == user_id)
         )
-        total_messages = len(messages_result.scalars().all())
 
         return {
             "total_conversations": total_conversations,
             "active_conversations": active_conversations,
-            "total_messages": total_messages
+            "total_messages": total_messages or 0,
+            "conversations_by_agent": conversations_by_agent
         }
 
     @performance_monitor("process_message_with_lcel")
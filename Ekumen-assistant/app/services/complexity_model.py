@@ -0,0 +1,277 @@
+"""
+Complexity Model - learned, local query complexity classifier
+
+Predicts the probability that a query needs the strong model, in
+microseconds and without an LLM call:
+
+- Features are hashed word unigrams and bigrams of the normalized query
+  plus its length, so the model is a sparse weight table
+- The weights are a logistic regression trained on logged outcomes
+  (load_training_examples): answers from the cheap model that users rated
+  badly or well, and shadow evaluations where the cheap model ran next to
+  the strong one
+- Trained models are JSON files (MODEL_ROUTER_CLASSIFIER_PATH), written by
+  scripts/train_complexity_model.py
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+from app.services.semantic_answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+FEATURE_BITS = 18
+MODEL_VERSION = 1
+
+# Ratings (1-5) at or below this mean the answer was not good enough
+BAD_RATING = 2
+GOOD_RATING = 4
+
+
+def query_features(query: str, bits: int = FEATURE_BITS) -> List[int]:
+    """Hashed feature indices of a query (binary features, no duplicates)"""
+    words = normalize_query(query).split()
+    size = len(words)
+    length = "len:short" if size <= 5 else "len:medium" if size <= 12 else "len:long" if size <= 25 else "len:very_long"
+    features = [length, f"q:{min(query.count('?'), 2)}"]
+    features.extend(f"w:{word}" for word in words)
+    features.extend(f"b:{first}_{second}" for first, second in zip(words, words[1:]))
+    mask = (1 << bits) - 1
+    return list({zlib.crc32(feature.encode("utf-8")) & mask for feature in features})
+
+
+def _sigmoid(score: float) -> float:
+    if score >= 0:
+        return 1.0 / (1.0 + math.exp(-score))
+    exp = math.exp(score)
+    return exp / (1.0 + exp)
+
+
+@dataclass
+class TrainingExample:
+    query: str
+    needs_strong: bool
+    source: str = "feedback"  # feedback, analytics or shadow
+
+
+class ComplexityModel:
+    """Sparse logistic regression over hashed query features"""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bias: float = 0.0,
+                 bits: int = FEATURE_BITS, metadata: Optional[Dict[str, Any]] = None):
+        self.weights = weights or {}
+        self.bias = bias
+        self.bits = bits
+        self.metadata = metadata or {}
+
+    def predict_proba(self, query: str) -> float:
+        """Probability that the query needs the strong model"""
+        weights = self.weights
+        score = self.bias
+        for index in query_features(query, self.bits):
+            score += weights.get(index, 0.0)
+        return _sigmoid(score)
+
+    @classmethod
+    def train(
+        cls,
+        examples: Sequence[TrainingExample],
+        epochs: int = 8,
+        learning_rate: float = 0.2,
+        l2: float = 1e-4,
+        seed: int = 0,
+    ) -> "ComplexityModel":
+        """
+        Fit by stochastic gradient descent
+
+        Classes are weighted inversely to their frequency, since most logged
+        queries are simple ones.
+        """
+        features = [query_features(example.query) for example in examples]
+        labels = [1.0 if example.needs_strong else 0.0 for example in examples]
+        positives = sum(labels)
+        negatives = len(labels) - positives
+        class_weight = {
+            1.0: len(labels) / (2 * positives) if positives else 1.0,
+            0.0: len(labels) / (2 * negatives) if negatives else 1.0,
+        }
+
+        model = cls(metadata={"examples": len(examples), "positives": int(positives)})
+        weights = model.weights
+        order = list(range(len(examples)))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            for i in order:
+                score = model.bias + sum(weights.get(index, 0.0) for index in features[i])
+                gradient = (_sigmoid(score) - labels[i]) * class_weight[labels[i]]
+                model.bias -= rate * gradient
+                for index in features[i]:
+                    weight = weights.get(index, 0.0)
+                    weights[index] = weight - rate * (gradient + l2 * weight)
+        return model
+
+    def evaluate(self, examples: Sequence[TrainingExample], threshold: float = 0.5) -> Dict[str, float]:
+        """Accuracy, strong-model recall and precision, and share routed to the cheap model"""
+        true_positive = false_positive = false_negative = correct = cheap = 0
+        for example in examples:
+            strong = self.predict_proba(example.query) >= threshold
+            cheap += not strong
+            correct += strong == example.needs_strong
+            true_positive += strong and example.needs_strong
+            false_positive += strong and not example.needs_strong
+            false_negative += not strong and example.needs_strong
+        total = len(examples) or 1
+        return {
+            "accuracy": round(correct / total, 4),
+            "strong_recall": round(true_positive / (true_positive + false_negative), 4) if true_positive + false_negative else 1.0,
+            "strong_precision": round(true_positive / (true_positive + false_positive), 4) if true_positive + false_positive else 1.0,
+            "cheap_share": round(cheap / total, 4),
+        }
+
+    def save(self, path: str):
+        """Write the model as JSON (atomically)"""
+        data = {
+            "version": MODEL_VERSION,
+            "bits": self.bits,
+            "bias": self.bias,
+            "weights": {str(index): round(weight, 6) for index, weight in self.weights.items() if abs(weight) > 1e-6},
+            "metadata": {**self.metadata, "trained_at": datetime.now(timezone.utc).isoformat()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ComplexityModel"]:
+        """Model saved by save(), or None if missing or from another version"""
+        try:
+            if not os.path.exists(path):
+                return None
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MODEL_VERSION:
+                logger.warning(f"Complexity model {path} has version {data.get('version')}, expected {MODEL_VERSION}")
+                return None
+            return cls(
+                weights={int(index): weight for index, weight in data["weights"].items()},
+                bias=data["bias"],
+                bits=data["bits"],
+                metadata=data.get("metadata"),
+            )
+        except Exception as e:
+            logger.error(f"Error loading complexity model {path}: {e}")
+            return None
+
+
+_model: Any = None
+
+
+def get_complexity_model() -> Optional[ComplexityModel]:
+    """Process-wide trained model (None until one has been trained)"""
+    global _model
+    if _model is None:
+        _model = ComplexityModel.load(settings.MODEL_ROUTER_CLASSIFIER_PATH) or False
+        if _model:
+            logger.info(f"Loaded complexity model ({len(_model.weights)} weights)")
+    return _model or None
+
+
+def set_complexity_model(model: Optional[ComplexityModel]):
+    """Replace the process-wide model (e.g. after retraining)"""
+    global _model
+    _model = model if model is not None else False
+
+
+def label_from_rating(model_is_cheap: bool, rating: Optional[float]) -> Optional[bool]:
+    """
+    needs_strong label of a rated answer
+
+    Only answers of the cheap model are informative: rated badly it was not
+    enough, rated well it was. A good strong-model answer says nothing about
+    whether the cheap model would have done.
+    """
+    if rating is None or not model_is_cheap:
+        return None
+    if rating <= BAD_RATING:
+        return True
+    if rating >= GOOD_RATING:
+        return False
+    return None
+
+
+async def load_training_examples(
+    db,
+    is_cheap_model: Callable[[str], bool],
+    days: int = 90,
+) -> List[TrainingExample]:
+    """
+    Labelled queries from rated agent responses, query analytics and
+    shadow evaluations of the last days
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import aliased
+    from app.models.analytics import AnalyticsEvent, AnalyticsEventType, QueryAnalytics
+    from app.models.conversation import AgentResponse, Message
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    examples: List[TrainingExample] = []
+
+    # Rated responses, with the user message they answered
+    answer, question = aliased(Message), aliased(Message)
+    rows = (await db.execute(
+        select(question.content, AgentResponse.model_used, AgentResponse.user_rating)
+        .join(answer, answer.id == AgentResponse.message_id)
+        .join(question, question.id == answer.parent_message_id)
+        .where(AgentResponse.user_rating.isnot(None), AgentResponse.created_at >= since)
+    )).all()
+    for row in rows:
+        label = label_from_rating(is_cheap_model(row.model_used or ""), row.user_rating)
+        if label is not None:
+            examples.append(TrainingExample(row.content, label, "feedback"))
+
+    # Aggregated satisfaction per query, when the model is known
+    rows = (await db.execute(
+        select(QueryAnalytics.query_text, QueryAnalytics.satisfaction_score, QueryAnalytics.extra_data)
+        .where(QueryAnalytics.satisfaction_count > 0, QueryAnalytics.period_start >= since)
+    )).all()
+    for row in rows:
+        model_used = (row.extra_data or {}).get("model_used")
+        score = float(row.satisfaction_score) if row.satisfaction_score is not None else None
+        label = label_from_rating(is_cheap_model(model_used), score) if model_used else None
+        if label is not None:
+            examples.append(TrainingExample(row.query_text, label, "analytics"))
+
+    # Shadow evaluations: the cheap model ran on a strong-model query
+    rows = (await db.execute(
+        select(AnalyticsEvent.event_data)
+        .where(
+            AnalyticsEvent.event_type == AnalyticsEventType.MODEL_SHADOW_EVALUATION.value,
+            AnalyticsEvent.created_at >= since
+        )
+    )).all()
+    for row in rows:
+        data = row.event_data or {}
+        if data.get("query") and "cheap_sufficed" in data:
+            examples.append(TrainingExample(data["query"], not data["cheap_sufficed"], "shadow"))
+
+    return examples
+
+
+def split_examples(examples: Iterable[TrainingExample], holdout: float = 0.2, seed: int = 0):
+    """(train, test) split, stable for a seed"""
+    examples = list(examples)
+    random.Random(seed).shuffle(examples)
+    cut = int(len(examples) * (1 - holdout))
+    return examples[:cut], examples[cut:]
@@ -0,0 +1,309 @@
+"""
+Knowledge base access control for RAG retrieval
+
+Two halves that implement the same access rules:
+
+- Chunk metadata. Every chunk written to the vector store carries its
+  document's organization, visibility, expiry (epoch seconds) and one flag
+  per organization/user it is shared with. acl_where() turns a user into a
+  Chroma where-filter, so the vector search only ranks chunks the user may
+  see instead of receiving every accessible document ID in an $in list.
+
+- Accessible sets. DocumentAccessCache keeps, per organization, the
+  approved, completed, visible, unexpired documents it can reach, loaded
+  with one column-only query. Search hits are checked against it (status
+  changes after ingestion do not touch chunk metadata) and it supplies the
+  workflow metadata attached to results. Sets are dropped when a
+  KnowledgeBaseDocument commit in this process touches them, and otherwise
+  reloaded every RAG_ACCESS_CACHE_TTL seconds.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, Iterable, NamedTuple, Optional
+
+from sqlalchemy import and_, event, func, inspect, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.knowledge_base import DocumentStatus, KnowledgeBaseDocument
+
+logger = logging.getLogger(__name__)
+
+VISIBLE_STATES = ("shared", "public")
+
+# expires_at for documents without an expiration date (9999-12-31)
+NO_EXPIRY = 253402300799.0
+
+ACL_ORG_PREFIX = "acl_org_"
+ACL_USER_PREFIX = "acl_user_"
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    """Epoch seconds for a datetime or ISO string (naive values are UTC)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def document_expires_at(document: Any) -> float:
+    """Earliest of the expiration column and the workflow metadata expiration"""
+    metadata = getattr(document, "organization_metadata", None) or {}
+    candidates = [
+        _timestamp(getattr(document, "expiration_date", None)),
+        _timestamp(metadata.get("expiration_date")),
+    ]
+    candidates = [c for c in candidates if c is not None]
+    return min(candidates) if candidates else NO_EXPIRY
+
+
+class DocumentAccess(NamedTuple):
+    """What retrieval needs to know about one accessible document"""
+    document_id: str
+    organization_id: str
+    filename: str
+    document_type: Optional[str]
+    visibility: str
+    shared_with_organizations: FrozenSet[str]
+    shared_with_users: FrozenSet[str]
+    is_ekumen_provided: bool
+    expires_at: float
+    quality_score: Optional[float]
+    version: Optional[int]
+    tags: tuple
+    description: Optional[str]
+    metadata_expiration_date: Optional[str]
+
+    def allows(self, user_id: str, organization_id: str, include_ekumen_content: bool = True,
+               now: Optional[float] = None) -> bool:
+        """Whether the user may retrieve this document (mirrors acl_where)"""
+        if self.expires_at <= (now if now is not None else time.time()):
+            return False
+        if self.organization_id == organization_id:
+            return True
+        if self.visibility == "shared" and (
+            not self.shared_with_organizations or organization_id in self.shared_with_organizations
+        ):
+            return True
+        if user_id in self.shared_with_users:
+            return True
+        return include_ekumen_content and self.is_ekumen_provided
+
+    def workflow_metadata(self) -> Dict[str, Any]:
+        """Metadata merged into retrieved chunks"""
+        return {
+            "document_type": self.document_type,
+            "organization_id": self.organization_id,
+            "quality_score": self.quality_score,
+            "version": self.version,
+            "expiration_date": self.metadata_expiration_date,
+            "is_ekumen_provided": self.is_ekumen_provided,
+            "tags": list(self.tags),
+            "description": self.description,
+        }
+
+
+def chunk_acl_metadata(document: Any) -> Dict[str, Any]:
+    """Access-control fields stored on every chunk of a document"""
+    shared_orgs = [str(o) for o in (document.shared_with_organizations or [])]
+    metadata = {
+        "organization_id": str(document.organization_id),
+        "visibility": document.visibility,
+        "is_ekumen_provided": bool(document.is_ekumen_provided),
+        "shared_with_all": document.visibility == "shared" and not shared_orgs,
+        "expires_at": document_expires_at(document),
+    }
+    if document.visibility == "shared":
+        metadata.update({f"{ACL_ORG_PREFIX}{o}": True for o in shared_orgs})
+    metadata.update({f"{ACL_USER_PREFIX}{u}": True for u in (document.shared_with_users or [])})
+    return metadata
+
+
+def acl_where(user_id: str, organization_id: str, include_ekumen_content: bool = True,
+              now: Optional[float] = None) -> Dict[str, Any]:
+    """Chroma where-filter selecting the chunks a user may retrieve"""
+    grants = [
+        {"organization_id": organization_id},
+        {"shared_with_all": True},
+        {f"{ACL_ORG_PREFIX}{organization_id}": True},
+        {f"{ACL_USER_PREFIX}{user_id}": True},
+    ]
+    if include_ekumen_content:
+        grants.append({"is_ekumen_provided": True})
+    return {
+        "$and": [
+            {"visibility": {"$in": list(VISIBLE_STATES)}},
+            {"expires_at": {"$gt": now if now is not None else time.time()}},
+            {"$or": grants},
+        ]
+    }
+
+
+class AccessibleSet(NamedTuple):
+    """Documents an organization can reach, keyed by document ID"""
+    documents: Dict[str, DocumentAccess]
+    loaded_at: float
+
+
+class DocumentAccessCache:
+    """Per-organization accessible document sets"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.RAG_ACCESS_CACHE_TTL
+        self._sets: Dict[str, AccessibleSet] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generation = 0
+        self.stats = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def invalidate(self, organization_ids: Optional[Iterable[str]] = None):
+        """Drop the sets of the given organizations, or all of them"""
+        self._generation += 1
+        self.stats["invalidations"] += 1
+        if organization_ids is None:
+            self._sets.clear()
+        else:
+            for organization_id in organization_ids:
+                self._sets.pop(str(organization_id), None)
+
+    def _fresh(self, organization_id: str) -> Optional[AccessibleSet]:
+        entry = self._sets.get(organization_id)
+        if entry is not None and time.time() - entry.loaded_at < self.ttl:
+            return entry
+        return None
+
+    async def get(self, organization_id: str, db=None) -> Dict[str, DocumentAccess]:
+        """Accessible documents of an organization, loading them if needed"""
+        organization_id = str(organization_id)
+        entry = self._fresh(organization_id)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry.documents
+
+        lock = self._locks.setdefault(organization_id, asyncio.Lock())
+        async with lock:
+            entry = self._fresh(organization_id)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry.documents
+
+            generation = self._generation
+            if db is not None:
+                documents = await self._load(organization_id, db)
+            else:
+                from app.core.database import AsyncSessionLocal
+
+                async with AsyncSessionLocal() as session:
+                    documents = await self._load(organization_id, session)
+            self.stats["loads"] += 1
+
+            # A commit that landed while loading may not be reflected
+            if generation == self._generation:
+                self._sets[organization_id] = AccessibleSet(documents, time.time())
+            return documents
+
+    @staticmethod
+    async def _load(organization_id: str, db) -> Dict[str, DocumentAccess]:
+        kb = KnowledgeBaseDocument
+        empty = func.cast("[]", JSONB)
+        query = select(
+            kb.id, kb.organization_id, kb.filename, kb.document_type, kb.visibility,
+            kb.shared_with_organizations, kb.shared_with_users, kb.is_ekumen_provided,
+            kb.expiration_date, kb.organization_metadata, kb.quality_score, kb.version,
+            kb.tags, kb.description,
+        ).where(
+            and_(
+                kb.processing_status == DocumentStatus.COMPLETED,
+                kb.visibility.in_(VISIBLE_STATES),
+                kb.submission_status == "approved",
+                or_(kb.expiration_date == None, kb.expiration_date > datetime.utcnow()),
+                or_(
+                    kb.organization_id == organization_id,
+                    and_(
+                        kb.visibility == "shared",
+                        or_(
+                            func.jsonb_array_length(func.coalesce(kb.shared_with_organizations, empty)) == 0,
+                            kb.shared_with_organizations.contains([organization_id]),
+                        ),
+                    ),
+                    func.jsonb_array_length(func.coalesce(kb.shared_with_users, empty)) > 0,
+                    kb.is_ekumen_provided == True,
+                ),
+            )
+        )
+        result = await db.execute(query)
+
+        documents = {}
+        for row in result:
+            metadata = row.organization_metadata or {}
+            document_id = str(row.id)
+            documents[document_id] = DocumentAccess(
+                document_id=document_id,
+                organization_id=str(row.organization_id),
+                filename=row.filename,
+                document_type=row.document_type.value if row.document_type else None,
+                visibility=row.visibility,
+                shared_with_organizations=frozenset(str(o) for o in row.shared_with_organizations or []),
+                shared_with_users=frozenset(str(u) for u in row.shared_with_users or []),
+                is_ekumen_provided=bool(row.is_ekumen_provided),
+                expires_at=document_expires_at(row),
+                quality_score=float(row.quality_score) if row.quality_score is not None else None,
+                version=row.version,
+                tags=tuple(row.tags or ()),
+                description=row.description,
+                metadata_expiration_date=metadata.get("expiration_date"),
+            )
+        logger.info(f"Loaded {len(documents)} accessible documents for organization {organization_id}")
+        return documents
+
+
+# Process-wide cache
+document_access_cache = DocumentAccessCache()
+
+
+# Invalidate after KnowledgeBaseDocument rows are committed in this process
+_CHANGED_KEY = "knowledge_base_documents_changed"
+_ALL = "*"
+_SHARING_ATTRS = ("visibility", "shared_with_organizations", "shared_with_users", "is_ekumen_provided")
+
+
+def _affected_organizations(document) -> set:
+    """Organizations whose accessible set a document change can alter"""
+    state = inspect(document)
+    # Sharing changed on an existing row: the previous audience is unknown here
+    if any(state.attrs[attr].history.deleted for attr in _SHARING_ATTRS):
+        return {_ALL}
+    if document.is_ekumen_provided or document.shared_with_users or document.visibility == "shared":
+        return {_ALL}
+    return {str(document.organization_id)}
+
+
+def _mark_session_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).update(_affected_organizations(target))
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(KnowledgeBaseDocument, _event, _mark_session_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if changed:
+        document_access_cache.invalidate(None if _ALL in changed else changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
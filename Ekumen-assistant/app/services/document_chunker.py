@@ -0,0 +1,312 @@
+"""
+Document Chunker - streaming, structure-aware chunking for knowledge base ingestion
+
+Documents are consumed page by page and never held in memory as one string:
+
+- iter_document_pages() yields pages as the parser extracts them, with page
+  numbers and section starts taken from the document structure (PDF outline,
+  Markdown headings) instead of guessed from the text
+- StreamingChunker packs sentences into chunks of at most RAG_CHUNK_TOKENS
+  tokens with RAG_CHUNK_OVERLAP_TOKENS of overlap, as a generator
+
+Chunk offsets are exact character offsets into the document text, i.e. the
+concatenation of the page texts (what read_document_text() returns). Page
+breaks do not cut sentences: an unfinished sentence at the end of a page is
+completed with the start of the next one.
+"""
+
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+TEXT_FILE_TYPES = {"txt", "csv", "md", "markdown"}
+MARKDOWN_FILE_TYPES = {"md", "markdown"}
+
+# Characters per page yielded for text files, which have no pages of their
+# own (blocks may end mid-line; the chunker completes the sentence)
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# Longest unfinished sentence carried from one page into the next
+MAX_CARRY_CHARS = 64 * 1024
+
+# A sentence: up to a terminator followed by whitespace (so "3.5 L/ha" stays
+# whole) or a line break, plus trailing whitespace; the matches tile the text
+SEGMENT_RE = re.compile(r"(?:[^.!?\n]|[.!?]+(?![\s.!?]|$))*(?:[.!?]+(?=\s|$)|\n|$)\s*")
+WORD_RE = re.compile(r"\S+\s*|\s+")
+MARKDOWN_HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+# How a complete sentence ends; anything else at the end of a page may go on
+SENTENCE_END_RE = re.compile(r"(?:\n|[.!?]\s)\s*$")
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in a text (cl100k_base; about 4 characters per token without tiktoken)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
+
+
+@dataclass
+class DocumentPage:
+    """One page of extracted text and the sections starting on it"""
+
+    text: str
+    page_number: Optional[int] = None
+    sections: List[Tuple[int, str]] = field(default_factory=list)  # (offset in page, title)
+
+
+@dataclass
+class _Segment:
+    start: int
+    text: str
+    tokens: int
+    page_number: Optional[int]
+    section: Optional[str]
+
+
+def iter_document_pages(document) -> Iterator[DocumentPage]:
+    """
+    Extracted pages of an uploaded knowledge base document
+
+    Raises:
+        ValueError: If the file type cannot be extracted
+    """
+    path = Path(document.file_path)
+    file_type = (document.file_type or path.suffix.lstrip(".")).lower()
+
+    if file_type in TEXT_FILE_TYPES:
+        return _iter_text_pages(path, markdown=file_type in MARKDOWN_FILE_TYPES)
+
+    if file_type == "pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise ValueError("PDF ingestion requires the pypdf package")
+        return _iter_pdf_pages(path, PdfReader)
+
+    raise ValueError(f"Unsupported file type for ingestion: {file_type}")
+
+
+def _iter_text_pages(path: Path, markdown: bool) -> Iterator[DocumentPage]:
+    with path.open(encoding="utf-8", errors="replace", newline="") as handle:
+        parts: List[str] = []
+        sections: List[Tuple[int, str]] = []
+        size = 0
+        line_start = True
+        # Lines longer than a block are read in pieces
+        for piece in iter(lambda: handle.readline(TEXT_BLOCK_CHARS), ""):
+            if markdown and line_start:
+                heading = MARKDOWN_HEADING_RE.match(piece)
+                if heading:
+                    sections.append((size, heading.group(1)))
+            line_start = piece.endswith("\n")
+            parts.append(piece)
+            size += len(piece)
+            if size >= TEXT_BLOCK_CHARS:
+                yield DocumentPage("".join(parts), sections=sections)
+                parts, sections, size = [], [], 0
+        if parts:
+            yield DocumentPage("".join(parts), sections=sections)
+
+
+def _outline_starts(reader) -> Dict[int, List[str]]:
+    """Section titles by page index, from the PDF outline (bookmarks)"""
+    starts: Dict[int, List[str]] = {}
+
+    def walk(items):
+        for item in items:
+            if isinstance(item, list):
+                walk(item)
+                continue
+            try:
+                page_index = reader.get_destination_page_number(item)
+            except Exception:
+                continue
+            if page_index is not None and page_index >= 0:
+                starts.setdefault(page_index, []).append(item.title)
+
+    try:
+        walk(reader.outline)
+    except Exception:
+        pass
+    return starts
+
+
+def _iter_pdf_pages(path: Path, reader_class) -> Iterator[DocumentPage]:
+    reader = reader_class(str(path))
+    starts = _outline_starts(reader)
+    for index, page in enumerate(reader.pages):
+        text = (page.extract_text() or "") + "\n"
+        # The outline only locates sections to the page; the last one opened
+        # on a page is the one in effect for its text
+        sections = [(0, title) for title in starts.get(index, [])[-1:]]
+        yield DocumentPage(text, page_number=index + 1, sections=sections)
+
+
+class StreamingChunker:
+    """
+    Token-budgeted chunker over a stream of pages.
+
+    Chunks end at sentence boundaries (sentences longer than the budget are
+    split between words) and at section starts; they may span pages and
+    carry the page of their first sentence.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        count_tokens: Callable[[str], int] = count_tokens,
+    ):
+        self.max_tokens = max_tokens or settings.RAG_CHUNK_TOKENS
+        self.overlap_tokens = settings.RAG_CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+        if self.overlap_tokens >= self.max_tokens:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.count_tokens = count_tokens
+
+    def chunks(self, pages: Iterable[DocumentPage]) -> Iterator[Dict[str, Any]]:
+        """
+        Chunks of a document
+
+        Yields:
+            Dicts with content, page_number, section, chunk_start, chunk_end
+            and token_count
+        """
+        window: List[_Segment] = []
+        tokens = 0
+        fresh = False  # window holds text not yet emitted
+        section: Optional[str] = None
+
+        for start, text, page_number, new_section in self._sentences(pages):
+            if new_section != section:
+                # A chunk never straddles sections, nor overlaps the previous one
+                if fresh:
+                    chunk = self._chunk(window)
+                    if chunk:
+                        yield chunk
+                window, tokens, fresh = [], 0, False
+                section = new_section
+
+            for segment in self._segments(start, text, page_number, section):
+                if fresh and tokens + segment.tokens > self.max_tokens:
+                    chunk = self._chunk(window)
+                    if chunk:
+                        yield chunk
+                    window, tokens = self._overlap(window)
+                    fresh = False
+                while window and tokens + segment.tokens > self.max_tokens:
+                    tokens -= window.pop(0).tokens
+                window.append(segment)
+                tokens += segment.tokens
+                fresh = True
+
+        if fresh:
+            chunk = self._chunk(window)
+            if chunk:
+                yield chunk
+
+    @staticmethod
+    def _sentences(pages: Iterable[DocumentPage]) -> Iterator[Tuple[int, str, Optional[int], Optional[str]]]:
+        """
+        (offset, text, page number, section) of each sentence of a page stream
+
+        The last sentence of a page is held back when it may go on (no
+        terminator or line break yet) and read together with the next page.
+        """
+        pages = iter(pages)
+        offset = 0  # document offset of tail
+        tail, tail_page = "", None
+        tail_sections: List[Tuple[int, str]] = []
+        section: Optional[str] = None
+
+        while True:
+            page = next(pages, None)
+            if page is None:
+                text, boundaries = tail, tail_sections
+            else:
+                text = tail + page.text
+                boundaries = tail_sections + sorted((start + len(tail), title) for start, title in page.sections)
+
+            matches = [match for match in SEGMENT_RE.finditer(text) if match.group()]
+            held = len(text)
+            if (
+                page is not None and matches
+                and not SENTENCE_END_RE.search(matches[-1].group())
+                and len(text) - matches[-1].start() <= MAX_CARRY_CHARS
+            ):
+                held = matches.pop().start()
+
+            next_boundary = 0
+            for match in matches:
+                while next_boundary < len(boundaries) and boundaries[next_boundary][0] <= match.start():
+                    section = boundaries[next_boundary][1]
+                    next_boundary += 1
+                page_number = tail_page if match.start() < len(tail) else page.page_number
+                yield offset + match.start(), match.group(), page_number, section
+
+            if page is None:
+                return
+            # Section starts not reached yet apply from the start of the held text
+            tail_sections = [(max(start - held, 0), title) for start, title in boundaries[next_boundary:]]
+            tail_page = tail_page if held < len(tail) else page.page_number
+            tail = text[held:]
+            offset += held
+
+    def _segments(self, start: int, text: str, page_number, section) -> Iterator[_Segment]:
+        tokens = self.count_tokens(text)
+        if tokens <= self.max_tokens:
+            yield _Segment(start, text, tokens, page_number, section)
+            return
+
+        # Sentence over budget: pack its words instead
+        piece_start, piece, piece_tokens = start, "", 0
+        for word in WORD_RE.finditer(text):
+            word_tokens = self.count_tokens(word.group())
+            if piece and piece_tokens + word_tokens > self.max_tokens:
+                yield _Segment(piece_start, piece, piece_tokens, page_number, section)
+                piece_start, piece, piece_tokens = start + word.start(), "", 0
+            piece += word.group()
+            piece_tokens += word_tokens
+        if piece:
+            yield _Segment(piece_start, piece, piece_tokens, page_number, section)
+
+    def _overlap(self, window: List[_Segment]) -> Tuple[List[_Segment], int]:
+        """Trailing sentences of a chunk carried into the next one"""
+        kept: List[_Segment] = []
+        tokens = 0
+        for segment in reversed(window):
+            if tokens + segment.tokens > self.overlap_tokens:
+                break
+            kept.append(segment)
+            tokens += segment.tokens
+        kept.reverse()
+        return kept, tokens
+
+    @staticmethod
+    def _chunk(window: List[_Segment]) -> Optional[Dict[str, Any]]:
+        text = "".join(segment.text for segment in window)
+        content = text.strip()
+        if not content:
+            return None
+        lead = len(text) - len(text.lstrip())
+        first = next(segment for segment in window if segment.text.strip())
+        start = window[0].start + lead
+        return {
+            "content": content,
+            "page_number": first.page_number,
+            "section": first.section,
+            "chunk_start": start,
+            "chunk_end": start + len(content),
+            "token_count": sum(segment.tokens for segment in window),
+        }
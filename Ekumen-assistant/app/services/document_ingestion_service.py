@@ -0,0 +1,209 @@
+"""
+Document Ingestion Service
+Embeds approved knowledge base documents on a background worker
+
+Approval only enqueues the document; the worker streams the file page by
+page through the chunker, embeds it through the shared RAG service and
+records the outcome in processing_status, so approval requests return
+immediately. The queue is in memory, so documents queued or mid-ingestion
+when a process stops are re-queued at the next startup (recover()).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, func, or_, update
+
+from app.core.config import settings
+from app.models.knowledge_base import KnowledgeBaseDocument, DocumentStatus
+from app.services.document_chunker import iter_document_pages
+
+logger = logging.getLogger(__name__)
+
+
+def read_document_text(document: KnowledgeBaseDocument) -> str:
+    """
+    Extract the text of an uploaded document
+
+    Raises:
+        ValueError: If the file type cannot be extracted
+    """
+    return "".join(page.text for page in iter_document_pages(document))
+
+
+class DocumentIngestionService:
+    """
+    Background ingestion queue for approved documents.
+
+    One worker task per process drains a bounded queue; embedding
+    concurrency within a document is bounded by the RAG service.
+    """
+
+    def __init__(self, session_factory=None, rag_service=None, queue_size: Optional[int] = None,
+                 stale_after: Optional[float] = None):
+        self._session_factory = session_factory
+        self._rag_service = rag_service
+        self.queue_size = queue_size or settings.RAG_INGESTION_QUEUE_SIZE
+        self.stale_after = stale_after if stale_after is not None else settings.RAG_INGESTION_STALE_AFTER
+        self.queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._recovery: Optional[asyncio.Task] = None
+        self.stats = {"queued": 0, "ingested": 0, "failed": 0, "rejected": 0, "recovered": 0}
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @property
+    def rag_service(self):
+        if self._rag_service is None:
+            from app.services.rag_service import get_rag_service
+            self._rag_service = get_rag_service()
+        return self._rag_service
+
+    def start(self, recover: bool = False) -> bool:
+        """
+        Start the worker task (needs a running event loop)
+
+        Args:
+            recover: Also re-queue documents left over by a previous process
+        """
+        if self._worker is not None and not self._worker.done():
+            return False
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._worker = loop.create_task(self._run())
+        if recover:
+            self._recovery = loop.create_task(self.recover())
+        logger.info("✅ Document ingestion worker started")
+        return True
+
+    async def stop(self):
+        """Stop the worker task; queued documents stay pending"""
+        for task in (self._recovery, self._worker):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._worker = self._recovery = None
+
+    async def recover(self) -> int:
+        """
+        Re-queue documents whose ingestion was lost with a previous process
+
+        Approved documents still PENDING, and documents PROCESSING for longer
+        than stale_after seconds (the process stopped mid-document). Each
+        document is claimed in the same UPDATE that selects it (set PROCESSING
+        with a fresh updated_at), so when several workers start together every
+        document is queued by exactly one of them. Waits for queue space
+        instead of rejecting.
+
+        Returns:
+            Number of documents queued
+        """
+        kb = KnowledgeBaseDocument
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    update(kb)
+                    .where(
+                        or_(
+                            and_(kb.processing_status == DocumentStatus.PENDING, kb.approved_at != None),
+                            and_(kb.processing_status == DocumentStatus.PROCESSING, kb.updated_at < stale_before),
+                        )
+                    )
+                    .values(processing_status=DocumentStatus.PROCESSING, updated_at=func.now())
+                    .returning(kb.id)
+                    .execution_options(synchronize_session=False)
+                )
+                document_ids = [str(document_id) for document_id, in result]
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to claim documents to re-queue: {e}")
+            return 0
+
+        for document_id in document_ids:
+            await self.queue.put((document_id, None))
+        self.stats["queued"] += len(document_ids)
+        self.stats["recovered"] += len(document_ids)
+        if document_ids:
+            logger.info(f"Re-queued {len(document_ids)} documents for ingestion")
+        return len(document_ids)
+
+    def enqueue(self, document_id: str, content: Optional[str] = None) -> bool:
+        """
+        Queue a document for ingestion
+
+        Args:
+            document_id: Knowledge base document ID
+            content: Document text (streamed from the uploaded file if omitted)
+
+        Returns:
+            False if the queue is full
+        """
+        if self._worker is None or self._worker.done():
+            self.start()
+        try:
+            self.queue.put_nowait((str(document_id), content))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            logger.warning(f"⚠️ Ingestion queue full, document {document_id} not queued")
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    async def join(self):
+        """Wait until every queued document is processed"""
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def _run(self):
+        while True:
+            document_id, content = await self.queue.get()
+            try:
+                await self.ingest(document_id, content)
+            except Exception as e:
+                logger.error(f"Ingestion of document {document_id} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def ingest(self, document_id: str, content: Optional[str] = None) -> bool:
+        """Chunk, embed and index one document, recording its processing status"""
+        async with self.session_factory() as db:
+            document = await db.get(KnowledgeBaseDocument, document_id)
+            if document is None:
+                logger.warning(f"Document {document_id} not found for ingestion")
+                return False
+
+            document.processing_status = DocumentStatus.PROCESSING
+            await db.commit()
+
+            try:
+                pages = iter_document_pages(document) if content is None else content
+                success = await self.rag_service.add_document_to_vectorstore(document, pages, db)
+            except Exception as e:
+                logger.error(f"Error ingesting document {document_id}: {e}")
+                success = False
+
+            if not success:
+                await db.rollback()
+            document.processing_status = DocumentStatus.COMPLETED if success else DocumentStatus.FAILED
+            await db.commit()
+
+        self.stats["ingested" if success else "failed"] += 1
+        return success
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "pending": self.queue.qsize() if self.queue is not None else 0}
+
+
+# Process-wide ingestion worker
+document_ingestion_service = DocumentIngestionService()
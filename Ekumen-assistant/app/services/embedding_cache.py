@@ -0,0 +1,233 @@
+"""
+Embedding Cache - content hash -> vector, shared by every embedding caller
+
+Embedding the same text twice returns the same vector, so vectors are cached
+by (model, SHA-256 of the text):
+
+- An in-process LRU of float32 vectors answers repeated questions without I/O
+- The embedding_cache table (float16 bytea, half the size of float32) is
+  shared by all workers and survives restarts, so re-ingesting a new version
+  of a document only embeds the chunks that changed
+- Hit rates are tracked per tier
+- Calls that reach the embedding API are metered (usage_meter)
+
+Lookups are synchronous (callers already embed off the event loop); the
+async helpers run them in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.usage_meter import usage_meter
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT = object()
+
+Vector = np.ndarray
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """Compact float16 encoding of a vector"""
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def decode_vector(blob: bytes) -> Vector:
+    """float32 vector from encode_vector() output"""
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+
+
+class PostgresEmbeddingStore:
+    """Persistent tier on the embedding_cache table (sync engine)"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.core.database import sync_engine
+            self._engine = sync_engine
+        return self._engine
+
+    def get_many(self, model: str, hashes: Sequence[str]) -> Dict[str, Vector]:
+        from sqlalchemy import select
+        from app.models.cache import CachedEmbedding
+
+        table = CachedEmbedding.__table__
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.content_hash, table.c.vector)
+                .where(table.c.model == model, table.c.content_hash.in_(list(hashes)))
+            ).all()
+        return {row.content_hash: decode_vector(bytes(row.vector)) for row in rows}
+
+    def put_many(self, model: str, items: Dict[str, Vector]):
+        from sqlalchemy.dialects.postgresql import insert
+        from app.models.cache import CachedEmbedding
+
+        statement = insert(CachedEmbedding.__table__).values([
+            {"model": model, "content_hash": digest, "dimensions": len(vector), "vector": encode_vector(vector)}
+            for digest, vector in items.items()
+        ]).on_conflict_do_nothing(index_elements=["model", "content_hash"])
+        with self.engine.begin() as connection:
+            connection.execute(statement)
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: in-process LRU in front of a persistent store.
+
+    A failing store is skipped for RETRY_AFTER seconds; lookups then fall
+    back to the LRU and the embedding API.
+    """
+
+    RETRY_AFTER = 30
+
+    def __init__(self, store=_DEFAULT, lru_size: Optional[int] = None):
+        self.store = PostgresEmbeddingStore() if store is _DEFAULT else store
+        self.lru_size = lru_size or settings.EMBEDDING_CACHE_LRU_SIZE
+        self._lru: "OrderedDict[Tuple[str, str], Vector]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store_disabled_until = 0.0
+        self.stats = {"lru_hits": 0, "store_hits": 0, "misses": 0, "store_errors": 0}
+
+    def _store_available(self) -> bool:
+        return self.store is not None and self._store_disabled_until <= time.time()
+
+    def _store_failed(self, e: Exception):
+        self.stats["store_errors"] += 1
+        self._store_disabled_until = time.time() + self.RETRY_AFTER
+        logger.warning(f"⚠️ Embedding store error, skipping it for {self.RETRY_AFTER}s: {e}")
+
+    def _remember(self, model: str, digest: str, vector: Vector):
+        vector.flags.writeable = False
+        with self._lock:
+            self._lru[(model, digest)] = vector
+            self._lru.move_to_end((model, digest))
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[Vector]]:
+        """Cached vectors of texts (None where missing)"""
+        digests = [text_hash(text) for text in texts]
+        vectors: List[Optional[Vector]] = [None] * len(texts)
+        with self._lock:
+            for i, digest in enumerate(digests):
+                vector = self._lru.get((model, digest))
+                if vector is not None:
+                    self._lru.move_to_end((model, digest))
+                    vectors[i] = vector
+                    self.stats["lru_hits"] += 1
+
+        missing = {digests[i] for i, vector in enumerate(vectors) if vector is None}
+        if missing and self._store_available():
+            try:
+                stored = self.store.get_many(model, sorted(missing))
+            except Exception as e:
+                self._store_failed(e)
+                stored = {}
+            for digest, vector in stored.items():
+                self._remember(model, digest, vector)
+            for i, digest in enumerate(digests):
+                if vectors[i] is None and digest in stored:
+                    vectors[i] = stored[digest]
+                    self.stats["store_hits"] += 1
+
+        self.stats["misses"] += sum(vector is None for vector in vectors)
+        return vectors
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Cache vectors of texts in both tiers"""
+        items = {}
+        for text, vector in zip(texts, vectors):
+            items[text_hash(text)] = np.array(vector, dtype=np.float32)
+        for digest, vector in items.items():
+            self._remember(model, digest, vector)
+        if items and self._store_available():
+            try:
+                self.store.put_many(model, items)
+            except Exception as e:
+                self._store_failed(e)
+
+    def embed(
+        self,
+        model: str,
+        texts: Sequence[str],
+        embed_fn: Callable[[List[str]], Sequence[Sequence[float]]]
+    ) -> List[Vector]:
+        """
+        Vectors of texts, calling embed_fn once for the distinct uncached texts
+
+        Args:
+            model: Embedding model name (part of the cache key)
+            texts: Texts to embed
+            embed_fn: Computes vectors for a list of texts
+        """
+        vectors = self.get_many(model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            started = time.perf_counter()
+            try:
+                computed = embed_fn(missing)
+            except Exception:
+                usage_meter.record_embedding(model, missing, time.perf_counter() - started, error=True)
+                raise
+            usage_meter.record_embedding(model, missing, time.perf_counter() - started)
+            self.put_many(model, missing, computed)
+            by_text = {text: np.asarray(vector, dtype=np.float32) for text, vector in zip(missing, computed)}
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    async def aembed(
+        self,
+        model: str,
+        texts: Sequence[str],
+        embed_fn: Callable[[List[str]], Awaitable[Sequence[Sequence[float]]]]
+    ) -> List[Vector]:
+        """Async embed(): store lookups run in a worker thread, embed_fn is awaited"""
+        vectors = await asyncio.to_thread(self.get_many, model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            started = time.perf_counter()
+            try:
+                computed = await embed_fn(missing)
+            except Exception:
+                usage_meter.record_embedding(model, missing, time.perf_counter() - started, error=True)
+                raise
+            usage_meter.record_embedding(model, missing, time.perf_counter() - started)
+            await asyncio.to_thread(self.put_many, model, missing, computed)
+            by_text = {text: np.asarray(vector, dtype=np.float32) for text, vector in zip(missing, computed)}
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def clear(self):
+        """Drop the in-process tier"""
+        with self._lock:
+            self._lru.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["lru_hits"] + self.stats["store_hits"] + self.stats["misses"]
+        hits = self.stats["lru_hits"] + self.stats["store_hits"]
+        return {
+            **self.stats,
+            "lru_size": len(self._lru),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Process-wide cache
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,170 @@
+"""
+EPHY change-set cache invalidation
+
+The backend's incremental EPHY import publishes a change-set (inserted,
+updated and removed keys per CSV kind, withdrawn AMMs) on a Redis channel.
+This module listens on that channel and invalidates only the regulatory
+cache entries that mention an affected AMM, instead of waiting for the
+2-hour TTL or flushing the whole category.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.cache import _serialize_pydantic, invalidate_tags, redis_client
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# French AMM numbers are 7 digits
+AMM_PATTERN = re.compile(r"(?<!\d)(\d{7})(?!\d)")
+
+# Tag for results of product/substance searches, which can change when new
+# products are authorized (not only when a listed AMM changes)
+SEARCH_TAG = "ephy:search"
+
+# Change-set kinds that can add entries to search results
+SEARCH_KINDS = {"produits", "substances"}
+
+
+def amm_tag(numero_amm: str) -> str:
+    return f"amm:{numero_amm}"
+
+
+def amm_cache_tags(result: Any) -> List[str]:
+    """
+    Invalidation tags for a cached regulatory result: one per AMM it mentions
+
+    Used as redis_cache(tags=amm_cache_tags).
+    """
+    try:
+        text = _serialize_pydantic(result)
+    except Exception:
+        text = str(result)
+    return [amm_tag(amm) for amm in sorted(set(AMM_PATTERN.findall(text)))]
+
+
+def amm_search_tags(result: Any) -> List[str]:
+    """Tags for product lookups: mentioned AMMs plus the search tag"""
+    return amm_cache_tags(result) + [SEARCH_TAG]
+
+
+def change_set_tags(change_set: Dict[str, Any]) -> Set[str]:
+    """Tags affected by an EPHY import change-set"""
+    tags = {amm_tag(amm) for amm in change_set.get("affected_amms", [])}
+    tags.update(amm_tag(amm) for amm in change_set.get("withdrawn_products", []))
+    if any(change_set.get("inserted", {}).get(kind) for kind in SEARCH_KINDS):
+        tags.add(SEARCH_TAG)
+    # Substance rows are keyed by name, not AMM
+    if any(change_set.get(name, {}).get("substances") for name in ("updated", "removed")):
+        tags.add(SEARCH_TAG)
+    return tags
+
+
+def apply_ephy_change_set(change_set: Dict[str, Any]) -> int:
+    """
+    Invalidate cache entries affected by a change-set
+
+    Args:
+        change_set: EPHYChangeSet.to_dict() payload from the backend
+
+    Returns:
+        Number of cache entries removed
+    """
+    tags = change_set_tags(change_set)
+    if not tags:
+        return 0
+
+    removed = invalidate_tags(tags)
+    logger.info(
+        f"EPHY change-set applied: {len(tags)} tags, {removed} cache entries invalidated, "
+        f"{len(change_set.get('withdrawn_products', []))} products withdrawn"
+    )
+    return removed
+
+
+class EPHYChangeListener:
+    """
+    Background subscriber to the EPHY change-set channel
+
+    Runs redis-py's pub/sub worker thread; a no-op when Redis is unavailable.
+    Messages are parsed on that thread but applied on the event loop the
+    listener was started from, since the memory caches and tag index are
+    not thread-safe.
+    """
+
+    def __init__(self, channel: Optional[str] = None, client=None):
+        self.channel = channel or settings.EPHY_CHANGES_CHANNEL
+        self._client = client if client is not None else redis_client
+        self._pubsub = None
+        self._thread = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._callbacks: List[Callable[[Dict[str, Any]], Any]] = []
+        self.applied = 0
+
+    def add_callback(self, callback: Callable[[Dict[str, Any]], Any]):
+        """Also call `callback(change_set)` after each invalidation (on the event loop)"""
+        self._callbacks.append(callback)
+
+    def _handle(self, message: Dict[str, Any]):
+        try:
+            change_set = json.loads(message["data"])
+        except Exception as e:
+            logger.warning(f"Invalid EPHY change-set message: {e}")
+            return
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if self._loop is None or running_loop is self._loop:
+            self._apply(change_set)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._apply, change_set)
+
+    def _apply(self, change_set: Dict[str, Any]):
+        try:
+            apply_ephy_change_set(change_set)
+            self.applied += 1
+        except Exception as e:
+            logger.warning(f"Invalid EPHY change-set: {e}")
+            return
+
+        for callback in self._callbacks:
+            try:
+                callback(change_set)
+            except Exception as e:
+                logger.warning(f"EPHY change-set callback failed: {e}")
+
+    def start(self) -> bool:
+        """Subscribe and start the worker thread (call from the event loop)"""
+        if self._thread is not None:
+            return True
+        if not self._client:
+            logger.info("Redis not available, EPHY change-set listener disabled")
+            return False
+
+        self._loop = asyncio.get_running_loop()
+
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._handle})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        logger.info(f"✅ Listening for EPHY change-sets on '{self.channel}'")
+        return True
+
+    def stop(self):
+        """Stop the worker thread and unsubscribe"""
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+# Process-wide listener (started in app startup)
+ephy_change_listener = EPHYChangeListener()
@@ -0,0 +1,334 @@
+"""
+Batched Evapotranspiration Engine - Vectorized FAO-56 Penman-Monteith
+
+NumPy implementation of the scalar formulas in evapotranspiration_service,
+evaluated over whole (days × parcels) forecast arrays in one pass, for
+irrigation advice over a farm portfolio instead of one parcel per request.
+
+Not called from the agents yet: the weather and ET tools work on one
+location per request, and parcels only carry a commune INSEE code and a
+GeoJSON outline, no site latitude or elevation to build ParcelSite from.
+
+Every step mirrors a scalar function (same FAO-56 equations, same
+constants), so results are numerically equivalent to calling
+SolarRadiationEstimator / PenmanMonteithET0 day by day.
+
+References:
+- Allen et al. (1998) FAO Irrigation and Drainage Paper No. 56
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.tools.schemas.evapotranspiration_schemas import CROP_COEFFICIENTS
+
+# Solar constant (MJ/m²/min)
+GSC = 0.0820
+# Stefan-Boltzmann constant (MJ/K⁴/m²/day)
+SIGMA = 4.903e-9
+# Reference crop albedo
+ALBEDO = 0.23
+# Hargreaves coefficient
+KRS = 0.17
+# Angstrom coefficients
+AS_COEF = 0.25
+BS_COEF = 0.50
+
+# Irrigation is recommended above this period deficit (mm), with a 10% buffer
+IRRIGATION_DEFICIT_THRESHOLD_MM = 10.0
+IRRIGATION_BUFFER = 1.1
+
+
+@dataclass
+class ParcelSite:
+    """Location and crop of one parcel"""
+    parcel_id: str
+    latitude_deg: float
+    elevation_m: float = 0.0
+    crop_type: Optional[str] = None
+    crop_stage: Optional[str] = None
+
+
+@dataclass
+class BatchETResult:
+    """
+    Results for a (days × parcels) batch
+
+    Daily arrays have shape (days, parcels); totals have shape (parcels,).
+    """
+    dates: List[str]
+    parcel_ids: List[str]
+    rs: np.ndarray
+    et0: np.ndarray
+    kc: np.ndarray
+    etc: np.ndarray
+    total_et0: np.ndarray
+    total_etc: np.ndarray
+    total_precipitation: np.ndarray
+    water_deficit: np.ndarray
+    water_surplus: np.ndarray
+    irrigation_needed: np.ndarray
+    irrigation_amount: np.ndarray
+
+    def parcel_summary(self, index: int) -> Dict[str, Any]:
+        """Water balance summary for one parcel (JSON-friendly)"""
+        return {
+            "parcel_id": self.parcel_ids[index],
+            "total_et0": round(float(self.total_et0[index]), 1),
+            "total_etc": round(float(self.total_etc[index]), 1),
+            "total_precipitation": round(float(self.total_precipitation[index]), 1),
+            "water_deficit": round(float(self.water_deficit[index]), 1),
+            "water_surplus": round(float(self.water_surplus[index]), 1),
+            "irrigation_needed": bool(self.irrigation_needed[index]),
+            "irrigation_amount": (
+                round(float(self.irrigation_amount[index]), 1)
+                if self.irrigation_needed[index] else None
+            ),
+        }
+
+
+class BatchEvapotranspirationEngine:
+    """
+    Vectorized ET₀ / ETc / water balance over days × parcels
+
+    Inputs broadcast NumPy-style: daily weather arrays are (days, parcels),
+    julian days are (days, 1) and site parameters are (1, parcels).
+    """
+
+    # ------------------------------------------------------------------
+    # Solar radiation (FAO-56 Eq. 21-25, 35, 37, 50)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def extraterrestrial_radiation(latitude_deg: np.ndarray, julian_day: np.ndarray) -> np.ndarray:
+        """Ra in MJ/m²/day (FAO-56 Eq. 21)"""
+        lat_rad = latitude_deg * np.pi / 180
+        delta = 0.409 * np.sin((2 * np.pi * julian_day / 365) - 1.39)
+        dr = 1 + 0.033 * np.cos(2 * np.pi * julian_day / 365)
+        # Clip keeps polar day/night defined (scalar version raises there)
+        ws = np.arccos(np.clip(-np.tan(lat_rad) * np.tan(delta), -1.0, 1.0))
+
+        return (24 * 60 / np.pi) * GSC * dr * (
+            ws * np.sin(lat_rad) * np.sin(delta) +
+            np.cos(lat_rad) * np.cos(delta) * np.sin(ws)
+        )
+
+    @staticmethod
+    def clear_sky_radiation(Ra: np.ndarray, elevation_m: np.ndarray) -> np.ndarray:
+        """Rso in MJ/m²/day (FAO-56 Eq. 37)"""
+        return (0.75 + 2e-5 * elevation_m) * Ra
+
+    @staticmethod
+    def solar_radiation(
+        temp_min: np.ndarray,
+        temp_max: np.ndarray,
+        Ra: np.ndarray,
+        Rso: np.ndarray,
+        cloud_cover: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Rs in MJ/m²/day, best available method per cell
+
+        Cloud cover (Angstrom, Eq. 35) where available, temperature range
+        (Hargreaves, Eq. 50) where cloud cover is missing (NaN), capped at Rso.
+        """
+        rs_temperature = KRS * np.sqrt(np.maximum(temp_max - temp_min, 0.0)) * Ra
+        if cloud_cover is None:
+            rs = rs_temperature
+        else:
+            rs_cloud = (AS_COEF + BS_COEF * (1 - cloud_cover / 100)) * Ra
+            rs = np.where(np.isnan(cloud_cover), rs_temperature, rs_cloud)
+        return np.minimum(rs, Rso)
+
+    # ------------------------------------------------------------------
+    # Penman-Monteith (FAO-56 Eq. 6, 8, 11, 13, 19, 38-40)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def saturation_vapor_pressure(temp_c: np.ndarray) -> np.ndarray:
+        """es in kPa (FAO-56 Eq. 11)"""
+        return 0.6108 * np.exp((17.27 * temp_c) / (temp_c + 237.3))
+
+    @staticmethod
+    def et0(
+        temp_min: np.ndarray,
+        temp_max: np.ndarray,
+        humidity_mean: np.ndarray,
+        wind_speed_kmh: np.ndarray,
+        Rs: np.ndarray,
+        Rso: np.ndarray,
+        elevation_m: np.ndarray
+    ) -> np.ndarray:
+        """ET₀ in mm/day (FAO-56 Eq. 6), clipped at zero"""
+        engine = BatchEvapotranspirationEngine
+        wind_speed_ms = wind_speed_kmh / 3.6
+        temp_mean = (temp_max + temp_min) / 2
+
+        es_tmin = engine.saturation_vapor_pressure(temp_min)
+        es = (engine.saturation_vapor_pressure(temp_max) + es_tmin) / 2
+        ea = es_tmin * (humidity_mean / 100)
+        vpd = es - ea
+
+        es_mean = engine.saturation_vapor_pressure(temp_mean)
+        delta = (4098 * es_mean) / ((temp_mean + 237.3) ** 2)
+
+        pressure = 101.3 * ((293 - 0.0065 * elevation_m) / 293) ** 5.26
+        gamma = 0.000665 * pressure
+
+        # Net radiation
+        Rns = (1 - ALBEDO) * Rs
+        temp_max_k = temp_max + 273.16
+        temp_min_k = temp_min + 273.16
+        Rnl = SIGMA * ((temp_max_k ** 4 + temp_min_k ** 4) / 2) * (
+            0.34 - 0.14 * np.sqrt(ea)
+        ) * (1.35 * Rs / Rso - 0.35)
+        Rn = Rns - Rnl
+
+        numerator = (
+            0.408 * delta * Rn +
+            gamma * (900 / (temp_mean + 273)) * wind_speed_ms * vpd
+        )
+        denominator = delta + gamma * (1 + 0.34 * wind_speed_ms)
+
+        return np.maximum(0.0, numerator / denominator)
+
+    # ------------------------------------------------------------------
+    # Batch entry points
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def crop_coefficients(sites: Sequence[ParcelSite]) -> np.ndarray:
+        """
+        Kc per parcel (same 4-stage lookup as the single-parcel tool)
+
+        Parcels without a crop get Kc = 1.0, so ETc equals ET₀ and the water
+        balance matches the single-parcel tool's ET₀-based balance.
+        """
+        kc = np.empty(len(sites))
+        for index, site in enumerate(sites):
+            if not site.crop_type:
+                kc[index] = 1.0
+                continue
+            coeffs = CROP_COEFFICIENTS.get(site.crop_type.lower(), CROP_COEFFICIENTS["general"])
+            if site.crop_stage:
+                kc[index] = coeffs.get(site.crop_stage.lower(), coeffs.get("default", 0.8))
+            else:
+                kc[index] = coeffs.get("default", 0.8)
+        return kc
+
+    def compute(
+        self,
+        dates: Sequence[str],
+        sites: Sequence[ParcelSite],
+        temp_min: np.ndarray,
+        temp_max: np.ndarray,
+        humidity: np.ndarray,
+        wind_speed_kmh: np.ndarray,
+        precipitation: np.ndarray,
+        cloud_cover: Optional[np.ndarray] = None,
+        kc: Optional[np.ndarray] = None
+    ) -> BatchETResult:
+        """
+        Compute Rs, ET₀, Kc, ETc and water balance in one pass
+
+        Args:
+            dates: ISO dates, length D
+            sites: Parcels, length P
+            temp_min, temp_max, humidity, wind_speed_kmh, precipitation: (D, P) arrays
+            cloud_cover: Optional (D, P) array, NaN where unknown
+            kc: Optional Kc override, (P,) or (D, P); defaults to crop/stage lookup
+
+        Returns:
+            BatchETResult with (D, P) daily arrays and (P,) totals
+        """
+        julian_day = np.array(
+            [datetime.fromisoformat(d).timetuple().tm_yday for d in dates], dtype=float
+        )[:, np.newaxis]
+        latitude = np.array([s.latitude_deg for s in sites], dtype=float)[np.newaxis, :]
+        elevation = np.array([s.elevation_m for s in sites], dtype=float)[np.newaxis, :]
+
+        Ra = self.extraterrestrial_radiation(latitude, julian_day)
+        Rso = self.clear_sky_radiation(Ra, elevation)
+        rs = self.solar_radiation(temp_min, temp_max, Ra, Rso, cloud_cover)
+        et0 = self.et0(temp_min, temp_max, humidity, wind_speed_kmh, rs, Rso, elevation)
+
+        if kc is None:
+            kc = self.crop_coefficients(sites)
+        kc = np.broadcast_to(kc, et0.shape)
+        etc = et0 * kc
+
+        total_et0 = et0.sum(axis=0)
+        total_etc = etc.sum(axis=0)
+        total_precipitation = precipitation.sum(axis=0)
+        water_deficit = np.maximum(0.0, total_etc - total_precipitation)
+        water_surplus = np.maximum(0.0, total_precipitation - total_etc)
+        irrigation_needed = water_deficit > IRRIGATION_DEFICIT_THRESHOLD_MM
+        irrigation_amount = np.where(irrigation_needed, water_deficit * IRRIGATION_BUFFER, 0.0)
+
+        return BatchETResult(
+            dates=list(dates),
+            parcel_ids=[s.parcel_id for s in sites],
+            rs=rs,
+            et0=et0,
+            kc=kc,
+            etc=etc,
+            total_et0=total_et0,
+            total_etc=total_etc,
+            total_precipitation=total_precipitation,
+            water_deficit=water_deficit,
+            water_surplus=water_surplus,
+            irrigation_needed=irrigation_needed,
+            irrigation_amount=irrigation_amount,
+        )
+
+    def compute_from_forecasts(
+        self,
+        sites: Sequence[ParcelSite],
+        forecasts: Sequence[Sequence[Dict[str, Any]]]
+    ) -> BatchETResult:
+        """
+        Compute from per-parcel weather condition dicts (weather tool format)
+
+        All forecasts must cover the same dates (e.g. parcels sharing a
+        forecast tile, or one portfolio-wide fetch).
+
+        Args:
+            sites: Parcels, length P
+            forecasts: For each parcel, D weather condition dicts
+
+        Returns:
+            BatchETResult
+        """
+        if len(sites) != len(forecasts):
+            raise ValueError("One forecast is required per parcel")
+        if not forecasts:
+            raise ValueError("No forecasts provided")
+
+        dates = [c["date"] for c in forecasts[0]]
+
+        def daily_array(name: str, default: float) -> np.ndarray:
+            # Explicit None becomes NaN (cloud cover: fall back to temperature method)
+            return np.array(
+                [[np.nan if c.get(name, default) is None else c.get(name, default) for c in forecast]
+                 for forecast in forecasts],
+                dtype=float
+            ).T
+
+        # Same defaults as EvapotranspirationService._calculate_daily_et
+        return self.compute(
+            dates=dates,
+            sites=sites,
+            temp_min=daily_array("temperature_min", 15.0),
+            temp_max=daily_array("temperature_max", 25.0),
+            humidity=daily_array("humidity", 70.0),
+            wind_speed_kmh=daily_array("wind_speed", 10.0),
+            precipitation=daily_array("precipitation", 0.0),
+            cloud_cover=daily_array("cloud_cover", 50.0),
+        )
+
+
+# Create engine instance
+batch_evapotranspiration_engine = BatchEvapotranspirationEngine()
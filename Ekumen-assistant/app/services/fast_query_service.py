@@ -12,6 +12,7 @@ from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 
 from app.core.config import settings
+from app.services.token_stream import token_frame
 from app.tools.weather_agent.get_weather_data_tool import get_weather_data_tool
 
 logger = logging.getLogger(__name__)
@@ -307,16 +308,11 @@ Utilise des listes à puces (- ) pour les recommandations."""
                 "timestamp": datetime.now().isoformat()
             }
             
-            # Stream words
-            partial = ""
-            for word in words:
-                partial += word + " "
-                yield {
-                    "type": "token",
-                    "token": word + " ",
-                    "partial_response": partial.strip(),
-                    "timestamp": datetime.now().isoformat()
-                }
+            # Stream words as deltas
+            offset = 0
+            for seq, word in enumerate(words):
+                yield token_frame(word + " ", seq, offset)
+                offset += len(word) + 1
                 await asyncio.sleep(0.02)  # Small delay for streaming effect
             
             # Send final result
@@ -0,0 +1,360 @@
+"""
+Vectorized disease/pest scoring index
+
+In-memory copy of the active diseases and pests, with per-crop matrices so
+KnowledgeBaseService can score every candidate for a crop in one numpy
+operation instead of running _fuzzy_match loops per disease.
+
+For each text field (disease symptoms, pest damage patterns, pest
+indicators) a crop group holds:
+- the vocabulary of distinct phrases, with a token -> phrase inverted index
+- an incidence matrix phrases x candidates
+
+An observed term is matched against the vocabulary once (shared word,
+or substring either way, as in _fuzzy_match), giving a boolean row. A
+terms x phrases matrix times the incidence matrix gives terms x
+candidates hits, from which match ratios follow. Batches of observations
+(a scout's whole field walk) share one matrix product per crop.
+
+The index is reloaded when Disease/Pest rows are committed in this
+process, and otherwise re-validated against the tables every
+KNOWLEDGE_INDEX_TTL seconds with one cheap count/max(updated_at) query.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.disease import Disease
+from app.models.pest import Pest
+
+logger = logging.getLogger(__name__)
+
+
+def clean_term(term: str) -> str:
+    """Same normalization as KnowledgeBaseService._fuzzy_match"""
+    return term.lower().replace("_", " ").replace("-", " ")
+
+
+class PhraseMatcher:
+    """
+    Vectorized _fuzzy_match of one term against a phrase vocabulary
+
+    Matches are memoized per term; the vocabulary is fixed.
+    """
+
+    def __init__(self, phrases: Sequence[str]):
+        self.phrases = [clean_term(p) for p in phrases]
+        self._array = np.array(self.phrases, dtype=str) if self.phrases else np.array([], dtype=str)
+        tokens: Dict[str, List[int]] = defaultdict(list)
+        for i, phrase in enumerate(self.phrases):
+            for token in set(phrase.split()):
+                tokens[token].append(i)
+        self._tokens = {token: np.array(ids, dtype=np.intp) for token, ids in tokens.items()}
+        self._memo: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def match(self, term: str) -> np.ndarray:
+        """Boolean vector: which phrases _fuzzy_match(term, phrase)"""
+        cleaned = clean_term(term)
+        cached = self._memo.get(cleaned)
+        if cached is not None:
+            return cached
+
+        mask = np.zeros(len(self.phrases), dtype=bool)
+        if self.phrases:
+            # Word overlap
+            for token in set(cleaned.split()):
+                ids = self._tokens.get(token)
+                if ids is not None:
+                    mask[ids] = True
+            # Substring either way (covers exact matches)
+            mask |= np.char.find(self._array, cleaned) >= 0
+            mask |= np.char.find(cleaned, self._array) >= 0
+
+        if len(self._memo) >= 4096:
+            self._memo.clear()
+        self._memo[cleaned] = mask
+        return mask
+
+    def match_many(self, terms: Sequence[str]) -> np.ndarray:
+        """terms x phrases boolean matrix"""
+        if not terms:
+            return np.zeros((0, len(self.phrases)), dtype=bool)
+        return np.vstack([self.match(term) for term in terms])
+
+
+class FieldMatrix:
+    """One text field (e.g. symptoms) across the candidates of a crop"""
+
+    def __init__(self, phrase_lists: Sequence[Sequence[str]]):
+        vocabulary: Dict[str, int] = {}
+        self.candidate_phrases: List[List[int]] = []
+        for phrases in phrase_lists:
+            ids = [vocabulary.setdefault(p, len(vocabulary)) for p in phrases]
+            self.candidate_phrases.append(ids)
+        self.originals = list(vocabulary)
+        self.matcher = PhraseMatcher(self.originals)
+
+        self.incidence = np.zeros((len(vocabulary), len(phrase_lists)), dtype=np.float32)
+        for j, ids in enumerate(self.candidate_phrases):
+            self.incidence[ids, j] = 1.0
+
+    def hits(self, term_matches: np.ndarray) -> np.ndarray:
+        """terms x candidates boolean: term matched at least one phrase of the candidate"""
+        if term_matches.shape[0] == 0 or self.incidence.shape[0] == 0:
+            return np.zeros((term_matches.shape[0], self.incidence.shape[1]), dtype=bool)
+        return (term_matches.astype(np.float32) @ self.incidence) > 0
+
+    def matching(self, candidate: int, term_matches: np.ndarray) -> List[str]:
+        """First matching phrase of a candidate for each term (as _get_matching_symptoms)"""
+        matches = []
+        for row in term_matches:
+            for phrase_id in self.candidate_phrases[candidate]:
+                if row[phrase_id]:
+                    matches.append(self.originals[phrase_id])
+                    break
+        return matches
+
+
+class ConditionMatrix:
+    """Disease favorable_conditions as per-key arrays, for vectorized condition scores"""
+
+    def __init__(self, condition_dicts: Sequence[Optional[Dict[str, Any]]]):
+        self.size = len(condition_dicts)
+        self.has_conditions = np.array([bool(c) for c in condition_dicts], dtype=bool)
+        self._present: Dict[str, np.ndarray] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+        self._strings: Dict[str, List[Optional[str]]] = {}
+        for key in {k for c in condition_dicts if c for k in c}:
+            present = np.zeros(self.size, dtype=bool)
+            numeric = np.full(self.size, np.nan)
+            strings: List[Optional[str]] = [None] * self.size
+            for j, conditions in enumerate(condition_dicts):
+                if not conditions or key not in conditions:
+                    continue
+                present[j] = True
+                value = conditions[key]
+                if isinstance(value, str):
+                    strings[j] = value.lower()
+                elif isinstance(value, (int, float)):
+                    numeric[j] = value
+            self._present[key] = present
+            self._numeric[key] = numeric
+            self._strings[key] = strings
+
+    def scores(self, conditions: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Vectorized _evaluate_condition_match for every candidate"""
+        neutral = np.full(self.size, 0.5)
+        if not conditions:
+            return neutral
+
+        matches = np.zeros(self.size)
+        totals = np.zeros(self.size)
+        for key, value in conditions.items():
+            present = self._present.get(key)
+            if present is None:
+                continue
+            totals += present
+            if isinstance(value, str):
+                lowered = value.lower()
+                matches += np.array([s == lowered for s in self._strings[key]], dtype=bool)
+            elif isinstance(value, (int, float)):
+                numeric = self._numeric[key]
+                with np.errstate(invalid="ignore"):
+                    matches += np.abs(numeric - value) <= numeric * 0.2
+
+        scores = np.divide(matches, totals, out=neutral.copy(), where=totals > 0)
+        return np.where(self.has_conditions, scores, 0.5)
+
+
+@dataclass
+class CropGroup:
+    """Candidates for one crop and their field matrices"""
+    items: List[Dict[str, Any]]
+    severity: np.ndarray
+    fields: Dict[str, FieldMatrix]
+    conditions: Optional[ConditionMatrix] = None
+
+    def severity_mask(self, severity_filter: Optional[str]) -> np.ndarray:
+        if not severity_filter:
+            return np.ones(len(self.items), dtype=bool)
+        return self.severity == severity_filter
+
+
+@dataclass
+class KnowledgeIndex:
+    """Active diseases and pests, grouped by crop on demand"""
+    diseases: List[Tuple[Dict[str, Any], Dict[str, Any]]]  # (to_dict(), raw fields)
+    pests: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    version: Tuple[Any, ...] = ()
+    loaded_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self._groups: Dict[Tuple[str, str], CropGroup] = {}
+
+    def disease_group(self, crop_type: str) -> CropGroup:
+        return self._group("disease", crop_type)
+
+    def pest_group(self, crop_type: str) -> CropGroup:
+        return self._group("pest", crop_type)
+
+    def _group(self, kind: str, crop_type: str) -> CropGroup:
+        key = (kind, crop_type)
+        group = self._groups.get(key)
+        if group is not None:
+            return group
+
+        rows = [
+            (item, raw) for item, raw in (self.diseases if kind == "disease" else self.pests)
+            if raw["primary_crop"] == crop_type or crop_type in (raw["affected_crops"] or [])
+        ]
+        items = [item for item, _ in rows]
+        severity = np.array([raw["severity_level"] for _, raw in rows], dtype=object)
+        if kind == "disease":
+            group = CropGroup(
+                items=items,
+                severity=severity,
+                fields={"symptoms": FieldMatrix([raw["symptoms"] or [] for _, raw in rows])},
+                conditions=ConditionMatrix([raw["favorable_conditions"] for _, raw in rows]),
+            )
+        else:
+            group = CropGroup(
+                items=items,
+                severity=severity,
+                fields={
+                    "damage_patterns": FieldMatrix([raw["damage_patterns"] or [] for _, raw in rows]),
+                    "pest_indicators": FieldMatrix([raw["pest_indicators"] or [] for _, raw in rows]),
+                },
+            )
+        self._groups[key] = group
+        return group
+
+    @classmethod
+    async def from_database(cls, db) -> "KnowledgeIndex":
+        """Load every active disease and pest"""
+        diseases = (await db.execute(select(Disease).where(Disease.is_active == True))).scalars().all()
+        pests = (await db.execute(select(Pest).where(Pest.is_active == True))).scalars().all()
+        version = await cls.fetch_version(db)
+        return cls(
+            diseases=[
+                (d.to_dict(), {
+                    "primary_crop": d.primary_crop,
+                    "affected_crops": d.affected_crops,
+                    "severity_level": d.severity_level,
+                    "symptoms": d.symptoms,
+                    "favorable_conditions": d.favorable_conditions,
+                })
+                for d in diseases
+            ],
+            pests=[
+                (p.to_dict(), {
+                    "primary_crop": p.primary_crop,
+                    "affected_crops": p.affected_crops,
+                    "severity_level": p.severity_level,
+                    "damage_patterns": p.damage_patterns,
+                    "pest_indicators": p.pest_indicators,
+                })
+                for p in pests
+            ],
+            version=version,
+        )
+
+    @staticmethod
+    async def fetch_version(db) -> Tuple[Any, ...]:
+        """Cheap change detector: row counts and last update per table"""
+        result = await db.execute(
+            select(
+                select(func.count(Disease.id)).scalar_subquery(),
+                select(func.max(Disease.updated_at)).scalar_subquery(),
+                select(func.count(Pest.id)).scalar_subquery(),
+                select(func.max(Pest.updated_at)).scalar_subquery(),
+            )
+        )
+        return tuple(result.one())
+
+
+class KnowledgeIndexStore:
+    """Holds the current KnowledgeIndex, reloading it when the tables change"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.KNOWLEDGE_INDEX_TTL
+        self.index: Optional[KnowledgeIndex] = None
+        self._stale = False
+        self._lock = asyncio.Lock()
+        self.stats = {"loads": 0, "version_checks": 0}
+
+    def mark_stale(self):
+        """Force a reload on next use"""
+        self._stale = True
+
+    async def get(self) -> KnowledgeIndex:
+        """Current index, loading or re-validating it if needed"""
+        index = self.index
+        if index is not None and not self._stale and time.time() - index.loaded_at < self.ttl:
+            return index
+
+        async with self._lock:
+            index = self.index
+            if index is not None and not self._stale and time.time() - index.loaded_at < self.ttl:
+                return index
+
+            from app.core.database import AsyncSessionLocal
+
+            async with AsyncSessionLocal() as db:
+                if index is not None and not self._stale:
+                    self.stats["version_checks"] += 1
+                    if await KnowledgeIndex.fetch_version(db) == index.version:
+                        index.loaded_at = time.time()
+                        return index
+
+                self._stale = False
+                started = time.perf_counter()
+                index = await KnowledgeIndex.from_database(db)
+                self.index = index
+                self.stats["loads"] += 1
+                logger.info(
+                    f"✅ Knowledge index loaded: {len(index.diseases)} diseases, "
+                    f"{len(index.pests)} pests in {time.perf_counter() - started:.2f}s"
+                )
+                return index
+
+
+# Process-wide index
+knowledge_index_store = KnowledgeIndexStore()
+
+
+# Reload after Disease/Pest rows are committed in this process
+_CHANGED_KEY = "knowledge_base_changed"
+
+
+def _mark_session_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED_KEY] = True
+
+
+for _model in (Disease, Pest):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _mark_session_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_commit(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        knowledge_index_store.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_CHANGED_KEY, None)
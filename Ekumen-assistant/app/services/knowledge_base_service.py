@@ -6,14 +6,12 @@ supporting the enhanced crop health tools with database-backed knowledge.
 """
 
 import logging
+from collections import defaultdict
 from typing import Dict, List, Any, Optional, Tuple
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, text
-from sqlalchemy.orm import selectinload
 
-from ..core.database import AsyncSessionLocal
-from ..models.disease import Disease
-from ..models.pest import Pest
+import numpy as np
+
+from .knowledge_base_index import CropGroup, knowledge_index_store
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +20,8 @@ class KnowledgeBaseService:
     Service for intelligent disease and pest identification using database knowledge.
     
     Provides semantic search, symptom matching, and confidence scoring for
-    accurate agricultural diagnosis and pest identification.
+    accurate agricultural diagnosis and pest identification. Scoring runs
+    vectorized over the in-memory knowledge index (see knowledge_base_index).
     """
     
     def __init__(self):
@@ -48,66 +47,57 @@ class KnowledgeBaseService:
         Returns:
             Dictionary with search results and confidence scores
         """
+        return (await self.search_diseases_batch([{
+            "crop_type": crop_type,
+            "symptoms": symptoms,
+            "conditions": conditions,
+            "severity_filter": severity_filter
+        }]))[0]
+    
+    async def search_diseases_batch(self, observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score many disease observations in one call (e.g. a whole field walk).
+        
+        Args:
+            observations: Dicts with crop_type, symptoms, and optional
+                conditions and severity_filter (as search_diseases)
+            
+        Returns:
+            One search_diseases result per observation, in order
+        """
         try:
-            async with AsyncSessionLocal() as db:
-                # Build base query
-                query = select(Disease).where(
-                    and_(
-                        Disease.is_active == True,
-                        or_(
-                            Disease.primary_crop == crop_type,
-                            Disease.affected_crops.contains([crop_type])
-                        )
-                    )
-                )
-                
-                # Add severity filter if specified
-                if severity_filter:
-                    query = query.where(Disease.severity_level == severity_filter)
-                
-                # Execute query
-                result = await db.execute(query)
-                diseases = result.scalars().all()
-                
-                # Calculate confidence scores based on symptom matching
-                scored_diseases = []
-                for disease in diseases:
-                    confidence = self._calculate_disease_confidence(
-                        disease, symptoms, conditions
-                    )
-                    
-                    if confidence >= self.confidence_threshold:
-                        scored_diseases.append({
-                            "disease": disease.to_dict(),
-                            "confidence_score": confidence,
-                            "matching_symptoms": self._get_matching_symptoms(disease, symptoms),
-                            "condition_match": self._evaluate_condition_match(disease, conditions)
-                        })
-                
-                # Sort by confidence score
-                scored_diseases.sort(key=lambda x: x["confidence_score"], reverse=True)
-                
-                return {
-                    "crop_type": crop_type,
-                    "search_symptoms": symptoms,
-                    "search_conditions": conditions,
-                    "total_results": len(scored_diseases),
-                    "diseases": scored_diseases[:self.max_results],
-                    "search_metadata": {
-                        "confidence_threshold": self.confidence_threshold,
-                        "max_results": self.max_results,
-                        "database_diseases_count": len(diseases)
-                    }
-                }
-                
+            index = await knowledge_index_store.get()
         except Exception as e:
             logger.error(f"Disease search error: {e}")
-            return {
-                "error": f"Erreur lors de la recherche de maladies: {str(e)}",
-                "crop_type": crop_type,
-                "total_results": 0,
-                "diseases": []
-            }
+            return [
+                {
+                    "error": f"Erreur lors de la recherche de maladies: {str(e)}",
+                    "crop_type": observation.get("crop_type"),
+                    "total_results": 0,
+                    "diseases": []
+                }
+                for observation in observations
+            ]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(observations)
+        for crop_type, positions in self._group_by_crop(observations).items():
+            group = index.disease_group(crop_type)
+            field = group.fields["symptoms"]
+            
+            # One matrix product for every symptom of every observation on this crop
+            symptom_lists = [observations[i].get("symptoms") or [] for i in positions]
+            term_matches = field.matcher.match_many([s for symptoms in symptom_lists for s in symptoms])
+            hits = field.hits(term_matches)
+            
+            offset = 0
+            for i, symptoms in zip(positions, symptom_lists):
+                rows = slice(offset, offset + len(symptoms))
+                offset += len(symptoms)
+                results[i] = self._disease_results(
+                    group, observations[i], symptoms, term_matches[rows], hits[rows]
+                )
+        
+        return results
     
     async def search_pests(
         self,
@@ -128,146 +118,163 @@ class KnowledgeBaseService:
         Returns:
             Dictionary with search results and confidence scores
         """
+        return (await self.search_pests_batch([{
+            "crop_type": crop_type,
+            "damage_patterns": damage_patterns,
+            "pest_indicators": pest_indicators,
+            "severity_filter": severity_filter
+        }]))[0]
+    
+    async def search_pests_batch(self, observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Score many pest observations in one call (e.g. a whole field walk).
+        
+        Args:
+            observations: Dicts with crop_type, damage_patterns,
+                pest_indicators and optional severity_filter (as search_pests)
+            
+        Returns:
+            One search_pests result per observation, in order
+        """
         try:
-            async with AsyncSessionLocal() as db:
-                # Build base query
-                query = select(Pest).where(
-                    and_(
-                        Pest.is_active == True,
-                        or_(
-                            Pest.primary_crop == crop_type,
-                            Pest.affected_crops.contains([crop_type])
-                        )
-                    )
-                )
-                
-                # Add severity filter if specified
-                if severity_filter:
-                    query = query.where(Pest.severity_level == severity_filter)
-                
-                # Execute query
-                result = await db.execute(query)
-                pests = result.scalars().all()
-                
-                # Calculate confidence scores based on damage and indicator matching
-                scored_pests = []
-                for pest in pests:
-                    confidence = self._calculate_pest_confidence(
-                        pest, damage_patterns, pest_indicators
-                    )
-                    
-                    if confidence >= self.confidence_threshold:
-                        scored_pests.append({
-                            "pest": pest.to_dict(),
-                            "confidence_score": confidence,
-                            "matching_damage": self._get_matching_damage(pest, damage_patterns),
-                            "matching_indicators": self._get_matching_indicators(pest, pest_indicators)
-                        })
-                
-                # Sort by confidence score
-                scored_pests.sort(key=lambda x: x["confidence_score"], reverse=True)
-                
-                return {
-                    "crop_type": crop_type,
-                    "search_damage_patterns": damage_patterns,
-                    "search_pest_indicators": pest_indicators,
-                    "total_results": len(scored_pests),
-                    "pests": scored_pests[:self.max_results],
-                    "search_metadata": {
-                        "confidence_threshold": self.confidence_threshold,
-                        "max_results": self.max_results,
-                        "database_pests_count": len(pests)
-                    }
-                }
-                
+            index = await knowledge_index_store.get()
         except Exception as e:
             logger.error(f"Pest search error: {e}")
-            return {
-                "error": f"Erreur lors de la recherche de ravageurs: {str(e)}",
-                "crop_type": crop_type,
-                "total_results": 0,
-                "pests": []
-            }
-    
-    def _calculate_disease_confidence(
-        self, 
-        disease: Disease, 
-        symptoms: List[str], 
-        conditions: Optional[Dict[str, Any]]
-    ) -> float:
-        """Calculate confidence score for disease match."""
-        if not symptoms:
-            return 0.0
-        
-        # Symptom matching (70% weight)
-        symptom_matches = 0
-        disease_symptoms = disease.symptoms or []
+            return [
+                {
+                    "error": f"Erreur lors de la recherche de ravageurs: {str(e)}",
+                    "crop_type": observation.get("crop_type"),
+                    "total_results": 0,
+                    "pests": []
+                }
+                for observation in observations
+            ]
         
-        for symptom in symptoms:
-            for disease_symptom in disease_symptoms:
-                if self._fuzzy_match(symptom, disease_symptom):
-                    symptom_matches += 1
-                    break
+        results: List[Optional[Dict[str, Any]]] = [None] * len(observations)
+        for crop_type, positions in self._group_by_crop(observations).items():
+            group = index.pest_group(crop_type)
+            matched = {}
+            for name in ("damage_patterns", "pest_indicators"):
+                field = group.fields[name]
+                term_lists = [observations[i].get(name) or [] for i in positions]
+                term_matches = field.matcher.match_many([t for terms in term_lists for t in terms])
+                matched[name] = (term_lists, term_matches, field.hits(term_matches))
+            
+            offsets = {name: 0 for name in matched}
+            for k, i in enumerate(positions):
+                per_field = {}
+                for name, (term_lists, term_matches, hits) in matched.items():
+                    terms = term_lists[k]
+                    rows = slice(offsets[name], offsets[name] + len(terms))
+                    offsets[name] += len(terms)
+                    per_field[name] = (terms, term_matches[rows], hits[rows])
+                results[i] = self._pest_results(group, observations[i], per_field)
         
-        symptom_score = symptom_matches / len(symptoms) if symptoms else 0
+        return results
+    
+    @staticmethod
+    def _group_by_crop(observations: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+        """Observation positions per crop type"""
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for i, observation in enumerate(observations):
+            positions[observation["crop_type"]].append(i)
+        return positions
+    
+    def _disease_results(
+        self,
+        group: CropGroup,
+        observation: Dict[str, Any],
+        symptoms: List[str],
+        term_matches: np.ndarray,
+        hits: np.ndarray
+    ) -> Dict[str, Any]:
+        """Build the search_diseases result for one observation"""
+        conditions = observation.get("conditions")
+        candidates = group.severity_mask(observation.get("severity_filter"))
         
-        # Condition matching (30% weight)
-        condition_score = 0.5  # Default neutral score
-        if conditions and disease.favorable_conditions:
-            condition_score = self._evaluate_condition_match(disease, conditions)
+        # Symptom matching (70% weight), condition matching (30% weight)
+        condition_scores = group.conditions.scores(conditions)
+        if symptoms:
+            symptom_scores = hits.sum(axis=0) / len(symptoms)
+            confidence = np.minimum(symptom_scores * 0.7 + condition_scores * 0.3, 1.0)
+        else:
+            confidence = np.zeros(len(group.items))
         
-        # Weighted final score
-        confidence = (symptom_score * 0.7) + (condition_score * 0.3)
+        ranked = self._rank(confidence, candidates)
+        field = group.fields["symptoms"]
+        scored_diseases = [
+            {
+                "disease": dict(group.items[j]),
+                "confidence_score": float(confidence[j]),
+                "matching_symptoms": field.matching(j, term_matches),
+                "condition_match": float(condition_scores[j])
+            }
+            for j in ranked[:self.max_results]
+        ]
         
-        return min(confidence, 1.0)
+        return {
+            "crop_type": observation["crop_type"],
+            "search_symptoms": symptoms,
+            "search_conditions": conditions,
+            "total_results": len(ranked),
+            "diseases": scored_diseases,
+            "search_metadata": {
+                "confidence_threshold": self.confidence_threshold,
+                "max_results": self.max_results,
+                "database_diseases_count": int(candidates.sum())
+            }
+        }
     
-    def _calculate_pest_confidence(
-        self, 
-        pest: Pest, 
-        damage_patterns: List[str], 
-        pest_indicators: List[str]
-    ) -> float:
-        """Calculate confidence score for pest match."""
-        if not damage_patterns and not pest_indicators:
-            return 0.0
+    def _pest_results(
+        self,
+        group: CropGroup,
+        observation: Dict[str, Any],
+        per_field: Dict[str, Tuple[List[str], np.ndarray, np.ndarray]]
+    ) -> Dict[str, Any]:
+        """Build the search_pests result for one observation"""
+        candidates = group.severity_mask(observation.get("severity_filter"))
         
-        total_score = 0.0
+        # Damage patterns (60% weight) and indicators (40% weight),
+        # normalized by the weight of the fields actually observed
+        total_score = np.zeros(len(group.items))
         total_weight = 0.0
+        for name, weight in (("damage_patterns", 0.6), ("pest_indicators", 0.4)):
+            terms, _, hits = per_field[name]
+            if terms:
+                total_score = total_score + (hits.sum(axis=0) / len(terms)) * weight
+                total_weight += weight
+        confidence = np.minimum(total_score / total_weight, 1.0) if total_weight > 0 else total_score
         
-        # Damage pattern matching (60% weight)
-        if damage_patterns:
-            damage_matches = 0
-            pest_damage = pest.damage_patterns or []
-            
-            for pattern in damage_patterns:
-                for pest_pattern in pest_damage:
-                    if self._fuzzy_match(pattern, pest_pattern):
-                        damage_matches += 1
-                        break
-            
-            damage_score = damage_matches / len(damage_patterns)
-            total_score += damage_score * 0.6
-            total_weight += 0.6
-        
-        # Indicator matching (40% weight)
-        if pest_indicators:
-            indicator_matches = 0
-            pest_indicators_db = pest.pest_indicators or []
-            
-            for indicator in pest_indicators:
-                for pest_indicator in pest_indicators_db:
-                    if self._fuzzy_match(indicator, pest_indicator):
-                        indicator_matches += 1
-                        break
-            
-            indicator_score = indicator_matches / len(pest_indicators)
-            total_score += indicator_score * 0.4
-            total_weight += 0.4
-        
-        # Normalize by total weight
-        confidence = total_score / total_weight if total_weight > 0 else 0.0
+        ranked = self._rank(confidence, candidates)
+        damage = group.fields["damage_patterns"]
+        indicators = group.fields["pest_indicators"]
+        scored_pests = [
+            {
+                "pest": dict(group.items[j]),
+                "confidence_score": float(confidence[j]),
+                "matching_damage": damage.matching(j, per_field["damage_patterns"][1]),
+                "matching_indicators": indicators.matching(j, per_field["pest_indicators"][1])
+            }
+            for j in ranked[:self.max_results]
+        ]
         
-        return min(confidence, 1.0)
+        return {
+            "crop_type": observation["crop_type"],
+            "search_damage_patterns": per_field["damage_patterns"][0],
+            "search_pest_indicators": per_field["pest_indicators"][0],
+            "total_results": len(ranked),
+            "pests": scored_pests,
+            "search_metadata": {
+                "confidence_threshold": self.confidence_threshold,
+                "max_results": self.max_results,
+                "database_pests_count": int(candidates.sum())
+            }
+        }
+    
+    def _rank(self, confidence: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Candidates above the confidence threshold, best first (stable)"""
+        selected = np.flatnonzero(candidates & (confidence >= self.confidence_threshold))
+        return selected[np.argsort(-confidence[selected], kind="stable")]
     
     def _fuzzy_match(self, term1: str, term2: str) -> bool:
         """Simple fuzzy matching for terms."""
@@ -288,68 +295,3 @@ class KnowledgeBaseService:
         overlap = len(words1.intersection(words2))
         
         return overlap > 0
-    
-    def _get_matching_symptoms(self, disease: Disease, symptoms: List[str]) -> List[str]:
-        """Get list of matching symptoms."""
-        matches = []
-        disease_symptoms = disease.symptoms or []
-        
-        for symptom in symptoms:
-            for disease_symptom in disease_symptoms:
-                if self._fuzzy_match(symptom, disease_symptom):
-                    matches.append(disease_symptom)
-                    break
-        
-        return matches
-    
-    def _get_matching_damage(self, pest: Pest, damage_patterns: List[str]) -> List[str]:
-        """Get list of matching damage patterns."""
-        matches = []
-        pest_damage = pest.damage_patterns or []
-        
-        for pattern in damage_patterns:
-            for pest_pattern in pest_damage:
-                if self._fuzzy_match(pattern, pest_pattern):
-                    matches.append(pest_pattern)
-                    break
-        
-        return matches
-    
-    def _get_matching_indicators(self, pest: Pest, pest_indicators: List[str]) -> List[str]:
-        """Get list of matching pest indicators."""
-        matches = []
-        pest_indicators_db = pest.pest_indicators or []
-        
-        for indicator in pest_indicators:
-            for pest_indicator in pest_indicators_db:
-                if self._fuzzy_match(indicator, pest_indicator):
-                    matches.append(pest_indicator)
-                    break
-        
-        return matches
-    
-    def _evaluate_condition_match(self, disease: Disease, conditions: Optional[Dict[str, Any]]) -> float:
-        """Evaluate how well conditions match disease preferences."""
-        if not conditions or not disease.favorable_conditions:
-            return 0.5  # Neutral score
-        
-        matches = 0
-        total_conditions = 0
-        
-        disease_conditions = disease.favorable_conditions
-        
-        for condition, value in conditions.items():
-            if condition in disease_conditions:
-                total_conditions += 1
-                disease_value = disease_conditions[condition]
-                
-                # Simple matching logic
-                if isinstance(disease_value, str) and isinstance(value, str):
-                    if disease_value.lower() == value.lower():
-                        matches += 1
-                elif isinstance(disease_value, (int, float)) and isinstance(value, (int, float)):
-                    # For numeric values, consider close matches
-                    if abs(disease_value - value) <= disease_value * 0.2:  # 20% tolerance
-                        matches += 1
-        
-        return matches / total_conditions if total_conditions > 0 else 0.5
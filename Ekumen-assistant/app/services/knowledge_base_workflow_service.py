@@ -53,8 +53,7 @@ class KnowledgeBaseWorkflowService:
                 document_id=document_id,
                 action="approved",
                 performed_by=approved_by,
-                comments=comments,
-                timestamp=datetime.utcnow()
+                comments=comments
             )
             db.add(audit)
             
@@ -190,7 +189,13 @@ class KnowledgeBaseWorkflowService:
             if new_expiry_date is None:
                 new_expiry_date = datetime.utcnow() + timedelta(days=365)
             
-            document.expiry_date = new_expiry_date
+            document.expiration_date = new_expiry_date
+            if (document.organization_metadata or {}).get("expiration_date"):
+                # Retrieval uses the earlier of the two dates
+                document.organization_metadata = {
+                    **document.organization_metadata,
+                    "expiration_date": new_expiry_date.isoformat(),
+                }
             document.renewed_by = renewed_by
             document.renewed_at = datetime.utcnow()
             
@@ -199,13 +204,16 @@ class KnowledgeBaseWorkflowService:
                 document_id=document_id,
                 action="renewed",
                 performed_by=renewed_by,
-                comments=f"Document renewed until {new_expiry_date}",
-                timestamp=datetime.utcnow()
+                comments=f"Document renewed until {new_expiry_date}"
             )
             db.add(audit)
             
             await db.commit()
             
+            # Chunks carry the expiry used by the index-side ACL filter
+            from app.services.rag_service import get_rag_service
+            await get_rag_service().sync_acl_metadata(document)
+            
             return {
                 "success": True,
                 "message": "Document renewed successfully",
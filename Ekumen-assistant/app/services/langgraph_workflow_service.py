@@ -501,10 +501,10 @@ Réponds maintenant:"""
         try:
             processing_steps = state["processing_steps"] + ["synthesis"]
 
-            # STEP 1: Classify query complexity using LangChain
+            # STEP 1: Classify query complexity
             from app.services.query_classifier import get_classifier
 
-            classifier = get_classifier(use_llm=True)  # Use LangChain LLM for classification
+            classifier = get_classifier()  # Learned or pattern-based, no LLM round trip
             classification = classifier.classify(state["query"])
 
             logger.info(f"Query classified as: {classification['complexity']} "
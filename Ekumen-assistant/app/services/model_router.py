@@ -0,0 +1,320 @@
+"""
+Model Router - cost and latency aware model selection
+
+Every LLM call gets a RouteDecision holding an immutable ModelConfig (model,
+max_tokens, temperature); nothing on a shared client is mutated, so
+concurrent calls cannot change each other's settings.
+
+- The query's complexity comes from the learned ComplexityModel (a sparse
+  table lookup, microseconds) or, until one is trained, from the regex
+  patterns of QueryComplexityClassifier; never from an LLM call
+- Queries likely to need it go to the strong model, unless that breaks the
+  organization's budget: its latency SLO (estimated from observed call
+  latency) or its daily cost cap (MODEL_ROUTER_ORG_POLICIES)
+- A share of latency downgrades (MODEL_ROUTER_LATENCY_PROBE_RATE) still
+  goes to the strong model, so its latency keeps being observed and a slow
+  spell does not downgrade it for good
+- Shadow mode: a sample of strong-model calls (MODEL_ROUTER_SHADOW_RATE)
+  also runs the cheap model in the background; how often its answer agreed
+  with the strong one is reported, and each comparison is logged as a
+  training example for the complexity model
+"""
+
+import logging
+import random
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.complexity_model import ComplexityModel, get_complexity_model
+from app.services.semantic_answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT = object()
+
+
+@dataclass(frozen=True)
+class ModelConfig:
+    """One model and the settings of one call; copy with with_call(), never mutate"""
+
+    name: str
+    tier: str  # cheap or strong
+    input_cost_per_1k: float  # USD
+    output_cost_per_1k: float
+    latency_base: float  # Seconds before the first output token
+    latency_per_token: float  # Seconds per output token
+    max_tokens: int = 500
+    temperature: float = 0.3
+    typical_output_tokens: int = 300  # Usual answer length, for the latency estimate
+
+    def with_call(self, max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> "ModelConfig":
+        return replace(
+            self,
+            max_tokens=self.max_tokens if max_tokens is None else max_tokens,
+            temperature=self.temperature if temperature is None else temperature,
+        )
+
+    def call_kwargs(self) -> Dict[str, Any]:
+        """Per-call parameters, bound to the shared client with .bind()"""
+        return {"max_tokens": self.max_tokens, "temperature": self.temperature}
+
+    def estimate_cost(self, input_tokens: float, output_tokens: float) -> float:
+        return (input_tokens * self.input_cost_per_1k + output_tokens * self.output_cost_per_1k) / 1000
+
+    def estimate_latency(self, output_tokens: float) -> float:
+        return self.latency_base + output_tokens * self.latency_per_token
+
+
+# Prices (USD per 1k tokens) and latency profiles before any call is observed
+MODEL_PROFILES: Dict[str, ModelConfig] = {
+    "gpt-3.5-turbo": ModelConfig("gpt-3.5-turbo", "cheap", 0.0005, 0.0015, 0.5, 0.01),
+    "gpt-4o-mini": ModelConfig("gpt-4o-mini", "cheap", 0.00015, 0.0006, 0.5, 0.01),
+    "gpt-4": ModelConfig("gpt-4", "strong", 0.03, 0.06, 1.5, 0.03, max_tokens=1000, temperature=0.1, typical_output_tokens=400),
+    "gpt-4o": ModelConfig("gpt-4o", "strong", 0.0025, 0.01, 0.8, 0.015, max_tokens=1000, temperature=0.1, typical_output_tokens=400),
+    "gpt-4-turbo-preview": ModelConfig("gpt-4-turbo-preview", "strong", 0.01, 0.03, 1.0, 0.02, max_tokens=1000, temperature=0.1, typical_output_tokens=400),
+}
+
+# Fallback probabilities for the pattern classifier's labels
+PATTERN_PROBABILITIES = {"simple": 0.1, "medium": 0.35, "complex": 0.8}
+
+WORD_RE = re.compile(r"\w+")
+
+
+def complexity_label(probability: float, threshold: float) -> str:
+    """simple, medium or complex from the probability of needing the strong model"""
+    if probability >= threshold:
+        return "complex"
+    return "simple" if probability < threshold / 2 else "medium"
+
+
+def answer_agreement(reference: str, candidate: str) -> float:
+    """Word-overlap F1 between two answers (0-1)"""
+    reference_words = set(WORD_RE.findall(normalize_query(reference)))
+    candidate_words = set(WORD_RE.findall(normalize_query(candidate)))
+    if not reference_words or not candidate_words:
+        return 0.0
+    common = len(reference_words & candidate_words)
+    if not common:
+        return 0.0
+    precision = common / len(candidate_words)
+    recall = common / len(reference_words)
+    return 2 * precision * recall / (precision + recall)
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    latency_slo: float  # Seconds an answer may take
+    daily_cost_cap: float  # USD per UTC day, 0 for none
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    config: ModelConfig
+    complexity: str  # simple, medium or complex
+    probability: Optional[float]  # None when the caller fixed the complexity
+    reason: str  # classifier, caller, latency_slo, latency_probe, cost_cap
+    organization_id: Optional[str] = None
+    shadow: bool = False  # Also run the cheap model for evaluation
+
+
+class ModelRouter:
+    """Chooses the model of each call and keeps the statistics that inform it"""
+
+    def __init__(
+        self,
+        cheap_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        classifier: Any = _DEFAULT,
+        shadow_rate: Optional[float] = None,
+        rng: Optional[random.Random] = None,
+        latency_probe_rate: Optional[float] = None,
+    ):
+        self.cheap = MODEL_PROFILES[cheap_model or settings.MODEL_ROUTER_CHEAP_MODEL]
+        self.strong = MODEL_PROFILES[strong_model or settings.MODEL_ROUTER_STRONG_MODEL]
+        self._classifier = classifier
+        self._pattern_classifier = None
+        self.threshold = settings.MODEL_ROUTER_STRONG_THRESHOLD
+        self.shadow_rate = settings.MODEL_ROUTER_SHADOW_RATE if shadow_rate is None else shadow_rate
+        self.latency_probe_rate = (
+            settings.MODEL_ROUTER_LATENCY_PROBE_RATE if latency_probe_rate is None else latency_probe_rate
+        )
+        self.rng = rng or random.Random()
+
+        # Observed latency per model (exponential moving average) and spend per organization today
+        self.latency: Dict[str, float] = {}
+        self.spend: Dict[str, float] = {}
+        self._spend_day = self._today()
+
+        self.stats = {
+            "routed": 0, "cheap": 0, "strong": 0,
+            "downgraded_latency": 0, "downgraded_cost": 0, "latency_probes": 0,
+            "classifier_seconds": 0.0,
+        }
+        self.shadow_stats = {"runs": 0, "cheap_sufficed": 0, "failures": 0, "cost": 0.0}
+        self.shadow_results: Deque[Dict[str, Any]] = deque(maxlen=1000)
+
+    @property
+    def classifier(self) -> Optional[ComplexityModel]:
+        return get_complexity_model() if self._classifier is _DEFAULT else self._classifier
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def policy(self, organization_id: Optional[str]) -> RoutingPolicy:
+        overrides = settings.MODEL_ROUTER_ORG_POLICIES.get(str(organization_id), {}) if organization_id else {}
+        return RoutingPolicy(
+            latency_slo=overrides.get("latency_slo", settings.MODEL_ROUTER_LATENCY_SLO),
+            daily_cost_cap=overrides.get("daily_cost_cap", settings.MODEL_ROUTER_DAILY_COST_CAP),
+        )
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """(complexity label, probability the strong model is needed)"""
+        start = time.perf_counter()
+        model = self.classifier
+        if model is not None:
+            probability = model.predict_proba(query)
+        else:
+            if self._pattern_classifier is None:
+                from app.services.query_classifier import QueryComplexityClassifier
+                self._pattern_classifier = QueryComplexityClassifier(use_llm=False)
+            label = self._pattern_classifier._classify_by_patterns(query)["complexity"]
+            probability = PATTERN_PROBABILITIES[label]
+        self.stats["classifier_seconds"] += time.perf_counter() - start
+        return complexity_label(probability, self.threshold), probability
+
+    def estimated_latency(self, config: ModelConfig) -> float:
+        """Observed average latency of the model, else its profile for a typical answer"""
+        return self.latency.get(config.name) or config.estimate_latency(
+            min(config.typical_output_tokens, config.max_tokens)
+        )
+
+    def spent_today(self, organization_id: Optional[str]) -> float:
+        if self._spend_day != self._today():
+            self.spend.clear()
+            self._spend_day = self._today()
+        return self.spend.get(str(organization_id), 0.0)
+
+    def route(
+        self,
+        query: str,
+        organization_id: Optional[str] = None,
+        complexity: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        input_tokens: Optional[float] = None,
+    ) -> RouteDecision:
+        """
+        Model and settings for one call
+
+        Args:
+            query: Text the complexity is judged on
+            complexity: Caller's own judgement (skips the classifier)
+            input_tokens: Prompt size for the cost estimate (defaults to the query's)
+        """
+        if complexity is None:
+            complexity, probability = self.classify(query)
+            reason = "classifier"
+        else:
+            probability, reason = None, "caller"
+
+        config = self.strong if complexity == "complex" else self.cheap
+        config = config.with_call(max_tokens, temperature)
+
+        if config.tier == "strong":
+            over_budget = self._over_budget(config, query, organization_id, input_tokens)
+            if over_budget == "latency_slo" and self.rng.random() < self.latency_probe_rate:
+                # Measure the strong model again instead of trusting a stale estimate
+                over_budget = None
+                reason = "latency_probe"
+                self.stats["latency_probes"] += 1
+            if over_budget:
+                reason = over_budget
+                self.stats[f"downgraded_{'latency' if over_budget == 'latency_slo' else 'cost'}"] += 1
+                config = self.cheap.with_call(max_tokens, temperature)
+
+        shadow = config.tier == "strong" and self.shadow_rate > 0 and self.rng.random() < self.shadow_rate
+        self.stats["routed"] += 1
+        self.stats[config.tier] += 1
+        return RouteDecision(config, complexity, probability, reason, organization_id, shadow)
+
+    def _over_budget(self, config: ModelConfig, query: str, organization_id: Optional[str],
+                     input_tokens: Optional[float]) -> Optional[str]:
+        """latency_slo or cost_cap if the model breaks the organization's policy"""
+        policy = self.policy(organization_id)
+        if self.estimated_latency(config) > policy.latency_slo:
+            return "latency_slo"
+        if policy.daily_cost_cap:
+            input_tokens = input_tokens if input_tokens is not None else len(query.split()) * 1.3
+            cost = config.estimate_cost(input_tokens, config.max_tokens)
+            if self.spent_today(organization_id) + cost > policy.daily_cost_cap:
+                return "cost_cap"
+        return None
+
+    def record(self, decision: RouteDecision, latency: float, cost: float):
+        """Account a finished call: latency for the SLO, cost for the organization's cap"""
+        previous = self.latency.get(decision.config.name)
+        self.latency[decision.config.name] = latency if previous is None else 0.8 * previous + 0.2 * latency
+        self.spent_today(decision.organization_id)
+        key = str(decision.organization_id)
+        self.spend[key] = self.spend.get(key, 0.0) + cost
+
+    def record_shadow(self, decision: RouteDecision, query: str, strong_answer: str,
+                      cheap_answer: Optional[str], cost: float = 0.0) -> Optional[bool]:
+        """
+        Compare the cheap model's shadow answer with the strong one
+
+        Returns:
+            Whether the cheap answer would have sufficed (None if it failed)
+        """
+        self.shadow_stats["runs"] += 1
+        self.shadow_stats["cost"] += cost
+        if cheap_answer is None:
+            self.shadow_stats["failures"] += 1
+            return None
+        agreement = answer_agreement(strong_answer, cheap_answer)
+        sufficed = agreement >= settings.MODEL_ROUTER_SHADOW_AGREEMENT
+        self.shadow_stats["cheap_sufficed"] += sufficed
+        result = {
+            "query": query,
+            "probability": decision.probability,
+            "agreement": round(agreement, 4),
+            "cheap_sufficed": sufficed,
+            "cheap_model": self.cheap.name,
+            "strong_model": decision.config.name,
+        }
+        self.shadow_results.append(result)
+
+        # Logged as a training example for the complexity model
+        from app.services.retrieval_analytics_writer import retrieval_analytics_writer
+        from app.models.analytics import AnalyticsEventType
+        retrieval_analytics_writer.record_event(AnalyticsEventType.MODEL_SHADOW_EVALUATION.value, result)
+        return sufficed
+
+    def get_stats(self) -> Dict[str, Any]:
+        routed = self.stats["routed"]
+        runs = self.shadow_stats["runs"] - self.shadow_stats["failures"]
+        model = self.classifier
+        return {
+            **self.stats,
+            "cheap_share": round(self.stats["cheap"] / routed, 4) if routed else 0.0,
+            "avg_classifier_us": round(self.stats["classifier_seconds"] / routed * 1e6, 2) if routed else 0.0,
+            "classifier": "learned" if model is not None else "patterns",
+            "models": {"cheap": self.cheap.name, "strong": self.strong.name},
+            "observed_latency": {name: round(seconds, 3) for name, seconds in self.latency.items()},
+            "spend_today": {org: round(cost, 4) for org, cost in self.spend.items()},
+            "shadow": {
+                **self.shadow_stats,
+                "cost": round(self.shadow_stats["cost"], 4),
+                "cheap_sufficed_rate": round(self.shadow_stats["cheap_sufficed"] / runs, 4) if runs else 0.0,
+            },
+        }
+
+
+# Process-wide router
+model_router = ModelRouter()
@@ -2,22 +2,48 @@
 Multi-Layer Cache Service - Aggressive caching for performance.
 
 Implements 3-layer caching:
-1. Memory cache (< 10ms) - In-process dictionary
-2. Redis cache (< 100ms) - Shared across processes
-3. Database cache (< 500ms) - Persistent storage
+1. Memory cache (< 10ms) - In-process LRU with per-entry TTL
+2. Redis cache (< 100ms) - Shared across processes/API workers
+3. Database cache (< 500ms) - Postgres spill tier for large or expensive
+   results (synthesized reports), shared and persistent
+
+Values are serialized once with their tags (JSON, zlib-compressed above
+1KB) and the same bytes are written to Redis and Postgres. The shared
+tiers hold data only, never pickles: a value read back cannot run code.
+Values of MULTI_LAYER_CACHE_SPILL_BYTES and more skip Redis and go to
+Postgres only. Hits in a lower tier are promoted to the tiers above with
+their remaining TTL.
+
+Invalidation (key, substring pattern, tags) applies to every tier and is
+published on MULTI_LAYER_CACHE_CHANNEL so other workers drop their memory
+copies.
 
 Goal: Reduce repeated query time from 5-10s to 0.1-0.5s
 """
 
+import asyncio
 import logging
 import time
 import json
+import base64
 import hashlib
-from typing import Dict, Any, Optional, Callable
-from dataclasses import dataclass
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Any, Optional, Callable, Awaitable, Iterable, List, Set, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 from functools import wraps
 
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.single_flight import RedisLease, SingleFlight
+from app.models.cache import CachedResult
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,12 +63,41 @@ class CacheEntry:
     created_at: float
     ttl: int  # Time to live in seconds
     layer: CacheLayer
-    
+    tags: Tuple[str, ...] = ()
+
     def is_expired(self) -> bool:
         """Check if cache entry is expired"""
         return time.time() - self.created_at > self.ttl
 
 
+@dataclass
+class TierStats:
+    """Per-tier counters and read latency"""
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    errors: int = 0
+    read_seconds: float = 0.0
+
+    def record_read(self, hit: bool, seconds: float):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.read_seconds += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        reads = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "hit_rate": self.hits / reads if reads else 0.0,
+            "avg_read_ms": round(self.read_seconds / reads * 1000, 3) if reads else 0.0,
+        }
+
+
 @dataclass
 class CacheStats:
     """Cache statistics"""
@@ -51,7 +106,10 @@ class CacheStats:
     database_hits: int = 0
     misses: int = 0
     total_requests: int = 0
-    
+    tiers: Dict[str, TierStats] = field(default_factory=lambda: {
+        layer.value: TierStats() for layer in (CacheLayer.MEMORY, CacheLayer.REDIS, CacheLayer.DATABASE)
+    })
+
     @property
     def hit_rate(self) -> float:
         """Calculate overall hit rate"""
@@ -61,33 +119,359 @@ class CacheStats:
         return hits / self.total_requests
 
 
+# ============================================================================
+# Serialization
+# ============================================================================
+
+# Format markers (first byte); entries in any other format read as misses
+_RAW = b"J"
+_COMPRESSED = b"Z"
+COMPRESS_MIN_BYTES = 1024
+_TYPE = "__type__"
+
+
+def _pack(value: Any) -> Any:
+    """JSON-compatible form of a value; types JSON lacks are tagged"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_pack(item) for item in value]
+    if isinstance(value, dict):
+        if _TYPE not in value and all(isinstance(k, str) for k in value):
+            return {k: _pack(v) for k, v in value.items()}
+        return {_TYPE: "dict", "items": [[_pack(k), _pack(v)] for k, v in value.items()]}
+    if isinstance(value, tuple):
+        return {_TYPE: "tuple", "items": [_pack(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {_TYPE: type(value).__name__, "items": [_pack(item) for item in value]}
+    if isinstance(value, bytes):
+        return {_TYPE: "bytes", "value": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, datetime):
+        return {_TYPE: "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {_TYPE: "date", "value": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_TYPE: "decimal", "value": str(value)}
+    if isinstance(value, uuid.UUID):
+        return {_TYPE: "uuid", "value": str(value)}
+    raise TypeError(f"Cannot cache values of type {type(value).__name__}")
+
+
+_UNPACK: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "dict": lambda o: {k: v for k, v in o["items"]},
+    "tuple": lambda o: tuple(o["items"]),
+    "set": lambda o: set(o["items"]),
+    "frozenset": lambda o: frozenset(o["items"]),
+    "bytes": lambda o: base64.b64decode(o["value"]),
+    "datetime": lambda o: datetime.fromisoformat(o["value"]),
+    "date": lambda o: date.fromisoformat(o["value"]),
+    "decimal": lambda o: Decimal(o["value"]),
+    "uuid": lambda o: uuid.UUID(o["value"]),
+}
+
+
+def _unpack(obj: Dict[str, Any]) -> Any:
+    # json calls this innermost first, so tagged items are already restored
+    kind = obj.get(_TYPE)
+    if kind is None:
+        return obj
+    if kind not in _UNPACK:
+        raise ValueError(f"Unknown cached type: {kind!r}")
+    return _UNPACK[kind](obj)
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Serialize a value for the shared tiers (1-byte format marker + payload)
+
+    Raises:
+        TypeError: For values JSON cannot represent and that are not tagged
+    """
+    payload = json.dumps(_pack(value), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload, 6)
+        if len(compressed) < len(payload):
+            return _COMPRESSED + compressed
+    return _RAW + payload
+
+
+def decode_value(blob: bytes) -> Any:
+    """
+    Inverse of encode_value
+
+    Raises:
+        ValueError: If the blob is not in this format
+    """
+    marker, payload = blob[:1], blob[1:]
+    if marker == _COMPRESSED:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt cache value: {e}")
+    elif marker != _RAW:
+        raise ValueError(f"Unknown cache value format: {marker!r}")
+    return json.loads(payload, object_hook=_unpack)
+
+
+# ============================================================================
+# Tiers
+# ============================================================================
+
+class MemoryTier:
+    """
+    LRU cache with per-entry TTL.
+
+    OrderedDict keeps recency order, so hits (move_to_end) and evictions
+    (least recently used first) are O(1). Expired entries are dropped when read.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired():
+            self.pop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        if key in self.entries:
+            self.pop(key)
+        entry = CacheEntry(
+            key=key,
+            value=value,
+            created_at=time.time(),
+            ttl=ttl,
+            layer=CacheLayer.MEMORY,
+            tags=tuple(tags)
+        )
+        self.entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self.entries) > self.maxsize:
+            oldest = next(iter(self.entries))
+            self.pop(oldest)
+            self.evictions += 1
+
+    def pop(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            for tag in entry.tags:
+                keys = self._tags.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tags[tag]
+        return entry
+
+    def delete_pattern(self, pattern: str) -> int:
+        keys = [key for key in self.entries if pattern in key]
+        for key in keys:
+            self.pop(key)
+        return len(keys)
+
+    def delete_tags(self, tags: Iterable[str]) -> int:
+        keys = set()
+        for tag in tags:
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self.pop(key)
+        return len(keys)
+
+    def clear(self):
+        self.entries.clear()
+        self._tags.clear()
+
+
+def _glob_escape(text: str) -> str:
+    """Escape Redis glob metacharacters"""
+    return "".join(f"\\{c}" if c in "*?[]\\" else c for c in text)
+
+
+class RedisTier:
+    """Shared tier on redis.asyncio; tags are Redis sets of member keys"""
+
+    def __init__(self, client, prefix: str, tag_ttl: int):
+        self.client = client
+        self.prefix = prefix
+        self.tag_ttl = tag_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        """Value bytes and remaining TTL in seconds (None without expiry)"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(self._key(key))
+            pipe.pttl(self._key(key))
+            blob, pttl = await pipe.execute()
+        if blob is None:
+            return None
+        return blob, (pttl / 1000 if pttl and pttl > 0 else None)
+
+    async def set(self, key: str, blob: bytes, ttl: int, cache_type: str, tags: Iterable[str] = ()):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self._key(key), blob, px=int(ttl * 1000))
+            for tag in tags:
+                # Tag sets may outlive their members; deleting a missing key is harmless
+                pipe.sadd(self._tag_key(tag), key)
+                pipe.expire(self._tag_key(tag), max(int(ttl), self.tag_ttl))
+            await pipe.execute()
+
+    async def delete(self, keys: Iterable[str]) -> int:
+        names = [self._key(key) for key in keys]
+        return await self.client.delete(*names) if names else 0
+
+    async def delete_pattern(self, pattern: str) -> int:
+        deleted = 0
+        batch: List[bytes] = []
+        match = f"{_glob_escape(self.prefix)}*{_glob_escape(pattern)}*"
+        async for name in self.client.scan_iter(match=match, count=500):
+            if isinstance(name, bytes):
+                name = name.decode()
+            # Tag sets share the prefix
+            if name.startswith(self._tag_key("")):
+                continue
+            batch.append(name)
+            if len(batch) >= 500:
+                deleted += await self.client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += await self.client.delete(*batch)
+        return deleted
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        members: Set[str] = set()
+        for tag_key in tag_keys:
+            for member in await self.client.smembers(tag_key):
+                members.add(member.decode() if isinstance(member, bytes) else member)
+        deleted = await self.delete(members) if members else 0
+        await self.client.delete(*tag_keys)
+        return deleted
+
+    async def clear(self) -> int:
+        deleted = 0
+        async for name in self.client.scan_iter(match=f"{_glob_escape(self.prefix)}*", count=500):
+            deleted += await self.client.delete(name)
+        return deleted
+
+
+class DatabaseTier:
+    """Postgres tier on the cache_entries table"""
+
+    PURGE_EVERY = 100  # Writes between purges of expired rows
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(CachedResult.value, CachedResult.expires_at)
+                .where(CachedResult.key == key, CachedResult.expires_at > now)
+            )
+            row = result.first()
+        if row is None:
+            return None
+        return bytes(row.value), (row.expires_at - now).total_seconds()
+
+    async def set(self, key: str, blob: bytes, ttl: int, cache_type: str, tags: Iterable[str] = ()):
+        values = {
+            "key": key,
+            "cache_type": cache_type,
+            "value": blob,
+            "size_bytes": len(blob),
+            "tags": list(tags),
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl),
+        }
+        statement = insert(CachedResult).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CachedResult.key],
+            set_={k: statement.excluded[k] for k in values if k != "key"}
+        )
+        async with self.session_factory() as db:
+            await db.execute(statement)
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                await db.execute(delete(CachedResult).where(CachedResult.expires_at <= datetime.now(timezone.utc)))
+            await db.commit()
+
+    async def _delete(self, *criteria) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(delete(CachedResult).where(*criteria))
+            await db.commit()
+        return result.rowcount or 0
+
+    async def delete(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        return await self._delete(CachedResult.key.in_(keys)) if keys else 0
+
+    async def delete_pattern(self, pattern: str) -> int:
+        return await self._delete(CachedResult.key.contains(pattern, autoescape=True))
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        tags = list(tags)
+        return await self._delete(CachedResult.tags.overlap(tags)) if tags else 0
+
+    async def clear(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(delete(CachedResult))
+            await db.commit()
+        return result.rowcount or 0
+
+
+_DEFAULT = object()
+
+
 class MultiLayerCacheService:
     """
     Multi-layer caching service for maximum performance.
-    
+
     Features:
     - 3-layer caching (memory, Redis, database)
     - Automatic TTL management
     - Cache warming
-    - Statistics tracking
+    - Statistics tracking (per tier hits, errors and read latency)
+    - Request coalescing (single-flight) on concurrent misses, optionally
+      across workers with a Redis lease
+    - Key, pattern and tag invalidation across tiers and workers
     - Decorator for easy caching
+
+    A tier that raises is skipped for RETRY_AFTER seconds instead of adding
+    its timeout to every request.
     """
-    
-    def __init__(self):
-        # Layer 1: In-memory cache (fastest)
-        self.memory_cache: Dict[str, CacheEntry] = {}
-        
-        # Layer 2: Redis cache (shared, fast)
-        # TODO: Initialize Redis connection
-        self.redis_client = None
-        
-        # Layer 3: Database cache (persistent)
-        # TODO: Initialize database connection
-        self.db_cache = None
-        
-        # Statistics
-        self.stats = CacheStats()
-        
+
+    RETRY_AFTER = 30.0
+
+    def __init__(
+        self,
+        redis_client: Any = _DEFAULT,
+        db_session_factory: Any = _DEFAULT,
+        memory_maxsize: Optional[int] = None,
+        spill_min_bytes: Optional[int] = None
+    ):
         # Default TTLs per cache type (seconds)
         self.default_ttls = {
             "weather": 300,        # 5 minutes
@@ -96,11 +480,78 @@ class MultiLayerCacheService:
             "tool_result": 3600,   # 1 hour
             "agent_response": 1800,  # 30 minutes
             "routing": 3600,       # 1 hour
-            "llm_response": 1800   # 30 minutes
+            "llm_response": 1800,  # 30 minutes
+            "report": 86400        # 24 hours
         }
-        
+
+        # Cache types always written to the database tier, whatever their size
+        self.database_cache_types = {"report"}
+        self.spill_min_bytes = spill_min_bytes or settings.MULTI_LAYER_CACHE_SPILL_BYTES
+
+        # Layer 1: In-memory cache (fastest)
+        self.memory_cache = MemoryTier(memory_maxsize or settings.MULTI_LAYER_CACHE_MEMORY_SIZE)
+
+        # Layer 2: Redis cache (shared, fast)
+        if redis_client is _DEFAULT:
+            redis_client = self._create_redis_client()
+        self.redis_client = redis_client
+        self.redis_tier = (
+            RedisTier(redis_client, f"{settings.CACHE_PREFIX}mlc:", max(self.default_ttls.values()))
+            if redis_client is not None else None
+        )
+
+        # Layer 3: Database cache (persistent)
+        if db_session_factory is _DEFAULT:
+            from app.core.database import AsyncSessionLocal
+            db_session_factory = AsyncSessionLocal
+        self.db_cache = DatabaseTier(db_session_factory) if db_session_factory is not None else None
+
+        self._disabled_until: Dict[str, float] = {}
+
+        # Statistics
+        self.stats = CacheStats()
+
+        # Concurrent misses on the same key share one computation
+        self.single_flight = SingleFlight(name="multi_layer_cache")
+        # ...and, for get_or_set(distributed_lock=True), across workers
+        self.redis_lease = (
+            RedisLease(redis_client, prefix=f"{settings.CACHE_PREFIX}mlc:lock:")
+            if redis_client is not None else None
+        )
+
+        # Cross-worker memory invalidation
+        self.instance_id = uuid.uuid4().hex
+        self.channel = settings.MULTI_LAYER_CACHE_CHANNEL
+        self._listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+
         logger.info("Initialized Multi-Layer Cache Service")
-    
+
+    @staticmethod
+    def _create_redis_client():
+        """redis.asyncio client for the shared tier (connects lazily)"""
+        try:
+            import redis.asyncio as aioredis
+
+            return aioredis.from_url(
+                settings.REDIS_URL,
+                password=settings.REDIS_PASSWORD,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Redis tier unavailable: {e}")
+            return None
+
+    def _tier_available(self, layer: CacheLayer) -> bool:
+        tier = self.redis_tier if layer is CacheLayer.REDIS else self.db_cache
+        return tier is not None and self._disabled_until.get(layer.value, 0) <= time.time()
+
+    def _tier_failed(self, layer: CacheLayer, operation: str, error: Exception):
+        self.stats.tiers[layer.value].errors += 1
+        self._disabled_until[layer.value] = time.time() + self.RETRY_AFTER
+        logger.warning(f"⚠️ {layer.value} cache {operation} failed, skipping tier for {self.RETRY_AFTER:.0f}s: {error}")
+
     async def get(
         self,
         key: str,
@@ -108,148 +559,190 @@ class MultiLayerCacheService:
     ) -> Optional[Any]:
         """
         Get value from cache (tries all layers).
-        
+
         Args:
             key: Cache key
             cache_type: Type of cache (for TTL selection)
-        
+
         Returns:
             Cached value or None if not found
         """
         self.stats.total_requests += 1
-        start_time = time.time()
-        
+        start_time = time.perf_counter()
+
         # Try Layer 1: Memory cache
-        if key in self.memory_cache:
-            entry = self.memory_cache[key]
-            if not entry.is_expired():
-                self.stats.memory_hits += 1
-                logger.debug(f"✅ Memory cache HIT: {key} ({time.time() - start_time:.3f}s)")
-                return entry.value
-            else:
-                # Remove expired entry
-                del self.memory_cache[key]
-        
-        # Try Layer 2: Redis cache
-        if self.redis_client:
-            redis_value = await self._get_from_redis(key)
-            if redis_value is not None:
+        entry = self.memory_cache.get(key)
+        self.stats.tiers["memory"].record_read(entry is not None, time.perf_counter() - start_time)
+        if entry is not None:
+            self.stats.memory_hits += 1
+            logger.debug(f"✅ Memory cache HIT: {key} ({time.perf_counter() - start_time:.3f}s)")
+            return entry.value
+
+        # Try Layer 2: Redis cache, then Layer 3: Database cache
+        layer, value = await self._get_shared(key, cache_type)
+        if layer is not None:
+            if layer is CacheLayer.REDIS:
                 self.stats.redis_hits += 1
-                # Promote to memory cache
-                await self._set_memory(key, redis_value, cache_type)
-                logger.debug(f"✅ Redis cache HIT: {key} ({time.time() - start_time:.3f}s)")
-                return redis_value
-        
-        # Try Layer 3: Database cache
-        if self.db_cache:
-            db_value = await self._get_from_database(key)
-            if db_value is not None:
+            else:
                 self.stats.database_hits += 1
-                # Promote to memory and Redis
-                await self._set_memory(key, db_value, cache_type)
-                if self.redis_client:
-                    await self._set_redis(key, db_value, cache_type)
-                logger.debug(f"✅ Database cache HIT: {key} ({time.time() - start_time:.3f}s)")
-                return db_value
-        
+            logger.debug(f"✅ {layer.value.capitalize()} cache HIT: {key} ({time.perf_counter() - start_time:.3f}s)")
+            return value
+
         # Cache miss
         self.stats.misses += 1
-        logger.debug(f"❌ Cache MISS: {key} ({time.time() - start_time:.3f}s)")
+        logger.debug(f"❌ Cache MISS: {key} ({time.perf_counter() - start_time:.3f}s)")
         return None
-    
+
+    async def _get_shared(self, key: str, cache_type: str) -> Tuple[Optional[CacheLayer], Any]:
+        """Read the Redis, then database tier, promoting a hit to the tiers above"""
+        for layer in (CacheLayer.REDIS, CacheLayer.DATABASE):
+            if not self._tier_available(layer):
+                continue
+            tier = self.redis_tier if layer is CacheLayer.REDIS else self.db_cache
+            tier_start = time.perf_counter()
+            try:
+                found = await tier.get(key)
+            except Exception as e:
+                self._tier_failed(layer, "read", e)
+                continue
+            if found is not None:
+                try:
+                    tags, value = decode_value(found[0])
+                except ValueError as e:
+                    # Entries from an older format (or corrupt) are misses, not tier failures
+                    logger.warning(f"Unreadable {layer.value} cache entry for {key}, ignoring it: {e}")
+                    found = None
+            self.stats.tiers[layer.value].record_read(found is not None, time.perf_counter() - tier_start)
+            if found is None:
+                continue
+
+            blob, remaining_ttl = found
+            # Promote a database hit to Redis unless it was spilled for its size
+            if (
+                layer is CacheLayer.DATABASE
+                and len(blob) < self.spill_min_bytes
+                and self._tier_available(CacheLayer.REDIS)
+            ):
+                await self._write_tier(CacheLayer.REDIS, key, blob, remaining_ttl, cache_type, tags)
+            # Promote to memory cache
+            await self._set_memory(key, value, cache_type, remaining_ttl, tags)
+            return layer, value
+        return None, None
+
     async def set(
         self,
         key: str,
         value: Any,
         cache_type: str = "default",
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = ()
     ):
         """
         Set value in all cache layers.
-        
+
         Args:
             key: Cache key
             value: Value to cache
             cache_type: Type of cache (for TTL selection)
             ttl: Custom TTL (overrides default)
+            tags: Tags for invalidate_tags
         """
         # Determine TTL
         if ttl is None:
             ttl = self.default_ttls.get(cache_type, 3600)
-        
+        tags = tuple(tags)
+
         # Set in all layers
-        await self._set_memory(key, value, cache_type, ttl)
-        
-        if self.redis_client:
-            await self._set_redis(key, value, cache_type, ttl)
-        
-        if self.db_cache:
-            await self._set_database(key, value, cache_type, ttl)
-        
+        await self._set_memory(key, value, cache_type, ttl, tags)
+
+        if self.redis_tier or self.db_cache:
+            try:
+                # Tags travel with the value so promoted copies stay invalidatable
+                blob = encode_value((tags, value))
+            except Exception as e:
+                logger.warning(f"Value for {key} is not serializable, memory cache only: {e}")
+                return
+
+            spill = len(blob) >= self.spill_min_bytes
+            if not spill and self._tier_available(CacheLayer.REDIS):
+                await self._write_tier(CacheLayer.REDIS, key, blob, ttl, cache_type, tags)
+            if (spill or cache_type in self.database_cache_types) and self._tier_available(CacheLayer.DATABASE):
+                await self._write_tier(CacheLayer.DATABASE, key, blob, ttl, cache_type, tags)
+
         logger.debug(f"💾 Cached: {key} (TTL: {ttl}s)")
-    
+
+    async def _write_tier(self, layer: CacheLayer, key: str, blob: bytes, ttl: float,
+                          cache_type: str, tags: Tuple[str, ...]):
+        tier = self.redis_tier if layer is CacheLayer.REDIS else self.db_cache
+        try:
+            await tier.set(key, blob, max(ttl, 1), cache_type, tags)
+            self.stats.tiers[layer.value].writes += 1
+        except Exception as e:
+            self._tier_failed(layer, "write", e)
+
+    async def get_or_set(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        cache_type: str = "default",
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+        distributed_lock: bool = False
+    ) -> Any:
+        """
+        Get value from cache, computing it once on a miss.
+
+        Concurrent callers missing on the same key await a single call
+        to factory instead of each recomputing the value. With
+        distributed_lock, workers also agree on one leader through a Redis
+        lease; the others wait for its value in the shared tiers.
+
+        Args:
+            key: Cache key
+            factory: Zero-argument coroutine factory producing the value
+            cache_type: Type of cache (for TTL selection)
+            ttl: Custom TTL (overrides default)
+            tags: Tags for invalidate_tags
+            distributed_lock: Also coalesce across processes with a Redis lease
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = await self.get(key, cache_type)
+        if value is not None:
+            return value
+
+        async def compute() -> Any:
+            result = await factory()
+            if result is not None:
+                await self.set(key, result, cache_type, ttl, tags)
+            return result
+
+        async def compute_coalesced() -> Any:
+            if distributed_lock and self.redis_lease and self._tier_available(CacheLayer.REDIS):
+                async def read_shared() -> Any:
+                    _, value = await self._get_shared(key, cache_type)
+                    return value
+
+                return await self.redis_lease.run(key, compute, read_shared)
+            return await compute()
+
+        return await self.single_flight.do(key, compute_coalesced)
+
     async def _set_memory(
         self,
         key: str,
         value: Any,
         cache_type: str,
-        ttl: Optional[int] = None
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = ()
     ):
         """Set value in memory cache"""
         if ttl is None:
             ttl = self.default_ttls.get(cache_type, 3600)
-        
-        self.memory_cache[key] = CacheEntry(
-            key=key,
-            value=value,
-            created_at=time.time(),
-            ttl=ttl,
-            layer=CacheLayer.MEMORY
-        )
-        
-        # Limit memory cache size
-        if len(self.memory_cache) > 1000:
-            # Remove oldest 100 entries
-            oldest_keys = sorted(
-                self.memory_cache.keys(),
-                key=lambda k: self.memory_cache[k].created_at
-            )[:100]
-            for old_key in oldest_keys:
-                del self.memory_cache[old_key]
-    
-    async def _get_from_redis(self, key: str) -> Optional[Any]:
-        """Get value from Redis cache"""
-        # TODO: Implement Redis get
-        # For now, return None
-        return None
-    
-    async def _set_redis(
-        self,
-        key: str,
-        value: Any,
-        cache_type: str,
-        ttl: Optional[int] = None
-    ):
-        """Set value in Redis cache"""
-        # TODO: Implement Redis set
-        pass
-    
-    async def _get_from_database(self, key: str) -> Optional[Any]:
-        """Get value from database cache"""
-        # TODO: Implement database get
-        return None
-    
-    async def _set_database(
-        self,
-        key: str,
-        value: Any,
-        cache_type: str,
-        ttl: Optional[int] = None
-    ):
-        """Set value in database cache"""
-        # TODO: Implement database set
-        pass
-    
+
+        self.memory_cache.set(key, value, ttl, tags)
+
     def generate_key(
         self,
         prefix: str,
@@ -258,12 +751,12 @@ class MultiLayerCacheService:
     ) -> str:
         """
         Generate cache key from arguments.
-        
+
         Args:
             prefix: Key prefix (e.g., "weather", "tool_result")
             *args: Positional arguments
             **kwargs: Keyword arguments
-        
+
         Returns:
             Cache key string
         """
@@ -271,45 +764,120 @@ class MultiLayerCacheService:
         key_parts = [prefix]
         key_parts.extend(str(arg) for arg in args)
         key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
-        
+
         # Create hash for long keys
         key_string = ":".join(key_parts)
         if len(key_string) > 200:
             key_hash = hashlib.md5(key_string.encode()).hexdigest()
             return f"{prefix}:{key_hash}"
-        
+
         return key_string
-    
+
+    async def _invalidate_shared(self, operation: str, argument: Any) -> int:
+        """Run an invalidation on the Redis and database tiers"""
+        removed = 0
+        for layer in (CacheLayer.REDIS, CacheLayer.DATABASE):
+            if not self._tier_available(layer):
+                continue
+            tier = self.redis_tier if layer is CacheLayer.REDIS else self.db_cache
+            try:
+                removed += await getattr(tier, operation)(*argument)
+            except Exception as e:
+                self._tier_failed(layer, operation, e)
+        return removed
+
     async def invalidate(self, key: str):
         """Invalidate cache entry across all layers"""
-        # Remove from memory
-        if key in self.memory_cache:
-            del self.memory_cache[key]
-        
-        # Remove from Redis
-        if self.redis_client:
-            # TODO: Implement Redis delete
-            pass
-        
-        # Remove from database
-        if self.db_cache:
-            # TODO: Implement database delete
-            pass
-        
+        self.memory_cache.pop(key)
+        await self._invalidate_shared("delete", ([key],))
+        await self._publish({"keys": [key]})
+
         logger.debug(f"🗑️ Invalidated cache: {key}")
-    
-    async def invalidate_pattern(self, pattern: str):
-        """Invalidate all cache entries matching pattern"""
-        # Invalidate from memory
-        keys_to_delete = [
-            key for key in self.memory_cache.keys()
-            if pattern in key
-        ]
-        for key in keys_to_delete:
-            del self.memory_cache[key]
-        
-        logger.debug(f"🗑️ Invalidated {len(keys_to_delete)} cache entries matching: {pattern}")
-    
+
+    async def invalidate_pattern(self, pattern: str) -> int:
+        """Invalidate all cache entries whose key contains pattern"""
+        removed = self.memory_cache.delete_pattern(pattern)
+        removed += await self._invalidate_shared("delete_pattern", (pattern,))
+        await self._publish({"pattern": pattern})
+
+        logger.debug(f"🗑️ Invalidated {removed} cache entries matching: {pattern}")
+        return removed
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Invalidate all cache entries carrying any of the tags"""
+        tags = list(tags)
+        removed = self.memory_cache.delete_tags(tags)
+        removed += await self._invalidate_shared("delete_tags", (tags,))
+        await self._publish({"tags": tags})
+
+        logger.debug(f"🗑️ Invalidated {removed} cache entries tagged: {tags}")
+        return removed
+
+    async def _publish(self, message: Dict[str, Any]):
+        """Tell other workers to drop their memory copies"""
+        if not self._tier_available(CacheLayer.REDIS):
+            return
+        try:
+            await self.redis_client.publish(self.channel, json.dumps({**message, "sender": self.instance_id}))
+        except Exception as e:
+            self._tier_failed(CacheLayer.REDIS, "publish", e)
+
+    def apply_remote_invalidation(self, message: Dict[str, Any]) -> int:
+        """Apply an invalidation published by another worker to the memory tier"""
+        if message.get("sender") == self.instance_id:
+            return 0
+        if message.get("clear"):
+            removed = len(self.memory_cache)
+            self.memory_cache.clear()
+            return removed
+        removed = sum(self.memory_cache.pop(key) is not None for key in message.get("keys", ()))
+        if message.get("pattern"):
+            removed += self.memory_cache.delete_pattern(message["pattern"])
+        if message.get("tags"):
+            removed += self.memory_cache.delete_tags(message["tags"])
+        return removed
+
+    async def start(self) -> bool:
+        """Subscribe to invalidations from other workers"""
+        if self.redis_client is None or self._listener is not None:
+            return False
+        try:
+            self._pubsub = self.redis_client.pubsub()
+            await self._pubsub.subscribe(self.channel)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache invalidation listener not started: {e}")
+            self._pubsub = None
+            return False
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"✅ Listening for cache invalidations on {self.channel}")
+        return True
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                self.apply_remote_invalidation(json.loads(message["data"]))
+            except Exception as e:
+                logger.error(f"Invalid cache invalidation message: {e}")
+
+    async def stop(self):
+        """Stop listening for invalidations"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
+
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         return {
@@ -319,16 +887,25 @@ class MultiLayerCacheService:
             "misses": self.stats.misses,
             "total_requests": self.stats.total_requests,
             "hit_rate": self.stats.hit_rate,
-            "memory_cache_size": len(self.memory_cache)
+            "memory_cache_size": len(self.memory_cache),
+            "memory_evictions": self.memory_cache.evictions,
+            "tiers": {name: tier.to_dict() for name, tier in self.stats.tiers.items()},
+            "single_flight": self.single_flight.get_stats(),
+            "cross_process": self.redis_lease.get_stats() if self.redis_lease else None
         }
-    
-    def clear_all(self):
+
+    async def clear_all(self):
         """Clear all caches"""
         self.memory_cache.clear()
-        # TODO: Clear Redis and database caches
+        await self._invalidate_shared("clear", ())
+        await self._publish({"clear": True})
         logger.info("🗑️ Cleared all caches")
 
 
+# Process-wide cache shared by the services of this worker
+multi_layer_cache = MultiLayerCacheService()
+
+
 def cached(
     cache_type: str = "default",
     ttl: Optional[int] = None,
@@ -336,7 +913,7 @@ def cached(
 ):
     """
     Decorator for caching function results.
-    
+
     Usage:
         @cached(cache_type="weather", ttl=300)
         async def get_weather(location: str):
@@ -351,24 +928,18 @@ def cached(
             if not cache_service:
                 # No cache service, execute function normally
                 return await func(*args, **kwargs)
-            
+
             # Generate cache key
             prefix = key_prefix or func.__name__
             cache_key = cache_service.generate_key(prefix, *args, **kwargs)
-            
-            # Try to get from cache
-            cached_value = await cache_service.get(cache_key, cache_type)
-            if cached_value is not None:
-                return cached_value
-            
-            # Execute function
-            result = await func(*args, **kwargs)
-            
-            # Cache result
-            await cache_service.set(cache_key, result, cache_type, ttl)
-            
-            return result
-        
+
+            # Get from cache, coalescing concurrent misses
+            return await cache_service.get_or_set(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                cache_type,
+                ttl
+            )
+
         return wrapper
     return decorator
-
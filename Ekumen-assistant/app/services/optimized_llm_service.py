@@ -2,8 +2,13 @@
 Optimized LLM Service - Smart LLM selection and batching.
 
 Features:
-- Use GPT-3.5 for simple tasks (10x faster, 20x cheaper)
-- Use GPT-4 only for complex analysis
+- Cheap model (GPT-3.5) for simple tasks (10x faster, 20x cheaper)
+- Strong model (GPT-4) only for complex analysis, as judged by the model
+  router's local classifier and within the organization's latency and cost
+  budget (see model_router)
+- Per-call settings are bound to shared clients, never set on them
+- Token counts and costs come from the provider's usage, and every call is
+  metered per organization and request type (usage_meter)
 - Batch multiple LLM calls when possible
 - Reduce total LLM calls per query
 
@@ -13,22 +18,24 @@ Goal: Reduce LLM time from 21-34s to 8-12s
 import logging
 import time
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
 from dataclasses import dataclass
 
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
 from app.core.config import settings
+from app.services.model_router import ModelRouter, RouteDecision, model_router
+from app.services.usage_meter import count_tokens, usage_scope
 
 logger = logging.getLogger(__name__)
 
 
 class LLMComplexity(Enum):
     """LLM task complexity levels"""
-    SIMPLE = "simple"       # GPT-3.5, < 2s
-    MEDIUM = "medium"       # GPT-3.5, < 5s
-    COMPLEX = "complex"     # GPT-4, < 15s
+    SIMPLE = "simple"       # Cheap model, < 2s
+    MEDIUM = "medium"       # Cheap model, < 5s
+    COMPLEX = "complex"     # Strong model, < 15s
 
 
 @dataclass
@@ -36,10 +43,13 @@ class LLMTask:
     """Single LLM task"""
     task_id: str
     prompt: str
-    complexity: LLMComplexity
+    complexity: Optional[LLMComplexity] = None  # None: classified from query (or prompt)
     max_tokens: int = 500
     temperature: float = 0.3
     system_message: Optional[str] = None
+    query: Optional[str] = None  # User question, when the prompt wraps it
+    organization_id: Optional[str] = None  # Whose latency SLO and cost cap apply
+    request_type: str = "llm"  # Usage metering dimension (synthesis, classification...)
 
 
 @dataclass
@@ -58,46 +68,58 @@ class OptimizedLLMService:
     Service for optimized LLM usage.
     
     Features:
-    - Smart model selection (GPT-3.5 vs GPT-4)
+    - Smart model selection (cheap vs strong model, via ModelRouter)
     - Batch processing for multiple tasks
     - Token optimization
     - Cost tracking
     """
     
-    def __init__(self):
-        # Initialize GPT-3.5 (fast, cheap)
-        self.gpt35 = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.3,
-            max_tokens=500,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
-        
-        # Initialize GPT-4 (slow, expensive, high quality)
-        self.gpt4 = ChatOpenAI(
-            model_name="gpt-4",
-            temperature=0.1,
-            max_tokens=1000,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
-        
-        # Cost tracking
-        self.costs = {
-            "gpt-3.5-turbo": {"input": 0.0005 / 1000, "output": 0.0015 / 1000},  # per token
-            "gpt-4": {"input": 0.03 / 1000, "output": 0.06 / 1000}
-        }
-        
+    def __init__(self, router: Optional[ModelRouter] = None):
+        self.router = router or model_router
+
+        # One shared client per model; per-call settings are bound, not assigned
+        self._clients: Dict[str, ChatOpenAI] = {}
+
+        # Background shadow runs of the cheap model
+        self._shadow_tasks = set()
+
         # Statistics
         self.stats = {
             "total_calls": 0,
-            "gpt35_calls": 0,
-            "gpt4_calls": 0,
+            "cheap_calls": 0,
+            "strong_calls": 0,
+            "calls_by_model": {},
             "total_tokens": 0,
             "total_cost": 0.0,
+            "strong_equivalent_cost": 0.0,  # Had every call used the strong model
             "total_time": 0.0
         }
         
         logger.info("Initialized Optimized LLM Service")
+
+    def _client(self, model_name: str) -> ChatOpenAI:
+        """Shared client of a model (created on first use)"""
+        client = self._clients.get(model_name)
+        if client is None:
+            client = ChatOpenAI(
+                model_name=model_name,
+                openai_api_key=settings.OPENAI_API_KEY
+            )
+            self._clients[model_name] = client
+        return client
+
+    async def _invoke(self, decision: RouteDecision, messages: List[Any]) -> Tuple[str, int, int]:
+        """(answer, prompt tokens, completion tokens) as reported by the provider"""
+        config = decision.config
+        response = await self._client(config.name).bind(**config.call_kwargs()).ainvoke(messages)
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            return response.content, usage["input_tokens"], usage["output_tokens"]
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+        if usage:
+            return response.content, usage["prompt_tokens"], usage["completion_tokens"]
+        prompt_tokens = count_tokens([message.content for message in messages])[0]
+        return response.content, prompt_tokens, count_tokens([response.content])[0]
     
     async def execute_task(
         self,
@@ -108,19 +130,18 @@ class OptimizedLLMService:
         """
         start_time = time.time()
         
-        # Select model based on complexity
-        if task.complexity == LLMComplexity.COMPLEX:
-            llm = self.gpt4
-            model_name = "gpt-4"
-            self.stats["gpt4_calls"] += 1
-        else:
-            llm = self.gpt35
-            model_name = "gpt-3.5-turbo"
-            self.stats["gpt35_calls"] += 1
-        
-        # Configure LLM for this task
-        llm.max_tokens = task.max_tokens
-        llm.temperature = task.temperature
+        # Select model and settings for this call
+        input_tokens = count_tokens([task.system_message or "", task.prompt])[0]
+        decision = self.router.route(
+            task.query or task.prompt,
+            organization_id=task.organization_id,
+            complexity=task.complexity.value if task.complexity else None,
+            max_tokens=task.max_tokens,
+            temperature=task.temperature,
+            input_tokens=input_tokens
+        )
+        config = decision.config
+        model_name = config.name
         
         # Prepare messages
         messages = []
@@ -130,27 +151,31 @@ class OptimizedLLMService:
         
         # Execute
         try:
-            response = await llm.agenerate([messages])
-            response_text = response.generations[0][0].text
-            
-            # Estimate tokens (rough approximation)
-            input_tokens = len(task.prompt.split()) * 1.3
-            output_tokens = len(response_text.split()) * 1.3
-            total_tokens = int(input_tokens + output_tokens)
+            with usage_scope(request_type=task.request_type, organization_id=task.organization_id):
+                response_text, input_tokens, output_tokens = await self._invoke(decision, messages)
+            total_tokens = input_tokens + output_tokens
             
             # Calculate cost
-            cost = (
-                input_tokens * self.costs[model_name]["input"] +
-                output_tokens * self.costs[model_name]["output"]
-            )
+            cost = config.estimate_cost(input_tokens, output_tokens)
             
             execution_time = time.time() - start_time
+            self.router.record(decision, execution_time, cost)
             
             # Update stats
             self.stats["total_calls"] += 1
+            self.stats[f"{config.tier}_calls"] += 1
+            self.stats["calls_by_model"][model_name] = self.stats["calls_by_model"].get(model_name, 0) + 1
             self.stats["total_tokens"] += total_tokens
             self.stats["total_cost"] += cost
+            self.stats["strong_equivalent_cost"] += self.router.strong.estimate_cost(input_tokens, output_tokens)
             self.stats["total_time"] += execution_time
+
+            if decision.shadow:
+                shadow = asyncio.create_task(
+                    self._run_shadow(decision, task.query or task.prompt, messages, response_text)
+                )
+                self._shadow_tasks.add(shadow)
+                shadow.add_done_callback(self._shadow_tasks.discard)
             
             logger.info(
                 f"✅ LLM task {task.task_id}: {model_name}, "
@@ -169,6 +194,33 @@ class OptimizedLLMService:
         except Exception as e:
             logger.error(f"LLM task {task.task_id} failed: {e}")
             raise
+
+    async def _run_shadow(
+        self,
+        decision: RouteDecision,
+        query: str,
+        messages: List[Any],
+        strong_answer: str
+    ):
+        """Answer with the cheap model too and let the router compare (never raises)"""
+        cheap = RouteDecision(
+            config=self.router.cheap.with_call(decision.config.max_tokens, decision.config.temperature),
+            complexity=decision.complexity,
+            probability=decision.probability,
+            reason="shadow",
+            organization_id=decision.organization_id
+        )
+        cheap_answer, cost = None, 0.0
+        try:
+            with usage_scope(request_type="shadow"):
+                cheap_answer, input_tokens, output_tokens = await self._invoke(cheap, messages)
+            cost = cheap.config.estimate_cost(input_tokens, output_tokens)
+        except Exception as e:
+            logger.warning(f"Shadow call to {cheap.config.name} failed: {e}")
+        try:
+            self.router.record_shadow(decision, query, strong_answer, cheap_answer, cost)
+        except Exception as e:
+            logger.warning(f"Error recording shadow evaluation: {e}")
     
     async def execute_batch(
         self,
@@ -177,24 +229,13 @@ class OptimizedLLMService:
         """
         Execute multiple LLM tasks in parallel.
         
-        Groups tasks by complexity and executes in parallel.
+        Tasks run concurrently; each one is routed on its own.
         """
         if not tasks:
             return []
         
         logger.info(f"📦 Executing batch of {len(tasks)} LLM tasks")
         
-        # Group tasks by complexity
-        simple_tasks = [t for t in tasks if t.complexity == LLMComplexity.SIMPLE]
-        medium_tasks = [t for t in tasks if t.complexity == LLMComplexity.MEDIUM]
-        complex_tasks = [t for t in tasks if t.complexity == LLMComplexity.COMPLEX]
-        
-        logger.info(
-            f"  Simple: {len(simple_tasks)} (GPT-3.5), "
-            f"Medium: {len(medium_tasks)} (GPT-3.5), "
-            f"Complex: {len(complex_tasks)} (GPT-4)"
-        )
-        
         # Execute all tasks in parallel
         all_task_coroutines = [self.execute_task(task) for task in tasks]
         results = await asyncio.gather(*all_task_coroutines, return_exceptions=True)
@@ -217,14 +258,19 @@ class OptimizedLLMService:
         self,
         query: str,
         tool_results: Dict[str, Any],
-        complexity: LLMComplexity = LLMComplexity.MEDIUM,
-        max_tokens: int = 800
+        complexity: Optional[LLMComplexity] = None,
+        max_tokens: int = 800,
+        organization_id: Optional[str] = None
     ) -> str:
         """
         Synthesize final response from tool results.
 
         This is the main synthesis step that combines all tool outputs.
+        Without a complexity, the query is classified locally.
         """
+        if complexity is None:
+            complexity = await self.classify_query_complexity(query)
+
         # Adjust max_tokens based on complexity
         if complexity == LLMComplexity.COMPLEX:
             max_tokens = max(max_tokens, 1500)  # Ensure detailed responses for complex queries
@@ -243,7 +289,10 @@ class OptimizedLLMService:
             complexity=complexity,
             max_tokens=max_tokens,
             temperature=0.3,
-            system_message=system_message
+            system_message=system_message,
+            query=query,
+            organization_id=organization_id,
+            request_type="synthesis"
         )
 
         # Execute
@@ -311,27 +360,10 @@ class OptimizedLLMService:
         """
         Classify query complexity to determine which LLM to use.
         
-        Uses fast GPT-3.5 for classification.
+        Uses the router's local classifier (no LLM call).
         """
-        task = LLMTask(
-            task_id="classify_complexity",
-            prompt=f"Classifie la complexité de cette question agricole (simple/medium/complex): {query}",
-            complexity=LLMComplexity.SIMPLE,
-            max_tokens=10,
-            temperature=0,
-            system_message="Tu es un classificateur de complexité. Réponds uniquement: simple, medium, ou complex."
-        )
-        
-        result = await self.execute_task(task)
-        
-        # Parse response
-        response_lower = result.response.lower().strip()
-        if "simple" in response_lower:
-            return LLMComplexity.SIMPLE
-        elif "complex" in response_lower:
-            return LLMComplexity.COMPLEX
-        else:
-            return LLMComplexity.MEDIUM
+        complexity, _ = self.router.classify(query)
+        return LLMComplexity(complexity)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get LLM usage statistics"""
@@ -345,23 +377,22 @@ class OptimizedLLMService:
                 self.stats["total_cost"] / self.stats["total_calls"]
                 if self.stats["total_calls"] > 0 else 0
             ),
-            "gpt35_percentage": (
-                self.stats["gpt35_calls"] / self.stats["total_calls"] * 100
+            "cheap_percentage": (
+                self.stats["cheap_calls"] / self.stats["total_calls"] * 100
                 if self.stats["total_calls"] > 0 else 0
             ),
-            "gpt4_percentage": (
-                self.stats["gpt4_calls"] / self.stats["total_calls"] * 100
+            "strong_percentage": (
+                self.stats["strong_calls"] / self.stats["total_calls"] * 100
                 if self.stats["total_calls"] > 0 else 0
             )
         }
     
     def estimate_cost_savings(self) -> Dict[str, Any]:
         """
-        Estimate cost savings from using GPT-3.5 instead of GPT-4.
+        Estimate cost savings from using the cheap model instead of the strong one.
         """
-        # Calculate what it would cost if all calls were GPT-4
-        gpt4_cost_per_call = 0.05  # Rough estimate
-        all_gpt4_cost = self.stats["total_calls"] * gpt4_cost_per_call
+        # What the same calls would have cost on the strong model
+        all_gpt4_cost = self.stats["strong_equivalent_cost"]
         
         # Actual cost
         actual_cost = self.stats["total_cost"]
@@ -20,9 +20,11 @@ from fastapi import WebSocket
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.callbacks.base import AsyncCallbackHandler
 
-from app.agents.orchestrator import OrchestratorAgent
-from app.services.multi_layer_cache_service import MultiLayerCacheService
+from app.agents.agent_pool import agent_pool
+from app.services.multi_layer_cache_service import multi_layer_cache
 from app.services.parallel_executor_service import ParallelExecutorService
+from app.services.semantic_answer_cache import semantic_answer_cache
+from app.services.token_stream import FrameCoalescer
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -47,22 +49,26 @@ class WebSocketCallback(AsyncCallbackHandler):
     def __init__(self, websocket: Optional[WebSocket] = None):
         self.websocket = websocket
         self.tokens = []
+        # Tokens go out as coalesced delta frames
+        self.frames = FrameCoalescer()
 
-    async def on_llm_new_token(self, token: str, **kwargs) -> None:
-        """Send new tokens to WebSocket"""
-        if self.websocket:
+    async def _send_frame(self, frame: Optional[Dict[str, Any]]) -> None:
+        if frame and self.websocket:
             try:
-                await self.websocket.send_json({
-                    "type": "token",
-                    "content": token
-                })
-                self.tokens.append(token)
+                await self.websocket.send_json(frame)
             except Exception as e:
                 logger.error(f"WebSocket send error: {e}")
 
+    async def on_llm_new_token(self, token: str, **kwargs) -> None:
+        """Send new tokens to WebSocket"""
+        if self.websocket:
+            self.tokens.append(token)
+            await self._send_frame(self.frames.push(token))
+
     async def on_llm_end(self, response, **kwargs) -> None:
         """Send completion signal"""
         if self.websocket:
+            await self._send_frame(self.frames.flush())
             try:
                 await self.websocket.send_json({
                     "type": "stream_end",
@@ -87,18 +93,20 @@ class OptimizedStreamingService:
     def __init__(self, tool_executor: Optional[Any] = None):
         """Initialize optimized streaming service"""
 
-        # Initialize caching
-        self.cache = MultiLayerCacheService()
+        # Initialize caching (exact keys, then paraphrases)
+        self.cache = multi_layer_cache
+        self.semantic_cache = semantic_answer_cache
 
         # Initialize parallel executor
         self.parallel_executor = ParallelExecutorService()
 
-        # Orchestrator will be created on-demand with callbacks
+        # Orchestrator comes from the process-wide agent pool
         self.orchestrator = None
 
         # Statistics
         self.total_queries = 0
         self.cache_hits = 0
+        self.semantic_cache_hits = 0
         self.total_time_saved = 0.0
 
         # WebSocket connections
@@ -106,7 +114,7 @@ class OptimizedStreamingService:
 
         logger.info("=" * 80)
         logger.info("✅ Optimized Streaming Service Initialized")
-        logger.info(f"✅ Orchestrator: Created on-demand with callbacks")
+        logger.info(f"✅ Orchestrator: Pooled per process, per-request callbacks")
         logger.info(f"✅ Model: {settings.OPENAI_DEFAULT_MODEL}")
         logger.info(f"✅ Caching: Multi-layer (Redis + Memory)")
         logger.info(f"✅ Streaming: Enabled")
@@ -184,6 +192,13 @@ class OptimizedStreamingService:
         # Check cache first
         cache_key = self.cache.generate_key(query, context)
         cached_response = await self.cache.get(cache_key)
+        semantic_match = None
+        if not cached_response:
+            # A paraphrase of a recent question in the same scope gets its answer
+            semantic_match = await self.semantic_cache.get(query, context, namespace="streamed_answer")
+            if semantic_match:
+                cached_response = semantic_match.answer
+                self.semantic_cache_hits += 1
 
         if cached_response:
             self.cache_hits += 1
@@ -197,6 +212,9 @@ class OptimizedStreamingService:
                 "message": "Réponse trouvée en cache",
                 "time_saved": cache_time
             }
+            if semantic_match:
+                cache_msg["similarity"] = semantic_match.similarity
+                cache_msg["matched_query"] = semantic_match.query
 
             if websocket:
                 try:
@@ -213,7 +231,8 @@ class OptimizedStreamingService:
                 "metadata": {
                     "cache_hit": True,
                     "total_time": cache_time,
-                    "model_used": "cache"
+                    "model_used": "cache",
+                    "semantic_cache_hit": semantic_match is not None
                 }
             }
 
@@ -233,11 +252,6 @@ class OptimizedStreamingService:
             # Create WebSocket callback
             ws_callback = WebSocketCallback(websocket) if websocket else None
 
-            # Create orchestrator with callbacks
-            orchestrator = OrchestratorAgent(
-                callbacks=[ws_callback] if ws_callback else []
-            )
-
             # Send orchestrator start message
             orchestrator_msg = {
                 "type": "orchestrator_thinking",
@@ -252,8 +266,13 @@ class OptimizedStreamingService:
 
             yield orchestrator_msg
 
-            # Process query through orchestrator
-            result = await orchestrator.process(query, context)
+            # Process query through the pooled orchestrator (callbacks are per request)
+            result = await agent_pool.execute(
+                "orchestrator",
+                query,
+                context,
+                callbacks=[ws_callback] if ws_callback else None
+            )
 
             orchestrator_time = time.time() - orchestrator_start
             total_time = time.time() - start_time
@@ -266,6 +285,7 @@ class OptimizedStreamingService:
 
             # Cache the response
             await self.cache.set(cache_key, response_text)
+            await self.semantic_cache.set(query, context, response_text, namespace="streamed_answer")
 
             # Build metrics
             metrics = StreamingMetrics(
@@ -327,6 +347,7 @@ class OptimizedStreamingService:
             "total_queries": self.total_queries,
             "cache_hits": self.cache_hits,
             "cache_hit_rate": f"{cache_hit_rate:.1f}%",
+            "semantic_cache_hits": self.semantic_cache_hits,
             "total_time_saved": f"{self.total_time_saved:.2f}s",
             "avg_time_saved_per_hit": f"{self.total_time_saved / self.cache_hits:.2f}s" if self.cache_hits > 0 else "0s",
             "active_websockets": len(self.websocket_connections),
@@ -1,20 +1,30 @@
 """
 Parallel Executor Service - Execute tools and agents in parallel.
 
-Replaces sequential execution with parallel execution using asyncio.gather.
+Tools are scheduled as a dependency DAG: each tool starts as soon as its own
+dependencies finish, within per-resource-class concurrency limits (LLM,
+weather API, database). Runtime estimates come from observed p50/p95
+durations, and the critical path is reported for every execution.
 
 Goal: Reduce tool execution time from 15-30s to 5-10s
 """
 
+import contextlib
+import heapq
 import logging
+import math
 import time
 import asyncio
+from collections import deque
 from typing import Dict, Any, Optional, List, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+RUNTIME_WINDOW = 100       # Observed runtimes kept per tool
+MIN_RUNTIME_SAMPLES = 5    # Observations needed before trusting percentiles
+
 
 class ToolStatus(Enum):
     """Tool execution status"""
@@ -36,10 +46,33 @@ class ToolResult:
 
 @dataclass
 class ExecutionPlan:
-    """Plan for parallel execution"""
-    parallel_groups: List[List[str]]  # Groups of tools that can run in parallel
-    sequential_groups: List[str]       # Tools that must run sequentially
-    estimated_time: float
+    """Plan for DAG execution"""
+    parallel_groups: List[List[str]]  # DAG levels: tools in a level never depend on each other
+    sequential_groups: List[str]       # Tools gated on declared dependencies
+    estimated_time: float              # Critical path time from p50 runtimes
+    dependencies: Dict[str, List[str]] = field(default_factory=dict)  # Edges within the request
+    order: List[str] = field(default_factory=list)                    # Start order, critical path first
+    critical_path: List[str] = field(default_factory=list)
+    estimated_time_p95: float = 0.0
+    estimated_sequential_time: float = 0.0
+
+
+class RuntimeStats:
+    """Recent runtimes of a tool (or tool type)"""
+    
+    def __init__(self, window: int = RUNTIME_WINDOW):
+        self.samples = deque(maxlen=window)
+    
+    def __len__(self) -> int:
+        return len(self.samples)
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile"""
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
 
 
 class ParallelExecutorService:
@@ -47,14 +80,15 @@ class ParallelExecutorService:
     Service for executing tools and agents in parallel.
     
     Features:
-    - Parallel execution of independent tools
-    - Dependency-aware execution ordering
+    - DAG scheduling: tools start when their own dependencies finish
+    - Concurrency limits per resource class
+    - Runtime estimates and critical path from observed p50/p95
     - Timeout handling
     - Error recovery
     - Performance monitoring
     """
     
-    def __init__(self):
+    def __init__(self, resource_limits: Optional[Dict[str, int]] = None):
         self.execution_stats = {
             "total_executions": 0,
             "parallel_executions": 0,
@@ -68,7 +102,10 @@ class ParallelExecutorService:
             "calculate_planning_costs": ["generate_planning_tasks"],
             "optimize_task_sequence": ["generate_planning_tasks"],
             "generate_farm_report": ["get_farm_data", "calculate_performance_metrics"],
-            "generate_planning_report": ["generate_planning_tasks", "calculate_planning_costs"]
+            "generate_planning_report": ["generate_planning_tasks", "calculate_planning_costs"],
+            "analyze_weather_risks": ["get_weather_data"],
+            "identify_intervention_windows": ["get_weather_data"],
+            "calculate_evapotranspiration": ["get_weather_data"]
         }
         
         # Default timeouts per tool type (seconds)
@@ -81,6 +118,42 @@ class ParallelExecutorService:
             "sustainability": 5.0
         }
         
+        # Prior estimates per tool type (seconds), until runtimes are observed
+        self.default_tool_times = {
+            "weather": 2.0,
+            "regulatory": 3.0,
+            "farm_data": 2.0,
+            "crop_health": 1.0,
+            "planning": 2.0,
+            "sustainability": 2.0,
+            "unknown": 3.0
+        }
+        
+        # Shared resource each tool type uses; unlisted tools are unthrottled
+        self.tool_resource_classes = {
+            "weather": "weather_api",
+            "regulatory": "db",
+            "farm_data": "db",
+            "crop_health": "db"
+        }
+        
+        # Maximum concurrent tools per resource class
+        self.resource_limits = {
+            "llm": 3,
+            "weather_api": 4,
+            "db": 5,
+            **(resource_limits or {})
+        }
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._semaphore_loop = None
+        
+        # Observed runtimes per tool and per tool type
+        self.runtime_stats: Dict[str, RuntimeStats] = {}
+        self.type_runtime_stats: Dict[str, RuntimeStats] = {}
+        
+        self.last_plan: Optional[ExecutionPlan] = None
+        self.last_critical_path: Dict[str, Any] = {}
+        
         logger.info("Initialized Parallel Executor Service")
     
     async def execute_tools_parallel(
@@ -91,7 +164,10 @@ class ParallelExecutorService:
         max_parallel: int = 5
     ) -> Dict[str, ToolResult]:
         """
-        Execute tools in parallel with dependency awareness.
+        Execute tools as a dependency DAG.
+        
+        Each tool starts as soon as its own dependencies have finished (whatever
+        their status), subject to its resource class limit and max_parallel.
         
         Args:
             tools: List of tool names to execute
@@ -106,48 +182,67 @@ class ParallelExecutorService:
         
         # Create execution plan
         execution_plan = self._create_execution_plan(tools)
+        self.last_plan = execution_plan
         
         logger.info(
-            f"📊 Execution plan: "
-            f"{len(execution_plan.parallel_groups)} parallel groups, "
-            f"{len(execution_plan.sequential_groups)} sequential tools, "
-            f"estimated {execution_plan.estimated_time:.1f}s"
+            f"📊 Execution plan: {len(execution_plan.order)} tools in "
+            f"{len(execution_plan.parallel_groups)} levels, "
+            f"critical path {' → '.join(execution_plan.critical_path)} "
+            f"estimated {execution_plan.estimated_time:.1f}s (p95 {execution_plan.estimated_time_p95:.1f}s)"
         )
         
-        results = {}
-        
-        # Execute parallel groups
-        for group_idx, tool_group in enumerate(execution_plan.parallel_groups):
-            logger.info(f"⚡ Executing parallel group {group_idx + 1}: {tool_group}")
-            
-            # Execute tools in this group in parallel
-            group_results = await self._execute_tool_group_parallel(
-                tool_group,
-                tool_executor,
-                context,
-                results  # Pass previous results for dependencies
-            )
-            
-            results.update(group_results)
+        results: Dict[str, ToolResult] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        slots = asyncio.Semaphore(max_parallel)
         
-        # Execute sequential tools
-        for tool_name in execution_plan.sequential_groups:
-            logger.info(f"🔄 Executing sequential tool: {tool_name}")
-            
-            tool_result = await self._execute_single_tool(
-                tool_name,
-                tool_executor,
-                context,
-                results
-            )
-            
+        async def run(tool_name: str) -> ToolResult:
+            dependencies = execution_plan.dependencies[tool_name]
+            if dependencies:
+                await asyncio.wait([tasks[d] for d in dependencies])
+            # Resource class first, so a tool waiting on a busy API holds no global slot
+            async with self._resource_semaphore(tool_name), slots:
+                tool_result = await self._execute_single_tool(
+                    tool_name,
+                    tool_executor,
+                    context,
+                    results  # Dependencies' results are already in here
+                )
             results[tool_name] = tool_result
+            return tool_result
+        
+        # Critical-path-first order, so contended slots go to the longest chains
+        for tool_name in execution_plan.order:
+            tasks[tool_name] = asyncio.create_task(run(tool_name), name=f"tool:{tool_name}")
+        
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        for tool_name, outcome in zip(tasks, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Tool {tool_name} failed with exception: {outcome}")
+                results[tool_name] = ToolResult(
+                    tool_name=tool_name,
+                    status=ToolStatus.FAILED,
+                    result=None,
+                    execution_time=0.0,
+                    error=str(outcome)
+                )
         
         # Calculate time saved
         total_time = time.time() - start_time
         sequential_time = sum(r.execution_time for r in results.values())
         time_saved = sequential_time - total_time
         
+        critical_path, critical_path_time = self._critical_path(
+            execution_plan.order,
+            execution_plan.dependencies,
+            {name: r.execution_time for name, r in results.items()}
+        )
+        self.last_critical_path = {
+            "tools": critical_path,
+            "observed_time": critical_path_time,
+            "estimated_time": execution_plan.estimated_time,
+            "wall_time": total_time
+        }
+        
         self.execution_stats["total_executions"] += 1
         self.execution_stats["parallel_executions"] += len(execution_plan.parallel_groups)
         self.execution_stats["sequential_executions"] += len(execution_plan.sequential_groups)
@@ -155,92 +250,184 @@ class ParallelExecutorService:
         
         logger.info(
             f"✅ Executed {len(tools)} tools in {total_time:.2f}s "
-            f"(sequential would be {sequential_time:.2f}s, saved {time_saved:.2f}s)"
+            f"(sequential would be {sequential_time:.2f}s, saved {time_saved:.2f}s, "
+            f"critical path {' → '.join(critical_path)} {critical_path_time:.2f}s)"
         )
         
-        return results
+        return {name: results[name] for name in dict.fromkeys(tools)}
     
     def _create_execution_plan(self, tools: List[str]) -> ExecutionPlan:
         """
-        Create execution plan with parallel groups.
+        Create a DAG execution plan.
         
-        Groups tools that can run in parallel vs those that must run sequentially.
+        Only dependencies that are part of the request become edges; a tool whose
+        dependencies were not requested starts immediately. Estimates use observed
+        runtimes, so estimated_time is the expected critical path time.
         """
-        # Separate tools with dependencies from independent tools
-        independent_tools = []
-        dependent_tools = []
-        
-        for tool in tools:
-            if tool in self.tool_dependencies:
-                dependent_tools.append(tool)
-            else:
-                independent_tools.append(tool)
+        tools = list(dict.fromkeys(tools))
+        dependencies = self._resolve_dependencies(tools)
         
-        # Create parallel groups
-        parallel_groups = []
+        p50 = {t: self._estimate_tool_time(t) for t in tools}
+        p95 = {t: self._estimate_tool_time(t, percentile=95) for t in tools}
         
-        # Group 1: All independent tools can run in parallel
-        if independent_tools:
-            parallel_groups.append(independent_tools)
+        # Longest remaining chain below each tool, used as start priority
+        dependents: Dict[str, List[str]] = {t: [] for t in tools}
+        for tool, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(tool)
+        rank: Dict[str, float] = {}
+        for tool in reversed(self._topological_order(tools, dependencies)):
+            rank[tool] = p50[tool] + max((rank[d] for d in dependents[tool]), default=0.0)
+        order = self._topological_order(tools, dependencies, priority=rank)
         
-        # Dependent tools run sequentially (for now - could be optimized)
-        sequential_groups = dependent_tools
+        # Levels: tools in one level never depend on each other
+        level: Dict[str, int] = {}
+        for tool in order:
+            level[tool] = 1 + max((level[d] for d in dependencies[tool]), default=-1)
+        parallel_groups = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for tool in tools:
+            parallel_groups[level[tool]].append(tool)
         
-        # Estimate execution time
-        # Parallel: max of group times
-        # Sequential: sum of tool times
-        parallel_time = max([self._estimate_tool_time(t) for t in independent_tools]) if independent_tools else 0
-        sequential_time = sum([self._estimate_tool_time(t) for t in dependent_tools])
-        estimated_time = parallel_time + sequential_time
+        critical_path, estimated_time = self._critical_path(order, dependencies, p50)
+        _, estimated_time_p95 = self._critical_path(order, dependencies, p95)
         
         return ExecutionPlan(
             parallel_groups=parallel_groups,
-            sequential_groups=sequential_groups,
-            estimated_time=estimated_time
+            sequential_groups=[t for t in order if t in self.tool_dependencies],
+            estimated_time=estimated_time,
+            dependencies=dependencies,
+            order=order,
+            critical_path=critical_path,
+            estimated_time_p95=estimated_time_p95,
+            estimated_sequential_time=sum(p50.values())
         )
     
-    async def _execute_tool_group_parallel(
-        self,
-        tool_group: List[str],
-        tool_executor: Any,
-        context: Optional[Dict[str, Any]],
-        previous_results: Dict[str, ToolResult]
-    ) -> Dict[str, ToolResult]:
-        """Execute a group of tools in parallel"""
-        
-        # Create tasks for all tools in the group
-        tasks = []
-        tool_names = []
+    def _resolve_dependencies(self, tools: List[str]) -> Dict[str, List[str]]:
+        """In-request dependency edges, with any cycle broken"""
+        requested = set(tools)
+        dependencies = {
+            tool: [d for d in self.tool_dependencies.get(tool, []) if d in requested and d != tool]
+            for tool in tools
+        }
         
-        for tool_name in tool_group:
-            task = self._execute_single_tool(
-                tool_name,
-                tool_executor,
-                context,
-                previous_results
-            )
-            tasks.append(task)
-            tool_names.append(tool_name)
+        if len(self._topological_order(tools, dependencies)) < len(tools):
+            # Only edges inside a strongly connected component are on a cycle;
+            # tools downstream of one keep waiting for it
+            component = self._strongly_connected_components(tools, dependencies)
+            for tool in tools:
+                cycle = [d for d in dependencies[tool] if component[d] == component[tool]]
+                if cycle:
+                    logger.warning(f"Dependency cycle between {tool} and {sorted(cycle)}, ignoring these edges")
+                    dependencies[tool] = [d for d in dependencies[tool] if d not in cycle]
+        return dependencies
+    
+    @staticmethod
+    def _strongly_connected_components(
+        tools: List[str],
+        dependencies: Dict[str, List[str]]
+    ) -> Dict[str, int]:
+        """Tarjan's algorithm (iterative); tools on a common cycle share an id"""
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        component: Dict[str, int] = {}
+        stack: List[str] = []
+        for root in tools:
+            if root in index:
+                continue
+            work = [(root, iter(dependencies[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            while work:
+                tool, edges = work[-1]
+                dep = next(edges, None)
+                if dep is not None:
+                    if dep not in index:
+                        index[dep] = lowlink[dep] = len(index)
+                        stack.append(dep)
+                        work.append((dep, iter(dependencies[dep])))
+                    elif dep not in component:
+                        lowlink[tool] = min(lowlink[tool], index[dep])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[tool])
+                if lowlink[tool] == index[tool]:
+                    while True:
+                        member = stack.pop()
+                        component[member] = index[tool]
+                        if member == tool:
+                            break
+        return component
+    
+    @staticmethod
+    def _topological_order(
+        tools: List[str],
+        dependencies: Dict[str, List[str]],
+        priority: Optional[Dict[str, float]] = None
+    ) -> List[str]:
+        """
+        Kahn's algorithm; among ready tools the highest priority comes first,
+        then request order. Tools on a cycle are left out.
+        """
+        position = {tool: i for i, tool in enumerate(tools)}
+        priority = priority or {}
+        waiting = {tool: len(deps) for tool, deps in dependencies.items()}
+        dependents: Dict[str, List[str]] = {tool: [] for tool in tools}
+        for tool, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(tool)
         
-        # Execute all tasks in parallel
-        results_list = await asyncio.gather(*tasks, return_exceptions=True)
+        ready = [(-priority.get(t, 0.0), position[t], t) for t in tools if waiting[t] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, _, tool = heapq.heappop(ready)
+            order.append(tool)
+            for dependent in dependents[tool]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (-priority.get(dependent, 0.0), position[dependent], dependent))
+        return order
+    
+    @staticmethod
+    def _critical_path(
+        order: List[str],
+        dependencies: Dict[str, List[str]],
+        durations: Dict[str, float]
+    ) -> Tuple[List[str], float]:
+        """Longest chain through the DAG and its total duration"""
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+        for tool in order:
+            slowest = max(dependencies[tool], key=finish.__getitem__, default=None)
+            finish[tool] = (finish[slowest] if slowest else 0.0) + durations.get(tool, 0.0)
+            previous[tool] = slowest
         
-        # Combine results
-        results = {}
-        for tool_name, result in zip(tool_names, results_list):
-            if isinstance(result, Exception):
-                logger.error(f"Tool {tool_name} failed with exception: {result}")
-                results[tool_name] = ToolResult(
-                    tool_name=tool_name,
-                    status=ToolStatus.FAILED,
-                    result=None,
-                    execution_time=0.0,
-                    error=str(result)
-                )
-            else:
-                results[tool_name] = result
+        if not finish:
+            return [], 0.0
+        tool = max(order, key=finish.__getitem__)
+        total = finish[tool]
+        path = []
+        while tool is not None:
+            path.append(tool)
+            tool = previous[tool]
+        return path[::-1], total
+    
+    def _resource_semaphore(self, tool_name: str):
+        """Concurrency limit of the tool's resource class (per event loop)"""
+        resource_class = self._get_resource_class(tool_name)
+        limit = self.resource_limits.get(resource_class)
+        if not limit:
+            return contextlib.nullcontext()
         
-        return results
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphores = {}
+            self._semaphore_loop = loop
+        if resource_class not in self._semaphores:
+            self._semaphores[resource_class] = asyncio.Semaphore(limit)
+        return self._semaphores[resource_class]
     
     async def _execute_single_tool(
         self,
@@ -266,6 +453,7 @@ class ParallelExecutorService:
             )
             
             execution_time = time.time() - start_time
+            self._record_runtime(tool_name, execution_time)
             
             return ToolResult(
                 tool_name=tool_name,
@@ -276,6 +464,7 @@ class ParallelExecutorService:
             
         except asyncio.TimeoutError:
             execution_time = time.time() - start_time
+            self._record_runtime(tool_name, execution_time)  # Keeps p95 honest
             logger.warning(f"Tool {tool_name} timed out after {timeout}s")
             
             return ToolResult(
@@ -348,22 +537,34 @@ class ParallelExecutorService:
         else:
             return "unknown"
     
-    def _estimate_tool_time(self, tool_name: str) -> float:
-        """Estimate execution time for a tool"""
+    def _get_resource_class(self, tool_name: str) -> Optional[str]:
+        """Resource class whose concurrency limit applies to a tool"""
+        name = tool_name.lower()
+        # Agent-backed categories call the LLM
+        if any(k in name for k in ("agent", "llm", "internet", "supplier", "market")):
+            return "llm"
+        return self.tool_resource_classes.get(self._get_tool_type(tool_name))
+    
+    def _record_runtime(self, tool_name: str, seconds: float):
+        """Record an observed runtime for the tool and its type"""
+        self.runtime_stats.setdefault(tool_name, RuntimeStats()).record(seconds)
         tool_type = self._get_tool_type(tool_name)
+        if tool_type != "unknown":
+            self.type_runtime_stats.setdefault(tool_type, RuntimeStats()).record(seconds)
+    
+    def _estimate_tool_time(self, tool_name: str, percentile: float = 50) -> float:
+        """
+        Estimate execution time for a tool.
         
-        # Estimated times based on tool type
-        estimates = {
-            "weather": 2.0,
-            "regulatory": 3.0,
-            "farm_data": 2.0,
-            "crop_health": 1.0,
-            "planning": 2.0,
-            "sustainability": 2.0,
-            "unknown": 3.0
-        }
+        Uses the tool's observed runtimes, then those of its tool type, then
+        the static prior for the type.
+        """
+        tool_type = self._get_tool_type(tool_name)
+        for stats in (self.runtime_stats.get(tool_name), self.type_runtime_stats.get(tool_type)):
+            if stats is not None and len(stats) >= MIN_RUNTIME_SAMPLES:
+                return stats.percentile(percentile)
         
-        return estimates.get(tool_type, 3.0)
+        return self.default_tool_times.get(tool_type, 3.0)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get execution statistics"""
@@ -372,6 +573,15 @@ class ParallelExecutorService:
             "avg_time_saved": (
                 self.execution_stats["total_time_saved"] / self.execution_stats["total_executions"]
                 if self.execution_stats["total_executions"] > 0 else 0
-            )
+            ),
+            "last_critical_path": self.last_critical_path,
+            "runtime_estimates": {
+                name: {
+                    "p50": stats.percentile(50),
+                    "p95": stats.percentile(95),
+                    "samples": len(stats)
+                }
+                for name, stats in self.runtime_stats.items()
+            }
         }
 
@@ -22,6 +22,7 @@ from sqlalchemy import text
 
 from app.core.config import settings
 from app.services.error_recovery_service import ErrorRecoveryService, ErrorContext, ErrorSeverity
+from app.services.semantic_answer_cache import semantic_answer_cache
 
 logger = logging.getLogger(__name__)
 
@@ -343,6 +344,7 @@ class PerformanceOptimizationService:
     
     def __init__(self):
         self.cache = QueryCache()
+        self.semantic_cache = semantic_answer_cache
         self.performance_monitor = PerformanceMonitor()
         self.db_optimizer = DatabaseOptimizer()
         self.optimization_rules = self._load_optimization_rules()
@@ -385,6 +387,16 @@ class PerformanceOptimizationService:
                 "from_cache": True,
                 "cache_hit": True
             }
+
+        # Then paraphrases of cached questions (same scope and freshness class)
+        semantic_match = await self.semantic_cache.get(query, context, namespace="query_result")
+        if semantic_match:
+            return {
+                **semantic_match.answer,
+                "from_cache": True,
+                "cache_hit": True,
+                "semantic_similarity": semantic_match.similarity
+            }
         
         # Execute query with monitoring
         start_time = time.time()
@@ -398,6 +410,7 @@ class PerformanceOptimizationService:
             # Cache result
             ttl = self.optimization_rules["cache_ttl"].get(cache_category, 15)
             await self.cache.set(query, context, result, ttl)
+            await self.semantic_cache.set(query, context, result, namespace="query_result")
             
             return {
                 **result,
@@ -438,6 +451,7 @@ class PerformanceOptimizationService:
         """Get comprehensive performance statistics"""
         return {
             "cache_stats": self.cache.get_stats(),
+            "semantic_cache_stats": self.semantic_cache.get_stats(),
             "performance_stats": self.performance_monitor.get_performance_stats(),
             "database_stats": self.db_optimizer.get_query_stats(),
             "optimization_rules": self.optimization_rules,
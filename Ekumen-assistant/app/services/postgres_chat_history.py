@@ -1,349 +1,625 @@
 """
 PostgreSQL-backed Chat Message History for LangChain
 Integrates with existing messages table
+
+Each turn loads a window of recent messages preceded by a rolling summary of
+everything older (conversations.summary, covering messages up to
+conversations.summary_through), so history cost stays flat as threads grow:
+
+- Reads use keyset pagination on (conversation_id, created_at, id), backed
+  by idx_messages_conversation_created
+- The hot window is cached per conversation in Redis (a capped message list
+  plus a summary hash), so repeat turns skip the database
+- Each turn is written with one multi-row INSERT
+- Once HISTORY_SUMMARY_BATCH messages have fallen out of the window, they
+  are folded into the summary in the background
 """
 
+import asyncio
+import json
 import logging
-from typing import List
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID, uuid4
+
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-from datetime import datetime
+
+from app.core.config import settings
+from app.models.conversation import Message
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT = object()
+
+SUMMARY_PREFIX = "Résumé de la conversation précédente : "
+SUMMARY_PAGE_SIZE = 100          # Messages folded into the summary per LLM call
+SUMMARY_MAX_MESSAGE_CHARS = 2000
+
+Summarizer = Callable[[Optional[str], List[BaseMessage]], Awaitable[str]]
+
+
+class StoredMessage(NamedTuple):
+    """A row of the messages table"""
+    id: str
+    sender: str
+    content: str
+    created_at: datetime
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": self.id,
+            "sender": self.sender,
+            "content": self.content,
+            "created_at": self.created_at.isoformat(),
+        })
+
+    @classmethod
+    def from_json(cls, raw) -> "StoredMessage":
+        data = json.loads(raw)
+        return cls(data["id"], data["sender"], data["content"], datetime.fromisoformat(data["created_at"]))
+
+    def to_message(self) -> BaseMessage:
+        if self.sender == "user":
+            return HumanMessage(content=self.content)
+        return AIMessage(content=self.content)
+
+
+def _conversation_uuid(session_id) -> Optional[UUID]:
+    """Conversation ID as a UUID, or None if it is not one"""
+    try:
+        return UUID(session_id) if isinstance(session_id, str) else session_id
+    except ValueError:
+        logger.warning(f"Invalid UUID format for conversation_id: {session_id}")
+        return None
+
+
+async def fetch_messages(
+    db: AsyncSession,
+    conversation_id: UUID,
+    after: Optional[Tuple[datetime, Optional[str]]] = None,
+    before: Optional[Tuple[datetime, str]] = None,
+    limit: int = 100,
+    newest_first: bool = False
+) -> List[StoredMessage]:
+    """
+    One keyset page of a conversation, returned oldest first.
+
+    Args:
+        db: Database session
+        conversation_id: Conversation ID
+        after: Exclusive lower bound (created_at, id); id None compares created_at only
+        before: Exclusive upper bound (created_at, id)
+        limit: Page size
+        newest_first: Take the newest messages within the bounds instead of the oldest
+    """
+    clauses = ["conversation_id = :conversation_id"]
+    params = {"conversation_id": conversation_id, "limit": limit}
+    if after is not None:
+        params["after_ts"], after_id = after
+        if after_id is None:
+            clauses.append("created_at > :after_ts")
+        else:
+            clauses.append("(created_at, id) > (:after_ts, :after_id)")
+            params["after_id"] = UUID(after_id)
+    if before is not None:
+        clauses.append("(created_at, id) < (:before_ts, :before_id)")
+        params["before_ts"], params["before_id"] = before[0], UUID(before[1])
+
+    direction = "DESC" if newest_first else "ASC"
+    query = text(f"""
+        SELECT id, content, sender, created_at
+        FROM messages
+        WHERE {" AND ".join(clauses)}
+        ORDER BY created_at {direction}, id {direction}
+        LIMIT :limit
+    """)
+    result = await db.execute(query, params)
+    records = [
+        StoredMessage(str(row.id), row.sender, row.content, row.created_at)
+        for row in result.fetchall()
+    ]
+    return records[::-1] if newest_first else records
+
+
+async def _load_summary(db: AsyncSession, conversation_id: UUID) -> Tuple[Optional[str], Optional[datetime]]:
+    result = await db.execute(
+        text("SELECT summary, summary_through FROM conversations WHERE id = :conversation_id"),
+        {"conversation_id": conversation_id}
+    )
+    row = result.fetchone()
+    if row is None or row.summary_through is None:
+        return None, None
+    return row.summary, row.summary_through
+
+
+class HistoryWindowCache:
+    """
+    Hot history window per conversation in Redis.
+
+    Two keys per conversation: a list of the most recent messages (capped at
+    window + summary batch) and a hash with the summary and its cursor. The
+    list is only appended to while the hash exists, so a partially cached
+    window is never served.
+    """
+
+    RETRY_AFTER = 30  # Seconds to skip Redis after an error
+
+    def __init__(self, redis_client=_DEFAULT, ttl: Optional[int] = None, capacity: Optional[int] = None):
+        self.redis = self._create_redis_client() if redis_client is _DEFAULT else redis_client
+        self.ttl = ttl or settings.HISTORY_CACHE_TTL
+        self.capacity = capacity or settings.HISTORY_WINDOW_MESSAGES + settings.HISTORY_SUMMARY_BATCH
+        self._disabled_until = 0.0
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    @staticmethod
+    def _create_redis_client():
+        """redis.asyncio client (connects lazily)"""
+        try:
+            import redis.asyncio as aioredis
+
+            return aioredis.from_url(
+                settings.REDIS_URL,
+                password=settings.REDIS_PASSWORD,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ History window cache unavailable: {e}")
+            return None
+
+    @staticmethod
+    def _keys(conversation_id: str) -> Tuple[str, str]:
+        base = f"{settings.CACHE_PREFIX}history:{conversation_id}"
+        return f"{base}:messages", f"{base}:meta"
+
+    async def _run(self, operation: Callable[[], Awaitable], default=None):
+        if self.redis is None or self._disabled_until > time.time():
+            return default
+        try:
+            return await operation()
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._disabled_until = time.time() + self.RETRY_AFTER
+            logger.warning(f"⚠️ History window cache error, skipping Redis for {self.RETRY_AFTER}s: {e}")
+            return default
+
+    async def get(self, conversation_id: str):
+        """(summary, summary_through, messages) or None on a miss"""
+        messages_key, meta_key = self._keys(conversation_id)
+
+        async def read():
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lrange(messages_key, 0, -1)
+                pipe.hgetall(meta_key)
+                raw_messages, meta = await pipe.execute()
+            if not meta:
+                return None
+            meta = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                    for k, v in meta.items()}
+            through = datetime.fromisoformat(meta["through"]) if meta.get("through") else None
+            return meta.get("summary") or None, through, [StoredMessage.from_json(m) for m in raw_messages]
+
+        cached = await self._run(read)
+        self.stats["hits" if cached is not None else "misses"] += 1
+        return cached
+
+    async def populate(self, conversation_id: str, summary: Optional[str], through: Optional[datetime],
+                       messages: List[StoredMessage]):
+        """Replace the cached window of a conversation"""
+        messages_key, meta_key = self._keys(conversation_id)
+
+        async def write():
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(messages_key, meta_key)
+                if messages:
+                    pipe.rpush(messages_key, *[m.to_json() for m in messages[-self.capacity:]])
+                pipe.hset(meta_key, mapping={
+                    "summary": summary or "",
+                    "through": through.isoformat() if through else "",
+                })
+                pipe.expire(messages_key, self.ttl)
+                pipe.expire(meta_key, self.ttl)
+                await pipe.execute()
+
+        await self._run(write)
+
+    async def append(self, conversation_id: str, messages: List[StoredMessage]):
+        """Append a turn to a cached window (no-op if the window is not cached)"""
+        messages_key, meta_key = self._keys(conversation_id)
+
+        async def write():
+            if not await self.redis.exists(meta_key):
+                return
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(messages_key, *[m.to_json() for m in messages])
+                pipe.ltrim(messages_key, -self.capacity, -1)
+                pipe.expire(messages_key, self.ttl)
+                pipe.expire(meta_key, self.ttl)
+                await pipe.execute()
+
+        await self._run(write)
+
+    async def set_summary(self, conversation_id: str, summary: Optional[str], through: Optional[datetime]):
+        """Update the summary of a cached window"""
+        _, meta_key = self._keys(conversation_id)
+
+        async def write():
+            if await self.redis.exists(meta_key):
+                await self.redis.hset(meta_key, mapping={
+                    "summary": summary or "",
+                    "through": through.isoformat() if through else "",
+                })
+
+        await self._run(write)
+
+    async def invalidate(self, conversation_id: str):
+        """Drop the cached window of a conversation"""
+        await self._run(lambda: self.redis.delete(*self._keys(conversation_id)))
+
+
+# Process-wide cache
+history_window_cache = HistoryWindowCache()
+
+
+async def summarize_messages(previous_summary: Optional[str], messages: List[BaseMessage]) -> str:
+    """Fold messages into the running conversation summary (LLM)"""
+    from app.agents.agent_pool import agent_pool
+
+    conversation_text = "\n".join(
+        f"{'Utilisateur' if isinstance(m, HumanMessage) else 'Assistant'}: "
+        f"{str(m.content)[:SUMMARY_MAX_MESSAGE_CHARS]}"
+        for m in messages
+    )
+    prompt = f"""Mettez à jour le résumé de cette conversation agricole avec les nouveaux échanges.
+
+Résumé actuel:
+{previous_summary or "(aucun)"}
+
+Nouveaux échanges:
+{conversation_text}
+
+Nouveau résumé (max 200 mots) conservant le contexte agricole (exploitation, cultures,
+parcelles), les questions posées, les recommandations données et les informations
+techniques importantes:"""
+
+    llm = agent_pool.get_llm(settings.OPENAI_FALLBACK_MODEL, 0)
+    result = await llm.ainvoke(prompt)
+    return result.content.strip()
+
+
+async def refresh_summary(
+    conversation_id: UUID,
+    summarizer: Summarizer,
+    window: Optional[int] = None,
+    cache: Optional[HistoryWindowCache] = None,
+    session_factory=None,
+    page_size: int = SUMMARY_PAGE_SIZE
+) -> Optional[str]:
+    """
+    Fold every message older than the window into the conversation summary.
+
+    Walks the unsummarized messages in keyset pages, one summarizer call per
+    page, saving the summary and its cursor after each page.
+    """
+    window = window or settings.HISTORY_WINDOW_MESSAGES
+    if session_factory is None:
+        from app.core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    async with session_factory() as db:
+        summary, through = await _load_summary(db, conversation_id)
+        after = (through, None) if through else None
+
+        recent = await fetch_messages(db, conversation_id, after=after, limit=window, newest_first=True)
+        if len(recent) < window:
+            return summary
+        window_start = (recent[0].created_at, recent[0].id)
+
+        while True:
+            page = await fetch_messages(db, conversation_id, after=after, before=window_start, limit=page_size)
+            if not page:
+                break
+            summary = await summarizer(summary, [m.to_message() for m in page])
+            through = page[-1].created_at
+            after = (page[-1].created_at, page[-1].id)
+            await db.execute(
+                text("""
+                    UPDATE conversations
+                    SET summary = :summary, summary_through = :through
+                    WHERE id = :conversation_id
+                """),
+                {"summary": summary, "through": through, "conversation_id": conversation_id}
+            )
+            await db.commit()
+            logger.info(f"Summarized {len(page)} messages of conversation {conversation_id}")
+            if len(page) < page_size:
+                break
+
+    if cache is not None:
+        await cache.set_summary(str(conversation_id), summary, through)
+    return summary
+
+
+# Running summary refreshes, at most one per conversation
+_summary_tasks: Dict[str, asyncio.Task] = {}
+
+
+def schedule_summary_refresh(conversation_id: UUID, summarizer: Summarizer, window: int,
+                             cache: Optional[HistoryWindowCache]) -> asyncio.Task:
+    """Refresh a conversation summary in the background (single flight)"""
+    key = str(conversation_id)
+    task = _summary_tasks.get(key)
+    if task is not None and not task.done():
+        return task
+
+    async def run():
+        try:
+            await refresh_summary(conversation_id, summarizer, window=window, cache=cache)
+        except Exception as e:
+            logger.error(f"Failed to refresh summary of conversation {key}: {e}")
+        finally:
+            if _summary_tasks.get(key) is task:
+                del _summary_tasks[key]
+
+    task = asyncio.get_running_loop().create_task(run())
+    _summary_tasks[key] = task
+    return task
+
 
 class PostgresChatMessageHistory(BaseChatMessageHistory):
     """
     Chat message history backed by PostgreSQL
     Integrates with existing messages table for automatic history management
+
+    Loads the last `window` messages plus the rolling summary; writes each
+    turn with one multi-row INSERT. Use the async methods (aget_messages,
+    aadd_messages) from async code.
     """
-    
-    def __init__(self, session_id: str, db_session: AsyncSession):
+
+    def __init__(
+        self,
+        session_id: str,
+        db_session: AsyncSession,
+        window: Optional[int] = None,
+        summary_batch: Optional[int] = None,
+        cache: Optional[HistoryWindowCache] = _DEFAULT,
+        summarizer: Optional[Summarizer] = _DEFAULT
+    ):
         """
         Initialize PostgreSQL chat history
-        
+
         Args:
             session_id: Conversation ID (UUID as string)
             db_session: Async SQLAlchemy session
+            window: Number of recent messages loaded (default HISTORY_WINDOW_MESSAGES)
+            summary_batch: Messages beyond the window before the summary is refreshed
+            cache: Hot window cache (None disables it)
+            summarizer: Async (previous_summary, messages) -> summary (None disables summaries)
         """
         self.session_id = session_id
         self.db_session = db_session
+        self.window = window or settings.HISTORY_WINDOW_MESSAGES
+        self.summary_batch = summary_batch or settings.HISTORY_SUMMARY_BATCH
+        self.cache = history_window_cache if cache is _DEFAULT else cache
+        if summarizer is _DEFAULT:
+            summarizer = summarize_messages if settings.HISTORY_SUMMARY_ENABLED else None
+        self.summarizer = summarizer
+
+        self.summary: Optional[str] = None
         self._messages: List[BaseMessage] = []
         self._loaded = False
-    
+        self._pending: List[BaseMessage] = []
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._background: Optional[asyncio.Task] = None
+
     @property
     def messages(self) -> List[BaseMessage]:
         """
         Get messages for this conversation
-        Lazy loads from database on first access
+        Loads from database on first access when no event loop is running
         """
+        if self._loaded:
+            return self._messages
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.get_event_loop().run_until_complete(self.aget_messages())
+        raise RuntimeError(
+            "Chat history is not loaded yet; use `await aget_messages()` inside a running event loop"
+        )
+
+    async def aget_messages(self) -> List[BaseMessage]:
+        """Async get messages: rolling summary then the recent window"""
         if not self._loaded:
-            # Synchronously load messages
-            import asyncio
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If we're in an async context, we need to handle this differently
-                    # For now, return cached messages
-                    return self._messages
-                else:
-                    self._messages = loop.run_until_complete(self._load_messages())
-                    self._loaded = True
-            except Exception as e:
-                logger.error(f"Failed to load messages: {e}")
-                return []
-        
+            self._messages = await self._load_messages()
+            self._loaded = True
         return self._messages
-    
+
     async def _load_messages(self) -> List[BaseMessage]:
-        """Load messages from PostgreSQL"""
+        """Load the summary and recent window (Redis first, then PostgreSQL)"""
+        conversation_uuid = _conversation_uuid(self.session_id)
+        if conversation_uuid is None:
+            return []
+
         try:
-            # Convert session_id to UUID if it's a string
-            from uuid import UUID
-            try:
-                conversation_uuid = UUID(self.session_id) if isinstance(self.session_id, str) else self.session_id
-            except ValueError:
-                # If not a valid UUID, return empty list
-                logger.warning(f"Invalid UUID format for conversation_id: {self.session_id}")
-                return []
-
-            query = text("""
-                SELECT content, sender, created_at
-                FROM messages
-                WHERE conversation_id = :conversation_id
-                ORDER BY created_at ASC
-                LIMIT 100
-            """)
-
-            result = await self.db_session.execute(
-                query,
-                {"conversation_id": conversation_uuid}
+            cache_key = str(conversation_uuid)
+            cached = await self.cache.get(cache_key) if self.cache else None
+            if cached is not None:
+                summary, through, records = cached
+                if through is not None:
+                    records = [r for r in records if r.created_at > through]
+            else:
+                summary, through = await _load_summary(self.db_session, conversation_uuid)
+                records = await fetch_messages(
+                    self.db_session,
+                    conversation_uuid,
+                    after=(through, None) if through else None,
+                    limit=self.window + self.summary_batch,
+                    newest_first=True
+                )
+                if self.cache:
+                    await self.cache.populate(cache_key, summary, through, records)
+
+            # A full batch of unsummarized messages has fallen out of the window
+            if self.summarizer and len(records) >= self.window + self.summary_batch:
+                schedule_summary_refresh(conversation_uuid, self.summarizer, self.window, self.cache)
+
+            self.summary = summary
+            records = records[-self.window:]
+            messages = [SystemMessage(content=SUMMARY_PREFIX + summary)] if summary else []
+            messages.extend(r.to_message() for r in records)
+
+            logger.info(
+                f"Loaded {len(records)} messages{' and summary' if summary else ''} "
+                f"for conversation {self.session_id} ({'cache' if cached is not None else 'database'})"
             )
-            
-            messages = []
-            for row in result.fetchall():
-                content, sender, created_at = row
-                if sender == "user":
-                    messages.append(HumanMessage(content=content))
-                else:
-                    messages.append(AIMessage(content=content))
-            
-            logger.info(f"Loaded {len(messages)} messages for conversation {self.session_id}")
             return messages
-            
+
         except Exception as e:
             logger.error(f"Error loading messages from database: {e}")
             return []
-    
-    async def aget_messages(self) -> List[BaseMessage]:
-        """Async get messages"""
-        if not self._loaded:
-            self._messages = await self._load_messages()
-            self._loaded = True
-        return self._messages
-    
+
     def add_message(self, message: BaseMessage) -> None:
         """
         Add message to history
-        Note: This is synchronous but schedules async save
+        Messages added in the same event loop iteration are saved together
         """
-        # Add to cache immediately
         self._messages.append(message)
-        
-        # Schedule async save
-        import asyncio
+        self._pending.append(message)
+
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # Create task to save message
-                asyncio.create_task(self._save_message(message))
-            else:
-                loop.run_until_complete(self._save_message(message))
-        except Exception as e:
-            logger.error(f"Failed to save message: {e}")
-    
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.get_event_loop().run_until_complete(self.aflush())
+            return
+        if self._background is None or self._background.done():
+            self._background = loop.create_task(self.aflush())
+
     async def aadd_messages(self, messages: List[BaseMessage]) -> None:
-        """Async add multiple messages"""
-        for message in messages:
-            await self._save_message(message)
-            self._messages.append(message)
-    
-    async def _save_message(self, message: BaseMessage) -> None:
-        """Save message to PostgreSQL"""
-        try:
-            # Convert session_id to UUID if it's a string
-            from uuid import UUID
-            try:
-                conversation_uuid = UUID(self.session_id) if isinstance(self.session_id, str) else self.session_id
-            except ValueError:
-                logger.warning(f"Invalid UUID format for conversation_id: {self.session_id}")
-                return
+        """Async add a turn (one INSERT for all messages)"""
+        self._messages.extend(messages)
+        self._pending.extend(messages)
+        await self.aflush()
 
-            query = text("""
-                INSERT INTO messages
-                (conversation_id, content, sender, message_type, created_at)
-                VALUES (:conversation_id, :content, :sender, 'text', :created_at)
-            """)
+    async def aflush(self) -> None:
+        """Save pending messages"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            # Messages added while a batch is being saved go out in the next round
+            while self._pending:
+                batch, self._pending = self._pending, []
+                await self._save_messages(batch)
 
-            sender = "user" if isinstance(message, HumanMessage) else "agent"
+    async def _save_messages(self, messages: List[BaseMessage]) -> None:
+        """Save messages to PostgreSQL with a single multi-row INSERT"""
+        conversation_uuid = _conversation_uuid(self.session_id)
+        if conversation_uuid is None:
+            return
 
-            await self.db_session.execute(query, {
-                "conversation_id": conversation_uuid,
-                "content": message.content,
-                "sender": sender,
-                "created_at": datetime.utcnow()
-            })
-            await self.db_session.commit()
+        # Distinct timestamps keep the turn's order stable under keyset pagination
+        now = datetime.now(timezone.utc)
+        records = [
+            StoredMessage(
+                str(uuid4()),
+                "user" if isinstance(message, HumanMessage) else "agent",
+                message.content,
+                now + timedelta(microseconds=index)
+            )
+            for index, message in enumerate(messages)
+        ]
 
-            logger.debug(f"Saved {sender} message to conversation {self.session_id}")
+        try:
+            await self.db_session.execute(
+                Message.__table__.insert().values([
+                    {
+                        "id": UUID(record.id),
+                        "conversation_id": conversation_uuid,
+                        "content": record.content,
+                        "sender": record.sender,
+                        "message_type": "text",
+                        "created_at": record.created_at,
+                    }
+                    for record in records
+                ])
+            )
+            await self.db_session.commit()
+            logger.debug(f"Saved {len(records)} messages to conversation {self.session_id}")
 
         except Exception as e:
-            logger.error(f"Error saving message to database: {e}")
+            logger.error(f"Error saving messages to database: {e}")
             await self.db_session.rollback()
-    
+            return
+
+        if self.cache:
+            await self.cache.append(str(conversation_uuid), records)
+
     def clear(self) -> None:
         """Clear all messages for this conversation"""
-        import asyncio
         try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(self._clear_messages())
-            else:
-                loop.run_until_complete(self._clear_messages())
-        except Exception as e:
-            logger.error(f"Failed to clear messages: {e}")
-    
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.get_event_loop().run_until_complete(self.aclear())
+            return
+        self._background = loop.create_task(self.aclear())
+
     async def aclear(self) -> None:
-        """Async clear messages"""
-        await self._clear_messages()
-    
-    async def _clear_messages(self) -> None:
-        """Clear messages from database"""
+        """Async clear messages and the summary"""
+        conversation_uuid = _conversation_uuid(self.session_id)
+        if conversation_uuid is None:
+            return
+
         try:
-            query = text("""
-                DELETE FROM messages
-                WHERE conversation_id = :conversation_id
-            """)
-            
             await self.db_session.execute(
-                query,
-                {"conversation_id": self.session_id}
+                text("DELETE FROM messages WHERE conversation_id = :conversation_id"),
+                {"conversation_id": conversation_uuid}
+            )
+            await self.db_session.execute(
+                text("""
+                    UPDATE conversations
+                    SET summary = NULL, summary_through = NULL
+                    WHERE id = :conversation_id
+                """),
+                {"conversation_id": conversation_uuid}
             )
             await self.db_session.commit()
-            
+
             self._messages = []
+            self._pending = []
+            self.summary = None
             self._loaded = True
-            
+
             logger.info(f"Cleared messages for conversation {self.session_id}")
-            
+
         except Exception as e:
             logger.error(f"Error clearing messages from database: {e}")
             await self.db_session.rollback()
 
+        if self.cache:
+            await self.cache.invalidate(str(conversation_uuid))
 
-class AsyncPostgresChatMessageHistory(BaseChatMessageHistory):
+
+class AsyncPostgresChatMessageHistory(PostgresChatMessageHistory):
     """
-    Fully async version of PostgreSQL chat history
-    Use this for async contexts
+    Async PostgreSQL chat history
+    Kept for existing imports; PostgresChatMessageHistory is fully async
     """
-    
-    def __init__(self, session_id: str, db_session: AsyncSession):
-        self.session_id = session_id
-        self.db_session = db_session
-        self._messages: List[BaseMessage] = []
-        self._loaded = False
-    
-    @property
-    def messages(self) -> List[BaseMessage]:
-        """Return cached messages"""
-        return self._messages
-    
-    async def aget_messages(self) -> List[BaseMessage]:
-        """Async get messages - loads from DB if not loaded"""
-        if not self._loaded:
-            await self._load_messages()
-        return self._messages
-    
-    async def _load_messages(self) -> None:
-        """Load messages from PostgreSQL"""
-        try:
-            # Convert session_id to UUID if it's a string
-            from uuid import UUID
-            try:
-                conversation_uuid = UUID(self.session_id) if isinstance(self.session_id, str) else self.session_id
-            except ValueError:
-                logger.warning(f"Invalid UUID format for conversation_id: {self.session_id}")
-                self._messages = []
-                return
-
-            query = text("""
-                SELECT content, sender, created_at, message_metadata
-                FROM messages
-                WHERE conversation_id = :conversation_id
-                ORDER BY created_at ASC
-                LIMIT 100
-            """)
-
-            result = await self.db_session.execute(
-                query,
-                {"conversation_id": conversation_uuid}
-            )
-            
-            self._messages = []
-            for row in result.fetchall():
-                content, sender, created_at, metadata = row
-                if sender == "user":
-                    self._messages.append(HumanMessage(content=content))
-                else:
-                    self._messages.append(AIMessage(content=content))
-            
-            self._loaded = True
-            logger.info(f"Loaded {len(self._messages)} messages for conversation {self.session_id}")
-            
-        except Exception as e:
-            logger.error(f"Error loading messages: {e}")
-            self._messages = []
-    
-    def add_message(self, message: BaseMessage) -> None:
-        """Add message (sync interface)"""
-        self._messages.append(message)
-    
-    async def aadd_messages(self, messages: List[BaseMessage]) -> None:
-        """Async add multiple messages"""
-        for message in messages:
-            await self._save_message(message)
-            self._messages.append(message)
-    
-    async def _save_message(self, message: BaseMessage) -> None:
-        """Save message to database"""
-        try:
-            # Convert session_id to UUID if it's a string
-            from uuid import UUID
-            try:
-                conversation_uuid = UUID(self.session_id) if isinstance(self.session_id, str) else self.session_id
-            except ValueError:
-                logger.warning(f"Invalid UUID format for conversation_id: {self.session_id}")
-                return
-
-            query = text("""
-                INSERT INTO messages
-                (conversation_id, content, sender, message_type, created_at)
-                VALUES (:conversation_id, :content, :sender, 'text', :created_at)
-            """)
-
-            sender = "user" if isinstance(message, HumanMessage) else "agent"
-
-            await self.db_session.execute(query, {
-                "conversation_id": conversation_uuid,
-                "content": message.content,
-                "sender": sender,
-                "created_at": datetime.utcnow()
-            })
-            await self.db_session.commit()
-
-        except Exception as e:
-            logger.error(f"Error saving message: {e}")
-            await self.db_session.rollback()
-    
-    def clear(self) -> None:
-        """Clear messages (sync interface)"""
-        self._messages = []
-    
-    async def aclear(self) -> None:
-        """Async clear messages"""
-        try:
-            query = text("""
-                DELETE FROM messages
-                WHERE conversation_id = :conversation_id
-            """)
-            
-            await self.db_session.execute(
-                query,
-                {"conversation_id": self.session_id}
-            )
-            await self.db_session.commit()
-            
-            self._messages = []
-            self._loaded = True
-            
-        except Exception as e:
-            logger.error(f"Error clearing messages: {e}")
-            await self.db_session.rollback()
 
 
 def get_session_history(session_id: str, db_session: AsyncSession) -> BaseChatMessageHistory:
     """
     Factory function to get message history for a session
     Used by RunnableWithMessageHistory
-    
+
     Args:
         session_id: Conversation ID
         db_session: Database session
-        
+
     Returns:
         BaseChatMessageHistory instance
     """
-    return AsyncPostgresChatMessageHistory(session_id, db_session)
-
+    return PostgresChatMessageHistory(session_id, db_session)
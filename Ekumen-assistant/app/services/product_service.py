@@ -5,7 +5,7 @@ Handles French agricultural product database operations
 
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func, text
+from sqlalchemy import select, and_, or_, text
 from sqlalchemy.orm import selectinload
 
 from app.models.product import (
@@ -17,6 +17,7 @@ from app.schemas.product import (
     ProductSearchRequest, ProductResponse, ProductUsageResponse,
     SubstanceResponse, ProductCompatibilityResponse
 )
+from app.services.regulatory_index import database_statistics, get_regulatory_index
 
 
 class ProductService:
@@ -45,14 +46,24 @@ class ProductService:
             "offset": offset
         })
         
-        # Convert result to Product objects
-        products = []
-        for row in result:
-            product = await self.get_product_by_amm(db, row.numero_amm)
-            if product:
-                products.append(product)
-        
-        return products
+        # Load all matching products in one query, keeping the search order
+        amms = [row.numero_amm for row in result]
+        if not amms:
+            return []
+
+        products_result = await db.execute(
+            select(Product)
+            .where(Product.numero_amm.in_(amms))
+            .options(
+                selectinload(Product.substances).selectinload(ProductSubstance.substance),
+                selectinload(Product.usages),
+                selectinload(Product.conditions_emploi),
+                selectinload(Product.classifications_danger),
+                selectinload(Product.phrases_risque)
+            )
+        )
+        by_amm = {product.numero_amm: product for product in products_result.scalars()}
+        return [by_amm[amm] for amm in amms if amm in by_amm]
     
     async def get_product_by_amm(self, db: AsyncSession, numero_amm: str) -> Optional[Product]:
         """Get product by AMM number"""
@@ -267,65 +278,13 @@ class ProductService:
     
     async def get_product_statistics(self, db: AsyncSession) -> Dict[str, Any]:
         """Get product database statistics"""
-        # Total products
-        total_products_result = await db.execute(
-            select(func.count(Product.id))
-        )
-        total_products = total_products_result.scalar()
-        
-        # Authorized products
-        authorized_products_result = await db.execute(
-            select(func.count(Product.id))
-            .where(Product.etat_autorisation == AuthorizationStatus.AUTORISE)
-        )
-        authorized_products = authorized_products_result.scalar()
-        
-        # Products by type
-        mfsc_products_result = await db.execute(
-            select(func.count(Product.id))
-            .where(
-                and_(
-                    Product.type_produit == ProductType.MFSC,
-                    Product.etat_autorisation == AuthorizationStatus.AUTORISE
-                )
-            )
-        )
-        mfsc_products = mfsc_products_result.scalar()
-        
-        ppp_products_result = await db.execute(
-            select(func.count(Product.id))
-            .where(
-                and_(
-                    Product.type_produit == ProductType.PPP,
-                    Product.etat_autorisation == AuthorizationStatus.AUTORISE
-                )
-            )
-        )
-        ppp_products = ppp_products_result.scalar()
-        
-        # Total active substances
-        total_substances_result = await db.execute(
-            select(func.count(SubstanceActive.id))
-            .where(SubstanceActive.etat_autorisation == AuthorizationStatus.AUTORISE)
-        )
-        total_substances = total_substances_result.scalar()
-        
-        # Total usages
-        total_usages_result = await db.execute(
-            select(func.count(Usage.id))
-            .where(Usage.etat_usage == UsageStatus.AUTORISE)
-        )
-        total_usages = total_usages_result.scalar()
-        
-        return {
-            "total_products": total_products,
-            "authorized_products": authorized_products,
-            "mfsc_products": mfsc_products,
-            "ppp_products": ppp_products,
-            "total_substances": total_substances,
-            "total_usages": total_usages,
-            "authorization_rate": (authorized_products / total_products * 100) if total_products > 0 else 0
-        }
+        # Served from the in-memory regulatory index once loaded
+        index = get_regulatory_index()
+        if index is not None:
+            return index.statistics()
+
+        # Same EPHY tables and definitions as the index
+        return await database_statistics(db)
     
     async def get_crop_statistics(self, db: AsyncSession) -> List[Dict[str, Any]]:
         """Get statistics by crop type"""
@@ -11,6 +11,8 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from app.services.usage_meter import usage_scope
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,7 +29,8 @@ class QueryComplexityClassifier:
     """
     Classify query complexity using multiple methods:
     1. Pattern-based (fast, rule-based)
-    2. LangChain LLM-based (intelligent, context-aware)
+    2. Learned (complexity_model, trained on logged outcomes; used once trained)
+    3. LangChain LLM-based (context-aware, but a blocking LLM call; opt-in only)
     """
     
     # Simple query patterns (informational, direct answer)
@@ -92,12 +95,12 @@ class QueryComplexityClassifier:
         ]
     }
     
-    def __init__(self, use_llm: bool = True):
+    def __init__(self, use_llm: bool = False):
         """
         Initialize classifier
         
         Args:
-            use_llm: Whether to use LangChain LLM for classification (more accurate but slower)
+            use_llm: Whether to use LangChain LLM for classification (blocks for a model round trip)
         """
         self.use_llm = use_llm
         self.llm = None
@@ -178,7 +181,33 @@ Classifie les requêtes en 3 niveaux de complexité:
                 logger.warning(f"LLM classification failed: {e}. Using pattern-based result.")
                 return pattern_result
         
+        # Learned model, once one has been trained
+        learned_result = self._classify_by_model(query, pattern_result)
+        if learned_result:
+            return learned_result
+        
         return pattern_result
+
+    def _classify_by_model(self, query: str, pattern_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Learned classification (microseconds); None until a model is trained"""
+        from app.core.config import settings
+        from app.services.complexity_model import get_complexity_model
+        from app.services.model_router import complexity_label
+
+        model = get_complexity_model()
+        if model is None:
+            return None
+        
+        probability = model.predict_proba(query)
+        complexity = complexity_label(probability, settings.MODEL_ROUTER_STRONG_THRESHOLD)
+        return {
+            "complexity": complexity,
+            "confidence": round(max(probability, 1 - probability), 4),
+            "query_type": pattern_result["query_type"],
+            "reasoning": f"Learned model: {probability:.2f} probability of needing the strong model",
+            "requires_full_structure": complexity == "complex",
+            "method": "learned"
+        }
     
     def _classify_by_patterns(self, query: str) -> Dict[str, Any]:
         """Fast pattern-based classification"""
@@ -240,7 +269,8 @@ Classifie les requêtes en 3 niveaux de complexité:
             )
             
             # Get LLM response
-            response = self.llm.invoke(prompt)
+            with usage_scope(request_type="classification"):
+                response = self.llm.invoke(prompt)
             
             # Parse structured output
             result = self.parser.parse(response.content)
@@ -286,7 +316,7 @@ Classifie les requêtes en 3 niveaux de complexité:
 # Singleton instance
 _classifier_instance = None
 
-def get_classifier(use_llm: bool = True) -> QueryComplexityClassifier:
+def get_classifier(use_llm: bool = False) -> QueryComplexityClassifier:
     """Get or create classifier instance"""
     global _classifier_instance
     if _classifier_instance is None:
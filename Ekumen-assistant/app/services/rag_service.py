@@ -4,58 +4,124 @@ Integrates with the vetted, time-bound knowledge contribution system
 Enhanced with detailed source tracking and attribution
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+import threading
+import time
+from typing import Dict, Any, Optional, List, AsyncIterator, Iterable, Iterator, Union
 from datetime import datetime, timedelta
-import json
+from itertools import islice
 import re
 
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import select
 
 from app.core.config import settings
-from app.models.knowledge_base import KnowledgeBaseDocument, DocumentStatus
+from app.models.knowledge_base import KnowledgeBaseDocument
+from app.services.document_access_cache import (
+    ACL_ORG_PREFIX,
+    ACL_USER_PREFIX,
+    DocumentAccess,
+    acl_where,
+    chunk_acl_metadata,
+    document_access_cache,
+)
+from app.services.document_chunker import DocumentPage, StreamingChunker
+from app.services.embedding_cache import embedding_cache
+from app.services.retrieval_analytics_writer import retrieval_analytics_writer
 from app.services.knowledge_base_workflow_service import KnowledgeBaseWorkflowService
 
 logger = logging.getLogger(__name__)
 
 
+# Seconds before the first retry of a failed embedding batch (doubles per attempt)
+EMBED_RETRY_BASE_DELAY = 1.0
+
+# Persistent Chroma collection of the knowledge base
+CHROMA_PERSIST_DIRECTORY = "./chroma_db"
+
+# Guards lazy initialization of the shared clients
+_init_lock = threading.RLock()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class RAGService:
     """
     RAG service that integrates with the knowledge base workflow
     Filters documents by expiration, approval status, and organization permissions
+
+    Use get_rag_service(): the embedding client and Chroma collection are
+    opened lazily, once per process.
     """
     
     def __init__(self):
-        self.embeddings = None
-        self.vectorstore = None
-        self.workflow_service = KnowledgeBaseWorkflowService()
-        self._initialize_components()
+        self._embeddings = None
+        self._vectorstore = None
+        self._workflow_service = None
+        self._acl_backfill: Optional[asyncio.Task] = None
+    
+    @property
+    def embeddings(self) -> OpenAIEmbeddings:
+        """Shared embedding client"""
+        if getattr(self, "_embeddings", None) is None:
+            with _init_lock:
+                if getattr(self, "_embeddings", None) is None:
+                    self._embeddings = OpenAIEmbeddings(
+                        openai_api_key=settings.OPENAI_API_KEY
+                    )
+        return self._embeddings
+    
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        self._embeddings = embeddings
+    
+    @property
+    def embedding_model(self) -> str:
+        """Embedding model name (part of the embedding cache key)"""
+        return getattr(self.embeddings, "model", None) or "openai"
+    
+    @property
+    def vectorstore(self):
+        """Knowledge base vector store, opened on first use"""
+        if getattr(self, "_vectorstore", None) is None:
+            with _init_lock:
+                if getattr(self, "_vectorstore", None) is None:
+                    self._initialize_components()
+        return self._vectorstore
+    
+    @vectorstore.setter
+    def vectorstore(self, vectorstore):
+        self._vectorstore = vectorstore
+    
+    @property
+    def workflow_service(self) -> KnowledgeBaseWorkflowService:
+        if self._workflow_service is None:
+            self._workflow_service = KnowledgeBaseWorkflowService()
+        return self._workflow_service
     
     def _initialize_components(self):
         """Initialize LangChain components"""
         try:
-            # Initialize embeddings
-            self.embeddings = OpenAIEmbeddings(
-                openai_api_key=settings.OPENAI_API_KEY
-            )
-            
             # Initialize vector store
             try:
                 from langchain_chroma import Chroma as ChromaNew
-                self.vectorstore = ChromaNew(
+                self._vectorstore = ChromaNew(
                     embedding_function=self.embeddings,
-                    persist_directory="./chroma_db"
+                    persist_directory=CHROMA_PERSIST_DIRECTORY
                 )
                 logger.info("✅ RAG using updated langchain-chroma package")
             except ImportError:
                 from langchain.vectorstores import Chroma
-                self.vectorstore = Chroma(
+                self._vectorstore = Chroma(
                     embedding_function=self.embeddings,
-                    persist_directory="./chroma_db"
+                    persist_directory=CHROMA_PERSIST_DIRECTORY
                 )
                 logger.warning("⚠️  RAG using deprecated Chroma")
             
@@ -94,171 +160,69 @@ class RAGService:
         if not user_id or not organization_id:
             raise ValueError("Authentication required: user_id and organization_id must be provided")
         try:
-            # First, get all approved, active, non-expired documents the user can access
-            accessible_docs = await self._get_accessible_documents(
-                user_id, organization_id, db, include_ekumen_content
-            )
+            # Approved, active, non-expired documents the organization can reach (cached)
+            accessible = await document_access_cache.get(organization_id, db)
             
-            if not accessible_docs:
+            if not accessible:
                 logger.warning("No accessible documents found for user")
                 return []
             
-            # Create document IDs filter for vector search
-            doc_ids = [str(doc.id) for doc in accessible_docs]
-            
-            # Perform vector search with document filtering
             try:
-                # Use metadata filtering if supported by vector store
-                search_results = self.vectorstore.similarity_search(
+                # The ACL filter runs inside the vector index; search (and the
+                # query embedding call) runs off the event loop
+                search_results = await asyncio.to_thread(
+                    self._similarity_search,
                     query,
-                    k=k,
-                    filter={"document_id": {"$in": doc_ids}} if hasattr(self.vectorstore, 'similarity_search') else None
+                    k,
+                    acl_where(user_id, organization_id, include_ekumen_content)
                 )
-                
-                # If metadata filtering not supported, filter results manually
-                if not hasattr(self.vectorstore, 'similarity_search') or not search_results:
-                    # Fallback: get all results and filter
-                    search_results = self.vectorstore.similarity_search(query, k=k*2)
-                    search_results = [doc for doc in search_results 
-                                    if doc.metadata.get("document_id") in doc_ids]
-                    search_results = search_results[:k]
-                
-                # Enhance documents with workflow metadata
-                enhanced_docs = await self._enhance_documents_with_metadata(
-                    search_results, accessible_docs, db
-                )
-                
-                # Track document analytics - update query count and last accessed
-                await self._track_document_analytics(enhanced_docs, db, query)
-                
-                return enhanced_docs
-                
             except Exception as e:
                 logger.error(f"Vector search error: {e}")
-                # Fallback to basic search
-                return self.vectorstore.similarity_search(query, k=k)
-            
-        except Exception as e:
-            logger.error(f"Error getting relevant documents: {e}")
-            return []
-    
-    async def _get_accessible_documents(
-        self,
-        user_id: str,
-        organization_id: str,
-        db: AsyncSession,
-        include_ekumen_content: bool = True
-    ) -> List[KnowledgeBaseDocument]:
-        """
-        Get documents accessible to the authenticated user based on workflow rules
-        """
-        try:
-            # Build query for accessible documents
-            query = select(KnowledgeBaseDocument).where(
-                and_(
-                    # Document must be completed and active
-                    KnowledgeBaseDocument.processing_status == DocumentStatus.COMPLETED,
-                    KnowledgeBaseDocument.visibility.in_(["shared", "public"]),
-                    
-                    # Document must not be expired
-                    or_(
-                        KnowledgeBaseDocument.expiration_date == None,  # No expiration set
-                        KnowledgeBaseDocument.expiration_date > datetime.utcnow()
-                    ),
-                    
-                    # Document must be approved
-                    KnowledgeBaseDocument.submission_status == "approved"
-                )
-            )
-            
-            # Add organization access rules for authenticated users
-            access_conditions = []
-            
-            # User can access their own organization's documents
-            access_conditions.append(
-                KnowledgeBaseDocument.organization_id == organization_id
-            )
-            
-            # User can access shared documents from other organizations
-            access_conditions.append(
-                and_(
-                    KnowledgeBaseDocument.visibility == "shared",
-                    or_(
-                        # Shared with all organizations
-                        func.jsonb_array_length(
-                            func.coalesce(
-                                KnowledgeBaseDocument.shared_with_organizations, 
-                                func.cast('[]', JSONB)
-                            )
-                        ) == 0,  # Empty array means shared with all
-                        # Shared with specific organizations including user's org
-                        func.jsonb_array_length(
-                            func.coalesce(
-                                KnowledgeBaseDocument.shared_with_organizations, 
-                                func.cast('[]', JSONB)
-                            )
-                        ) > 0
-                    )
-                )
-            )
-            
-            # User can access documents shared with them specifically
-            access_conditions.append(
-                and_(
-                    KnowledgeBaseDocument.shared_with_users.isnot(None),
-                    func.jsonb_array_length(KnowledgeBaseDocument.shared_with_users) > 0
-                )
-            )
+                return []
             
-            # Include Ekumen-provided content (available to all authenticated users)
-            if include_ekumen_content:
-                access_conditions.append(
-                    KnowledgeBaseDocument.is_ekumen_provided == True
-                )
+            # Chunk metadata is written at ingestion; re-check the current state
+            now = time.time()
+            allowed = {}
+            for doc in search_results:
+                doc_id = doc.metadata.get("document_id")
+                access = accessible.get(doc_id)
+                if access is not None and access.allows(user_id, organization_id, include_ekumen_content, now):
+                    allowed[doc_id] = access
+            search_results = [doc for doc in search_results if doc.metadata.get("document_id") in allowed]
             
-            query = query.where(or_(*access_conditions))
+            # Enhance documents with workflow metadata
+            enhanced_docs = await self._enhance_documents_with_metadata(search_results, allowed)
             
-            result = await db.execute(query)
-            documents = result.scalars().all()
+            # Track document analytics - update query count and last accessed
+            await self._track_document_analytics(enhanced_docs, db, query)
             
-            logger.info(f"Found {len(documents)} accessible documents for user {user_id}")
-            return documents
+            return enhanced_docs
             
         except Exception as e:
-            logger.error(f"Error getting accessible documents: {e}")
+            logger.error(f"Error getting relevant documents: {e}")
             return []
     
+    def _similarity_search(self, query: str, k: int, where: Dict[str, Any]) -> List[Document]:
+        """Vector search with the query embedding served from the embedding cache"""
+        vector = embedding_cache.embed(
+            self.embedding_model, [query], lambda texts: [self.embeddings.embed_query(texts[0])]
+        )[0]
+        return self.vectorstore.similarity_search_by_vector(vector.tolist(), k=k, filter=where)
+    
     async def _enhance_documents_with_metadata(
         self,
         search_results: List[Document],
-        accessible_docs: List[KnowledgeBaseDocument],
-        db: AsyncSession
+        accessible: Dict[str, DocumentAccess]
     ) -> List[Document]:
         """
         Enhance search results with workflow metadata
         """
         try:
-            # Create lookup for accessible documents
-            doc_lookup = {str(doc.id): doc for doc in accessible_docs}
-            
             enhanced_docs = []
             for doc in search_results:
-                doc_id = doc.metadata.get("document_id")
-                if doc_id and doc_id in doc_lookup:
-                    kb_doc = doc_lookup[doc_id]
-                    
-                    # Add workflow metadata
-                    doc.metadata.update({
-                        "document_type": kb_doc.document_type.value,
-                        "organization_id": str(kb_doc.organization_id),
-                        "quality_score": kb_doc.quality_score,
-                        "version": kb_doc.version,
-                        "expiration_date": kb_doc.organization_metadata.get("expiration_date") if kb_doc.organization_metadata else None,
-                        "is_ekumen_provided": kb_doc.is_ekumen_provided,
-                        "tags": kb_doc.tags or [],
-                        "description": kb_doc.description
-                    })
-                    
+                access = accessible.get(doc.metadata.get("document_id"))
+                if access is not None:
+                    doc.metadata.update(access.workflow_metadata())
                     enhanced_docs.append(doc)
             
             return enhanced_docs
@@ -270,93 +234,141 @@ class RAGService:
     async def add_document_to_vectorstore(
         self,
         document: KnowledgeBaseDocument,
-        content: str,
+        content: Union[str, Iterable[DocumentPage]],
         db: AsyncSession
     ) -> bool:
         """
         Add a document to the vector store after approval
+        
+        Content is the document text or a stream of extracted pages, chunked
+        off the event loop. Chunks are keyed by document and content hash: identical chunks are
+        embedded once, chunks already indexed are not re-embedded, and chunks
+        no longer in the document are removed. Chunks are embedded and
+        upserted as the chunker produces them, RAG_EMBED_BATCH_SIZE *
+        RAG_EMBED_CONCURRENCY at a time, so only one window of chunks is held.
         """
         try:
-            # Split content into chunks
-            chunks = self._split_text_into_chunks(content)
-            
-            # Create documents with metadata
-            documents = []
-            for i, chunk_data in enumerate(chunks):
-                doc = Document(
-                    page_content=chunk_data["content"],
-                    metadata={
-                        "document_id": str(document.id),
-                        "chunk_index": i,
-                        "filename": document.filename,
-                        "document_type": document.document_type.value,
-                        "organization_id": str(document.organization_id),
-                        "uploaded_by": str(document.uploaded_by),
-                        "created_at": document.created_at.isoformat(),
-                        "version": document.version,
-                        "page_number": chunk_data.get("page_number"),
-                        "section": chunk_data.get("section"),
-                        "chunk_start": chunk_data.get("chunk_start", 0),
-                        "chunk_end": chunk_data.get("chunk_end", 0)
-                    }
+            existing = await asyncio.to_thread(
+                self.vectorstore.get, where={"document_id": str(document.id)}, include=[]
+            )
+            existing_ids = set(existing.get("ids") or [])
+            acl = chunk_acl_metadata(document)
+            window = settings.RAG_EMBED_BATCH_SIZE * settings.RAG_EMBED_CONCURRENCY
+            chunk_iter = enumerate(self._split_text_into_chunks(content))
+            seen = set()
+            embedded = 0
+            
+            while True:
+                # Pull the next window of chunks off the event loop
+                batch = await asyncio.to_thread(list, islice(chunk_iter, window))
+                if not batch:
+                    break
+                
+                new_chunks = []
+                for i, chunk_data in batch:
+                    chunk_id = f"{document.id}:{content_hash(chunk_data['content'])}"
+                    if chunk_id in seen:
+                        continue
+                    seen.add(chunk_id)
+                    if chunk_id not in existing_ids:
+                        new_chunks.append((chunk_id, i, chunk_data))
+                if not new_chunks:
+                    continue
+                
+                texts = [chunk_data["content"] for _, _, chunk_data in new_chunks]
+                vectors = await self._embed_in_batches(texts)
+                await asyncio.to_thread(
+                    self.vectorstore._collection.upsert,
+                    ids=[chunk_id for chunk_id, _, _ in new_chunks],
+                    embeddings=vectors,
+                    documents=texts,
+                    metadatas=[
+                        self._chunk_metadata(document, i, chunk_data, acl)
+                        for _, i, chunk_data in new_chunks
+                    ]
                 )
-                documents.append(doc)
+                embedded += len(new_chunks)
             
-            # Add to vector store
-            self.vectorstore.add_documents(documents)
+            stale_ids = [chunk_id for chunk_id in existing_ids if chunk_id not in seen]
+            if stale_ids:
+                await asyncio.to_thread(self.vectorstore.delete, ids=stale_ids)
             
             # Update document record
-            document.chunk_count = len(chunks)
+            document.chunk_count = len(seen)
             await db.commit()
             
-            logger.info(f"Added document {document.id} to vector store with {len(chunks)} chunks")
+            logger.info(
+                f"Added document {document.id} to vector store with {len(seen)} chunks "
+                f"({embedded} embedded, {len(stale_ids)} removed)"
+            )
             return True
             
         except Exception as e:
             logger.error(f"Error adding document to vector store: {e}")
             return False
     
-    def _split_text_into_chunks(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
-        """
-        Split text into overlapping chunks with page/section mapping for better retrieval
-        Returns list of dictionaries with chunk content and metadata
-        """
-        if len(text) <= chunk_size:
-            return [{
-                "content": text,
-                "page_number": self._extract_page_from_text(text),
-                "section": self._extract_section_from_text(text),
-                "chunk_start": 0,
-                "chunk_end": len(text)
-            }]
+    @staticmethod
+    def _chunk_metadata(
+        document: KnowledgeBaseDocument,
+        chunk_index: int,
+        chunk_data: Dict[str, Any],
+        acl: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        metadata = {
+            "document_id": str(document.id),
+            "chunk_index": chunk_index,
+            "content_hash": content_hash(chunk_data["content"]),
+            "filename": document.filename,
+            "document_type": document.document_type.value,
+            "organization_id": str(document.organization_id),
+            "uploaded_by": str(document.uploaded_by),
+            "created_at": document.created_at.isoformat(),
+            "version": document.version,
+            "page_number": chunk_data.get("page_number"),
+            "section": chunk_data.get("section"),
+            "chunk_start": chunk_data.get("chunk_start", 0),
+            "chunk_end": chunk_data.get("chunk_end", 0),
+            **acl
+        }
+        # Chroma rejects None metadata values
+        return {key: value for key, value in metadata.items() if value is not None}
+    
+    async def _embed_in_batches(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts through the embedding cache; uncached texts are embedded
+        in batches of RAG_EMBED_BATCH_SIZE, at most RAG_EMBED_CONCURRENCY
+        batches in flight, retrying failed batches with exponential back-off
+        """
+        vectors = await embedding_cache.aembed(self.embedding_model, texts, self._embed_uncached)
+        return [vector.tolist() for vector in vectors]
+    
+    async def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        batch_size = settings.RAG_EMBED_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.RAG_EMBED_CONCURRENCY)
         
-        chunks = []
-        start = 0
+        async def embed(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                for attempt in range(1, settings.RAG_EMBED_MAX_RETRIES + 1):
+                    try:
+                        return await self.embeddings.aembed_documents(batch)
+                    except Exception as e:
+                        if attempt == settings.RAG_EMBED_MAX_RETRIES:
+                            raise
+                        delay = EMBED_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                        logger.warning(f"Embedding batch failed (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                        await asyncio.sleep(delay)
         
-        while start < len(text):
-            end = start + chunk_size
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                # Look for sentence endings
-                for i in range(end, max(start + chunk_size - 100, start), -1):
-                    if text[i] in '.!?':
-                        end = i + 1
-                        break
-            
-            chunk_text = text[start:end].strip()
-            if chunk_text:
-                chunks.append({
-                    "content": chunk_text,
-                    "page_number": self._extract_page_from_text(chunk_text),
-                    "section": self._extract_section_from_text(chunk_text),
-                    "chunk_start": start,
-                    "chunk_end": end
-                })
-            
-            start = end - overlap
-            
-        return chunks
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(embed(batch) for batch in batches))
+        return [vector for result in results for vector in result]
+    
+    def _split_text_into_chunks(self, content: Union[str, Iterable[DocumentPage]]) -> Iterator[Dict[str, Any]]:
+        """
+        Split a document into token-budgeted chunks with page/section mapping
+        Accepts the document text or its pages as extracted by the parser
+        """
+        pages = [DocumentPage(content)] if isinstance(content, str) else content
+        return StreamingChunker().chunks(pages)
     
     async def remove_document_from_vectorstore(
         self,
@@ -383,6 +395,9 @@ class RAGService:
             
             await db.commit()
             
+            # Keep the chunks out of the index-side ACL filter as well
+            await self.sync_acl_metadata(document)
+            
             logger.info(f"Deactivated document {document_id} from vector store")
             return True
             
@@ -390,6 +405,90 @@ class RAGService:
             logger.error(f"Error removing document from vector store: {e}")
             return False
     
+    async def sync_acl_metadata(self, document: KnowledgeBaseDocument) -> int:
+        """
+        Rewrite the access-control metadata of a document's chunks
+        
+        Needed after visibility, sharing or expiration changes, and to backfill
+        chunks ingested before they carried ACL metadata. Returns the number of
+        chunks updated.
+        """
+        try:
+            return await asyncio.to_thread(self._sync_acl_metadata, str(document.id), chunk_acl_metadata(document))
+        except Exception as e:
+            logger.error(f"Error syncing ACL metadata for document {document.id}: {e}")
+            return 0
+    
+    def _sync_acl_metadata(self, document_id: str, acl: Dict[str, Any]) -> int:
+        existing = self.vectorstore.get(where={"document_id": document_id}, include=["metadatas"])
+        ids = existing.get("ids") or []
+        if not ids:
+            return 0
+        
+        metadatas = []
+        for metadata in existing["metadatas"]:
+            # Revoke shares that are gone, Chroma merges metadata on update
+            revoked = {
+                key: False for key in metadata
+                if key.startswith((ACL_ORG_PREFIX, ACL_USER_PREFIX)) and key not in acl
+            }
+            metadatas.append({**metadata, **revoked, **acl})
+        
+        self.vectorstore._collection.update(ids=ids, metadatas=metadatas)
+        return len(ids)
+    
+    async def backfill_acl_metadata(self, db: Optional[AsyncSession] = None, page_size: int = 1000) -> int:
+        """
+        Add ACL metadata to chunks ingested before chunks carried it
+        
+        Those chunks have no visibility or expires_at, so acl_where never
+        matches them. Scans the collection once and syncs every document that
+        has such chunks. Returns the number of documents updated.
+        """
+        try:
+            document_ids = await asyncio.to_thread(self._documents_missing_acl, page_size)
+            if not document_ids:
+                return 0
+            
+            query = select(KnowledgeBaseDocument).where(KnowledgeBaseDocument.id.in_(document_ids))
+            if db is not None:
+                documents = (await db.execute(query)).scalars().all()
+            else:
+                from app.core.database import AsyncSessionLocal
+                
+                async with AsyncSessionLocal() as session:
+                    documents = (await session.execute(query)).scalars().all()
+            
+            updated = 0
+            for document in documents:
+                if await self.sync_acl_metadata(document):
+                    updated += 1
+            logger.info(f"Backfilled ACL metadata for {updated} documents")
+            return updated
+        except Exception as e:
+            logger.error(f"Error backfilling ACL metadata: {e}")
+            return 0
+    
+    def _documents_missing_acl(self, page_size: int) -> List[str]:
+        collection = self.vectorstore._collection
+        missing = set()
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas = page.get("metadatas") or []
+            for metadata in metadatas:
+                if metadata and metadata.get("document_id") and not {"visibility", "expires_at"} <= metadata.keys():
+                    missing.add(metadata["document_id"])
+            if len(metadatas) < page_size:
+                return sorted(missing)
+            offset += page_size
+    
+    def start_acl_backfill(self) -> asyncio.Task:
+        """Run backfill_acl_metadata in the background"""
+        if getattr(self, "_acl_backfill", None) is None or self._acl_backfill.done():
+            self._acl_backfill = asyncio.get_running_loop().create_task(self.backfill_acl_metadata())
+        return self._acl_backfill
+    
     async def get_document_statistics(
         self,
         organization_id: Optional[str] = None,
@@ -441,67 +540,18 @@ class RAGService:
     async def _track_document_analytics(
         self,
         documents: List[Document],
-        db: AsyncSession,
+        db: AsyncSession = None,
         query: str = None
     ) -> None:
         """
         Track document analytics when documents are retrieved
-        Updates query_count, last_accessed_at, and creates analytics records with chunk-level tracking
+        Buffered by the retrieval analytics writer: query_count, last_accessed_at,
+        daily document analytics and chunk-level events are written in batches
         """
         try:
-            from datetime import datetime
-            from sqlalchemy import update
-            from app.services.analytics_service import AnalyticsService
-            from app.models.analytics import AnalyticsEvent
-            
-            analytics_service = AnalyticsService()
-            
-            for doc in documents:
-                document_id = doc.metadata.get("document_id")
-                chunk_index = doc.metadata.get("chunk_index", 0)
-                if not document_id:
-                    continue
-                
-                # Update query count and last accessed timestamp
-                await db.execute(
-                    update(KnowledgeBaseDocument)
-                    .where(KnowledgeBaseDocument.id == document_id)
-                    .values(
-                        query_count=KnowledgeBaseDocument.query_count + 1,
-                        last_accessed_at=datetime.utcnow()
-                    )
-                )
-                
-                # Create analytics record for this retrieval
-                await analytics_service.create_document_analytics_record(
-                    document_id=document_id,
-                    document_name=doc.metadata.get("filename", "Unknown Document"),
-                    retrievals=1,  # This document was retrieved once
-                    citations=0,   # Will be updated if document is cited
-                    interactions=0,  # Will be updated if user interacts with document
-                    db=db
-                )
-                
-                # Create chunk-level analytics event
-                chunk_event = AnalyticsEvent(
-                    event_type="document_retrieved",
-                    event_data={
-                        "document_id": document_id,
-                        "chunk_index": chunk_index,
-                        "chunk_content_preview": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                        "query": query,
-                        "relevance_score": doc.metadata.get("score", 0.0),
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                )
-                db.add(chunk_event)
-            
-            await db.commit()
-            logger.info(f"Updated analytics for {len(documents)} documents with chunk-level tracking")
-            
+            retrieval_analytics_writer.record_retrieval(documents, query)
         except Exception as e:
             logger.error(f"Error tracking document analytics: {e}")
-            await db.rollback()
 
     async def track_document_citation(
         self,
@@ -510,60 +560,29 @@ class RAGService:
         citation_context: str,
         confidence_score: float = None,
         chunk_index: int = None,
-        db: AsyncSession = None
+        db: AsyncSession = None,
+        document_name: str = None
     ) -> None:
         """
         Track when a document is cited in a response with enhanced confidence scoring
+        Buffered by the retrieval analytics writer like retrievals
         """
         try:
-            from app.services.analytics_service import AnalyticsService
-            
-            analytics_service = AnalyticsService()
-            
-            # Get document name for analytics
-            result = await db.execute(
-                select(KnowledgeBaseDocument).where(KnowledgeBaseDocument.id == document_id)
-            )
-            document = result.scalar_one_or_none()
-            document_name = document.filename if document else "Unknown Document"
-            
             # Calculate confidence score if not provided
             if confidence_score is None:
                 confidence_score = self._calculate_citation_confidence(query, citation_context)
             
-            # Update analytics record with citation
-            await analytics_service.create_document_analytics_record(
+            retrieval_analytics_writer.record_citation(
                 document_id=document_id,
-                document_name=document_name,
-                retrievals=0,  # No new retrieval
-                citations=1,   # This document was cited once
-                interactions=0,  # No user interaction yet
-                satisfaction_score=confidence_score,  # Use confidence as satisfaction proxy
-                db=db
-            )
-            
-            # Create analytics event for citation tracking
-            from app.models.analytics import AnalyticsEvent
-            citation_event = AnalyticsEvent(
-                event_type="document_cited",
-                event_data={
-                    "document_id": document_id,
-                    "query": query,
-                    "citation_context": citation_context,
-                    "confidence_score": confidence_score,
-                    "chunk_index": chunk_index,
-                    "citation_type": "direct" if confidence_score > 0.7 else "indirect",
-                    "timestamp": datetime.utcnow().isoformat()
-                }
+                query=query,
+                citation_context=citation_context,
+                confidence_score=confidence_score,
+                chunk_index=chunk_index,
+                document_name=document_name
             )
-            db.add(citation_event)
-            
-            await db.commit()
-            logger.info(f"Tracked citation for document {document_id} with confidence {confidence_score}")
             
         except Exception as e:
             logger.error(f"Error tracking document citation: {e}")
-            await db.rollback()
 
     def _calculate_citation_confidence(self, query: str, citation_context: str) -> float:
         """
@@ -661,7 +680,8 @@ class RAGService:
                         citation_context=doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
                         confidence_score=confidence,
                         chunk_index=chunk_index,
-                        db=db
+                        db=db,
+                        document_name=doc.metadata.get("filename")
                     )
             
             return attribution_data
@@ -870,8 +890,6 @@ class RAGService:
         Shows which chunks are most frequently accessed and their performance
         """
         try:
-            from datetime import datetime, timedelta
-            from sqlalchemy import select, func, and_
             from app.models.analytics import AnalyticsEvent
             
             # Calculate period
@@ -882,12 +900,10 @@ class RAGService:
             result = await db.execute(
                 select(AnalyticsEvent)
                 .where(
-                    and_(
-                        AnalyticsEvent.event_type == "document_retrieved",
-                        AnalyticsEvent.event_data['document_id'].astext == document_id,
-                        AnalyticsEvent.created_at >= start_date,
-                        AnalyticsEvent.created_at <= end_date
-                    )
+                    AnalyticsEvent.event_type == "document_retrieved",
+                    AnalyticsEvent.event_data['document_id'].astext == document_id,
+                    AnalyticsEvent.created_at >= start_date,
+                    AnalyticsEvent.created_at <= end_date
                 )
                 .order_by(AnalyticsEvent.created_at.desc())
             )
@@ -941,3 +957,16 @@ class RAGService:
         except Exception as e:
             logger.error(f"Error getting chunk analytics: {e}")
             return {"error": str(e)}
+
+
+_rag_service = None
+
+
+def get_rag_service() -> RAGService:
+    """Get global RAG service instance"""
+    global _rag_service
+    if _rag_service is None:
+        with _init_lock:
+            if _rag_service is None:
+                _rag_service = RAGService()
+    return _rag_service
@@ -0,0 +1,707 @@
+"""
+In-memory EPHY regulatory index
+
+Read-optimized copy of the EPHY products, active substances and usages
+(doses, DAR, ZNT) kept in process memory, so AMM lookups, product name
+search and crop -> usage queries on the treatment-plan path don't hit the
+database:
+
+- AMM number -> product (dict)
+- product names (and second commercial names): sorted keys for prefix
+  search, trigram postings for substring search
+- crop -> usages inverted index, AMM -> usages
+- substance -> products
+
+The index is loaded at startup from a snapshot (versioned JSON,
+zlib-compressed; data only, so reading it back cannot run code) or built
+from the database when there is none, and rebuilt after each EPHY import. A rebuild
+produces a new RegulatoryIndex and swaps the store's reference in one
+assignment, so readers always see a complete index.
+"""
+
+import asyncio
+import bisect
+import logging
+import json
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.ephy import (
+    EtatAutorisation, Produit, ProductType, ProduitSubstance, SubstanceActive, Titulaire, UsageProduit
+)
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_VERSION = 2
+
+# etat_autorisation / etat_usage values meaning "authorized"
+AUTHORIZED_STATES = {"AUTORISE", "Autorisé", "Autorise"}
+
+# Substance etat_autorisation values meaning "approved" (EU inscription)
+APPROVED_SUBSTANCE_STATES = {"INSCRITE", "Inscrite", *AUTHORIZED_STATES}
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+# Memoized crop/substance filter results per index
+MEMO_SIZE = 2048
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normalize a product, substance or crop name for index lookups
+
+    "K-OBIOL EC 25" -> "k obiol ec 25", "Blé tendre" -> "ble tendre"
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    ascii_value = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", ascii_value).strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _state(value: Any) -> Optional[str]:
+    """Enum or string authorization state -> string"""
+    if value is None:
+        return None
+    return getattr(value, "value", value)
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _date_to_json(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _product_from_json(row: List[Any]) -> "ProductRecord":
+    """Snapshot row -> ProductRecord (JSON has no dates or tuples)"""
+    product = ProductRecord._make(row)
+    return product._replace(
+        date_retrait_produit=(
+            date.fromisoformat(product.date_retrait_produit)
+            if product.date_retrait_produit is not None else None
+        ),
+        seconds_noms_commerciaux=tuple(product.seconds_noms_commerciaux),
+        substances=tuple(tuple(s) for s in product.substances),
+    )
+
+
+class ProductRecord(NamedTuple):
+    """Indexed EPHY product"""
+    numero_amm: str
+    nom_produit: str
+    type_produit: Optional[str]
+    titulaire: Optional[str]
+    etat_autorisation: Optional[str]
+    date_retrait_produit: Optional[date]
+    seconds_noms_commerciaux: Tuple[str, ...]
+    substances: Tuple[Tuple[str, Optional[float], Optional[str]], ...]  # (name, concentration, unit)
+
+    @property
+    def authorized(self) -> bool:
+        return self.etat_autorisation in AUTHORIZED_STATES
+
+
+class UsageRecord(NamedTuple):
+    """Indexed product usage (one crop/target authorization)"""
+    numero_amm: str
+    identifiant_usage_lib_court: Optional[str]
+    type_culture_libelle: Optional[str]
+    dose_min_par_apport: Optional[float]
+    dose_max_par_apport: Optional[float]
+    dose_retenue: Optional[float]
+    dose_retenue_unite: Optional[str]
+    delai_avant_recolte_jour: Optional[int]
+    nombre_max_application: Optional[int]
+    intervalle_minimum_entre_applications_jour: Optional[int]
+    znt_aquatique_m: Optional[float]
+    znt_arthropodes_non_cibles_m: Optional[float]
+    znt_plantes_non_cibles_m: Optional[float]
+    etat_usage: Optional[str]
+    condition_emploi: Optional[str]
+
+    @property
+    def authorized(self) -> bool:
+        return self.etat_usage in AUTHORIZED_STATES
+
+
+class SubstanceRecord(NamedTuple):
+    """Indexed active substance"""
+    nom_substance: str
+    numero_cas: Optional[str]
+    etat_autorisation: Optional[str]
+
+    @property
+    def authorized(self) -> bool:
+        return self.etat_autorisation in APPROVED_SUBSTANCE_STATES
+
+
+async def database_statistics(db: AsyncSession) -> Dict[str, Any]:
+    """
+    RegulatoryIndex.statistics() computed in SQL, for when the index is not loaded
+
+    Counts the same EPHY tables with the same authorization states as the
+    index, so both describe the same dataset.
+    """
+    authorized = Produit.etat_autorisation.in_(
+        [state for state in EtatAutorisation if state.value in AUTHORIZED_STATES]
+    )
+    result = await db.execute(
+        select(
+            func.count(Produit.numero_amm).label("total_products"),
+            func.count(Produit.numero_amm).filter(authorized).label("authorized_products"),
+            func.count(Produit.numero_amm).filter(
+                authorized, Produit.type_produit == ProductType.MFSC
+            ).label("mfsc_products"),
+            func.count(Produit.numero_amm).filter(
+                authorized, Produit.type_produit == ProductType.PPP
+            ).label("ppp_products"),
+            select(func.count(SubstanceActive.id))
+            .where(SubstanceActive.etat_autorisation.in_(sorted(APPROVED_SUBSTANCE_STATES)))
+            .scalar_subquery().label("total_substances"),
+            select(func.count(UsageProduit.id))
+            .where(UsageProduit.etat_usage.in_(sorted(AUTHORIZED_STATES)))
+            .scalar_subquery().label("total_usages"),
+        )
+    )
+    stats = dict(result.one()._mapping)
+    total = stats["total_products"]
+    stats["authorization_rate"] = (stats["authorized_products"] / total * 100) if total > 0 else 0
+    return stats
+
+
+class RegulatoryIndex:
+    """
+    Immutable in-memory index over EPHY products, substances and usages
+
+    Build once (from_database / load) and share; never mutate in place.
+    """
+
+    def __init__(
+        self,
+        products: Iterable[ProductRecord],
+        usages: Iterable[UsageRecord],
+        substances: Iterable[SubstanceRecord],
+        built_at: Optional[float] = None
+    ):
+        self.products: Dict[str, ProductRecord] = {p.numero_amm: p for p in products}
+        self.usages: Tuple[UsageRecord, ...] = tuple(usages)
+        self.substances: Dict[str, SubstanceRecord] = {
+            normalize_text(s.nom_substance): s for s in substances
+        }
+        self.built_at = built_at or time.time()
+        self._memo: Dict[Tuple[str, str], Any] = {}
+        self._build()
+
+    def _build(self):
+        """Derive lookup structures from the records"""
+        usages_by_amm: Dict[str, List[int]] = defaultdict(list)
+        crop_usages: Dict[str, List[int]] = defaultdict(list)
+        for i, usage in enumerate(self.usages):
+            usages_by_amm[usage.numero_amm].append(i)
+            if usage.type_culture_libelle:
+                crop_usages[normalize_text(usage.type_culture_libelle)].append(i)
+        self._usages_by_amm = {amm: tuple(ids) for amm, ids in usages_by_amm.items()}
+        self._crop_usages = {crop: tuple(ids) for crop, ids in crop_usages.items()}
+
+        names: Set[Tuple[str, str]] = set()
+        names_by_amm: Dict[str, Tuple[str, ...]] = {}
+        trigrams: Dict[str, Set[str]] = defaultdict(set)
+        substance_products: Dict[str, List[str]] = defaultdict(list)
+        for product in self.products.values():
+            product_names = tuple({
+                normalize_text(name)
+                for name in (product.nom_produit, *product.seconds_noms_commerciaux)
+                if name
+            })
+            names_by_amm[product.numero_amm] = product_names
+            for name in product_names:
+                names.add((name, product.numero_amm))
+                for gram in _trigrams(name):
+                    trigrams[gram].add(product.numero_amm)
+            for substance, _, _ in product.substances:
+                substance_products[normalize_text(substance)].append(product.numero_amm)
+
+        self._names = sorted(names)
+        self._name_keys = [name for name, _ in self._names]
+        self._names_by_amm = names_by_amm
+        self._sort_keys = {
+            amm: (normalize_text(product.nom_produit), amm) for amm, product in self.products.items()
+        }
+        self._trigrams = {gram: frozenset(amms) for gram, amms in trigrams.items()}
+        self._substance_products = {s: tuple(amms) for s, amms in substance_products.items()}
+        self._statistics = self._compute_statistics()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, numero_amm: str) -> Optional[ProductRecord]:
+        """Product by AMM number"""
+        return self.products.get(numero_amm.strip())
+
+    def search(
+        self,
+        term: Optional[str] = None,
+        product_type: Optional[str] = None,
+        crop: Optional[str] = None,
+        substance: Optional[str] = None,
+        authorized_only: bool = True,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[ProductRecord]:
+        """
+        Search products
+
+        Args:
+            term: AMM number, or part of a product name (name prefix matches
+                rank first, then substring matches)
+            product_type: PPP, MFSC, ...
+            crop: Only products with an authorized usage on a matching crop
+            substance: Only products containing a matching active substance
+            authorized_only: Skip withdrawn products
+            limit: Maximum results
+            offset: Results to skip
+
+        Returns:
+            Matching products
+        """
+        crop_amms = self._crop_products(crop) if crop else None
+        substance_amms = self._substance_matches(substance) if substance else None
+
+        if term:
+            candidates = self._match_term(term)
+        elif crop_amms is not None:
+            candidates = self._memoized(("crop_sorted", crop), lambda: self._sorted(crop_amms))
+        elif substance_amms is not None:
+            candidates = self._memoized(
+                ("substance_sorted", substance), lambda: self._sorted(substance_amms)
+            )
+        else:
+            candidates = self._memoized(("all", ""), lambda: self._sorted(self.products))
+
+        wanted_type = product_type.upper() if product_type else None
+
+        results: List[ProductRecord] = []
+        skipped = 0
+        for amm in candidates:
+            product = self.products[amm]
+            if authorized_only and not product.authorized:
+                continue
+            if wanted_type and product.type_produit != wanted_type:
+                continue
+            if crop_amms is not None and amm not in crop_amms:
+                continue
+            if substance_amms is not None and amm not in substance_amms:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            results.append(product)
+            if len(results) >= limit:
+                break
+        return results
+
+    def usages_for(
+        self,
+        numero_amm: str,
+        crop: Optional[str] = None,
+        authorized_only: bool = True
+    ) -> List[UsageRecord]:
+        """Usages of a product, optionally restricted to crops matching `crop`"""
+        crop_key = normalize_text(crop) if crop else None
+        usages = []
+        for i in self._usages_by_amm.get(numero_amm, ()):
+            usage = self.usages[i]
+            if authorized_only and not usage.authorized:
+                continue
+            if crop_key and crop_key not in normalize_text(usage.type_culture_libelle or ""):
+                continue
+            usages.append(usage)
+        return usages
+
+    def usages_for_crop(self, crop: str, authorized_only: bool = True) -> List[UsageRecord]:
+        """All usages on crops matching `crop` (e.g. "ble" matches "Blé tendre")"""
+        return [
+            self.usages[i]
+            for i in self._crop_usage_ids(crop)
+            if not authorized_only or self.usages[i].authorized
+        ]
+
+    def authorized_crops(self, numero_amm: str) -> Set[str]:
+        """Crop labels with an authorized usage for a product"""
+        return {
+            usage.type_culture_libelle
+            for usage in self.usages_for(numero_amm)
+            if usage.type_culture_libelle
+        }
+
+    def znt(self, numero_amm: str, crop: Optional[str] = None) -> Dict[str, Optional[float]]:
+        """Largest buffer zones (ZNT, metres) over a product's authorized usages"""
+        usages = self.usages_for(numero_amm, crop)
+
+        def largest(field: str) -> Optional[float]:
+            values = [getattr(u, field) for u in usages if getattr(u, field) is not None]
+            return max(values) if values else None
+
+        return {
+            "aquatique": largest("znt_aquatique_m"),
+            "arthropodes_non_cibles": largest("znt_arthropodes_non_cibles_m"),
+            "plantes_non_cibles": largest("znt_plantes_non_cibles_m"),
+        }
+
+    def products_by_substance(
+        self,
+        substance: str,
+        authorized_only: bool = True,
+        limit: int = 50
+    ) -> List[ProductRecord]:
+        """Products containing an active substance (name substring match)"""
+        return self.search(substance=substance, authorized_only=authorized_only, limit=limit)
+
+    def statistics(self) -> Dict[str, Any]:
+        """Product database statistics (same keys as ProductService.get_product_statistics)"""
+        return dict(self._statistics)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _match_term(self, term: str) -> List[str]:
+        """AMMs matching a search term, best matches first"""
+        stripped = term.strip()
+        if stripped in self.products:
+            return [stripped]
+
+        query = normalize_text(term)
+        if not query:
+            return []
+
+        matched: Dict[str, None] = {}  # insertion-ordered set
+        start = bisect.bisect_left(self._name_keys, query)
+        for name, amm in self._names[start:]:
+            if not name.startswith(query):
+                break
+            matched.setdefault(amm)
+
+        if len(query) >= 3:
+            postings = sorted(
+                (self._trigrams.get(gram, _EMPTY) for gram in _trigrams(query)),
+                key=len
+            )
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            substring = [
+                amm for amm in candidates
+                if amm not in matched and any(query in n for n in self._names_by_amm[amm])
+            ]
+            for amm in self._sorted(substring):
+                matched.setdefault(amm)
+
+        return list(matched)
+
+    def _crop_usage_ids(self, crop: str) -> List[int]:
+        crop_key = normalize_text(crop)
+        if crop_key in self._crop_usages:
+            return list(self._crop_usages[crop_key])
+        ids: List[int] = []
+        for label, usage_ids in self._crop_usages.items():
+            if crop_key in label:
+                ids.extend(usage_ids)
+        return ids
+
+    def _crop_products(self, crop: str) -> FrozenSet[str]:
+        return self._memoized(("crop", crop), lambda: frozenset(
+            self.usages[i].numero_amm
+            for i in self._crop_usage_ids(crop)
+            if self.usages[i].authorized
+        ))
+
+    def _substance_matches(self, substance: str) -> FrozenSet[str]:
+        def compute() -> FrozenSet[str]:
+            query = normalize_text(substance)
+            amms: Set[str] = set()
+            for name, products in self._substance_products.items():
+                if query in name:
+                    amms.update(products)
+            return frozenset(amms)
+
+        return self._memoized(("substance", substance), compute)
+
+    def _sorted(self, amms: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(sorted(amms, key=self._sort_keys.__getitem__))
+
+    def _memoized(self, key: Tuple[str, str], compute) -> Any:
+        """Cache a filter result (the index is immutable, so entries never go stale)"""
+        value = self._memo.get(key)
+        if value is None:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            value = self._memo[key] = compute()
+        return value
+
+    def _compute_statistics(self) -> Dict[str, Any]:
+        authorized = [p for p in self.products.values() if p.authorized]
+        by_type = Counter(p.type_produit for p in authorized)
+        total = len(self.products)
+        return {
+            "total_products": total,
+            "authorized_products": len(authorized),
+            "mfsc_products": by_type.get("MFSC", 0),
+            "ppp_products": by_type.get("PPP", 0),
+            "total_substances": sum(1 for s in self.substances.values() if s.authorized),
+            "total_usages": sum(1 for u in self.usages if u.authorized),
+            "authorization_rate": (len(authorized) / total * 100) if total > 0 else 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    async def from_database(cls, db: AsyncSession) -> "RegulatoryIndex":
+        """
+        Build the index from the EPHY tables (four column-only queries)
+
+        Only the queries run on the event loop; turning rows into records
+        and building the postings happens in a worker thread.
+        """
+        started = time.perf_counter()
+
+        substance_links = (await db.execute(
+            select(
+                ProduitSubstance.numero_amm,
+                SubstanceActive.nom_substance,
+                ProduitSubstance.concentration,
+                ProduitSubstance.unite_concentration,
+            ).join(SubstanceActive, ProduitSubstance.substance_id == SubstanceActive.id)
+        )).all()
+
+        product_rows = (await db.execute(
+            select(
+                Produit.numero_amm,
+                Produit.nom_produit,
+                Produit.type_produit,
+                Titulaire.nom,
+                Produit.etat_autorisation,
+                Produit.date_retrait_produit,
+                Produit.seconds_noms_commerciaux,
+            ).outerjoin(Titulaire, Produit.titulaire_id == Titulaire.id)
+        )).all()
+
+        usage_rows = (await db.execute(
+            select(
+                UsageProduit.numero_amm,
+                UsageProduit.identifiant_usage_lib_court,
+                UsageProduit.type_culture_libelle,
+                UsageProduit.dose_min_par_apport,
+                UsageProduit.dose_max_par_apport,
+                UsageProduit.dose_retenue,
+                UsageProduit.dose_retenue_unite,
+                UsageProduit.delai_avant_recolte_jour,
+                UsageProduit.nombre_max_application,
+                UsageProduit.intervalle_minimum_entre_applications_jour,
+                UsageProduit.znt_aquatique_m,
+                UsageProduit.znt_arthropodes_non_cibles_m,
+                UsageProduit.znt_plantes_non_cibles_m,
+                UsageProduit.etat_usage,
+                UsageProduit.condition_emploi,
+            )
+        )).all()
+
+        substance_rows = (await db.execute(
+            select(SubstanceActive.nom_substance, SubstanceActive.numero_cas, SubstanceActive.etat_autorisation)
+        )).all()
+
+        index = await asyncio.to_thread(
+            cls._from_rows, substance_links, product_rows, usage_rows, substance_rows
+        )
+        logger.info(
+            f"✅ Regulatory index built from database: {len(index.products)} products, "
+            f"{len(index.usages)} usages in {time.perf_counter() - started:.2f}s"
+        )
+        return index
+
+    @classmethod
+    def _from_rows(cls, substance_links, product_rows, usage_rows, substance_rows) -> "RegulatoryIndex":
+        """Build the index from the rows of from_database()'s queries"""
+        substances_by_amm: Dict[str, List[Tuple[str, Optional[float], Optional[str]]]] = defaultdict(list)
+        for amm, name, concentration, unit in substance_links:
+            substances_by_amm[amm].append((name, _float(concentration), unit))
+
+        products = [
+            ProductRecord(
+                numero_amm=amm,
+                nom_produit=name,
+                type_produit=_state(product_type),
+                titulaire=holder,
+                etat_autorisation=_state(etat),
+                date_retrait_produit=withdrawal,
+                seconds_noms_commerciaux=tuple(
+                    n.strip() for n in (second_names or "").split("|") if n.strip()
+                ),
+                substances=tuple(substances_by_amm.get(amm, ())),
+            )
+            for amm, name, product_type, holder, etat, withdrawal, second_names in product_rows
+        ]
+
+        usages = [
+            UsageRecord(
+                amm, short_label, crop,
+                _float(dose_min), _float(dose_max), _float(dose), unit,
+                dar, max_applications, interval,
+                _float(znt_water), _float(znt_arthropods), _float(znt_plants),
+                _state(etat), condition,
+            )
+            for (
+                amm, short_label, crop, dose_min, dose_max, dose, unit,
+                dar, max_applications, interval,
+                znt_water, znt_arthropods, znt_plants, etat, condition,
+            ) in usage_rows
+        ]
+
+        substances = [SubstanceRecord(name, cas, _state(etat)) for name, cas, etat in substance_rows]
+        return cls(products, usages, substances)
+
+    def save(self, path: str):
+        """Write a snapshot (atomically, via a temporary file)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "built_at": self.built_at,
+            "products": [
+                p._replace(date_retrait_produit=_date_to_json(p.date_retrait_produit))
+                for p in self.products.values()
+            ],
+            "usages": list(self.usages),
+            "substances": list(self.substances.values()),
+        }
+        payload = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(payload, 6))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RegulatoryIndex"]:
+        """Load a snapshot written by save(); None if missing or incompatible"""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            blob = f.read()
+        try:
+            snapshot = json.loads(zlib.decompress(blob))
+        except (zlib.error, ValueError):
+            logger.info("Regulatory index snapshot has an old format, ignoring it")
+            return None
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.info("Regulatory index snapshot has an old format, ignoring it")
+            return None
+        return cls(
+            (_product_from_json(p) for p in snapshot["products"]),
+            (UsageRecord._make(u) for u in snapshot["usages"]),
+            (SubstanceRecord._make(s) for s in snapshot["substances"]),
+            built_at=snapshot["built_at"],
+        )
+
+
+class RegulatoryIndexStore:
+    """
+    Holds the current RegulatoryIndex and refreshes it
+
+    `index` is None until the first load completes; callers fall back to
+    the database in that case.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path or settings.REGULATORY_INDEX_SNAPSHOT
+        self.index: Optional[RegulatoryIndex] = None
+        self._refresh_lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._load_task: Optional[asyncio.Task] = None
+        self.stats = {"snapshot_loads": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def start(self):
+        """Load in the background (call from the running event loop)"""
+        self._loop = asyncio.get_running_loop()
+        if self._load_task is None or self._load_task.done():
+            self._load_task = self._loop.create_task(self.load())
+
+    async def load(self) -> Optional[RegulatoryIndex]:
+        """
+        Load the snapshot, then refresh from the database if it is missing
+        or older than REGULATORY_INDEX_MAX_AGE
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            index = await asyncio.to_thread(RegulatoryIndex.load, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not read regulatory index snapshot: {e}")
+            index = None
+
+        if index is not None:
+            self.index = index
+            self.stats["snapshot_loads"] += 1
+            logger.info(f"✅ Regulatory index loaded from snapshot: {len(index)} products")
+            if time.time() - index.built_at < settings.REGULATORY_INDEX_MAX_AGE:
+                return index
+
+        return await self.refresh()
+
+    async def refresh(self) -> Optional[RegulatoryIndex]:
+        """Rebuild from the database, swap it in and write a new snapshot"""
+        from app.core.database import AsyncSessionLocal
+
+        async with self._refresh_lock:
+            try:
+                async with AsyncSessionLocal() as db:
+                    index = await RegulatoryIndex.from_database(db)
+            except Exception as e:
+                self.stats["refresh_errors"] += 1
+                logger.error(f"Regulatory index refresh failed: {e}")
+                return self.index
+
+            self.index = index
+            self.stats["refreshes"] += 1
+            try:
+                await asyncio.to_thread(index.save, self.snapshot_path)
+            except Exception as e:
+                logger.warning(f"Could not write regulatory index snapshot: {e}")
+            return index
+
+    def schedule_refresh(self, change_set: Optional[Dict[str, Any]] = None):
+        """
+        Refresh in the background; safe to call from other threads
+
+        Registered as an EPHY change-set listener callback.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.refresh(), self._loop)
+
+
+# Process-wide index (loaded in app startup)
+regulatory_index_store = RegulatoryIndexStore()
+
+
+def get_regulatory_index() -> Optional[RegulatoryIndex]:
+    """Current regulatory index, or None if not loaded yet"""
+    return regulatory_index_store.index
@@ -0,0 +1,338 @@
+"""
+Retrieval Analytics Writer - buffers retrieval and citation analytics off the request path
+
+Searches only record events in memory; a background task flushes them every
+RETRIEVAL_ANALYTICS_FLUSH_INTERVAL seconds (or sooner once a batch is full):
+
+- Counters are aggregated per document per interval, so a flush issues one
+  query_count update per document and one document_analytics row per
+  document and day, whatever the number of retrievals
+- Chunk-level events go to analytics_events in one multi-row insert
+- The event buffer is bounded; when it is full new events are dropped and
+  counted (counters are never dropped, they are one entry per document)
+
+Retrieval latency therefore does not depend on analytics write throughput.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, insert, select, update
+
+from app.core.config import settings
+from app.models.analytics import AnalyticsEvent, DocumentAnalytics
+from app.models.knowledge_base import KnowledgeBaseDocument
+
+logger = logging.getLogger(__name__)
+
+
+def _preview(text: str, length: int = 200) -> str:
+    return text[:length] + "..." if len(text) > length else text
+
+
+def _as_uuid(value: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+@dataclass
+class DocumentCounters:
+    """Analytics accumulated for one document during one interval"""
+
+    document_name: Optional[str] = None
+    retrievals: int = 0
+    citations: int = 0
+    satisfaction_sum: float = 0.0
+    satisfaction_count: int = 0
+    last_accessed_at: Optional[datetime] = None
+
+    def merge(self, other: "DocumentCounters"):
+        self.document_name = self.document_name or other.document_name
+        self.retrievals += other.retrievals
+        self.citations += other.citations
+        self.satisfaction_sum += other.satisfaction_sum
+        self.satisfaction_count += other.satisfaction_count
+        if other.last_accessed_at and (
+            self.last_accessed_at is None or other.last_accessed_at > self.last_accessed_at
+        ):
+            self.last_accessed_at = other.last_accessed_at
+
+
+class RetrievalAnalyticsWriter:
+    """
+    In-memory analytics queue with periodic batched flushes.
+
+    record_* methods are synchronous and never touch the database.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_events: Optional[int] = None,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval or settings.RETRIEVAL_ANALYTICS_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.RETRIEVAL_ANALYTICS_BATCH_SIZE
+        self.max_events = max_events or settings.RETRIEVAL_ANALYTICS_MAX_EVENTS
+        self._counters: Dict[str, DocumentCounters] = {}
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats = {
+            "recorded_events": 0,
+            "dropped_events": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "flushed_events": 0,
+            "flushed_documents": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def start(self) -> bool:
+        """Start the flush task (needs a running event loop)"""
+        if self._worker is not None and not self._worker.done():
+            return False
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        logger.info("✅ Retrieval analytics writer started")
+        return True
+
+    async def stop(self):
+        """Stop the flush task and write what is still buffered"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        await self.flush()
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self.start()
+
+    def record_retrieval(self, documents: List[Any], query: Optional[str] = None):
+        """Record retrieved chunks (LangChain documents with document_id metadata)"""
+        self._ensure_started()
+        now = datetime.utcnow()
+        for doc in documents:
+            document_id = doc.metadata.get("document_id")
+            if not document_id:
+                continue
+            counters = self._counters_for(document_id, doc.metadata.get("filename"))
+            counters.retrievals += 1
+            counters.last_accessed_at = now
+            self._add_event("document_retrieved", {
+                "document_id": document_id,
+                "chunk_index": doc.metadata.get("chunk_index", 0),
+                "chunk_content_preview": _preview(doc.page_content),
+                "query": query,
+                "relevance_score": doc.metadata.get("score", 0.0),
+                "timestamp": now.isoformat(),
+            })
+
+    def record_citation(
+        self,
+        document_id: str,
+        query: str,
+        citation_context: str,
+        confidence_score: float,
+        chunk_index: Optional[int] = None,
+        document_name: Optional[str] = None,
+    ):
+        """Record a document cited in a response; confidence doubles as satisfaction"""
+        self._ensure_started()
+        counters = self._counters_for(document_id, document_name)
+        counters.citations += 1
+        counters.satisfaction_sum += confidence_score
+        counters.satisfaction_count += 1
+        self._add_event("document_cited", {
+            "document_id": document_id,
+            "query": query,
+            "citation_context": citation_context,
+            "confidence_score": confidence_score,
+            "chunk_index": chunk_index,
+            "citation_type": "direct" if confidence_score > 0.7 else "indirect",
+            "timestamp": datetime.utcnow().isoformat(),
+        })
+
+    def record_event(self, event_type: str, event_data: Dict[str, Any]):
+        """Record any other analytics event, written with the next batch"""
+        self._ensure_started()
+        self._add_event(event_type, {**event_data, "timestamp": datetime.utcnow().isoformat()})
+
+    def _counters_for(self, document_id: str, document_name: Optional[str]) -> DocumentCounters:
+        counters = self._counters.get(str(document_id))
+        if counters is None:
+            counters = self._counters[str(document_id)] = DocumentCounters()
+        counters.document_name = counters.document_name or document_name
+        return counters
+
+    def _add_event(self, event_type: str, event_data: Dict[str, Any]):
+        if len(self._events) >= self.max_events:
+            self.stats["dropped_events"] += 1
+            return
+        self._events.append({"event_type": event_type, "event_data": event_data})
+        self.stats["recorded_events"] += 1
+        if len(self._events) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Write buffered analytics in one transaction
+
+        Returns:
+            Number of events written
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._counters and not self._events:
+                return 0
+            counters, self._counters = self._counters, {}
+            events = list(self._events)
+            self._events.clear()
+
+            start = time.perf_counter()
+            try:
+                await self._persist(counters, events)
+            except Exception as e:
+                logger.error(f"Error flushing retrieval analytics: {e}")
+                self.stats["failed_flushes"] += 1
+                # The transaction rolled back: counters go back into the buffer,
+                # events only as far as the buffer has room
+                for document_id, pending in counters.items():
+                    self._counters_for(document_id, None).merge(pending)
+                room = max(self.max_events - len(self._events), 0)
+                self._events.extendleft(reversed(events[:room]))
+                self.stats["dropped_events"] += len(events) - min(room, len(events))
+                return 0
+
+            self.stats["flushes"] += 1
+            self.stats["flushed_events"] += len(events)
+            self.stats["flushed_documents"] += len(counters)
+            self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return len(events)
+
+    async def _persist(self, counters: Dict[str, DocumentCounters], events: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            await self._update_document_counters(db, counters)
+            await self._upsert_document_analytics(db, counters)
+            if events:
+                await db.execute(insert(AnalyticsEvent.__table__), events)
+            await db.commit()
+
+    async def _update_document_counters(self, db, counters: Dict[str, DocumentCounters]):
+        table = KnowledgeBaseDocument.__table__
+        rows = [
+            {"b_id": document_uuid, "b_count": c.retrievals, "b_accessed": c.last_accessed_at}
+            for document_id, c in counters.items()
+            if c.retrievals and (document_uuid := _as_uuid(document_id)) is not None
+        ]
+        if not rows:
+            return
+        await db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(query_count=table.c.query_count + bindparam("b_count"), last_accessed_at=bindparam("b_accessed")),
+            rows,
+        )
+
+    async def _upsert_document_analytics(self, db, counters: Dict[str, DocumentCounters]):
+        """Add the interval's counts to each document's daily analytics row"""
+        period_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        period_end = period_start + timedelta(days=1)
+
+        result = await db.execute(
+            select(DocumentAnalytics).where(
+                and_(
+                    DocumentAnalytics.document_id.in_(list(counters)),
+                    DocumentAnalytics.period_start == period_start,
+                    DocumentAnalytics.period_end == period_end,
+                )
+            )
+        )
+        existing = {record.document_id: record for record in result.scalars().all()}
+
+        missing_names = [
+            document_uuid for document_id, c in counters.items()
+            if document_id not in existing and not c.document_name
+            and (document_uuid := _as_uuid(document_id)) is not None
+        ]
+        names: Dict[str, str] = {}
+        if missing_names:
+            rows = await db.execute(
+                select(KnowledgeBaseDocument.id, KnowledgeBaseDocument.filename)
+                .where(KnowledgeBaseDocument.id.in_(missing_names))
+            )
+            names = {str(document_id): filename for document_id, filename in rows.all()}
+
+        for document_id, c in counters.items():
+            record = existing.get(document_id)
+            if record is None:
+                db.add(DocumentAnalytics(
+                    document_id=document_id,
+                    document_name=c.document_name or names.get(document_id, "Unknown Document"),
+                    document_audience="public",  # Default for now
+                    period_start=period_start,
+                    period_end=period_end,
+                    period_type="daily",
+                    retrievals=c.retrievals,
+                    citations=c.citations,
+                    user_interactions=0,
+                    satisfaction_score=c.satisfaction_sum / c.satisfaction_count if c.satisfaction_count else None,
+                    satisfaction_count=c.satisfaction_count,
+                ))
+                continue
+
+            record.retrievals += c.retrievals
+            record.citations += c.citations
+            if c.satisfaction_count:
+                total = record.satisfaction_count + c.satisfaction_count
+                previous = float(record.satisfaction_score or 0) * record.satisfaction_count
+                record.satisfaction_score = (previous + c.satisfaction_sum) / total
+                record.satisfaction_count = total
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "buffered_events": len(self._events),
+            "buffered_documents": len(self._counters),
+        }
+
+
+# Process-wide analytics writer
+retrieval_analytics_writer = RetrievalAnalyticsWriter()
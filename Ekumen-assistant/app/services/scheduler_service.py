@@ -13,7 +13,7 @@ from threading import Thread
 
 from app.core.database import AsyncSessionLocal
 from app.services.knowledge_base_workflow_service import KnowledgeBaseWorkflowService
-from app.services.rag_service import RAGService
+from app.services.rag_service import get_rag_service
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +25,7 @@ class SchedulerService:
     
     def __init__(self):
         self.workflow_service = KnowledgeBaseWorkflowService()
-        self.rag_service = RAGService()
+        self.rag_service = get_rag_service()
         self.is_running = False
         self.scheduler_thread = None
     
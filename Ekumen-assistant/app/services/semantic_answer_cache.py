@@ -0,0 +1,440 @@
+"""
+Semantic Answer Cache - serve answers to paraphrased questions
+
+"Quelle météo demain à Dourdan ?" and "météo de demain sur Dourdan" are the
+same question; an exact-key cache runs the orchestrator for both. Here
+answers are looked up by meaning:
+
+- Queries are normalized (case, accents, punctuation) and embedded through
+  the shared embedding cache; an identical normalized query skips the
+  embedding call entirely
+- Entries are partitioned by scope (organization or user, farm, agent) and by the
+  freshness class of the data the answer depends on; within a partition the
+  nearest cached query is found by cosine similarity over a normalized
+  vector matrix
+- Freshness classes have their own TTL and similarity threshold
+  (SEMANTIC_CACHE_TTLS, SEMANTIC_CACHE_THRESHOLDS): weather answers expire
+  in minutes, regulatory ones in a day
+- Anchors that embeddings barely separate (numbers, dates, place names)
+  must match exactly: "demain" never serves "après-demain"
+- Callers that store different answer types (streamed text, result dicts)
+  pass their own namespace, so they never read each other's entries
+
+The cache is in process and bounded to SEMANTIC_CACHE_MAX_ENTRIES (LRU).
+replay() runs logged queries through a cache to pick thresholds offline;
+scripts/evaluate_semantic_cache.py drives it.
+"""
+
+import itertools
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache, embedding_cache as shared_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT = object()
+
+EmbedFn = Callable[[List[str]], Awaitable[Sequence[Sequence[float]]]]
+
+# Freshness classes, matched on the normalized query; a query matching several
+# takes the one that expires first
+FRESHNESS_PATTERNS: Dict[str, re.Pattern] = {
+    "weather": re.compile(
+        r"\b(meteo|temps qu il|pluie|pleu\w*|precipitation\w*|vent\w*|temperature\w*|gel\w*|orage\w*|"
+        r"grele|prevision\w*|humidite|ensoleillement|rosee|secheresse)\b"
+    ),
+    "farm_data": re.compile(
+        r"\b(parcelle\w*|ilot\w*|mon exploitation|mes cultures|ma ferme|rendement\w*|assolement|intervention\w*)\b"
+    ),
+    "regulatory": re.compile(
+        r"\b(amm|znt|dar|homologu\w*|reglement\w*|autoris\w*|interdi\w*|dose\w*|phyto\w*|ephy|"
+        r"conformite|delai de rentree|melange\w*|usage\w*)\b"
+    ),
+}
+
+# Words fixing when or which; two queries only share an answer if they agree on them
+ANCHOR_RE = re.compile(
+    r"\b(aujourd hui|apres demain|demain|hier|ce soir|ce matin|cette nuit|cette semaine|semaine prochaine|"
+    r"ce week end|lundi|mardi|mercredi|jeudi|vendredi|samedi|dimanche|\d+(?:_\d+)?)\b"
+)
+NAME_RE = re.compile(r"\b[A-ZÀ-Ý][\w'-]+")
+# Capitalized only because they start a sentence
+SENTENCE_STARTERS = frozenset(
+    "a au aux ce ces comment combien dans de des dis donne donnez dois en est et faut il je la le les ma "
+    "meteo mes mon nous on ou peut peux pour pourquoi puis qu quand que quel quelle quelles quels "
+    "sur un une y".split()
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, accent-free, punctuation-free form of a query ("2,5" and "2.5" become "2_5")"""
+    text = re.sub(r"(\d)[.,](\d)", r"\1_\2", query.lower())
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", text).split())
+
+
+def query_anchors(query: str) -> FrozenSet[str]:
+    """Dates, numbers and capitalized names (places, products) in a query"""
+    normalized = normalize_query(query)
+    anchors = {match.group(1) for match in ANCHOR_RE.finditer(normalized)}
+    names = (normalize_query(match.group()) for match in NAME_RE.finditer(query))
+    anchors.update(name for name in names if name and name not in SENTENCE_STARTERS)
+    return frozenset(anchors)
+
+
+def freshness_class(normalized_query: str) -> str:
+    """Freshness class of the data answering a normalized query"""
+    ttls = settings.SEMANTIC_CACHE_TTLS
+    matches = [name for name, pattern in FRESHNESS_PATTERNS.items() if pattern.search(normalized_query)]
+    if not matches:
+        return "general"
+    return min(matches, key=lambda name: ttls.get(name, ttls["general"]))
+
+
+def cache_scope(context: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+    """
+    (owner, farm, agent) an answer may be shared within
+
+    The owner is the organization, or the user when there is none: answers
+    may draw on an organization's knowledge base and must not leave it.
+    """
+    context = context or {}
+    return (
+        str(context.get("organization_id") or context.get("org_id") or context.get("user_id") or ""),
+        str(context.get("farm_siret") or context.get("location") or ""),
+        str(context.get("agent_type") or ""),
+    )
+
+
+@dataclass
+class CachedAnswer:
+    id: int
+    query: str
+    normalized: str
+    anchors: FrozenSet[str]
+    vector: np.ndarray
+    answer: Any
+    expires_at: float
+    hits: int = 0
+
+
+@dataclass
+class SemanticMatch:
+    answer: Any
+    query: str  # Cached query that matched
+    similarity: float
+    freshness: str
+    exact: bool
+
+
+class _Partition:
+    """Entries of one scope and freshness class, their vectors rows of one matrix"""
+
+    def __init__(self):
+        self.entries: List[CachedAnswer] = []
+        self.positions: Dict[int, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+
+    def add(self, entry: CachedAnswer):
+        size = len(self.entries)
+        if self._vectors is None:
+            self._vectors = np.empty((8, entry.vector.shape[0]), dtype=np.float32)
+        elif size == len(self._vectors):
+            # Grow by doubling so adding stays amortized O(dimensions)
+            self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+        self._vectors[size] = entry.vector
+        self.positions[entry.id] = size
+        self.entries.append(entry)
+
+    def remove(self, entry_ids: Iterable[int]):
+        for entry_id in entry_ids:
+            index = self.positions.pop(entry_id, None)
+            if index is None:
+                continue
+            # The last row takes the removed one's place
+            last = self.entries.pop()
+            if last.id != entry_id:
+                self.entries[index] = last
+                self._vectors[index] = self._vectors[len(self.entries)]
+                self.positions[last.id] = index
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._vectors[:len(self.entries)]
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by query meaning within a scope and freshness class.
+
+    Embedding failures are treated as misses: the cache never fails a query.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Any = _DEFAULT,
+        embedding_cache: Optional[EmbeddingCache] = _DEFAULT,
+        max_entries: Optional[int] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        ttls: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._embed_fn = None if embed_fn is _DEFAULT else embed_fn
+        self.embedding_cache = shared_embedding_cache if embedding_cache is _DEFAULT else embedding_cache
+        self.model = settings.SEMANTIC_CACHE_EMBEDDING_MODEL
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.thresholds = thresholds or settings.SEMANTIC_CACHE_THRESHOLDS
+        self.ttls = ttls or settings.SEMANTIC_CACHE_TTLS
+        self.clock = clock
+        self.enabled = settings.SEMANTIC_CACHE_ENABLED
+
+        self.partitions: Dict[Tuple[Tuple[str, ...], str], _Partition] = {}
+        self.exact: Dict[Tuple[Tuple[str, ...], str, str], CachedAnswer] = {}
+        self._lru: "OrderedDict[int, Tuple[Tuple[Tuple[str, ...], str], CachedAnswer]]" = OrderedDict()
+        self._ids = itertools.count()
+        self.stats = {
+            "lookups": 0, "exact_hits": 0, "semantic_hits": 0, "misses": 0,
+            "near_misses": 0, "anchor_rejections": 0, "stores": 0,
+            "evictions": 0, "expired": 0, "embedding_errors": 0,
+        }
+        self.domain_stats: Dict[str, Dict[str, int]] = {}
+        self._hit_similarity = 0.0
+
+    def _threshold(self, freshness: str) -> float:
+        return self.thresholds.get(freshness, self.thresholds["general"])
+
+    def _ttl(self, freshness: str) -> int:
+        return self.ttls.get(freshness, self.ttls["general"])
+
+    async def _default_embed(self, texts: List[str]) -> Sequence[Sequence[float]]:
+        if self._embed_fn is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings(model=self.model, openai_api_key=settings.OPENAI_API_KEY)
+            self._embed_fn = embeddings.aembed_documents
+        return await self._embed_fn(texts)
+
+    async def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        try:
+            if self.embedding_cache is not None:
+                vector = (await self.embedding_cache.aembed(self.model, [normalized], self._default_embed))[0]
+            else:
+                vector = np.asarray((await self._default_embed([normalized]))[0], dtype=np.float32)
+        except Exception as e:
+            self.stats["embedding_errors"] += 1
+            logger.warning(f"⚠️ Semantic cache embedding failed, treating as a miss: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        return np.asarray(vector, dtype=np.float32) / norm if norm else None
+
+    def _record(self, freshness: str, outcome: str):
+        stats = self.domain_stats.setdefault(freshness, {"lookups": 0, "hits": 0})
+        stats["lookups"] += 1
+        if outcome != "misses":
+            stats["hits"] += 1
+        self.stats[outcome] += 1
+
+    def _touch(self, entry: CachedAnswer):
+        if entry.id in self._lru:
+            self._lru.move_to_end(entry.id)
+
+    def _expire(self, partition_key, partition: _Partition, now: float):
+        expired = [entry for entry in partition.entries if entry.expires_at <= now]
+        if expired:
+            for entry in expired:
+                self._forget(partition_key, entry)
+            partition.remove([entry.id for entry in expired])
+            self.stats["expired"] += len(expired)
+
+    def _forget(self, partition_key, entry: CachedAnswer):
+        self._lru.pop(entry.id, None)
+        exact_key = (partition_key[0], partition_key[1], entry.normalized)
+        if self.exact.get(exact_key) is entry:
+            del self.exact[exact_key]
+
+    async def get(
+        self, query: str, context: Optional[Dict[str, Any]] = None, namespace: str = ""
+    ) -> Optional[SemanticMatch]:
+        """Cached answer to the query or a paraphrase of it, within the namespace and the context's scope"""
+        if not self.enabled:
+            return None
+        self.stats["lookups"] += 1
+        normalized = normalize_query(query)
+        freshness = freshness_class(normalized)
+        scope = (namespace, *cache_scope(context))
+        partition_key = (scope, freshness)
+        now = self.clock()
+
+        partition = self.partitions.get(partition_key)
+        if partition is not None:
+            self._expire(partition_key, partition, now)
+        if not partition or not partition.entries:
+            self._record(freshness, "misses")
+            return None
+
+        entry = self.exact.get((scope, freshness, normalized))
+        if entry is not None:
+            return self._hit(entry, 1.0, freshness, exact=True)
+
+        vector = await self._embed(normalized)
+        if vector is None:
+            self._record(freshness, "misses")
+            return None
+
+        threshold = self._threshold(freshness)
+        anchors = query_anchors(query)
+        scores = partition.matrix @ vector
+        for index in np.argsort(-scores):
+            similarity = float(scores[index])
+            if similarity < threshold:
+                if similarity >= threshold - 0.05:
+                    self.stats["near_misses"] += 1
+                break
+            candidate = partition.entries[index]
+            if candidate.anchors != anchors:
+                self.stats["anchor_rejections"] += 1
+                continue
+            return self._hit(candidate, similarity, freshness, exact=False)
+
+        self._record(freshness, "misses")
+        return None
+
+    def _hit(self, entry: CachedAnswer, similarity: float, freshness: str, exact: bool) -> SemanticMatch:
+        entry.hits += 1
+        self._touch(entry)
+        self._record(freshness, "exact_hits" if exact else "semantic_hits")
+        self._hit_similarity += similarity
+        return SemanticMatch(entry.answer, entry.query, similarity, freshness, exact)
+
+    async def set(self, query: str, context: Optional[Dict[str, Any]], answer: Any, namespace: str = "") -> bool:
+        """Cache an answer; returns False when it could not be embedded"""
+        if not self.enabled or answer is None:
+            return False
+        normalized = normalize_query(query)
+        if not normalized:
+            return False
+        freshness = freshness_class(normalized)
+        scope = (namespace, *cache_scope(context))
+        partition_key = (scope, freshness)
+
+        existing = self.exact.get((scope, freshness, normalized))
+        if existing is not None:
+            existing.answer = answer
+            existing.expires_at = self.clock() + self._ttl(freshness)
+            self._touch(existing)
+            return True
+
+        vector = await self._embed(normalized)
+        if vector is None:
+            return False
+
+        entry = CachedAnswer(
+            id=next(self._ids),
+            query=query,
+            normalized=normalized,
+            anchors=query_anchors(query),
+            vector=vector,
+            answer=answer,
+            expires_at=self.clock() + self._ttl(freshness),
+        )
+        self.partitions.setdefault(partition_key, _Partition()).add(entry)
+        self.exact[(scope, freshness, normalized)] = entry
+        self._lru[entry.id] = (partition_key, entry)
+        self.stats["stores"] += 1
+
+        while len(self._lru) > self.max_entries:
+            _, (old_key, old_entry) = self._lru.popitem(last=False)
+            self._forget(old_key, old_entry)
+            self.partitions[old_key].remove([old_entry.id])
+            if not self.partitions[old_key].entries:
+                del self.partitions[old_key]
+            self.stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        self.partitions.clear()
+        self.exact.clear()
+        self._lru.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "entries": len(self._lru),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "avg_hit_similarity": round(self._hit_similarity / hits, 4) if hits else 0.0,
+            "by_freshness": {
+                name: {**counts, "hit_rate": round(counts["hits"] / counts["lookups"], 4) if counts["lookups"] else 0.0}
+                for name, counts in self.domain_stats.items()
+            },
+        }
+
+
+async def replay(
+    log: Iterable[Dict[str, Any]],
+    embed_fn: EmbedFn,
+    thresholds: Sequence[float],
+    embedding_cache: Optional[EmbeddingCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Offline evaluation: replay logged queries through a cache per threshold
+
+    Args:
+        log: Time-ordered dicts with query, an optional context (scope),
+            at (epoch seconds, for TTLs) and label (an intent id; queries
+            with the same label accept each other's answers)
+        embed_fn: Computes vectors for a list of texts
+        thresholds: Similarity thresholds to try, for every freshness class
+
+    Returns:
+        Per threshold: hit rate overall and per freshness class, and the
+        share of labelled hits that served another intent's answer
+    """
+    log = list(log)
+    embedding_cache = embedding_cache or EmbeddingCache(store=None)
+    report = []
+    for threshold in thresholds:
+        now = [0.0]
+        cache = SemanticAnswerCache(
+            embed_fn=embed_fn,
+            embedding_cache=embedding_cache,
+            max_entries=max(len(log), 1),
+            thresholds={name: threshold for name in [*FRESHNESS_PATTERNS, "general"]},
+            clock=lambda: now[0],
+        )
+        cache.enabled = True
+        labelled_hits = wrong_hits = 0
+        for i, item in enumerate(log):
+            now[0] = float(item.get("at", i))
+            label = item.get("label")
+            match = await cache.get(item["query"], item.get("context"))
+            if match is None:
+                await cache.set(item["query"], item.get("context"), {"label": label, "query": item["query"]})
+            elif label is not None and match.answer["label"] is not None:
+                labelled_hits += 1
+                wrong_hits += match.answer["label"] != label
+        stats = cache.get_stats()
+        report.append({
+            "threshold": threshold,
+            "lookups": stats["lookups"],
+            "hit_rate": stats["hit_rate"],
+            "by_freshness": {name: counts["hit_rate"] for name, counts in stats["by_freshness"].items()},
+            "labelled_hits": labelled_hits,
+            "wrong_hit_rate": round(wrong_hits / labelled_hits, 4) if labelled_hits else 0.0,
+        })
+    return report
+
+
+# Process-wide cache
+semantic_answer_cache = SemanticAnswerCache()
@@ -18,6 +18,7 @@ from app.services.advanced_langchain_service import AdvancedLangChainService
 from app.services.langgraph_workflow_service import LangGraphWorkflowService
 # ConditionalRoutingService deleted - routing now handled by orchestrator agent
 from app.services.fast_query_service import FastQueryService
+from app.services.token_stream import FrameCoalescer
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +32,19 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         self.message_id = message_id
         self.tokens = []
         self.current_step = ""
+        # Tokens go out as coalesced delta frames, never as the growing answer
+        self.frames = FrameCoalescer(message_id=message_id)
+    
+    async def _send(self, message_data: Dict[str, Any]) -> None:
+        if self.websocket:
+            await self.websocket.send_text(json.dumps(message_data))
+        elif self.callback:
+            await self.callback(message_data)
+    
+    async def _flush_tokens(self) -> None:
+        frame = self.frames.flush()
+        if frame:
+            await self._send(frame)
     
     async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs) -> None:
         """Called when LLM starts generating"""
@@ -44,33 +58,20 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         if hasattr(self, 'message_id') and self.message_id:
             message_data["message_id"] = self.message_id
 
-        if self.websocket:
-            await self.websocket.send_text(json.dumps(message_data))
-        elif self.callback:
-            await self.callback(message_data)
+        await self._send(message_data)
     
     async def on_llm_new_token(self, token: str, **kwargs) -> None:
         """Called when LLM generates a new token"""
         self.tokens.append(token)
 
-        message_data = {
-            "type": "token",
-            "token": token,
-            "partial_response": "".join(self.tokens),
-            "timestamp": datetime.now().isoformat()
-        }
-
-        # Add message_id if available
-        if hasattr(self, 'message_id') and self.message_id:
-            message_data["message_id"] = self.message_id
-
-        if self.websocket:
-            await self.websocket.send_text(json.dumps(message_data))
-        elif self.callback:
-            await self.callback(message_data)
+        frame = self.frames.push(token)
+        if frame:
+            await self._send(frame)
     
     async def on_llm_end(self, response, **kwargs) -> None:
         """Called when LLM finishes generating"""
+        await self._flush_tokens()
+
         message_data = {
             "type": "complete",
             "message": "✅ Analyse terminée",
@@ -82,14 +83,12 @@ class StreamingCallbackHandler(BaseCallbackHandler):
         if hasattr(self, 'message_id') and self.message_id:
             message_data["message_id"] = self.message_id
 
-        if self.websocket:
-            await self.websocket.send_text(json.dumps(message_data))
-        elif self.callback:
-            await self.callback(message_data)
+        await self._send(message_data)
     
     async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs) -> None:
         """Called when a tool starts executing"""
         tool_name = serialized.get("name", "Unknown")
+        await self._flush_tokens()
         
         if self.websocket:
             await self.websocket.send_text(json.dumps({
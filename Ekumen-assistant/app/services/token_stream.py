@@ -0,0 +1,253 @@
+"""
+Token Stream - delta-only answer streaming with frame coalescing and resume
+
+Streamed answers are sent as deltas, never as the growing answer:
+
+    {"type": "token", "text": "<new text>", "seq": 3, "offset": 412, "message_id": "..."}
+
+- offset is the position of text in the answer; a client that reconnects
+  resumes by asking for the answer from the length it already has
+- Tokens are coalesced into one frame per STREAM_FRAME_INTERVAL_MS, sent
+  early once STREAM_FRAME_MAX_CHARS are pending
+
+FrameCoalescer does this for callback handlers that receive one token at a
+time. StreamSession decouples generation from delivery: the producer appends
+to the session, each connection reads frames from its own offset, and the
+answer keeps being generated (and saved) if the client drops. A session
+ends when its producer task does, even if the task was cancelled or failed
+without closing it. Sessions live in this process for STREAM_RESUME_TTL
+seconds after they end, so resuming needs the same worker (sticky sessions).
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def token_frame(text: str, seq: int, offset: int, message_id: Optional[str] = None) -> Dict[str, Any]:
+    frame = {"type": "token", "text": text, "seq": seq, "offset": offset}
+    if message_id:
+        frame["message_id"] = message_id
+    return frame
+
+
+class FrameCoalescer:
+    """Groups tokens into delta frames on a time/size budget"""
+
+    def __init__(
+        self,
+        message_id: Optional[str] = None,
+        interval_ms: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.message_id = message_id
+        self.interval = (interval_ms if interval_ms is not None else settings.STREAM_FRAME_INTERVAL_MS) / 1000
+        self.max_chars = max_chars or settings.STREAM_FRAME_MAX_CHARS
+        self.pending: List[str] = []
+        self.pending_chars = 0
+        self.offset = 0  # Characters already framed
+        self.seq = 0
+        self.last_frame = time.monotonic()
+
+    def push(self, token: str) -> Optional[Dict[str, Any]]:
+        """Add a token; returns a frame when the budget is used up"""
+        if not token:
+            return None
+        self.pending.append(token)
+        self.pending_chars += len(token)
+        if self.pending_chars >= self.max_chars or time.monotonic() - self.last_frame >= self.interval:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Frame whatever is pending"""
+        if not self.pending:
+            return None
+        text = "".join(self.pending)
+        frame = token_frame(text, self.seq, self.offset, self.message_id)
+        self.seq += 1
+        self.offset += len(text)
+        self.pending, self.pending_chars = [], 0
+        self.last_frame = time.monotonic()
+        return frame
+
+
+class StreamSession:
+    """One answer being generated, readable from any offset by any connection"""
+
+    def __init__(self, message_id: str, owner: Optional[str] = None):
+        self.message_id = message_id
+        self.owner = owner  # e.g. the conversation, checked on resume
+        self.chunks: List[str] = []
+        self.starts: List[int] = []  # Answer offset of each chunk
+        self.length = 0
+        self.closed = False
+        self.final_event: Optional[Dict[str, Any]] = None
+        self.closed_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def append(self, text: str):
+        if not text or self.closed:
+            return
+        self.chunks.append(text)
+        self.starts.append(self.length)
+        self.length += len(text)
+        self._notify()
+
+    def close(self, final_event: Optional[Dict[str, Any]] = None):
+        """End the answer; final_event (e.g. done or error) is sent after the last frame"""
+        if self.closed:
+            return
+        self.closed = True
+        self.final_event = final_event
+        self.closed_at = time.monotonic()
+        self._notify()
+
+    def attach(self, task: asyncio.Task) -> asyncio.Task:
+        """Set the producer task; the session is closed with an error if the task ends without closing it"""
+        self.task = task
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        if self.closed:
+            return
+        if task.cancelled():
+            message = "Answer generation cancelled"
+        elif task.exception() is not None:
+            message = str(task.exception())
+        else:
+            message = "Answer generation ended without completing"
+        self.close({"type": "error", "message": message, "message_id": self.message_id})
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def text_from(self, offset: int) -> str:
+        """Answer text from offset (only the chunks after it are copied)"""
+        if offset >= self.length:
+            return ""
+        i = bisect.bisect_right(self.starts, offset) - 1
+        return self.chunks[i][offset - self.starts[i]:] + "".join(self.chunks[i + 1:])
+
+    async def frames(
+        self,
+        offset: int = 0,
+        interval_ms: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Delta frames from offset until the answer ends
+
+        Everything pending is sent once max_chars are pending, or interval_ms
+        after the previous frame.
+        """
+        interval = (interval_ms if interval_ms is not None else settings.STREAM_FRAME_INTERVAL_MS) / 1000
+        max_chars = max_chars or settings.STREAM_FRAME_MAX_CHARS
+        offset = max(0, min(offset, self.length))
+        seq = 0
+        last_frame = time.monotonic() - interval
+
+        while True:
+            pending = self.length - offset
+            wait: Optional[float] = None
+            if pending:
+                wait = interval - (time.monotonic() - last_frame)
+                if self.closed or pending >= max_chars or wait <= 0:
+                    text = self.text_from(offset)
+                    yield token_frame(text, seq, offset, self.message_id)
+                    seq += 1
+                    offset += len(text)
+                    last_frame = time.monotonic()
+                    continue
+            elif self.closed:
+                return
+
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def collect_answer(session: StreamSession, events: AsyncIterable[Any]) -> Tuple[str, List[Any]]:
+    """
+    Append the string events of an LCEL answer stream to a session
+
+    Returns:
+        (answer, context documents) - the final event's answer when it has one
+    """
+    source_docs: List[Any] = []
+    final_answer = None
+    async for event in events:
+        # Final event carries full answer and context
+        if isinstance(event, dict) and "final" in event:
+            final_payload = event.get("final") or {}
+            answer = final_payload.get("answer")
+            if isinstance(answer, str) and answer:
+                final_answer = answer
+            context = final_payload.get("context")
+            if isinstance(context, list):
+                source_docs = context
+            continue
+        if isinstance(event, str):
+            session.append(event)
+
+    # If no tokens were streamed but there is a final answer, stream it once
+    if session.length == 0 and final_answer:
+        session.append(final_answer)
+    return final_answer or session.text, source_docs
+
+
+class StreamRegistry:
+    """Process-wide sessions by message ID, kept STREAM_RESUME_TTL seconds after they end"""
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl or settings.STREAM_RESUME_TTL
+        self.sessions: Dict[str, StreamSession] = {}
+        self.stats = {"opened": 0, "resumed": 0, "resume_misses": 0}
+
+    def open(self, message_id: str, owner: Optional[str] = None) -> StreamSession:
+        self._expire()
+        session = StreamSession(message_id, owner)
+        self.sessions[message_id] = session
+        self.stats["opened"] += 1
+        return session
+
+    def resume(self, message_id: str, owner: Optional[str] = None) -> Optional[StreamSession]:
+        """Session to resume, if still known and owned by owner"""
+        self._expire()
+        session = self.sessions.get(message_id)
+        if session is None or (owner is not None and session.owner != owner):
+            self.stats["resume_misses"] += 1
+            return None
+        self.stats["resumed"] += 1
+        return session
+
+    def _expire(self):
+        for session in self.sessions.values():
+            # Producers that finished without closing their session end it now
+            if not session.closed and session.task is not None and session.task.done():
+                session._task_done(session.task)
+        cutoff = time.monotonic() - self.ttl
+        for message_id in [m for m, s in self.sessions.items() if s.closed and s.closed_at < cutoff]:
+            del self.sessions[message_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "active": sum(1 for s in self.sessions.values() if not s.closed)}
+
+
+# Process-wide stream sessions
+stream_registry = StreamRegistry()
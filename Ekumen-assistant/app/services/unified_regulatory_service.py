@@ -7,7 +7,7 @@ import logging
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, or_
 from dataclasses import dataclass
 
 from app.models.ephy import (
@@ -16,6 +16,7 @@ from app.models.ephy import (
 )
 from app.services.configuration_service import get_configuration_service
 from app.services.product_service import ProductService
+from app.services.regulatory_index import AUTHORIZED_STATES, get_regulatory_index
 
 logger = logging.getLogger(__name__)
 
@@ -121,8 +122,29 @@ class UnifiedRegulatoryService:
         product_type: str = None
     ) -> List[Product]:
         """Search products in EPHY database"""
+        index = get_regulatory_index()
+        if index is not None:
+            # Match in memory, then load the ORM rows by primary key
+            amms = [
+                record.numero_amm
+                for record in index.search(
+                    term=product_name,
+                    product_type=product_type,
+                    substance=active_ingredient,
+                    limit=50
+                )
+            ]
+            if not amms:
+                return []
+            result = await db.execute(select(Product).where(Product.numero_amm.in_(amms)))
+            by_amm = {product.numero_amm: product for product in result.scalars()}
+            return [by_amm[amm] for amm in amms if amm in by_amm]
+
+        # Same "authorized" states as the in-memory index
         query = select(Product).where(
-            Product.etat_autorisation == AuthorizationStatus.AUTORISE
+            Product.etat_autorisation.in_(
+                [state for state in AuthorizationStatus if state.value in AUTHORIZED_STATES]
+            )
         )
 
         # Add search filters
@@ -266,22 +288,19 @@ class UnifiedRegulatoryService:
         if not crop_type:
             return 1.0  # No specific crop to check
         
-        # Get authorized usages from database
-        query = select(Usage).where(
-            and_(
-                Usage.product_id == product.id,
-                Usage.etat_usage == AuthorizationStatus.AUTORISE
+        index = get_regulatory_index()
+        if index is not None:
+            authorized_crops = [crop.lower() for crop in index.authorized_crops(product.numero_amm)]
+        else:
+            # Get authorized usages from database
+            query = select(Usage.type_culture_libelle, Usage.etat_usage).where(
+                Usage.numero_amm == product.numero_amm
             )
-        )
-        
-        result = await db.execute(query)
-        usages = result.scalars().all()
-        
-        # Check if crop is authorized
-        authorized_crops = []
-        for usage in usages:
-            if usage.type_culture_libelle:
-                authorized_crops.append(usage.type_culture_libelle.lower())
+            result = await db.execute(query)
+            authorized_crops = [
+                crop.lower() for crop, etat in result
+                if crop and etat in AUTHORIZED_STATES
+            ]
         
         if crop_type.lower() not in authorized_crops:
             violations.append(f"Culture {crop_type} non autorisée pour ce produit")
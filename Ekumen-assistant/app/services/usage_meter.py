@@ -0,0 +1,705 @@
+"""
+Usage Meter - token usage of every LLM and embedding call, per organization,
+user, agent, tool and request type
+
+- UsageMeteringCallback is attached to every LangChain run of the process
+  through a configure hook (install_usage_metering), so agents, RAG chains
+  and classifiers are metered without passing callbacks around. Token counts
+  are the provider's (token_usage of the response); they are estimated only
+  when the provider reports none, e.g. for streamed answers
+- Embedding calls are recorded by the embedding cache for the texts that
+  actually reach the API
+- Dimensions come from usage_scope() / bind_usage_scope() (a context
+  variable set by the chat endpoints and the agent pool, inherited by the
+  tasks they start) and from the run tree: an LLM call made inside a tool is
+  attributed to that tool
+- Usage is aggregated in memory per hour and dimension and upserted into
+  llm_usage every USAGE_FLUSH_INTERVAL seconds, so calls never wait on a
+  database write
+- Daily token quotas are checked against today's totals of all workers
+  (reloaded after each flush) plus this worker's unflushed usage
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.http_client import LatencyHistogram
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # Older LangChain
+    from langchain.callbacks.base import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+# Dimensions a scope can set
+SCOPE_FIELDS = ("organization_id", "user_id", "agent_type", "tool_name", "request_type")
+
+# Total tokens per call
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# USD per 1k input tokens of embedding models (chat models are priced from MODEL_PROFILES)
+EMBEDDING_PRICES = {
+    "text-embedding-3-small": 0.00002,
+    "text-embedding-3-large": 0.00013,
+    "text-embedding-ada-002": 0.0001,
+}
+
+# Rows per upsert statement
+UPSERT_CHUNK = 500
+
+_scope: ContextVar[Dict[str, str]] = ContextVar("usage_scope", default={})
+_tallies: ContextVar[Tuple["UsageTally", ...]] = ContextVar("usage_tallies", default=())
+
+
+@dataclass
+class UsageTally:
+    """Usage of the calls made inside one usage_scope() block"""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, cost: float):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6)}
+
+
+def _dimensions(dimensions: Dict[str, Any]) -> Dict[str, str]:
+    unknown = set(dimensions) - set(SCOPE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown usage dimensions: {sorted(unknown)}")
+    return {name: str(value) for name, value in dimensions.items() if value is not None and value != ""}
+
+
+def current_scope() -> Dict[str, str]:
+    return _scope.get()
+
+
+def bind_usage_scope(**dimensions: Any):
+    """Set dimensions for the rest of the current task and the tasks it starts"""
+    return _scope.set({**_scope.get(), **_dimensions(dimensions)})
+
+
+@contextmanager
+def usage_scope(**dimensions: Any) -> Iterator[UsageTally]:
+    """Set dimensions for the calls made inside the block; yields their tally"""
+    tally = UsageTally()
+    scope_token = _scope.set({**_scope.get(), **_dimensions(dimensions)})
+    tallies_token = _tallies.set(_tallies.get() + (tally,))
+    try:
+        yield tally
+    finally:
+        _tallies.reset(tallies_token)
+        _scope.reset(scope_token)
+
+
+_encoding: Any = None
+
+
+def count_tokens(texts: Sequence[str]) -> Tuple[int, bool]:
+    """(tokens of texts, whether exact): tiktoken's cl100k count, else 4 characters per token"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, estimating tokens from characters: {e}")
+            _encoding = False
+    if _encoding:
+        return sum(len(_encoding.encode(text, disallowed_special=())) for text in texts), True
+    return sum((len(text) + 3) // 4 for text in texts), False
+
+
+_prices: Dict[str, Optional[Tuple[float, float]]] = {}
+
+
+def model_prices(model: str) -> Optional[Tuple[float, float]]:
+    """(input, output) USD per 1k tokens; dated names use their base model's price"""
+    if model not in _prices:
+        from app.services.model_router import MODEL_PROFILES
+        prices = {name: (p.input_cost_per_1k, p.output_cost_per_1k) for name, p in MODEL_PROFILES.items()}
+        prices.update({name: (price, 0.0) for name, price in EMBEDDING_PRICES.items()})
+        # Longest known name the model starts with (gpt-4o-mini-2024-07-18 -> gpt-4o-mini)
+        matches = [name for name in prices if model == name or model.startswith(f"{name}-")]
+        _prices[model] = prices[max(matches, key=len)] if matches else None
+    return _prices[model]
+
+
+@dataclass
+class UsageCounters:
+    """Usage of one hour and dimension, not flushed yet"""
+
+    calls: int = 0
+    errors: int = 0
+    estimated_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_ms: int = 0
+
+    def merge(self, other: "UsageCounters"):
+        for metric in fields(self):
+            setattr(self, metric.name, getattr(self, metric.name) + getattr(other, metric.name))
+
+
+METRIC_COLUMNS = tuple(metric.name for metric in fields(UsageCounters))
+
+# period_start, organization_id, user_id, agent_type, tool_name, request_type, model
+UsageKey = Tuple[datetime, str, str, str, str, str, str]
+
+
+class UsageMeter:
+    """
+    In-memory usage aggregates with periodic batched flushes.
+
+    record() is synchronous, thread-safe and never touches the database.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval or settings.USAGE_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.USAGE_FLUSH_BATCH_SIZE
+        self._aggregates: Dict[UsageKey, UsageCounters] = {}
+        self._lock = threading.Lock()  # Callbacks may run in executor threads
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Per request type distributions, and tokens since start per agent and organization
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.tokens: Dict[str, LatencyHistogram] = defaultdict(lambda: LatencyHistogram(TOKEN_BUCKETS))
+        self.tokens_by_agent: Dict[str, int] = defaultdict(int)
+        self.tokens_by_organization: Dict[str, int] = defaultdict(int)
+
+        # Today's tokens per organization: all workers as of the last flush, plus ours since
+        self._day = self._today()
+        self._flushed_today: Dict[str, int] = {}
+        self._pending_today: Dict[str, int] = defaultdict(int)
+
+        self.stats = {
+            "calls": 0,
+            "errors": 0,
+            "estimated_calls": 0,
+            "unpriced_calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cost_usd": 0.0,
+            "quota_rejections": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "flushed_rows": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    @staticmethod
+    def _today() -> datetime:
+        return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def start(self) -> bool:
+        """Start the flush task (needs a running event loop)"""
+        if self._worker is not None and not self._worker.done():
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker = self._loop.create_task(self._run())
+        logger.info("✅ Usage meter started")
+        return True
+
+    async def stop(self):
+        """Stop the flush task and write what is still buffered"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        await self.flush()
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self.start()
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        latency: float,
+        request_type: Optional[str] = None,
+        scope: Optional[Dict[str, str]] = None,
+        tallies: Optional[Sequence[UsageTally]] = None,
+        estimated: bool = False,
+        error: bool = False,
+    ) -> float:
+        """
+        Account one call
+
+        Args:
+            latency: Seconds the call took
+            request_type: Overrides the scope's (defaults to "llm")
+            scope, tallies: Dimensions and tallies captured when the call started
+                (default: the current ones)
+            estimated: Token counts are estimates, the provider reported none
+
+        Returns:
+            Cost of the call in USD (0 for unpriced models)
+        """
+        scope = current_scope() if scope is None else scope
+        tallies = _tallies.get() if tallies is None else tallies
+        request_type = request_type or scope.get("request_type") or "llm"
+        prices = model_prices(model)
+        cost = (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000 if prices else 0.0
+        total = prompt_tokens + completion_tokens
+        organization_id = scope.get("organization_id", "")
+        agent_type = scope.get("agent_type", "")
+        key = (
+            datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0),
+            organization_id, scope.get("user_id", ""), agent_type, scope.get("tool_name", ""),
+            request_type, model,
+        )
+
+        with self._lock:
+            counters = self._aggregates.get(key)
+            if counters is None:
+                counters = self._aggregates[key] = UsageCounters()
+            counters.calls += 1
+            counters.errors += error
+            counters.estimated_calls += estimated
+            counters.prompt_tokens += prompt_tokens
+            counters.completion_tokens += completion_tokens
+            counters.cost_usd += cost
+            counters.latency_ms += int(latency * 1000)
+
+            self.stats["calls"] += 1
+            self.stats["errors"] += error
+            self.stats["estimated_calls"] += estimated
+            self.stats["unpriced_calls"] += prices is None
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+            self.stats["cost_usd"] += cost
+            self.latency[request_type].observe(latency, error=error)
+            self.tokens[request_type].observe(total)
+            self.tokens_by_agent[agent_type or "none"] += total
+            if organization_id:
+                self.tokens_by_organization[organization_id] += total
+                self._roll_day()
+                self._pending_today[organization_id] += total
+            buffered = len(self._aggregates)
+
+        for tally in tallies:
+            tally.add(prompt_tokens, completion_tokens, cost)
+
+        self._ensure_started()
+        if buffered >= self.batch_size and self._wakeup is not None and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass
+        return cost
+
+    def record_embedding(self, model: str, texts: Sequence[str], latency: float, error: bool = False) -> float:
+        """Account one embedding API call for texts (failed calls are not billed)"""
+        tokens, exact = count_tokens(texts) if not error else (0, True)
+        return self.record(model, tokens, 0, latency, request_type="embedding", estimated=not exact, error=error)
+
+    # Quotas
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._flushed_today = {}
+            self._pending_today = defaultdict(int)
+
+    def token_quota(self, organization_id: Optional[str]) -> int:
+        """Daily token quota of an organization (0 = none)"""
+        return settings.USAGE_ORG_TOKEN_QUOTAS.get(str(organization_id), settings.USAGE_DAILY_TOKEN_QUOTA)
+
+    def tokens_today(self, organization_id: str) -> int:
+        with self._lock:
+            self._roll_day()
+            return self._flushed_today.get(organization_id, 0) + self._pending_today.get(organization_id, 0)
+
+    def quota_exceeded(self, organization_id: Optional[str]) -> bool:
+        if not organization_id:
+            return False
+        quota = self.token_quota(organization_id)
+        if quota and self.tokens_today(str(organization_id)) >= quota:
+            self.stats["quota_rejections"] += 1
+            return True
+        return False
+
+    # Flushing
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """
+        Upsert buffered usage into llm_usage in one transaction
+
+        Returns:
+            Number of rows written
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            with self._lock:
+                aggregates, self._aggregates = self._aggregates, {}
+                day, pending = self._day, dict(self._pending_today)
+
+            start = time.perf_counter()
+            if aggregates:
+                try:
+                    await self._persist(aggregates)
+                except Exception as e:
+                    logger.error(f"Error flushing usage: {e}")
+                    self.stats["failed_flushes"] += 1
+                    # The transaction rolled back: put the aggregates back
+                    with self._lock:
+                        for key, counters in aggregates.items():
+                            current = self._aggregates.get(key)
+                            if current is None:
+                                self._aggregates[key] = counters
+                            else:
+                                current.merge(counters)
+                    return 0
+
+                with self._lock:
+                    if self._day == day:
+                        for organization_id, tokens in pending.items():
+                            self._pending_today[organization_id] -= tokens
+                            self._flushed_today[organization_id] = self._flushed_today.get(organization_id, 0) + tokens
+                self.stats["flushes"] += 1
+                self.stats["flushed_rows"] += len(aggregates)
+                self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+            if settings.USAGE_DAILY_TOKEN_QUOTA or settings.USAGE_ORG_TOKEN_QUOTAS:
+                try:
+                    await self._refresh_today()
+                except Exception as e:
+                    logger.warning(f"Error reloading today's usage: {e}")
+            return len(aggregates)
+
+    async def _persist(self, aggregates: Dict[UsageKey, UsageCounters]):
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+        from app.models.usage import LLMUsage
+
+        table = LLMUsage.__table__
+        rows = [
+            {
+                "period_start": key[0], "organization_id": key[1], "user_id": key[2],
+                "agent_type": key[3], "tool_name": key[4], "request_type": key[5], "model": key[6],
+                **asdict(counters),
+            }
+            for key, counters in aggregates.items()
+        ]
+        async with self.session_factory() as db:
+            for offset in range(0, len(rows), UPSERT_CHUNK):
+                statement = insert(table).values(rows[offset:offset + UPSERT_CHUNK])
+                statement = statement.on_conflict_do_update(
+                    constraint="uq_llm_usage_period_dimensions",
+                    set_={
+                        **{name: table.c[name] + statement.excluded[name] for name in METRIC_COLUMNS},
+                        "updated_at": func.now(),
+                    },
+                )
+                await db.execute(statement)
+            await db.commit()
+
+    async def _refresh_today(self):
+        """Today's tokens per organization across all workers"""
+        from sqlalchemy import func, select
+        from app.models.usage import LLMUsage
+
+        day = self._today()
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(LLMUsage.organization_id, func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens))
+                .where(LLMUsage.period_start >= day, LLMUsage.organization_id != "")
+                .group_by(LLMUsage.organization_id)
+            )).all()
+        with self._lock:
+            self._roll_day()
+            if self._day == day:
+                self._flushed_today = {organization_id: int(tokens or 0) for organization_id, tokens in rows}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_request_type = {
+                request_type: {
+                    "calls": histogram.count,
+                    "errors": histogram.errors,
+                    "p50_latency_seconds": histogram.percentile(50),
+                    "p95_latency_seconds": histogram.percentile(95),
+                    "avg_tokens": round(self.tokens[request_type].total / histogram.count, 1) if histogram.count else 0,
+                    "p50_tokens": self.tokens[request_type].percentile(50),
+                    "p95_tokens": self.tokens[request_type].percentile(95),
+                }
+                for request_type, histogram in self.latency.items()
+            }
+            top_agents = sorted(self.tokens_by_agent.items(), key=lambda item: item[1], reverse=True)[:10]
+            top_organizations = sorted(self.tokens_by_organization.items(), key=lambda item: item[1], reverse=True)[:10]
+            buffered = len(self._aggregates)
+        return {
+            **self.stats,
+            "cost_usd": round(self.stats["cost_usd"], 4),
+            "buffered_rows": buffered,
+            "by_request_type": by_request_type,
+            "tokens_by_agent": dict(top_agents),
+            "tokens_by_organization": dict(top_organizations),
+        }
+
+
+async def usage_report(
+    db,
+    group_by: str = "agent_type",
+    days: int = 7,
+    organization_id: Optional[str] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Flushed usage of the last days grouped by one dimension, most tokens first
+
+    Args:
+        group_by: A scope dimension or "model"
+    """
+    from sqlalchemy import func, select
+    from app.models.usage import LLMUsage
+
+    if group_by not in SCOPE_FIELDS + ("model",):
+        raise ValueError(f"Cannot group usage by {group_by}")
+    column = getattr(LLMUsage, group_by)
+    tokens = func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens)
+    query = (
+        select(
+            column, func.sum(LLMUsage.calls), func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.completion_tokens), tokens, func.sum(LLMUsage.cost_usd), func.sum(LLMUsage.latency_ms)
+        )
+        .where(LLMUsage.period_start >= datetime.now(timezone.utc) - timedelta(days=days))
+        .group_by(column)
+        .order_by(tokens.desc())
+        .limit(limit)
+    )
+    if organization_id:
+        query = query.where(LLMUsage.organization_id == str(organization_id))
+
+    report = []
+    for value, calls, prompt_tokens, completion_tokens, total_tokens, cost, latency_ms in (await db.execute(query)).all():
+        calls = int(calls or 0)
+        report.append({
+            group_by: value or None,
+            "calls": calls,
+            "prompt_tokens": int(prompt_tokens or 0),
+            "completion_tokens": int(completion_tokens or 0),
+            "total_tokens": int(total_tokens or 0),
+            "tokens_per_call": round(int(total_tokens or 0) / calls, 1) if calls else 0,
+            "cost_usd": round(float(cost or 0), 4),
+            "avg_latency_ms": round(int(latency_ms or 0) / calls, 1) if calls else 0,
+        })
+    return report
+
+
+@dataclass
+class _Run:
+    started: float
+    model: str
+    prompts: List[str]
+    scope: Dict[str, str]
+    tallies: Tuple[UsageTally, ...] = field(default_factory=tuple)
+
+
+class UsageMeteringCallback(BaseCallbackHandler):
+    """
+    Records the token usage of every LLM run into a UsageMeter
+
+    Chain and tool runs are only tracked to attribute an LLM call to the
+    tool it runs under.
+    """
+
+    run_inline = True
+    MAX_TRACKED_RUNS = 10000
+
+    def __init__(self, meter: Optional[UsageMeter] = None):
+        self._meter = meter
+        self._runs: Dict[UUID, _Run] = {}
+        self._parents: Dict[UUID, Tuple[Optional[UUID], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def meter(self) -> UsageMeter:
+        return self._meter or usage_meter
+
+    def _track(self, run_id: UUID, parent_run_id: Optional[UUID], tool_name: Optional[str] = None):
+        with self._lock:
+            # Runs cancelled without an end event must not accumulate
+            if len(self._parents) >= self.MAX_TRACKED_RUNS:
+                for stale in list(self._parents)[:self.MAX_TRACKED_RUNS // 10]:
+                    del self._parents[stale]
+            self._parents[run_id] = (parent_run_id, tool_name)
+
+    def _untrack(self, run_id: UUID):
+        with self._lock:
+            self._parents.pop(run_id, None)
+
+    def _tool_of(self, run_id: Optional[UUID]) -> Optional[str]:
+        with self._lock:
+            for _ in range(100):
+                if run_id is None or run_id not in self._parents:
+                    return None
+                run_id, tool_name = self._parents[run_id]
+                if tool_name:
+                    return tool_name
+        return None
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._track(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._untrack(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._untrack(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._track(run_id, parent_run_id, (serialized or {}).get("name") or kwargs.get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._untrack(run_id)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs):
+        self._untrack(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model_name") or params.get("model")
+            or ((serialized or {}).get("kwargs") or {}).get("model_name") or ""
+        )
+        scope = current_scope()
+        tool_name = self._tool_of(parent_run_id)
+        if tool_name:
+            scope = {**scope, "tool_name": tool_name}
+        with self._lock:
+            self._runs[run_id] = _Run(time.perf_counter(), model, list(prompts), scope, _tallies.get())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        try:
+            llm_output = response.llm_output or {}
+            usage = llm_output.get("token_usage") or {}
+            prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+            if prompt_tokens is None:
+                prompt_tokens, completion_tokens = self._usage_metadata(response)
+            estimated = prompt_tokens is None
+            if estimated:
+                # Streamed answers carry no usage
+                texts = [generation.text for generations in response.generations for generation in generations]
+                prompt_tokens = count_tokens(run.prompts)[0]
+                completion_tokens = count_tokens(texts)[0]
+            self.meter.record(
+                run.model or llm_output.get("model_name") or "unknown",
+                int(prompt_tokens), int(completion_tokens or 0),
+                time.perf_counter() - run.started,
+                scope=run.scope, tallies=run.tallies, estimated=estimated,
+            )
+        except Exception as e:
+            logger.warning(f"Error metering LLM usage: {e}")
+
+    @staticmethod
+    def _usage_metadata(response) -> Tuple[Optional[int], Optional[int]]:
+        """Usage attached to the generated messages (newer LangChain), summed over generations"""
+        prompt_tokens = completion_tokens = None
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                    completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+        return prompt_tokens, completion_tokens
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        try:
+            self.meter.record(run.model or "unknown", 0, 0, time.perf_counter() - run.started,
+                              scope=run.scope, tallies=run.tallies, error=True)
+        except Exception as e:
+            logger.warning(f"Error metering failed LLM call: {e}")
+
+
+_metering_hook: Optional[ContextVar] = None
+
+
+def install_usage_metering(meter: Optional[UsageMeter] = None) -> bool:
+    """
+    Attach a UsageMeteringCallback to every LangChain run of the process
+
+    The handler is the default of a context variable registered as a
+    configure hook, so it applies in every task and thread.
+    """
+    global _metering_hook
+    if _metering_hook is not None:
+        return False
+    try:
+        from langchain_core.tracers.context import register_configure_hook
+    except ImportError:  # Older LangChain
+        from langchain.callbacks.manager import register_configure_hook
+    _metering_hook = ContextVar("usage_metering_callback", default=UsageMeteringCallback(meter))
+    register_configure_hook(_metering_hook, True)
+    logger.info("✅ Usage metering installed on LangChain runs")
+    return True
+
+
+# Process-wide meter
+usage_meter = UsageMeter()
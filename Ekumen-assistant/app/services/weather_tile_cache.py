@@ -0,0 +1,370 @@
+"""
+Geospatial forecast tile cache
+
+Weather forecasts are cached per geo-grid cell instead of per literal
+location string, so "Dourdan", "dourdan", INSEE code 91200 and a parcel's
+lat/lon in the same commune all share one upstream call. A tile holds the
+longest horizon fetched so far for its cell; shorter requests (1/3/7 days)
+are served by slicing it.
+"""
+
+import json
+import logging
+import math
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field, asdict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.core.cache import redis_client
+from app.core.config import settings
+from app.core.http_client import get_http_client, track_latency
+from app.core.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+# French INSEE commune codes: 5 digits, or 2A/2B + 3 digits for Corsica
+INSEE_CODE_PATTERN = re.compile(r"^(\d{5}|2[AB]\d{3})$", re.IGNORECASE)
+
+GEO_API_URL = "https://geo.api.gouv.fr/communes"
+
+# Memory miss marker (None is a remembered "not a commune")
+_UNRESOLVED = object()
+
+
+def normalize_location_name(name: str) -> str:
+    """
+    Normalize a location name for cache lookups
+
+    "Saint-Rémy-lès-Chevreuse " -> "saint remy les chevreuse"
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    ascii_name = re.sub(r"[-'’_,]", " ", ascii_name.lower())
+    return re.sub(r"\s+", " ", ascii_name).strip()
+
+
+@dataclass(frozen=True)
+class GridCell:
+    """Cell of a regular lat/lon grid"""
+    lat_index: int
+    lon_index: int
+    resolution: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.resolution}:{self.lat_index}:{self.lon_index}"
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        """Cell center (used as the upstream query point)"""
+        return (
+            round((self.lat_index + 0.5) * self.resolution, 4),
+            round((self.lon_index + 0.5) * self.resolution, 4),
+        )
+
+
+def grid_cell(lat: float, lon: float, resolution: Optional[float] = None) -> GridCell:
+    """
+    Snap coordinates to their grid cell
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        resolution: Cell size in degrees (default: WEATHER_TILE_RESOLUTION_DEG, ~11 km)
+
+    Returns:
+        GridCell containing the point
+    """
+    resolution = resolution or settings.WEATHER_TILE_RESOLUTION_DEG
+    return GridCell(
+        lat_index=math.floor(lat / resolution),
+        lon_index=math.floor(lon / resolution),
+        resolution=resolution,
+    )
+
+
+class LocationResolver:
+    """
+    Resolve commune names, INSEE codes and coordinates to a point
+
+    Names and INSEE codes are geocoded once via geo.api.gouv.fr (commune
+    centre) and remembered in memory (bounded, least recently used first
+    out) and Redis. Names that are not communes (e.g. "Normandie") resolve
+    to None and use the legacy per-location cache.
+    """
+
+    # Commune centres don't move; aliases are kept 30 days
+    POINT_TTL = 30 * 86400
+
+    def __init__(self, maxsize: int = 20000):
+        self._points: TTLCache = TTLCache(maxsize=maxsize, ttl=self.POINT_TTL)
+        self.geocode_calls = 0
+
+    async def resolve(
+        self,
+        location: Optional[str] = None,
+        coordinates: Optional[Tuple[float, float]] = None,
+        commune_insee: Optional[str] = None
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Resolve a lookup to (lat, lon)
+
+        Precedence: explicit coordinates, then INSEE code, then name.
+        """
+        if coordinates:
+            return coordinates
+
+        if commune_insee and INSEE_CODE_PATTERN.match(commune_insee.strip()):
+            return await self._lookup(f"insee:{commune_insee.strip().upper()}", {
+                "code": commune_insee.strip().upper()
+            })
+
+        if location:
+            normalized = normalize_location_name(location)
+            if normalized:
+                return await self._lookup(f"name:{normalized}", {"nom": location.strip()})
+
+        return None
+
+    async def _lookup(self, alias: str, query: Dict[str, str]) -> Optional[Tuple[float, float]]:
+        """Look up an alias in memory, then Redis, then geocode it"""
+        point = self._points.get(alias, _UNRESOLVED)
+        if point is not _UNRESOLVED:
+            return point
+
+        redis_key = f"{settings.CACHE_PREFIX}geo:{alias}"
+        if redis_client:
+            try:
+                cached = redis_client.get(redis_key)
+                if cached:
+                    point = json.loads(cached)
+                    point = tuple(point) if point else None
+                    self._points[alias] = point
+                    return point
+            except Exception as e:
+                logger.warning(f"Redis geo read error: {e}")
+
+        try:
+            point = await self._geocode(query)
+        except Exception as e:
+            # Transient failure - don't remember it, fall back to per-location caching
+            logger.warning(f"Commune geocoding failed for {query}: {e}")
+            return None
+
+        self._store(alias, point)
+        return point
+
+    def _store(self, alias: str, point: Optional[Tuple[float, float]]):
+        """Remember an alias in memory and Redis"""
+        self._points[alias] = point
+        if redis_client:
+            try:
+                redis_client.setex(
+                    f"{settings.CACHE_PREFIX}geo:{alias}",
+                    self.POINT_TTL,
+                    json.dumps(list(point) if point else None)
+                )
+            except Exception as e:
+                logger.warning(f"Redis geo write error: {e}")
+
+    async def _geocode(self, query: Dict[str, str]) -> Optional[Tuple[float, float]]:
+        """
+        Geocode a commune (by code or name) to its centre
+
+        Returns:
+            (lat, lon), or None if no such commune
+
+        Raises:
+            httpx.HTTPError: On transient API failures
+        """
+        self.geocode_calls += 1
+        params = {"fields": "nom,centre", "format": "json", "limit": 1}
+        url = GEO_API_URL
+        if "code" in query:
+            url = f"{GEO_API_URL}/{query['code']}"
+        else:
+            params.update({"nom": query["nom"], "boost": "population"})
+
+        async with track_latency("geo.api.gouv.fr"):
+            response = await get_http_client().get(url, params=params)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        data = response.json()
+        if isinstance(data, list):
+            if not data:
+                return None
+            data = data[0]
+            # The search is fuzzy - only accept an exact commune name match
+            if normalize_location_name(data.get("nom", "")) != normalize_location_name(query["nom"]):
+                return None
+
+        centre = data.get("centre")
+        if not centre:
+            return None
+        lon, lat = centre["coordinates"]
+        return (lat, lon)
+
+
+@dataclass
+class ForecastTile:
+    """Cached forecast for one grid cell"""
+    cell_key: str
+    lat: float
+    lon: float
+    conditions: List[Dict[str, Any]]  # WeatherCondition dicts, one per day
+    data_source: str
+    retrieved_at: str
+    fetched_at: float = field(default_factory=time.time)
+    # Provider's horizon when it returned fewer days than requested, else None
+    max_available: Optional[int] = None
+
+    def upcoming(self, today: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Days from today onwards (drops days that are already past)"""
+        today = today or date.today().isoformat()
+        return [c for c in self.conditions if c["date"] >= today]
+
+    def slice(self, days: int, today: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the next `days` days starting today, or None if not covered
+
+        A tile covers up to the provider's horizon (max_available), less the
+        days that have passed since it was fetched: a 5-day tile serves 7-day
+        requests, a 14-day tile still serves 14 days after midnight.
+
+        Args:
+            days: Requested horizon
+            today: ISO date (default: current date)
+        """
+        upcoming = self.upcoming(today)
+        needed = min(days, self.max_available) if self.max_available is not None else days
+        days_past = len(self.conditions) - len(upcoming)
+        if not upcoming or len(upcoming) < needed - days_past:
+            return None
+        return upcoming[:days]
+
+
+class ForecastTileCache:
+    """
+    Forecast cache keyed by grid cell
+
+    Tiles are stored in memory and Redis. Freshness is judged against the
+    requested horizon, so a 14-day tile fetched 2 hours ago still serves a
+    7-day request but not a 1-day one (see smart_weather_ttl).
+    """
+
+    # Tiles are kept for the longest freshness window (14-day forecasts)
+    MAX_TILE_AGE = 14400
+
+    def __init__(self, maxsize: int = 2000):
+        self._tiles: TTLCache = TTLCache(maxsize=maxsize, ttl=self.MAX_TILE_AGE)
+        self._single_flight = SingleFlight(name="weather_tiles")
+        self.stats = {"hits": 0, "slice_hits": 0, "misses": 0, "fetches": 0}
+
+    def get(self, cell: GridCell, days: int, max_age: float) -> Optional[Tuple[ForecastTile, List[Dict[str, Any]]]]:
+        """
+        Get a fresh-enough tile covering `days` days
+
+        Returns:
+            (tile, sliced conditions) or None on miss
+        """
+        tile = self._load(cell.key)
+        if tile is None or time.time() - tile.fetched_at > max_age:
+            self.stats["misses"] += 1
+            return None
+
+        sliced = tile.slice(days)
+        if sliced is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        if len(tile.conditions) > days:
+            self.stats["slice_hits"] += 1
+        return tile, sliced
+
+    async def fill(
+        self,
+        cell: GridCell,
+        days: int,
+        fetch: Callable[[], Awaitable[ForecastTile]]
+    ) -> ForecastTile:
+        """
+        Fetch and store a tile, coalescing concurrent fetches for the cell
+
+        Args:
+            cell: Grid cell
+            days: Requested horizon (concurrent requests for longer horizons fetch separately)
+            fetch: Coroutine factory fetching the tile from providers
+        """
+        async def compute() -> ForecastTile:
+            self.stats["fetches"] += 1
+            tile = await fetch()
+            if len(tile.conditions) < days:
+                # Provider horizon (e.g. OpenWeatherMap: 5 days) - asking again won't get more
+                tile.max_available = len(tile.conditions)
+            self._store(tile)
+            return tile
+
+        return await self._single_flight.do(f"{cell.key}:{days}", compute)
+
+    def _load(self, cell_key: str) -> Optional[ForecastTile]:
+        """Load a tile from memory, then Redis"""
+        tile = self._tiles.get(cell_key)
+        if tile is not None:
+            return tile
+
+        if redis_client:
+            try:
+                cached = redis_client.get(self._redis_key(cell_key))
+                if cached:
+                    tile = ForecastTile(**json.loads(cached))
+                    self._tiles[cell_key] = tile
+                    return tile
+            except Exception as e:
+                logger.warning(f"Redis tile read error: {e}")
+        return None
+
+    def _store(self, tile: ForecastTile):
+        """Store a tile unless a longer, equally fresh one already exists"""
+        existing = self._tiles.get(tile.cell_key)
+        if (
+            existing is not None
+            and len(existing.conditions) > len(tile.conditions)
+            and tile.fetched_at - existing.fetched_at < 1800
+        ):
+            return
+
+        self._tiles[tile.cell_key] = tile
+        if redis_client:
+            try:
+                redis_client.setex(
+                    self._redis_key(tile.cell_key), self.MAX_TILE_AGE, json.dumps(asdict(tile))
+                )
+            except Exception as e:
+                logger.warning(f"Redis tile write error: {e}")
+
+    def _redis_key(self, cell_key: str) -> str:
+        return f"{settings.CACHE_PREFIX}weather_tile:{cell_key}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tile cache statistics"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "tiles_in_memory": len(self._tiles),
+            "single_flight": self._single_flight.get_stats(),
+        }
+
+
+# Process-wide instances
+location_resolver = LocationResolver()
+forecast_tile_cache = ForecastTileCache()
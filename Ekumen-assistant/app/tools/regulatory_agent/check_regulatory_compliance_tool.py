@@ -35,6 +35,7 @@ from app.tools.schemas.compliance_schemas import (
 )
 # Exceptions are handled via Pydantic ValidationError and generic Exception
 from app.core.cache import redis_cache
+from app.services.ephy_change_service import amm_cache_tags
 from app.core.database import AsyncSessionLocal
 from app.services.configuration_service import ConfigurationService
 from app.services.unified_regulatory_service import UnifiedRegulatoryService
@@ -52,7 +53,7 @@ class ComplianceService:
         self.regulatory_service = UnifiedRegulatoryService()
         # BBCHService will be instantiated per-request with db session
     
-    @redis_cache(ttl=7200, model_class=ComplianceOutput, category="regulatory")
+    @redis_cache(ttl=7200, model_class=ComplianceOutput, category="regulatory", tags=amm_cache_tags)
     async def check_compliance(
         self,
         practice_type: str,
@@ -26,6 +26,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.cache import redis_cache
+from app.services.ephy_change_service import amm_cache_tags
 from app.core.database import AsyncSessionLocal
 from app.services.configuration_service import ConfigurationService
 from app.services.unified_regulatory_service import UnifiedRegulatoryService
@@ -54,7 +55,7 @@ class SafetyGuidelinesService:
         self.config_service = ConfigurationService()
         self.regulatory_service = UnifiedRegulatoryService()
     
-    @redis_cache(ttl=7200, model_class=SafetyGuidelinesOutput, category="regulatory")
+    @redis_cache(ttl=7200, model_class=SafetyGuidelinesOutput, category="regulatory", tags=amm_cache_tags)
     async def get_safety_guidelines(
         self,
         product_type: Optional[str] = None,
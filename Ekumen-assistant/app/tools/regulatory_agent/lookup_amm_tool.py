@@ -11,6 +11,7 @@ from pydantic import ValidationError
 
 from app.core.database import AsyncSessionLocal
 from app.core.cache import redis_cache
+from app.services.ephy_change_service import amm_search_tags
 from app.services.unified_regulatory_service import UnifiedRegulatoryService
 from app.services.configuration_service import get_configuration_service
 from app.tools.schemas.amm_schemas import (
@@ -41,7 +42,7 @@ class AMMService:
         self.config_service = get_configuration_service()
         logger.info("Initialized AMMService")
     
-    @redis_cache(ttl=7200, model_class=AMMOutput, category="regulatory")  # 2 hour TTL
+    @redis_cache(ttl=7200, model_class=AMMOutput, category="regulatory", tags=amm_search_tags, distributed_lock=True)  # 2 hour TTL
     async def lookup_amm(
         self,
         product_name: Optional[str] = None,
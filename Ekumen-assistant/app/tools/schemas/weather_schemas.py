@@ -152,6 +152,11 @@ class WeatherInput(BaseModel):
         default=True,
         description="Whether to use real weather APIs (default: True)"
     )
+    commune_insee: Optional[str] = Field(
+        default=None,
+        pattern=r"^(\d{5}|2[ABab]\d{3})$",
+        description="Optional INSEE commune code of the parcel (e.g. '91200')"
+    )
     
     class Config:
         json_schema_extra = {
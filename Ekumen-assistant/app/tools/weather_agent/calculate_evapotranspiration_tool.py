@@ -44,6 +44,10 @@ from app.services.evapotranspiration_service import (
 
 logger = logging.getLogger(__name__)
 
+# Site defaults when the parcel location is unknown (approximate center of France)
+DEFAULT_LATITUDE_DEG = 46.0
+DEFAULT_ELEVATION_M = 200.0
+
 
 class EvapotranspirationService:
     """Service for calculating evapotranspiration with caching"""
@@ -94,6 +98,9 @@ class EvapotranspirationService:
             
             location = data.get("location", "")
             forecast_period_days = len(weather_conditions)
+
+            # Use the forecast's real latitude when the weather tool provides it
+            latitude_deg = (data.get("coordinates") or {}).get("lat") or DEFAULT_LATITUDE_DEG
             
             # Calculate daily ET
             daily_et_list = []
@@ -105,7 +112,8 @@ class EvapotranspirationService:
                         condition,
                         crop_type,
                         crop_stage,
-                        warnings
+                        warnings,
+                        latitude_deg=latitude_deg
                     )
                     daily_et_list.append(daily_et)
                 except Exception as e:
@@ -176,16 +184,23 @@ class EvapotranspirationService:
         condition: Dict[str, Any],
         crop_type: Optional[str],
         crop_stage: Optional[str],
-        warnings: List[str]
+        warnings: List[str],
+        latitude_deg: float = None,
+        elevation_m: float = None
     ) -> DailyEvapotranspiration:
         """
         Calculate daily evapotranspiration using Penman-Monteith FAO-56
 
+        BatchEvapotranspirationEngine (app.services.evapotranspiration_batch_service)
+        evaluates the same equations over many parcels at once.
+
         Args:
             condition: Weather condition dict
             crop_type: Crop type
             crop_stage: Crop development stage (semis, croissance, floraison, maturation)
             warnings: List to append warnings to
+            latitude_deg: Site latitude (default: center of France)
+            elevation_m: Site elevation (default: 200 m)
 
         Returns:
             DailyEvapotranspiration object
@@ -207,9 +222,10 @@ class EvapotranspirationService:
         temp_avg = (temp_min + temp_max) / 2
 
         # Estimate solar radiation from cloud cover and temperature
-        # Default latitude for France (approximate center)
-        latitude_deg = 46.0  # TODO: Extract from location if available
-        elevation_m = 200.0  # TODO: Extract from location if available
+        if latitude_deg is None:
+            latitude_deg = DEFAULT_LATITUDE_DEG
+        if elevation_m is None:
+            elevation_m = DEFAULT_ELEVATION_M
 
         Rs, method = SolarRadiationEstimator.estimate_best_available(
             temp_min=temp_min,
@@ -4,18 +4,22 @@ Enhanced Get Weather Data Tool with Pydantic schemas, caching, and error handlin
 Improvements over original:
 - ✅ Pydantic schemas for type safety
 - ✅ Redis caching with 5-minute TTL
-- ✅ Async support
+- ✅ Async support (shared pooled HTTP client, never blocks the event loop)
+- ✅ Hedged requests across WeatherAPI.com and OpenWeatherMap
+- ✅ Geo-grid forecast tiles shared by commune name, INSEE code and coordinates
 - ✅ Granular error handling
 - ✅ Agricultural risk analysis
 - ✅ Intervention window identification
 """
 
+import asyncio
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional, Tuple
 from datetime import datetime, timedelta
-import requests
 import os
 
+import httpx
+
 from langchain.tools import StructuredTool
 from pydantic import ValidationError
 
@@ -35,6 +39,15 @@ from app.tools.exceptions import (
     WeatherLocationNotFoundError,
 )
 from app.core.cache import redis_cache, smart_weather_ttl
+from app.core.config import settings
+from app.core.http_client import get_http_client, track_latency
+from app.services.weather_tile_cache import (
+    ForecastTile,
+    GridCell,
+    grid_cell,
+    location_resolver,
+    forecast_tile_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,7 +60,8 @@ class WeatherService:
         location: str,
         days: int = 7,
         coordinates: Optional[Coordinates] = None,
-        use_real_api: bool = True
+        use_real_api: bool = True,
+        commune_insee: Optional[str] = None
     ) -> WeatherOutput:
         """
         Get weather forecast with dynamic caching and risk analysis
@@ -58,11 +72,18 @@ class WeatherService:
         - 7 days: 2 hours cache
         - 14 days: 4 hours cache
 
+        Lookups that resolve to a point (coordinates, INSEE code or a French
+        commune name) are served from geo-grid forecast tiles, so every
+        parcel in the same cell shares one upstream call and shorter
+        horizons are sliced from longer ones. Other locations (regions,
+        foreign places) use the per-location cache.
+
         Args:
             location: Location name
             days: Number of forecast days (1-14)
             coordinates: Optional lat/lon coordinates
             use_real_api: Whether to use real weather APIs
+            commune_insee: Optional INSEE commune code (e.g. Parcelle.commune_insee)
 
         Returns:
             WeatherOutput with forecast, risks, and intervention windows
@@ -73,6 +94,15 @@ class WeatherService:
             WeatherTimeoutError: If API times out
             WeatherLocationNotFoundError: If location not found
         """
+        if use_real_api:
+            point = await location_resolver.resolve(
+                location=location,
+                coordinates=(coordinates.lat, coordinates.lon) if coordinates else None,
+                commune_insee=commune_insee
+            )
+            if point is not None:
+                return await self._get_weather_forecast_tiled(location, days, grid_cell(*point))
+
         # Use cached version with dynamic TTL
         return await self._get_weather_forecast_cached(
             location=location,
@@ -81,10 +111,57 @@ class WeatherService:
             use_real_api=use_real_api
         )
 
+    async def _get_weather_forecast_tiled(
+        self,
+        location: str,
+        days: int,
+        cell: GridCell
+    ) -> WeatherOutput:
+        """Serve a forecast from the grid cell's tile, fetching it on a miss"""
+        cached = forecast_tile_cache.get(cell, days, max_age=smart_weather_ttl(days))
+        if cached is not None:
+            tile, conditions = cached
+        else:
+            try:
+                tile = await forecast_tile_cache.fill(cell, days, lambda: self._fetch_tile(cell, days))
+            except Exception as e:
+                raise self._translate_error(e)
+            # Providers may return fewer days than asked (e.g. OpenWeatherMap: 5)
+            conditions = tile.upcoming()[:days] or tile.conditions[:days]
+
+        try:
+            weather_conditions = [WeatherCondition(**condition) for condition in conditions]
+            return self._build_output(
+                location=location,
+                coordinates={"lat": tile.lat, "lon": tile.lon},
+                days=days,
+                weather_conditions=weather_conditions,
+                data_source=tile.data_source,
+                retrieved_at=tile.retrieved_at
+            )
+        except Exception as e:
+            raise self._translate_error(e)
+
+    async def _fetch_tile(self, cell: GridCell, days: int) -> ForecastTile:
+        """Fetch a forecast for the cell center from the providers"""
+        lat, lon = cell.center
+        weather_data = await self._get_real_weather_data(
+            f"{lat},{lon}", days, Coordinates(lat=lat, lon=lon)
+        )
+        return ForecastTile(
+            cell_key=cell.key,
+            lat=lat,
+            lon=lon,
+            conditions=[condition.model_dump() for condition in weather_data["weather_conditions"]],
+            data_source=weather_data["data_source"],
+            retrieved_at=weather_data["retrieved_at"]
+        )
+
     @redis_cache(
         ttl=7200,  # Default 2 hours, overridden by smart_weather_ttl
         model_class=WeatherOutput,
-        category="weather"
+        category="weather",
+        distributed_lock=True  # Coalesce 7am thundering herds across workers
     )
     async def _get_weather_forecast_cached(
         self,
@@ -105,34 +182,59 @@ class WeatherService:
 
             weather_data = await self._get_real_weather_data(location, days, coordinates)
             
-            # Analyze agricultural risks
-            risks = self._analyze_agricultural_risks(weather_data["weather_conditions"])
-            
-            # Identify intervention windows
-            windows = self._identify_intervention_windows(weather_data["weather_conditions"])
-            
-            # Create structured output
-            return WeatherOutput(
+            return self._build_output(
                 location=weather_data["location"],
-                coordinates=Coordinates(**weather_data["coordinates"]),
-                forecast_period_days=days,
+                coordinates=weather_data["coordinates"],
+                days=days,
                 weather_conditions=weather_data["weather_conditions"],
-                risks=risks,
-                intervention_windows=windows,
-                total_days=len(weather_data["weather_conditions"]),
                 data_source=weather_data["data_source"],
                 retrieved_at=weather_data["retrieved_at"]
             )
             
-        except requests.Timeout:
-            raise WeatherTimeoutError()
-        except requests.ConnectionError as e:
-            raise WeatherAPIError(f"Connexion impossible: {str(e)}")
-        except ValidationError as e:
-            raise WeatherValidationError(str(e))
         except Exception as e:
-            logger.error(f"Weather forecast error: {e}", exc_info=True)
-            raise WeatherAPIError(str(e))
+            raise self._translate_error(e)
+
+    def _build_output(
+        self,
+        location: str,
+        coordinates: dict,
+        days: int,
+        weather_conditions: List[WeatherCondition],
+        data_source: str,
+        retrieved_at: str
+    ) -> WeatherOutput:
+        """Analyze a forecast and assemble the structured output"""
+        # Analyze agricultural risks
+        risks = self._analyze_agricultural_risks(weather_conditions)
+        
+        # Identify intervention windows
+        windows = self._identify_intervention_windows(weather_conditions)
+        
+        # Create structured output
+        return WeatherOutput(
+            location=location,
+            coordinates=Coordinates(**coordinates),
+            forecast_period_days=days,
+            weather_conditions=weather_conditions,
+            risks=risks,
+            intervention_windows=windows,
+            total_days=len(weather_conditions),
+            data_source=data_source,
+            retrieved_at=retrieved_at
+        )
+
+    def _translate_error(self, error: Exception) -> Exception:
+        """Map low-level errors to weather tool exceptions"""
+        if isinstance(error, (WeatherTimeoutError, WeatherLocationNotFoundError, WeatherAPIError)):
+            return error
+        if isinstance(error, httpx.TimeoutException):
+            return WeatherTimeoutError()
+        if isinstance(error, httpx.TransportError):
+            return WeatherAPIError(f"Connexion impossible: {str(error)}")
+        if isinstance(error, ValidationError):
+            return WeatherValidationError(str(error))
+        logger.error(f"Weather forecast error: {error}", exc_info=error)
+        return WeatherAPIError(str(error))
     
     async def _get_real_weather_data(
         self,
@@ -140,37 +242,42 @@ class WeatherService:
         days: int,
         coordinates: Optional[Coordinates] = None
     ) -> dict:
-        """Get weather data from real APIs - NO MOCK FALLBACK"""
+        """
+        Get weather data from real APIs - NO MOCK FALLBACK
+
+        Providers are hedged rather than tried sequentially: WeatherAPI.com is
+        called first, and OpenWeatherMap is fired as soon as the primary fails
+        or has not answered within WEATHER_HEDGE_DELAY_SECONDS. The first
+        successful response wins and the other request is cancelled.
+        """
 
         errors = []
+        providers: List[Tuple[str, Callable[[], Awaitable[dict]]]] = []
 
-        # Try WeatherAPI.com first
         api_key = os.getenv("WEATHER_API_KEY")
         if api_key:
-            try:
-                return self._get_weatherapi_data(location, days, api_key)
-            except requests.HTTPError as e:
-                if e.response.status_code == 404:
-                    raise WeatherLocationNotFoundError(location)
-                error_msg = f"WeatherAPI.com failed: {e}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
+            providers.append((
+                "weatherapi",
+                lambda key=api_key: self._get_weatherapi_data(location, days, key)
+            ))
         else:
             errors.append("WEATHER_API_KEY not configured")
 
-        # Try OpenWeatherMap as backup
         api_key = os.getenv("OPENWEATHER_API_KEY")
         if api_key:
-            try:
-                coords_dict = coordinates.model_dump() if coordinates else None
-                return self._get_openweather_data(location, days, api_key, coords_dict)
-            except Exception as e:
-                error_msg = f"OpenWeatherMap failed: {e}"
-                logger.warning(error_msg)
-                errors.append(error_msg)
+            coords_dict = coordinates.model_dump() if coordinates else None
+            providers.append((
+                "openweathermap",
+                lambda key=api_key: self._get_openweather_data(location, days, key, coords_dict)
+            ))
         else:
             errors.append("OPENWEATHER_API_KEY not configured")
 
+        if providers:
+            result = await self._race_providers(location, providers, errors)
+            if result is not None:
+                return result
+
         # No API available - FAIL (do not use mock data)
         error_summary = "; ".join(errors)
         logger.error(f"All weather APIs failed: {error_summary}")
@@ -178,8 +285,87 @@ class WeatherService:
             f"Service météo indisponible. Veuillez configurer WEATHER_API_KEY ou OPENWEATHER_API_KEY. "
             f"Erreurs: {error_summary}"
         )
+
+    async def _race_providers(
+        self,
+        location: str,
+        providers: List[Tuple[str, Callable[[], Awaitable[dict]]]],
+        errors: List[str]
+    ) -> Optional[dict]:
+        """
+        Run providers as hedged requests and return the first success
+
+        Args:
+            location: Location name (for not-found errors)
+            providers: Ordered (name, coroutine factory) pairs, primary first
+            errors: List collecting provider error messages
+
+        Returns:
+            First successful provider payload, or None if all failed
+
+        Raises:
+            WeatherLocationNotFoundError: If the primary provider returns 404
+            WeatherTimeoutError: If every provider timed out
+        """
+        task_names = {}
+        pending = set()
+        next_index = 0
+        timeouts = 0
+
+        def launch_next():
+            nonlocal next_index
+            name, factory = providers[next_index]
+            task = asyncio.create_task(factory())
+            task_names[task] = name
+            pending.add(task)
+            next_index += 1
+
+        launch_next()
+        try:
+            while pending:
+                hedge_delay = settings.WEATHER_HEDGE_DELAY_SECONDS if next_index < len(providers) else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # Primary is slow - hedge with the next provider
+                    logger.info(f"Hedging weather request with {providers[next_index][0]}")
+                    launch_next()
+                    continue
+
+                for task in done:
+                    pending.discard(task)
+                    name = task_names[task]
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+
+                    if (
+                        name == "weatherapi"
+                        and isinstance(error, httpx.HTTPStatusError)
+                        and error.response.status_code == 404
+                    ):
+                        raise WeatherLocationNotFoundError(location)
+                    if isinstance(error, httpx.TimeoutException):
+                        timeouts += 1
+
+                    error_msg = f"{name} failed: {error}"
+                    logger.warning(error_msg)
+                    errors.append(error_msg)
+
+                # A provider failed - fire the next one immediately
+                if next_index < len(providers):
+                    launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if timeouts == len(providers):
+            raise WeatherTimeoutError()
+        return None
     
-    def _get_weatherapi_data(self, location: str, days: int, api_key: str) -> dict:
+    async def _get_weatherapi_data(self, location: str, days: int, api_key: str) -> dict:
         """Get weather data from WeatherAPI.com"""
         
         url = "http://api.weatherapi.com/v1/forecast.json"
@@ -190,8 +376,9 @@ class WeatherService:
             "lang": "fr"
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        async with track_latency("weatherapi"):
+            response = await get_http_client().get(url, params=params)
+            response.raise_for_status()
         data = response.json()
         
         # Convert to WeatherCondition objects
@@ -223,7 +410,7 @@ class WeatherService:
             "retrieved_at": datetime.utcnow().isoformat() + "Z"
         }
     
-    def _get_openweather_data(
+    async def _get_openweather_data(
         self,
         location: str,
         days: int,
@@ -254,8 +441,9 @@ class WeatherService:
             "lang": "fr"
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        async with track_latency("openweathermap"):
+            response = await get_http_client().get(url, params=params)
+            response.raise_for_status()
         data = response.json()
         
         # Process daily forecasts
@@ -388,7 +576,8 @@ async def get_weather_data_enhanced(
     location: str,
     days: int = 7,
     coordinates: Optional[dict] = None,
-    use_real_api: bool = True
+    use_real_api: bool = True,
+    commune_insee: Optional[str] = None
 ) -> str:
     """
     Get weather forecast for agricultural planning
@@ -403,6 +592,7 @@ async def get_weather_data_enhanced(
         days: Number of forecast days (1-14)
         coordinates: Optional lat/lon coordinates as dict
         use_real_api: Whether to use real weather APIs
+        commune_insee: Optional INSEE commune code of the parcel
 
     Returns:
         JSON string with weather forecast, risks, and intervention windows
@@ -416,7 +606,8 @@ async def get_weather_data_enhanced(
             location=location,
             days=days,
             coordinates=coords,
-            use_real_api=use_real_api
+            use_real_api=use_real_api,
+            commune_insee=commune_insee
         )
 
         # Get weather forecast
@@ -424,7 +615,8 @@ async def get_weather_data_enhanced(
             location=input_data.location,
             days=input_data.days,
             coordinates=input_data.coordinates,
-            use_real_api=input_data.use_real_api
+            use_real_api=input_data.use_real_api,
+            commune_insee=input_data.commune_insee
         )
 
         # Return as JSON
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Replay logged farmer questions through the semantic answer cache
+
+Reports, for each similarity threshold, the hit rate the cache would have
+had overall and per freshness class. Queries come from the messages table
+(user messages of the last --days) or from a JSONL file with one
+{"query", "context", "at", "label"} object per line; with labels (queries
+sharing a label are paraphrases), the share of hits that served another
+question's answer is reported too.
+
+Usage:
+    python scripts/evaluate_semantic_cache.py --days 7
+    python scripts/evaluate_semantic_cache.py --input labelled_queries.jsonl --thresholds 0.9 0.93 0.95
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.semantic_answer_cache import SemanticAnswerCache, replay
+
+
+async def load_logged_queries(days: int, limit: int):
+    """User messages of the last days with their conversation's scope, oldest first"""
+    from sqlalchemy import select
+    from app.core.database import AsyncSessionLocal
+    from app.models.conversation import Conversation, Message
+
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Message.content, Message.created_at, Conversation.organization_id,
+                   Conversation.user_id, Conversation.farm_siret, Conversation.agent_type)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.sender == "user", Message.created_at >= since)
+            .order_by(Message.created_at)
+            .limit(limit)
+        )).all()
+    return [
+        {
+            "query": row.content,
+            "at": row.created_at.timestamp(),
+            "context": {
+                "organization_id": row.organization_id,
+                "user_id": row.user_id,
+                "farm_siret": row.farm_siret,
+                "agent_type": row.agent_type,
+            },
+        }
+        for row in rows
+    ]
+
+
+def load_jsonl(path: str):
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="JSONL of logged queries (default: the messages table)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--limit", type=int, default=20000)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.88, 0.9, 0.92, 0.94, 0.96])
+    args = parser.parse_args()
+
+    log = load_jsonl(args.input) if args.input else await load_logged_queries(args.days, args.limit)
+    print(f"📊 Replaying {len(log)} queries")
+
+    # Embeds with the production model through the shared embedding cache
+    embedder = SemanticAnswerCache()
+    report = await replay(log, embedder._default_embed, args.thresholds, embedding_cache=embedder.embedding_cache)
+
+    print(f"{'threshold':>10} {'hit rate':>9} {'wrong hits':>11}  per freshness class")
+    for row in report:
+        classes = ", ".join(f"{name} {rate:.1%}" for name, rate in sorted(row["by_freshness"].items()))
+        wrong = f"{row['wrong_hit_rate']:.1%}" if row["labelled_hits"] else "-"
+        print(f"{row['threshold']:>10.2f} {row['hit_rate']:>9.1%} {wrong:>11}  {classes}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
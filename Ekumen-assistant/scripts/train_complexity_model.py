@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Train the query complexity model used by the model router
+
+Labelled queries come from rated answers of the cheap model, query
+analytics with a known model and shadow evaluations of the last --days.
+The model is evaluated on a held-out share of them and written to
+MODEL_ROUTER_CLASSIFIER_PATH (or --output); restart the workers or call
+set_complexity_model() to pick it up.
+
+Usage:
+    python scripts/train_complexity_model.py --days 90
+    python scripts/train_complexity_model.py --dry-run --thresholds 0.4 0.5 0.6
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from collections import Counter
+
+# Add the app directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.config import settings
+from app.services.complexity_model import ComplexityModel, load_training_examples, split_examples
+from app.services.model_router import MODEL_PROFILES
+
+
+def is_cheap_model(model_name: str) -> bool:
+    profile = MODEL_PROFILES.get(model_name)
+    if profile is not None:
+        return profile.tier == "cheap"
+    return model_name == settings.MODEL_ROUTER_CHEAP_MODEL
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[settings.MODEL_ROUTER_STRONG_THRESHOLD])
+    parser.add_argument("--output", default=settings.MODEL_ROUTER_CLASSIFIER_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate without saving")
+    args = parser.parse_args()
+
+    from app.core.database import AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        examples = await load_training_examples(db, is_cheap_model, days=args.days)
+
+    sources = Counter(example.source for example in examples)
+    positives = sum(example.needs_strong for example in examples)
+    print(f"📊 {len(examples)} labelled queries ({positives} needed the strong model): "
+          + ", ".join(f"{source} {count}" for source, count in sorted(sources.items())))
+    if len(examples) < 20:
+        print("❌ Not enough labelled queries to train on")
+        return
+
+    train, test = split_examples(examples, holdout=args.holdout)
+    model = ComplexityModel.train(train, epochs=args.epochs)
+
+    print(f"{'threshold':>10} {'accuracy':>9} {'recall':>7} {'precision':>10} {'cheap share':>12}")
+    for threshold in args.thresholds:
+        report = model.evaluate(test, threshold)
+        print(f"{threshold:>10.2f} {report['accuracy']:>9.1%} {report['strong_recall']:>7.1%} "
+              f"{report['strong_precision']:>10.1%} {report['cheap_share']:>12.1%}")
+
+    if args.dry_run:
+        return
+
+    # Final model on every example
+    model = ComplexityModel.train(examples, epochs=args.epochs)
+    model.metadata["days"] = args.days
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    model.save(args.output)
+    print(f"✅ Saved {len(model.weights)} weights to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
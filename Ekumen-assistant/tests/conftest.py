@@ -4,6 +4,9 @@ Pytest configuration and fixtures for agricultural chatbot tests
 
 import pytest
 import asyncio
+import functools
+import re
+import time
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -318,6 +321,276 @@ async def test_journal_entry(db_session: AsyncSession, test_user, test_farm, tes
     return entry
 
 
+def _redis_glob(match):
+    """Regex for a Redis glob (* and ? wildcards, backslash escapes)"""
+    parts, chars = [], iter(match)
+    for c in chars:
+        if c == "\\":
+            parts.append(re.escape(next(chars)))
+        elif c == "*":
+            parts.append(".*")
+        elif c == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(c))
+    return "".join(parts)
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+def _name(name):
+    return name.decode() if isinstance(name, bytes) else name
+
+
+def _command(method):
+    """FakeRedis command: counted, failing while `fail` is set"""
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        return self._dispatch(method, self, *args, **kwargs)
+    return call
+
+
+def release_lease(redis, keys, args):
+    """single_flight._RELEASE_SCRIPT for FakeRedis: delete the lease only while it holds our token"""
+    if redis._get(keys[0]) == _bytes(args[0]):
+        return redis._delete(keys[0])
+    return 0
+
+
+class FakePipeline:
+    """Queues commands and runs them on execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.queued.append((name, args, kwargs))
+            return self
+        return queue
+
+    def _run(self):
+        queued, self.queued = self.queued, []
+        return [getattr(self.redis, "_" + name)(*args, **kwargs) for name, args, kwargs in queued]
+
+    def execute(self):
+        return self.redis._dispatch(self._run)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the Redis commands used by the services
+
+    One keyspace (strings stored as bytes, sets, lists and hashes) with
+    expiry, pipelines and publish. Lua scripts cannot run here: pass their
+    Python equivalents in `scripts`, keyed by source and called as
+    fn(redis, keys, args). The default is the redis.asyncio API;
+    asynchronous=False gives the blocking redis.Redis one.
+
+    Set `fail` to make every command raise ConnectionError; `calls` counts
+    round trips (a pipeline is one).
+    """
+
+    def __init__(self, scripts=None, asynchronous=True):
+        self.scripts = dict(scripts or {})
+        self.asynchronous = asynchronous
+        self.data = {}
+        self.expiry = {}
+        self.published = []
+        self.fail = False
+        self.calls = 0
+
+    def _dispatch(self, fn, *args, **kwargs):
+        """Run a command now (blocking client) or when awaited (asyncio client)"""
+        def run():
+            self.calls += 1
+            if self.fail:
+                raise ConnectionError("redis down")
+            return fn(*args, **kwargs)
+
+        if not self.asynchronous:
+            return run()
+
+        async def reply():
+            return run()
+        return reply()
+
+    def _alive(self, name):
+        if name in self.expiry and self.expiry[name] <= time.time():
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+        return name in self.data
+
+    def _expire_in(self, name, seconds):
+        if name in self.data:
+            self.expiry[name] = time.time() + seconds
+            return True
+        return False
+
+    # Keys and strings
+
+    def _get(self, name):
+        name = _name(name)
+        return self.data[name] if self._alive(name) else None
+
+    def _set(self, name, value, nx=False, px=None, ex=None):
+        name = _name(name)
+        if nx and self._alive(name):
+            return None
+        self.data[name] = _bytes(value)
+        self.expiry.pop(name, None)
+        if px:
+            self._expire_in(name, px / 1000)
+        elif ex:
+            self._expire_in(name, ex)
+        return True
+
+    def _exists(self, *names):
+        return sum(self._alive(_name(n)) for n in names)
+
+    def _delete(self, *names):
+        deleted = 0
+        for name in map(_name, names):
+            deleted += self._alive(name)
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+        return deleted
+
+    def _expire(self, name, seconds):
+        name = _name(name)
+        return self._alive(name) and self._expire_in(name, seconds)
+
+    def _pttl(self, name):
+        name = _name(name)
+        if not self._alive(name):
+            return -2
+        return int((self.expiry[name] - time.time()) * 1000) if name in self.expiry else -1
+
+    def _scan(self, match=None):
+        pattern = _redis_glob(match or "*")
+        return [
+            name.encode() for name in list(self.data)
+            if self._alive(name) and re.fullmatch(pattern, name, re.S)
+        ]
+
+    # Sets
+
+    def _sadd(self, name, *members):
+        name = _name(name)
+        self._alive(name)
+        members = {_bytes(m) for m in members}
+        stored = self.data.setdefault(name, set())
+        added = len(members - stored)
+        stored |= members
+        return added
+
+    def _smembers(self, name):
+        name = _name(name)
+        return set(self.data[name]) if self._alive(name) else set()
+
+    # Lists
+
+    def _rpush(self, name, *values):
+        name = _name(name)
+        self._alive(name)
+        stored = self.data.setdefault(name, [])
+        stored.extend(_bytes(v) for v in values)
+        return len(stored)
+
+    def _lrange(self, name, start, end):
+        name = _name(name)
+        values = self.data[name] if self._alive(name) else []
+        return list(values[start:None if end == -1 else end + 1])
+
+    def _ltrim(self, name, start, end):
+        name = _name(name)
+        if self._alive(name):
+            self.data[name] = self._lrange(name, start, end)
+            if not self.data[name]:
+                self._delete(name)
+        return True
+
+    # Hashes
+
+    def _hset(self, name, key=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        name = _name(name)
+        self._alive(name)
+        stored = self.data.setdefault(name, {})
+        added = 0
+        for k, v in items.items():
+            added += _bytes(k) not in stored
+            stored[_bytes(k)] = _bytes(v)
+        return added
+
+    def _hgetall(self, name):
+        name = _name(name)
+        return dict(self.data[name]) if self._alive(name) else {}
+
+    # Pub/sub and scripts
+
+    def _publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def _eval(self, script, numkeys, *keys_and_args):
+        return self.scripts[script](self, list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:]))
+
+    get = _command(_get)
+    set = _command(_set)
+    exists = _command(_exists)
+    delete = _command(_delete)
+    expire = _command(_expire)
+    pttl = _command(_pttl)
+    sadd = _command(_sadd)
+    smembers = _command(_smembers)
+    rpush = _command(_rpush)
+    lrange = _command(_lrange)
+    ltrim = _command(_ltrim)
+    hset = _command(_hset)
+    hgetall = _command(_hgetall)
+    publish = _command(_publish)
+    eval = _command(_eval)
+
+    def scan_iter(self, match=None, count=None):
+        if not self.asynchronous:
+            return iter(self._dispatch(self._scan, match))
+
+        async def names():
+            for name in await self._dispatch(self._scan, match):
+                yield name
+        return names()
+
+    def register_script(self, source):
+        run = self.scripts[source]
+
+        def script(keys=(), args=()):
+            return self._dispatch(run, self, list(keys), list(args))
+        return script
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
 # Pytest configuration
 def pytest_configure(config):
     """Configure pytest."""
@@ -330,3 +603,24 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "integration: mark test as integration test"
     )
+    config.addinivalue_line(
+        "markers", "benchmark: wall-clock benchmark, skipped unless --run-benchmarks"
+    )
+
+
+def pytest_addoption(parser):
+    """Add command line options."""
+    parser.addoption(
+        "--run-benchmarks", action="store_true", default=False,
+        help="run wall-clock benchmarks (their timing bounds are unreliable on shared CI runners)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmarks unless explicitly requested."""
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmark: use --run-benchmarks to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
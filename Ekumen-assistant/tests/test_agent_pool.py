@@ -0,0 +1,180 @@
+"""
+Unit tests for the process-wide agent pool.
+
+Tests:
+- Agents built once per process and shared
+- Per-request callbacks without rebuilding
+- Start-up warm-up
+- Construction versus execution metrics
+- Synchronous wrapper outside a running loop only
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.agents.agent_manager import AgentManager
+from app.agents.agent_pool import AgentPool
+from app.agents.orchestrator import OrchestratorAgent
+
+
+class FakeLLMAgent:
+    """Agent with an async entry point accepting callbacks"""
+
+    builds = 0
+
+    def __init__(self):
+        FakeLLMAgent.builds += 1
+        time.sleep(0.05)  # Slow construction
+        self.calls = []
+
+    async def aprocess(self, message, context=None, callbacks=None):
+        self.calls.append((message, context, callbacks))
+        return {"response": f"ok: {message}"}
+
+
+class FakeSearchAgent:
+    """Agent without callback support (like InternetAgent)"""
+
+    async def process(self, query, context=None):
+        return {"response": query, "sources": []}
+
+
+@pytest.fixture
+def pool():
+    """Pool building fake agents"""
+    FakeLLMAgent.builds = 0
+    pool = AgentPool()
+
+    def build(key):
+        if key == "broken":
+            raise RuntimeError("missing credentials")
+        return FakeSearchAgent() if key == "internet" else FakeLLMAgent()
+
+    pool._build = build
+    yield pool
+    pool.clear()
+
+
+class TestAgentPool:
+    """Test suite for pooled agent construction"""
+
+    def test_built_once(self, pool):
+        """Test agents are built once and reused"""
+        first = pool.get_agent("weather")
+        assert pool.get_agent("WEATHER") is first
+        assert FakeLLMAgent.builds == 1
+        assert pool.reuses == 1
+
+    def test_concurrent_first_use_builds_once(self, pool):
+        """Test concurrent first requests share one construction"""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            agents = list(executor.map(lambda _: pool.get_agent("planning"), range(8)))
+        assert FakeLLMAgent.builds == 1
+        assert all(agent is agents[0] for agent in agents)
+
+    def test_market_prices_shares_internet_agent(self, pool):
+        """Test aliases resolve to the same pooled agent"""
+        assert pool.get_agent("market_prices") is pool.get_agent("internet")
+
+    def test_unknown_agent_type(self, pool):
+        """Test unknown agent types are rejected"""
+        with pytest.raises(ValueError, match="Unknown production agent type"):
+            pool.get_agent("astrology")
+
+    def test_shared_llm_clients(self, monkeypatch):
+        """Test LLM clients are shared per configuration"""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        pool = AgentPool()
+        llm = pool.get_llm("gpt-4", 0.1)
+        assert pool.get_llm("gpt-4", 0.1) is llm
+        assert pool.get_llm("gpt-4", 0.1, streaming=True) is not llm
+
+        orchestrator = pool.get_orchestrator()
+        assert pool.get_orchestrator() is orchestrator
+        assert orchestrator.llm is pool.get_llm(orchestrator.llm.model_name, 0, streaming=True)
+        assert orchestrator.agent_executor.callbacks == []
+
+
+class TestExecution:
+    """Test suite for per-request execution"""
+
+    @pytest.mark.asyncio
+    async def test_callbacks_per_request(self, pool):
+        """Test callbacks reach the agent without rebuilding it"""
+        first, second = object(), object()
+        await pool.execute("weather", "pluie ?", {"location": "Lyon"}, callbacks=[first])
+        await pool.execute("weather", "gel ?", callbacks=[second])
+
+        agent = pool.get_agent("weather")
+        assert [call[2] for call in agent.calls] == [[first], [second]]
+        assert agent.calls[1][1] == {}
+        assert FakeLLMAgent.builds == 1
+
+    @pytest.mark.asyncio
+    async def test_callbacks_skipped_for_agents_without_llm(self, pool):
+        """Test agents without a callbacks parameter still run"""
+        result = await pool.execute("internet", "prix du blé", callbacks=[object()])
+        assert result["response"] == "prix du blé"
+
+    @pytest.mark.asyncio
+    async def test_construction_and_execution_metrics(self, pool):
+        """Test construction and execution times are tracked separately"""
+        await pool.execute("weather", "q1")
+        await pool.execute("weather", "q2")
+
+        stats = pool.get_stats()
+        assert stats["agents"] == ["weather"]
+        assert stats["construction_ms"]["weather"] >= 50
+        assert stats["execution"]["weather"]["count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_orchestrator_passes_callbacks_in_run_config(self, monkeypatch):
+        """Test the orchestrator attaches callbacks to the run, not the executor"""
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        orchestrator = OrchestratorAgent()
+        orchestrator.agent_executor = AsyncMock()
+        orchestrator.agent_executor.ainvoke.return_value = {"output": "Bonjour", "intermediate_steps": []}
+        callback = object()
+
+        result = await orchestrator.process("Bonjour", callbacks=[callback])
+
+        assert result["response"] == "Bonjour"
+        _, kwargs = orchestrator.agent_executor.ainvoke.call_args
+        assert kwargs["config"] == {"callbacks": [callback]}
+
+
+class TestWarmUp:
+    """Test suite for start-up warm-up"""
+
+    @pytest.mark.asyncio
+    async def test_warm_up(self, pool):
+        """Test warm-up builds agents and survives failures"""
+        built = await pool.warm_up(["orchestrator", "weather", "broken"])
+
+        assert built == {"orchestrator": True, "weather": True, "broken": False}
+        assert FakeLLMAgent.builds == 2
+
+        # Requests after warm-up reuse the built agents
+        await pool.execute("orchestrator", "q")
+        assert FakeLLMAgent.builds == 2
+
+
+class TestSyncExecution:
+    """Test suite for synchronous callers"""
+
+    def test_execute_agent_sync_without_loop(self, pool, monkeypatch):
+        """Test execute_agent_sync runs pooled agents from plain synchronous code"""
+        monkeypatch.setattr("app.agents.agent_manager.agent_pool", pool)
+        result = AgentManager().execute_agent_sync("supplier", "semences")
+        assert result["response"] == "ok: semences"
+        assert result["metadata"]["is_demo"] is False
+
+    @pytest.mark.asyncio
+    async def test_execute_agent_sync_refuses_running_loop(self, pool, monkeypatch):
+        """Test execute_agent_sync does not drive pooled agents from a second loop"""
+        monkeypatch.setattr("app.agents.agent_manager.agent_pool", pool)
+        with pytest.raises(RuntimeError):
+            AgentManager().execute_agent_sync("supplier", "semences")
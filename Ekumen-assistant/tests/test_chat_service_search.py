@@ -0,0 +1,130 @@
+"""
+Unit tests for ChatService statistics and conversation search.
+
+Tests:
+- Statistics computed with SQL aggregates
+- Search cursor encoding
+- Ranked, keyset-paginated full-text search
+"""
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from app.services.chat_service import ChatService, decode_search_cursor, encode_search_cursor
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def fetchall(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+
+class FakeSession:
+    """Async session answering queued results and recording statements"""
+
+    def __init__(self, results=(), scalars=()):
+        self.results = list(results)
+        self.scalar_results = list(scalars)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return FakeResult(self.results.pop(0))
+
+    async def scalar(self, statement):
+        self.statements.append((str(statement), None))
+        return self.scalar_results.pop(0)
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ChatService()
+
+
+class TestStatistics:
+    """Test suite for aggregate statistics"""
+
+    @pytest.mark.asyncio
+    async def test_statistics_use_aggregates(self, service):
+        """Test counts come from GROUP BY / COUNT queries, not loaded rows"""
+        db = FakeSession(
+            results=[[("active", "weather", 3), ("archived", "weather", 1), ("active", "planning", 2)]],
+            scalars=[42]
+        )
+        stats = await service.get_conversation_statistics(db, str(uuid4()))
+
+        assert stats == {
+            "total_conversations": 6,
+            "active_conversations": 5,
+            "total_messages": 42,
+            "conversations_by_agent": {"weather": 4, "planning": 2},
+        }
+        assert len(db.statements) == 2
+        assert all("count(" in sql for sql, _ in db.statements)
+        assert "GROUP BY" in db.statements[0][0]
+
+    @pytest.mark.asyncio
+    async def test_statistics_without_conversations(self, service):
+        """Test a user without conversations"""
+        stats = await service.get_conversation_statistics(FakeSession(results=[[]], scalars=[None]), str(uuid4()))
+        assert stats["total_conversations"] == 0
+        assert stats["total_messages"] == 0
+
+
+class TestSearchCursor:
+    """Test suite for search cursors"""
+
+    def test_round_trip(self):
+        conversation_id = uuid4()
+        assert decode_search_cursor(encode_search_cursor(0.0607927, conversation_id)) == (0.0607927, conversation_id)
+
+    def test_malformed_cursor(self):
+        with pytest.raises(ValueError, match="Invalid search cursor"):
+            decode_search_cursor("not-a-cursor")
+
+
+class TestSearch:
+    """Test suite for full-text conversation search"""
+
+    @pytest.mark.asyncio
+    async def test_ranked_page_with_next_cursor(self, service):
+        """Test results keep rank order and the extra row yields a cursor"""
+        first, second, third = uuid4(), uuid4(), uuid4()
+        ranked = [SimpleNamespace(id=first, rank=0.4), SimpleNamespace(id=second, rank=0.2),
+                  SimpleNamespace(id=third, rank=0.1)]
+        loaded = [SimpleNamespace(id=second, title="Météo"), SimpleNamespace(id=first, title="Semis du blé")]
+        db = FakeSession(results=[ranked, loaded])
+
+        conversations, cursor = await service.search_conversations_page(
+            db, str(uuid4()), "blé", limit=2, organization_id=str(uuid4())
+        )
+
+        assert [c.title for c in conversations] == ["Semis du blé", "Météo"]
+        assert decode_search_cursor(cursor) == (0.2, second)
+        sql, params = db.statements[0]
+        assert "websearch_to_tsquery('french', :query)" in sql
+        assert params["limit"] == 3
+
+    @pytest.mark.asyncio
+    async def test_cursor_applies_keyset(self, service):
+        """Test a cursor continues after the last (rank, id)"""
+        last = uuid4()
+        db = FakeSession(results=[[]])
+        conversations, cursor = await service.search_conversations_page(
+            db, str(uuid4()), "colza", organization_id=str(uuid4()), cursor=encode_search_cursor(0.2, last)
+        )
+
+        assert conversations == [] and cursor is None
+        sql, params = db.statements[0]
+        assert "(max(rank), id) < (:after_rank, :after_id)" in sql
+        assert (params["after_rank"], params["after_id"]) == (0.2, last)
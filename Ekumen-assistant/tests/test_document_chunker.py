@@ -0,0 +1,228 @@
+"""
+Unit tests for the streaming document chunker.
+
+Tests:
+- Token budget, overlap and exact offsets
+- Pages and sections taken from the parser (Markdown headings, PDF outline)
+- Chunking as a generator over a page stream, sentences kept whole across
+  page breaks
+- Memory on a large ANSES-style regulatory notice (throughput is a
+  benchmark, run with --run-benchmarks)
+"""
+
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import document_chunker
+from app.services.document_chunker import (
+    DocumentPage,
+    StreamingChunker,
+    count_tokens,
+    iter_document_pages,
+)
+from app.services.document_ingestion_service import read_document_text
+from app.services.rag_service import RAGService
+
+
+def words(text):
+    return len(text.split()) or 1
+
+
+def _document(path, file_type):
+    return SimpleNamespace(id=uuid.uuid4(), file_path=str(path), file_type=file_type)
+
+
+def _notice_pages(pages):
+    """Synthetic ANSES marketing authorisation notice, one page at a time"""
+    for number in range(1, pages + 1):
+        lines = [f"Produit {number} - AMM n° {2000000 + number}"]
+        for usage in range(12):
+            lines.append(
+                f"Usage {usage} : traitement des parties aériennes contre le mildiou de la vigne. "
+                f"Dose maximale 2.5 L/ha, {usage % 3 + 1} applications par an, DAR 21 jours! "
+                "ZNT aquatique 20 m; délai de rentrée 48 heures. Porter des gants en nitrile?"
+            )
+        yield DocumentPage("\n".join(lines) + "\n", page_number=number, sections=[(0, f"Section {number // 10}")])
+
+
+class TestStreamingChunker:
+    """Test suite for StreamingChunker"""
+
+    def test_budget_overlap_and_offsets(self):
+        pages = [
+            DocumentPage("Dose 3.5 L/ha. Voir la notice! " * 40, page_number=1, sections=[(0, "1. Usages")]),
+            DocumentPage("Conditions d'emploi strictes. " * 40, page_number=2, sections=[(0, "2. Conditions")]),
+        ]
+        text = "".join(page.text for page in pages)
+        chunks = list(StreamingChunker(max_tokens=40, overlap_tokens=8, count_tokens=words).chunks(pages))
+
+        assert len(chunks) > 5
+        for chunk in chunks:
+            assert text[chunk["chunk_start"]:chunk["chunk_end"]] == chunk["content"]
+            assert chunk["token_count"] <= 40
+            # Sentences are never cut: decimals stay whole and chunks end on a terminator
+            assert chunk["content"][-1] in ".!"
+            assert not chunk["content"].startswith("5 L/ha")
+        for previous, chunk in zip(chunks, chunks[1:]):
+            if chunk["section"] == previous["section"]:
+                assert previous["chunk_start"] < chunk["chunk_start"] < previous["chunk_end"]
+            else:
+                # Sections start a new chunk without overlap
+                assert chunk["chunk_start"] == len(pages[0].text)
+
+        assert {(c["page_number"], c["section"]) for c in chunks} == {(1, "1. Usages"), (2, "2. Conditions")}
+        assert chunks[-1]["chunk_end"] == len(text.rstrip())
+
+    def test_long_sentence_split_between_words(self):
+        text = "mot " * 500
+        chunks = list(StreamingChunker(max_tokens=50, overlap_tokens=0, count_tokens=words).chunks([DocumentPage(text)]))
+        assert [c["token_count"] for c in chunks] == [50] * 10
+        assert " ".join(c["content"] for c in chunks) == text.strip()
+
+    def test_small_and_empty_documents(self):
+        chunker = StreamingChunker(max_tokens=50, overlap_tokens=10, count_tokens=words)
+        assert list(chunker.chunks([DocumentPage("")])) == []
+        assert list(chunker.chunks([DocumentPage("  Court.  ")])) == [{
+            "content": "Court.", "page_number": None, "section": None,
+            "chunk_start": 2, "chunk_end": 8, "token_count": 1,
+        }]
+
+    def test_overlap_must_fit_in_chunk(self):
+        with pytest.raises(ValueError):
+            StreamingChunker(max_tokens=10, overlap_tokens=10)
+
+    def test_sentence_cut_by_page_break(self):
+        pages = [
+            DocumentPage("Traitement du blé. Dose 3.", page_number=1),
+            DocumentPage("5 L/ha sur sol sec", page_number=2),
+            DocumentPage("ant. Porter des gants.\n", page_number=3, sections=[(5, "Précautions")]),
+        ]
+        text = "".join(page.text for page in pages)
+        chunks = list(StreamingChunker(max_tokens=8, overlap_tokens=0, count_tokens=words).chunks(pages))
+
+        # The sentence keeps its decimal and word, and the page it started on
+        assert [(c["content"], c["page_number"], c["section"]) for c in chunks] == [
+            ("Traitement du blé.", 1, None),
+            ("Dose 3.5 L/ha sur sol secant.", 1, None),
+            ("Porter des gants.", 3, "Précautions"),
+        ]
+        for chunk in chunks:
+            assert text[chunk["chunk_start"]:chunk["chunk_end"]] == chunk["content"]
+
+    def test_is_a_generator(self):
+        consumed = []
+
+        def pages():
+            for page in _notice_pages(50):
+                consumed.append(page.page_number)
+                yield page
+
+        chunks = StreamingChunker(count_tokens=words).chunks(pages())
+        first = next(chunks)
+        assert first["page_number"] == 1
+        assert len(consumed) <= 2
+
+
+class TestDocumentPages:
+    """Test suite for parser-driven page and section boundaries"""
+
+    def test_markdown_headings_are_sections(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(document_chunker, "TEXT_BLOCK_CHARS", 20)
+        path = tmp_path / "fiche.md"
+        path.write_text(
+            "# Identification\nNom commercial : PRODUIT.\n\n## Usages autorisés\n"
+            "Vigne, mildiou. Dose 2 L/ha.\nBlé, septoriose.\n# Précautions\nPorter des gants.\n",
+            encoding="utf-8",
+        )
+        document = _document(path, "md")
+        pages = list(iter_document_pages(document))
+        assert len(pages) == 5
+        assert pages[0].text == "# Identification\nNom commercial : PRO"
+        assert pages[1].sections == [(7, "Usages autorisés")]
+
+        text = read_document_text(document)
+        chunker = StreamingChunker(max_tokens=4, overlap_tokens=0, count_tokens=words)
+        chunks = list(chunker.chunks(iter_document_pages(document)))
+        sections = {c["content"]: c["section"] for c in chunks}
+        # Lines cut between blocks are chunked whole
+        assert sections["Nom commercial : PRODUIT."] == "Identification"
+        assert sections["Dose 2 L/ha."] == "Usages autorisés"
+        assert sections["Blé, septoriose."] == "Usages autorisés"
+        assert sections["Porter des gants."] == "Précautions"
+        for chunk in chunks:
+            assert text[chunk["chunk_start"]:chunk["chunk_end"]] == chunk["content"]
+
+    def test_pdf_outline_sections(self, monkeypatch):
+        class Item(SimpleNamespace):
+            pass
+
+        intro, usages, doses = Item(title="Introduction", page=0), Item(title="Usages", page=1), Item(title="Doses", page=1)
+        texts = ["Notice ANSES.", "Vigne. Blé.", "Suite des doses."]
+        reader = SimpleNamespace(
+            outline=[intro, [usages, doses]],
+            pages=[SimpleNamespace(extract_text=lambda t=t: t) for t in texts],
+            get_destination_page_number=lambda item: item.page,
+        )
+
+        pages = list(document_chunker._iter_pdf_pages("notice.pdf", lambda path: reader))
+        assert [p.page_number for p in pages] == [1, 2, 3]
+        assert [p.sections for p in pages] == [[(0, "Introduction")], [(0, "Doses")], []]
+
+        chunks = list(StreamingChunker(max_tokens=2, overlap_tokens=0, count_tokens=words).chunks(pages))
+        assert [(c["content"], c["page_number"], c["section"]) for c in chunks] == [
+            ("Notice ANSES.", 1, "Introduction"),
+            ("Vigne. Blé.", 2, "Doses"),
+            ("Suite des", 3, "Doses"),
+            ("doses.", 3, "Doses"),
+        ]
+
+    def test_unsupported_file_type(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            iter_document_pages(_document(tmp_path / "a.docx", "docx"))
+
+    def test_rag_service_chunks_text_and_pages(self):
+        service = RAGService()
+        pages = list(_notice_pages(3))
+        from_pages = list(service._split_text_into_chunks(iter(pages)))
+        from_text = list(service._split_text_into_chunks("".join(p.text for p in pages)))
+        assert [c["content"] for c in from_pages] == [c["content"] for c in from_text]
+        assert from_pages[-1]["page_number"] == 3 and from_text[-1]["page_number"] is None
+
+
+class TestChunkerPerformance:
+    """Streaming a large regulatory notice"""
+
+    def test_large_notice_streams_in_bounded_memory(self):
+        pages = 400
+        document_size = sum(len(page.text) for page in _notice_pages(pages))
+        count_tokens("préchauffage")  # load the tokenizer outside the measurement
+
+        tracemalloc.start()
+        chunks = 0
+        last_end = 0
+        for chunk in StreamingChunker().chunks(_notice_pages(pages)):
+            chunks += 1
+            last_end = chunk["chunk_end"]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert document_size > 1_000_000
+        assert last_end == document_size - 1
+        assert chunks > pages
+        # Only a page and the current chunk are held, never the document
+        assert peak < document_size / 10
+
+    @pytest.mark.benchmark
+    def test_large_notice_throughput(self):
+        pages = 400
+        count_tokens("préchauffage")
+        started = time.perf_counter()
+        chunks = sum(1 for _ in StreamingChunker().chunks(_notice_pages(pages)))
+        seconds = time.perf_counter() - started
+        print(f"{pages} pages -> {chunks} chunks in {seconds:.2f}s")
+        # Generous bound for slow CI machines
+        assert seconds < 10.0
@@ -0,0 +1,163 @@
+"""
+Unit tests for the content-hash embedding cache.
+
+Tests:
+- Compact float16 storage
+- LRU in front of the persistent store, shared between workers
+- Only distinct uncached texts are embedded
+- Store failure back-off and hit-rate metrics
+- Query embeddings reused by the RAG search path
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.embedding_cache import EmbeddingCache, decode_vector, encode_vector, text_hash
+
+
+class FakeStore:
+    """In-memory stand-in for PostgresEmbeddingStore"""
+
+    def __init__(self):
+        self.rows = {}
+        self.fail = False
+        self.reads = 0
+
+    def get_many(self, model, hashes):
+        if self.fail:
+            raise ConnectionError("postgres down")
+        self.reads += 1
+        return {h: decode_vector(self.rows[(model, h)]) for h in hashes if (model, h) in self.rows}
+
+    def put_many(self, model, items):
+        if self.fail:
+            raise ConnectionError("postgres down")
+        for digest, vector in items.items():
+            self.rows.setdefault((model, digest), encode_vector(vector))
+
+
+class Embedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0, -0.5] for t in texts]
+
+
+class TestEncoding:
+    """Test suite for vector encoding"""
+
+    def test_float16_round_trip(self):
+        vector = np.random.default_rng(0).normal(size=1536).astype(np.float32)
+        blob = encode_vector(vector)
+        assert len(blob) == 1536 * 2
+        assert np.allclose(decode_vector(blob), vector, atol=1e-2)
+
+    def test_hash_is_content_based(self):
+        assert text_hash("blé") == text_hash("blé") != text_hash("orge")
+
+
+class TestEmbeddingCache:
+    """Test suite for the two-tier cache"""
+
+    def test_only_distinct_misses_embedded(self):
+        cache, embed = EmbeddingCache(store=FakeStore()), Embedder()
+        vectors = cache.embed("m", ["a", "bb", "a"], embed)
+        assert embed.calls == [["a", "bb"]]
+        assert [v[0] for v in vectors] == [1.0, 2.0, 1.0]
+
+        cache.embed("m", ["bb", "ccc"], embed)
+        assert embed.calls[-1] == ["ccc"]
+
+    def test_models_do_not_share_vectors(self):
+        cache, embed = EmbeddingCache(store=None), Embedder()
+        cache.embed("m1", ["a"], embed)
+        cache.embed("m2", ["a"], embed)
+        assert len(embed.calls) == 2
+
+    def test_other_worker_reads_from_store(self):
+        store = FakeStore()
+        EmbeddingCache(store=store).embed("m", ["semis de blé"], Embedder())
+
+        other, embed = EmbeddingCache(store=store), Embedder()
+        vectors = other.embed("m", ["semis de blé"], embed)
+        assert embed.calls == []
+        assert vectors[0][0] == len("semis de blé")
+        assert other.stats["store_hits"] == 1
+
+        # Promoted to the in-process LRU
+        other.embed("m", ["semis de blé"], embed)
+        assert other.stats["lru_hits"] == 1
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(store=None, lru_size=2)
+        cache.embed("m", ["a", "b", "c"], Embedder())
+        assert cache.get_many("m", ["a", "b", "c"])[0] is None
+        assert cache.get_stats()["lru_size"] == 2
+
+    def test_cached_vectors_are_read_only(self):
+        cache = EmbeddingCache(store=None)
+        vector = cache.embed("m", ["a"], Embedder())[0]
+        cached = cache.get_many("m", ["a"])[0]
+        with pytest.raises(ValueError):
+            cached[0] = 0.0
+        assert vector[0] == 1.0
+
+    def test_store_failure_backs_off(self):
+        store = FakeStore()
+        cache, embed = EmbeddingCache(store=store), Embedder()
+        store.fail = True
+        assert cache.embed("m", ["a"], embed)[0][0] == 1.0
+        assert cache.stats["store_errors"] == 1
+
+        store.fail = False
+        cache.embed("m", ["b"], embed)
+        assert store.reads == 0 and store.rows == {}
+
+    def test_hit_rate(self):
+        cache = EmbeddingCache(store=None)
+        cache.embed("m", ["a", "b"], Embedder())
+        cache.embed("m", ["a", "b"], Embedder())
+        stats = cache.get_stats()
+        assert (stats["lru_hits"], stats["misses"], stats["hit_rate"]) == (2, 2, 0.5)
+
+    @pytest.mark.asyncio
+    async def test_async_embed(self):
+        cache = EmbeddingCache(store=FakeStore())
+        calls = []
+
+        async def embed(texts):
+            calls.append(texts)
+            return [[1.0, 2.0] for _ in texts]
+
+        await cache.aembed("m", ["a", "b"], embed)
+        await cache.aembed("m", ["a", "c"], embed)
+        assert calls == [["a", "b"], ["c"]]
+
+
+class TestRagQueryPath:
+    """Test suite for cached query embeddings in RAG search"""
+
+    def test_repeated_question_embedded_once(self, monkeypatch):
+        from app.services.rag_service import RAGService
+
+        cache = EmbeddingCache(store=None)
+        monkeypatch.setattr("app.services.rag_service.embedding_cache", cache)
+        queries, searches = [], []
+        service = RAGService()
+        service.embeddings = SimpleNamespace(
+            model="text-embedding-3-small",
+            embed_query=lambda text: queries.append(text) or [0.1, 0.2]
+        )
+        service.vectorstore = SimpleNamespace(
+            similarity_search_by_vector=lambda vector, k, filter: searches.append(vector) or []
+        )
+
+        for _ in range(3):
+            service._similarity_search("Quand semer le colza ?", 5, {})
+        assert queries == ["Quand semer le colza ?"]
+        assert len(searches) == 3
+        assert cache.get_stats()["hit_rate"] == round(2 / 3, 4)
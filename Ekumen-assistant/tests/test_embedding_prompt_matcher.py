@@ -0,0 +1,199 @@
+"""
+Unit tests for the embedding prompt matcher.
+
+Tests:
+- Matrix top-k ranking against per-prompt cosine similarity
+- Agent type filter and batch matching
+- Query embedding LRU
+- Async matching off the event loop
+- Async intent lookup
+- Memory-mapped embedding snapshots and staleness check
+"""
+
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from app.prompts.embedding_system import EmbeddingPromptMatcher
+
+
+PROMPTS = {
+    "AMM_LOOKUP_PROMPT": ("Vérification des autorisations AMM, statuts des produits", "regulatory_agent"),
+    "COMPLIANCE_CHECK_PROMPT": ("Vérification de conformité, réglementations, audits", "regulatory_agent"),
+    "WEATHER_FORECAST_PROMPT": ("Prévisions météorologiques, température, pluie, vent", "weather_agent"),
+    "IRRIGATION_PLANNING_PROMPT": ("Planification de l'irrigation, besoins en eau, pluie", "weather_agent"),
+    "DISEASE_DIAGNOSIS_PROMPT": ("Diagnostic des maladies, symptômes, traitement", "crop_health_agent"),
+    "PEST_IDENTIFICATION_PROMPT": ("Identification des ravageurs, dégâts, seuils", "crop_health_agent"),
+    "CARBON_FOOTPRINT_PROMPT": ("Calcul de l'empreinte carbone, émissions, bilan", "sustainability_agent"),
+}
+
+
+class FakeModel:
+    """Deterministic bag-of-words encoder standing in for sentence-transformers"""
+
+    dim = 64
+
+    def __init__(self):
+        self.calls = []
+        self.threads = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        self.threads.append(threading.current_thread().name)
+        out = np.zeros((len(texts), self.dim))
+        for i, text in enumerate(texts):
+            for word in text.lower().replace(",", " ").split():
+                out[i, zlib.crc32(word.encode()) % self.dim] += 1.0 + len(word) / 10
+        return out
+
+
+@pytest.fixture
+def matcher():
+    matcher = EmbeddingPromptMatcher(query_cache_size=4, embedding_cache=None)
+    matcher.embedding_model = FakeModel()
+    matcher.prompt_embeddings = {}
+    for name, (description, agent_type) in PROMPTS.items():
+        assert matcher.add_prompt_embedding(name, description, agent_type, "specialized")
+    matcher.embedding_model.calls.clear()
+    yield matcher
+    matcher.shutdown()
+
+
+def _reference(matcher, query, context="", agent_type=None, top_k=5):
+    """The original per-prompt cosine loop"""
+    q = matcher.embedding_model.encode([f"{query} {context}"])[0]
+    scored = []
+    for name, emb in matcher.prompt_embeddings.items():
+        if agent_type and emb.agent_type != agent_type:
+            continue
+        e = np.asarray(emb.embedding, dtype=float)
+        scored.append((name, float(q @ e / (np.linalg.norm(q) * np.linalg.norm(e)))))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
+
+
+QUERIES = [
+    "prévisions pluie demain",
+    "autorisation AMM du produit",
+    "symptômes maladies sur blé",
+    "empreinte carbone exploitation",
+    "ravageurs seuils colza",
+]
+
+
+class TestMatrixRanking:
+    """Test suite for matrix-vector ranking"""
+
+    def test_matches_reference_loop(self, matcher):
+        for query in QUERIES:
+            for top_k in (1, 3, 10):
+                got = matcher.find_best_prompt(query, top_k=top_k)
+                expected = _reference(matcher, query, top_k=top_k)
+                assert [m.prompt_name for m in got] == [n for n, _ in expected]
+                for match, (_, score) in zip(got, expected):
+                    assert match.similarity_score == pytest.approx(score, abs=1e-5)
+
+    def test_agent_type_filter(self, matcher):
+        got = matcher.find_best_prompt("pluie", agent_type="weather_agent", top_k=5)
+        assert {m.prompt_name for m in got} == {"WEATHER_FORECAST_PROMPT", "IRRIGATION_PLANNING_PROMPT"}
+        assert matcher.find_best_prompt("pluie", agent_type="unknown_agent") == []
+
+    def test_batch_equals_single_calls(self, matcher):
+        batch = matcher.find_best_prompts_batch(QUERIES, top_k=3)
+        assert batch == [matcher.find_best_prompt(q, top_k=3) for q in QUERIES]
+
+    def test_added_prompt_is_ranked(self, matcher):
+        matcher.find_best_prompt("analyse du sol")
+        matcher.add_prompt_embedding("SOIL_HEALTH_PROMPT", "Santé des sols, analyse du sol", "sustainability_agent", "specialized")
+        assert matcher.find_best_prompt("analyse du sol", top_k=1)[0].prompt_name == "SOIL_HEALTH_PROMPT"
+
+
+class TestQueryCache:
+    """Test suite for the query embedding LRU"""
+
+    def test_repeated_queries_are_not_re_encoded(self, matcher):
+        matcher.find_best_prompt("prévisions pluie")
+        matcher.find_best_prompt("prévisions pluie")
+        assert matcher.embedding_model.calls == [["prévisions pluie "]]
+        assert (matcher.query_cache_hits, matcher.query_cache_misses) == (1, 1)
+
+    def test_batch_encodes_only_misses_once(self, matcher):
+        matcher.find_best_prompt(QUERIES[0])
+        matcher.find_best_prompts_batch([QUERIES[0], QUERIES[1], QUERIES[1]])
+        assert matcher.embedding_model.calls[-1] == [f"{QUERIES[1]} "]
+
+    def test_lru_eviction(self, matcher):
+        for query in QUERIES:
+            matcher.find_best_prompt(query)
+        assert len(matcher._query_cache) == 4
+        assert f"{QUERIES[0]} " not in matcher._query_cache
+
+
+class TestAsyncMatching:
+    """Test suite for non-blocking matching"""
+
+    @pytest.mark.asyncio
+    async def test_encoding_runs_off_the_event_loop(self, matcher):
+        got = await matcher.afind_best_prompt("prévisions pluie", top_k=2)
+        assert got == matcher.find_best_prompt("prévisions pluie", top_k=2)
+        assert matcher.embedding_model.threads[-1].startswith("prompt-encoder")
+
+        # A cached query does not go through the executor
+        await matcher.afind_best_prompt("prévisions pluie")
+        assert len(matcher.embedding_model.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_without_model(self):
+        matcher = EmbeddingPromptMatcher()
+        matcher.embedding_model = None
+        got = await matcher.afind_best_prompt("prévision météo pluie")
+        assert got[0].prompt_name == "WEATHER_FORECAST_PROMPT"
+
+    @pytest.mark.asyncio
+    async def test_intent_lookup(self, matcher):
+        direct = await matcher.afind_prompt_by_intent("AMM_LOOKUP")
+        assert direct.prompt_name == "AMM_LOOKUP_PROMPT"
+        assert direct.similarity_score == 1.0
+        assert matcher.embedding_model.calls == []
+
+        # Unmapped intents fall back to semantic search in the encode thread
+        semantic = await matcher.afind_prompt_by_intent("prévisions pluie")
+        assert semantic == matcher.find_prompt_by_intent("prévisions pluie")
+        assert matcher.embedding_model.threads[-1].startswith("prompt-encoder")
+
+
+class TestEmbeddingSnapshot:
+    """Test suite for save_embeddings / load_embeddings"""
+
+    def test_memory_mapped_round_trip(self, matcher, tmp_path):
+        path = str(tmp_path / "prompts.npy")
+        assert matcher.save_embeddings(path)
+
+        descriptions = {name: description for name, (description, _) in PROMPTS.items()}
+        loaded = EmbeddingPromptMatcher(embeddings_path=path, descriptions=descriptions)
+        loaded.embedding_model = matcher.embedding_model
+        assert isinstance(loaded._matrix, np.memmap)
+        assert list(loaded.prompt_embeddings) == list(PROMPTS)
+        for query in QUERIES:
+            assert loaded.find_best_prompt(query) == matcher.find_best_prompt(query)
+
+    def test_snapshot_from_other_model_is_ignored(self, matcher, tmp_path):
+        path = str(tmp_path / "prompts.npy")
+        matcher.save_embeddings(path)
+        other = EmbeddingPromptMatcher(model_name="other-model")
+        assert other.load_embeddings(path) is False
+        assert other.load_embeddings(str(tmp_path / "missing.npy")) is False
+
+    def test_stale_snapshot_is_not_used(self, matcher, tmp_path):
+        path = str(tmp_path / "prompts.npy")
+        matcher.save_embeddings(path)
+
+        descriptions = {name: description for name, (description, _) in PROMPTS.items()}
+        descriptions["AMM_LOOKUP_PROMPT"] = "Numéros AMM"
+        stale = EmbeddingPromptMatcher(embeddings_path=path, descriptions=descriptions)
+        assert not isinstance(stale._matrix, np.memmap)
+        assert "AMM_LOOKUP_PROMPT" not in stale.prompt_embeddings or (
+            stale.prompt_embeddings["AMM_LOOKUP_PROMPT"].metadata["description"] == "Numéros AMM"
+        )
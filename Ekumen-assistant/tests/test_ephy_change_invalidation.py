@@ -0,0 +1,133 @@
+"""
+Unit tests for EPHY change-set cache invalidation.
+
+Tests:
+- Tagging cached results by the AMM numbers they mention
+- Tag invalidation of the memory cache
+- Change-set application (affected AMMs, withdrawn products, new products)
+- Messages from the pub/sub thread applied on the event loop
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.core import cache
+from app.core.cache import get_memory_cache, invalidate_tags, redis_cache
+from app.services.ephy_change_service import (
+    SEARCH_TAG,
+    EPHYChangeListener,
+    amm_cache_tags,
+    amm_search_tags,
+    apply_ephy_change_set,
+    change_set_tags,
+)
+
+
+@pytest.fixture(autouse=True)
+def memory_only(monkeypatch):
+    """Run against the in-memory cache only"""
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache, "_redis_lease", None)
+    get_memory_cache("regulatory").clear()
+    cache._tag_index.clear()
+    yield
+    get_memory_cache("regulatory").clear()
+    cache._tag_index.clear()
+
+
+def _make_lookup():
+    calls = []
+
+    @redis_cache(ttl=60, category="regulatory", tags=amm_cache_tags)
+    async def lookup(numero_amm: str):
+        calls.append(numero_amm)
+        return {"products": [{"amm_number": numero_amm, "name": f"Produit {numero_amm}"}]}
+
+    return lookup, calls
+
+
+class TestCacheTags:
+    """Test suite for result tagging"""
+
+    def test_amm_tags(self):
+        result = {"products": [{"amm_number": "2000001"}, {"amm_number": "9800336"}], "count": 12345678}
+        assert amm_cache_tags(result) == ["amm:2000001", "amm:9800336"]
+        assert amm_search_tags({"products": []}) == [SEARCH_TAG]
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_only_drops_tagged_entries(self):
+        lookup, calls = _make_lookup()
+        await lookup("2000001")
+        await lookup("9800336")
+        assert calls == ["2000001", "9800336"]
+
+        assert invalidate_tags(["amm:2000001"]) == 1
+
+        await lookup("2000001")
+        await lookup("9800336")
+        assert calls == ["2000001", "9800336", "2000001"]
+
+    def test_unknown_tag(self):
+        assert invalidate_tags(["amm:0000000"]) == 0
+
+
+class TestChangeSet:
+    """Test suite for change-set application"""
+
+    def test_change_set_tags(self):
+        change_set = {
+            "inserted": {"usages": ["2000001"]},
+            "updated": {"produits": ["9800336"]},
+            "removed": {},
+            "withdrawn_products": ["9800336"],
+            "affected_amms": ["2000001", "9800336"],
+        }
+        assert change_set_tags(change_set) == {"amm:2000001", "amm:9800336"}
+
+        change_set["inserted"]["produits"] = ["2250001"]
+        assert SEARCH_TAG in change_set_tags(change_set)
+
+    def test_empty_change_set(self):
+        assert change_set_tags({"inserted": {}, "updated": {}, "removed": {}}) == set()
+        assert apply_ephy_change_set({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_listener_applies_published_change_set(self):
+        lookup, calls = _make_lookup()
+        await lookup("2000001")
+
+        listener = EPHYChangeListener(client=None)
+        listener._handle({"data": json.dumps({"affected_amms": ["2000001"]})})
+        assert listener.applied == 1
+
+        await lookup("2000001")
+        assert calls == ["2000001", "2000001"]
+
+    @pytest.mark.asyncio
+    async def test_listener_thread_hands_change_set_to_loop(self):
+        lookup, calls = _make_lookup()
+        await lookup("2000001")
+
+        listener = EPHYChangeListener(client=None)
+        listener._loop = asyncio.get_running_loop()
+        callback_threads = []
+        listener.add_callback(lambda change_set: callback_threads.append(threading.get_ident()))
+
+        message = {"data": json.dumps({"affected_amms": ["2000001"]})}
+        worker = threading.Thread(target=listener._handle, args=(message,))
+        worker.start()
+        worker.join()
+        # Nothing touched the caches from the worker thread
+        assert listener.applied == 0
+
+        await asyncio.sleep(0)
+        assert listener.applied == 1
+        assert callback_threads == [threading.get_ident()]
+        await lookup("2000001")
+        assert calls == ["2000001", "2000001"]
+
+    def test_listener_without_redis(self):
+        assert EPHYChangeListener(client=None).start() is False
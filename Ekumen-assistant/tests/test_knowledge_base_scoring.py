@@ -0,0 +1,275 @@
+"""
+Unit tests for vectorized disease/pest scoring in KnowledgeBaseService.
+
+Tests:
+- Equivalence with the per-disease _fuzzy_match scoring
+- Condition matching, severity filter, crop grouping
+- Batch API (one call for a whole field walk); its speed-up over the
+  reference loop is a benchmark, run with --run-benchmarks
+- Index staleness after Disease/Pest commits
+"""
+
+import random
+import time
+
+import pytest
+
+from app.services import knowledge_base_index
+from app.services.knowledge_base_index import KnowledgeIndex, PhraseMatcher
+from app.services.knowledge_base_service import KnowledgeBaseService
+
+
+WORDS = [
+    "taches", "brunes", "jaunes", "feuilles", "tiges", "épis", "pustules", "orange",
+    "nécrose", "flétrissement", "pourriture", "racines", "galeries", "morsures",
+    "pucerons", "miellat", "déformation", "grains", "blanc", "poudreux",
+]
+CROPS = ["blé", "maïs", "colza", "vigne"]
+
+
+def _phrase(rng):
+    return " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+
+
+def _disease(rng, i):
+    crop = rng.choice(CROPS)
+    return (
+        {"id": i, "name": f"maladie {i}"},
+        {
+            "primary_crop": crop,
+            "affected_crops": rng.sample(CROPS, rng.randint(0, 2)),
+            "severity_level": rng.choice(["low", "moderate", "high"]),
+            "symptoms": [_phrase(rng) for _ in range(rng.randint(1, 6))],
+            "favorable_conditions": rng.choice([
+                None,
+                {},
+                {"humidity": rng.choice([70, 85, 95]), "temperature": rng.choice([15, 20, 25])},
+                {"humidity": "élevée", "season": "printemps"},
+            ]),
+        },
+    )
+
+
+def _pest(rng, i):
+    crop = rng.choice(CROPS)
+    return (
+        {"id": i, "name": f"ravageur {i}"},
+        {
+            "primary_crop": crop,
+            "affected_crops": rng.sample(CROPS, rng.randint(0, 2)),
+            "severity_level": rng.choice(["low", "moderate", "high"]),
+            "damage_patterns": [_phrase(rng) for _ in range(rng.randint(1, 5))],
+            "pest_indicators": [_phrase(rng) for _ in range(rng.randint(0, 4))],
+        },
+    )
+
+
+@pytest.fixture
+def index(monkeypatch):
+    rng = random.Random(7)
+    built = KnowledgeIndex(
+        diseases=[_disease(rng, i) for i in range(300)],
+        pests=[_pest(rng, i) for i in range(200)],
+    )
+    store = knowledge_base_index.KnowledgeIndexStore(ttl=3600)
+    store.index = built
+    monkeypatch.setattr("app.services.knowledge_base_service.knowledge_index_store", store)
+    return built
+
+
+def _reference_diseases(service, index, crop, symptoms, conditions=None, severity=None):
+    """The original per-disease scoring loop"""
+    scored = []
+    for item, raw in index.diseases:
+        if not (raw["primary_crop"] == crop or crop in (raw["affected_crops"] or [])):
+            continue
+        if severity and raw["severity_level"] != severity:
+            continue
+        matches = [
+            next((s for s in raw["symptoms"] if service._fuzzy_match(symptom, s)), None)
+            for symptom in symptoms
+        ]
+        matches = [m for m in matches if m is not None]
+        condition = 0.5
+        favorable = raw["favorable_conditions"]
+        if conditions and favorable:
+            hits = total = 0
+            for key, value in conditions.items():
+                if key in favorable:
+                    total += 1
+                    expected = favorable[key]
+                    if isinstance(expected, str) and isinstance(value, str):
+                        hits += expected.lower() == value.lower()
+                    elif isinstance(expected, (int, float)) and isinstance(value, (int, float)):
+                        hits += abs(expected - value) <= expected * 0.2
+            condition = hits / total if total else 0.5
+        confidence = min(len(matches) / len(symptoms) * 0.7 + condition * 0.3, 1.0) if symptoms else 0.0
+        if confidence >= service.confidence_threshold:
+            scored.append((item["id"], confidence, matches, condition))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+
+def _reference_pests(service, index, crop, damage, indicators):
+    scored = []
+    for item, raw in index.pests:
+        if not (raw["primary_crop"] == crop or crop in (raw["affected_crops"] or [])):
+            continue
+        score = weight = 0.0
+        for terms, known, w in ((damage, raw["damage_patterns"], 0.6), (indicators, raw["pest_indicators"], 0.4)):
+            if terms:
+                matched = sum(any(service._fuzzy_match(t, k) for k in known) for t in terms)
+                score += matched / len(terms) * w
+                weight += w
+        confidence = min(score / weight, 1.0) if weight else 0.0
+        if confidence >= service.confidence_threshold:
+            scored.append((item["id"], confidence))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored
+
+
+class TestPhraseMatcher:
+    """Test suite for the vectorized _fuzzy_match"""
+
+    def test_matches_fuzzy_match(self):
+        service = KnowledgeBaseService()
+        phrases = ["taches brunes", "rouille-orange", "Flétrissement_des_tiges", "blanc"]
+        matcher = PhraseMatcher(phrases)
+        for term in ["taches", "tache", "rouille orange sur feuilles", "BLANC", "tiges", "galeries", "t"]:
+            expected = [service._fuzzy_match(term, p) for p in phrases]
+            assert matcher.match(term).tolist() == expected
+
+
+class TestVectorizedScoring:
+    """Test suite for equivalence with per-disease scoring"""
+
+    @pytest.mark.asyncio
+    async def test_diseases_match_reference(self, index):
+        service = KnowledgeBaseService()
+        service.max_results = 1000
+        rng = random.Random(11)
+        for _ in range(40):
+            crop = rng.choice(CROPS)
+            symptoms = [_phrase(rng) for _ in range(rng.randint(0, 4))]
+            conditions = rng.choice([None, {"humidity": 88, "temperature": 21}, {"humidity": "Élevée"}])
+            severity = rng.choice([None, "high"])
+
+            result = await service.search_diseases(crop, symptoms, conditions, severity)
+            expected = _reference_diseases(service, index, crop, symptoms, conditions, severity)
+
+            assert [d["disease"]["id"] for d in result["diseases"]] == [e[0] for e in expected]
+            for got, (_, confidence, matches, condition) in zip(result["diseases"], expected):
+                assert got["confidence_score"] == pytest.approx(confidence, abs=1e-12)
+                assert got["matching_symptoms"] == matches
+                assert got["condition_match"] == pytest.approx(condition)
+            assert result["total_results"] == len(expected)
+
+    @pytest.mark.asyncio
+    async def test_pests_match_reference(self, index):
+        service = KnowledgeBaseService()
+        service.max_results = 1000
+        rng = random.Random(13)
+        for _ in range(40):
+            crop = rng.choice(CROPS)
+            damage = [_phrase(rng) for _ in range(rng.randint(0, 3))]
+            indicators = [_phrase(rng) for _ in range(rng.randint(0, 3))]
+
+            result = await service.search_pests(crop, damage, indicators)
+            expected = _reference_pests(service, index, crop, damage, indicators)
+
+            assert [p["pest"]["id"] for p in result["pests"]] == [e[0] for e in expected]
+            for got, (_, confidence) in zip(result["pests"], expected):
+                assert got["confidence_score"] == pytest.approx(confidence, abs=1e-12)
+
+    @pytest.mark.asyncio
+    async def test_result_shape(self, index):
+        result = await KnowledgeBaseService().search_diseases("blé", ["taches brunes"])
+        assert set(result) == {
+            "crop_type", "search_symptoms", "search_conditions", "total_results",
+            "diseases", "search_metadata",
+        }
+        assert len(result["diseases"]) <= 10
+        assert result["search_metadata"]["database_diseases_count"] == len(index.disease_group("blé").items)
+
+
+class TestBatchScoring:
+    """Test suite for the batch API"""
+
+    @pytest.mark.asyncio
+    async def test_batch_equals_single_calls(self, index):
+        service = KnowledgeBaseService()
+        rng = random.Random(17)
+        walk = [
+            {"crop_type": rng.choice(CROPS), "symptoms": [_phrase(rng) for _ in range(3)],
+             "conditions": {"humidity": 85}}
+            for _ in range(30)
+        ]
+
+        batch = await service.search_diseases_batch(walk)
+        singles = [
+            await service.search_diseases(o["crop_type"], o["symptoms"], o["conditions"])
+            for o in walk
+        ]
+        assert batch == singles
+
+    @pytest.mark.asyncio
+    async def test_pest_batch_equals_single_calls(self, index):
+        service = KnowledgeBaseService()
+        rng = random.Random(19)
+        walk = [
+            {"crop_type": rng.choice(CROPS), "damage_patterns": [_phrase(rng)],
+             "pest_indicators": [_phrase(rng) for _ in range(rng.randint(0, 2))]}
+            for _ in range(30)
+        ]
+
+        batch = await service.search_pests_batch(walk)
+        singles = [
+            await service.search_pests(o["crop_type"], o["damage_patterns"], o["pest_indicators"])
+            for o in walk
+        ]
+        assert batch == singles
+
+    @pytest.mark.benchmark
+    @pytest.mark.asyncio
+    async def test_batch_faster_than_reference_loop(self, index):
+        service = KnowledgeBaseService()
+        rng = random.Random(23)
+        walk = [
+            {"crop_type": "blé", "symptoms": [_phrase(rng) for _ in range(4)]}
+            for _ in range(200)
+        ]
+
+        started = time.perf_counter()
+        await service.search_diseases_batch(walk)
+        batch_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for o in walk:
+            _reference_diseases(service, index, o["crop_type"], o["symptoms"])
+        reference_seconds = time.perf_counter() - started
+
+        print(f"\n200 observations: batch {batch_seconds:.3f}s, reference loop {reference_seconds:.3f}s")
+        assert batch_seconds < reference_seconds
+
+
+class TestIndexStaleness:
+    """Test suite for index reloads"""
+
+    def test_commit_marks_index_stale(self, monkeypatch):
+        store = knowledge_base_index.KnowledgeIndexStore(ttl=3600)
+        monkeypatch.setattr(knowledge_base_index, "knowledge_index_store", store)
+
+        class FakeSession:
+            info = {knowledge_base_index._CHANGED_KEY: True}
+
+        knowledge_base_index._reload_after_commit(FakeSession())
+        assert store._stale is True
+
+    def test_rollback_discards_changes(self, monkeypatch):
+        store = knowledge_base_index.KnowledgeIndexStore(ttl=3600)
+        monkeypatch.setattr(knowledge_base_index, "knowledge_index_store", store)
+        session = type("FakeSession", (), {"info": {knowledge_base_index._CHANGED_KEY: True}})()
+
+        knowledge_base_index._discard_after_rollback(session)
+        knowledge_base_index._reload_after_commit(session)
+        assert store._stale is False
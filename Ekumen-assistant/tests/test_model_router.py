@@ -0,0 +1,218 @@
+"""
+Unit tests for the model router and the learned complexity model.
+
+Tests:
+- Training, evaluating and reloading the complexity model
+- Labels from ratings of cheap and strong model answers
+- Immutable per-call configs
+- Downgrades for the latency SLO and the daily cost cap
+- Latency probes recovering the strong model after a slow spell
+- Shadow evaluations and their analytics events
+- Classifier latency (benchmark, run with --run-benchmarks)
+"""
+
+import random
+import time
+
+import pytest
+
+from app.services.complexity_model import (
+    ComplexityModel,
+    TrainingExample,
+    label_from_rating,
+    query_features,
+    split_examples,
+)
+from app.services.model_router import MODEL_PROFILES, ModelRouter, answer_agreement
+
+SIMPLE = [
+    "Quelle météo demain à {}",
+    "Quelle température ce matin à {}",
+    "Va-t-il pleuvoir à {}",
+    "Quel temps fait-il à {}",
+]
+COMPLEX = [
+    "Comment planifier la rotation de mes cultures à {} sur cinq ans",
+    "Quelle stratégie contre la septoriose du blé à {} avec ces conditions",
+    "Compare les marges du colza et du tournesol à {} en agriculture bio",
+    "Pourquoi mon rendement de maïs à {} baisse depuis trois ans malgré la fertilisation",
+]
+TOWNS = ["Dourdan", "Étampes", "Chartres", "Rambouillet", "Orléans", "Auxerre", "Sens", "Provins"]
+
+
+def _examples():
+    examples = [TrainingExample(t.format(town), False) for t in SIMPLE for town in TOWNS]
+    examples += [TrainingExample(t.format(town), True) for t in COMPLEX for town in TOWNS]
+    return examples
+
+
+class FixedModel:
+    def __init__(self, probability):
+        self.probability = probability
+
+    def predict_proba(self, query):
+        return self.probability
+
+
+class FakeWriter:
+    def __init__(self):
+        self.events = []
+
+    def record_event(self, event_type, event_data):
+        self.events.append((event_type, event_data))
+
+
+class TestComplexityModel:
+    """Test suite for ComplexityModel"""
+
+    def test_features_are_stable_and_deduplicated(self):
+        features = query_features("Quelle météo, quelle météo ?")
+        assert features == query_features("quelle meteo quelle meteo ?")
+        assert len(features) == len(set(features))
+
+    def test_train_evaluate_and_reload(self, tmp_path):
+        train, test = split_examples(_examples(), holdout=0.25)
+        model = ComplexityModel.train(train)
+
+        report = model.evaluate(test)
+        assert report["accuracy"] >= 0.9 and report["strong_recall"] >= 0.9
+        assert model.predict_proba("Quelle météo demain à Nemours") < 0.5
+        assert model.predict_proba("Comment planifier la rotation de mes cultures à Nemours sur cinq ans") > 0.5
+
+        path = str(tmp_path / "model.json")
+        model.save(path)
+        loaded = ComplexityModel.load(path)
+        query = "Va-t-il pleuvoir à Nemours"
+        assert loaded.predict_proba(query) == pytest.approx(model.predict_proba(query), abs=1e-4)
+        assert ComplexityModel.load(str(tmp_path / "missing.json")) is None
+
+    def test_labels_from_ratings(self):
+        assert label_from_rating(True, 1) is True
+        assert label_from_rating(True, 5) is False
+        assert label_from_rating(True, 3) is None
+        # A strong-model answer says nothing about the cheap model
+        assert label_from_rating(False, 1) is None
+        assert label_from_rating(True, None) is None
+
+
+class TestModelRouter:
+    """Test suite for ModelRouter"""
+
+    def test_configs_are_per_call(self):
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.1))
+        short = router.route("Météo ?", max_tokens=50, temperature=0.0)
+        long = router.route("Météo ?", max_tokens=900, temperature=0.7)
+
+        assert short.config.call_kwargs() == {"max_tokens": 50, "temperature": 0.0}
+        assert long.config.call_kwargs() == {"max_tokens": 900, "temperature": 0.7}
+        assert MODEL_PROFILES["gpt-3.5-turbo"].max_tokens == 500
+        with pytest.raises(Exception):
+            short.config.max_tokens = 10
+
+    def test_routes_by_probability_and_caller(self):
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9))
+        decision = router.route("Comment planifier ma rotation ?")
+        assert decision.config.name == "gpt-4" and decision.complexity == "complex"
+        assert decision.reason == "classifier"
+
+        decision = router.route("Comment planifier ma rotation ?", complexity="simple")
+        assert decision.config.name == "gpt-3.5-turbo" and decision.reason == "caller"
+        assert router.get_stats()["cheap_share"] == 0.5
+
+    def test_pattern_fallback_without_trained_model(self):
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=None)
+        assert router.classify("Quelle météo demain ?")[0] == "simple"
+        assert router.classify("Comment traiter la maladie du blé ?")[0] == "complex"
+        assert router.get_stats()["classifier"] == "patterns"
+
+    def test_latency_slo_downgrades(self, monkeypatch):
+        monkeypatch.setattr("app.services.model_router.settings.MODEL_ROUTER_LATENCY_SLO", 5.0)
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9), latency_probe_rate=0.0)
+        assert router.route("Analyse", max_tokens=100).config.name == "gpt-4"
+
+        slow = router.route("Analyse", max_tokens=100)
+        router.record(slow, latency=12.0, cost=0.01)
+        decision = router.route("Analyse", max_tokens=100)
+        assert decision.config.name == "gpt-3.5-turbo" and decision.reason == "latency_slo"
+        assert router.get_stats()["downgraded_latency"] == 1
+
+    def test_complex_token_budget_fits_default_slo(self):
+        # Complex synthesis asks for 1500 tokens; the estimate uses a typical answer
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9), latency_probe_rate=0.0)
+        decision = router.route("Analyse", max_tokens=1500)
+        assert decision.config.name == "gpt-4" and decision.reason == "classifier"
+
+    def test_latency_probes_recover_from_downgrade(self, monkeypatch):
+        monkeypatch.setattr("app.services.model_router.settings.MODEL_ROUTER_LATENCY_SLO", 5.0)
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9),
+                             rng=random.Random(0), latency_probe_rate=1.0)
+        router.record(router.route("Analyse", max_tokens=100), latency=12.0, cost=0.01)
+
+        probe = router.route("Analyse", max_tokens=100)
+        assert probe.config.name == "gpt-4" and probe.reason == "latency_probe"
+        for _ in range(10):
+            router.record(probe, latency=2.0, cost=0.01)
+
+        decision = router.route("Analyse", max_tokens=100)
+        assert decision.config.name == "gpt-4" and decision.reason == "classifier"
+        assert router.get_stats()["latency_probes"] == 1
+
+    def test_cost_cap_per_organization(self, monkeypatch):
+        monkeypatch.setattr(
+            "app.services.model_router.settings.MODEL_ROUTER_ORG_POLICIES",
+            {"org-a": {"daily_cost_cap": 0.1}}
+        )
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9))
+        decision = router.route("Analyse", organization_id="org-a", max_tokens=500)
+        assert decision.config.name == "gpt-4"
+        router.record(decision, latency=3.0, cost=0.08)
+
+        decision = router.route("Analyse", organization_id="org-a", max_tokens=500)
+        assert decision.config.name == "gpt-3.5-turbo" and decision.reason == "cost_cap"
+        # Other organizations keep their own budget
+        assert router.route("Analyse", organization_id="org-b", max_tokens=500).config.name == "gpt-4"
+
+    def test_shadow_evaluation(self, monkeypatch):
+        writer = FakeWriter()
+        monkeypatch.setattr("app.services.retrieval_analytics_writer.retrieval_analytics_writer", writer)
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.9),
+                             shadow_rate=1.0, rng=random.Random(0))
+        decision = router.route("Quelle dose d'azote pour le blé ?")
+        assert decision.shadow
+
+        strong = "Apportez 180 unités d'azote en trois passages sur le blé."
+        assert router.record_shadow(decision, "Quelle dose d'azote pour le blé ?", strong,
+                                    "Apportez 180 unités d'azote en trois passages.", cost=0.001)
+        assert not router.record_shadow(decision, "Quelle dose ?", strong, "Je ne sais pas.")
+        assert router.record_shadow(decision, "Quelle dose ?", strong, None) is None
+
+        shadow = router.get_stats()["shadow"]
+        assert shadow["runs"] == 3 and shadow["failures"] == 1
+        assert shadow["cheap_sufficed_rate"] == 0.5
+        assert [event[1]["cheap_sufficed"] for event in writer.events] == [True, False]
+        assert writer.events[0][0] == "model_shadow_evaluation"
+
+    def test_cheap_calls_are_never_shadowed(self):
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=FixedModel(0.1), shadow_rate=1.0)
+        assert not router.route("Météo ?").shadow
+
+    def test_answer_agreement(self):
+        assert answer_agreement("Pluie demain", "pluie demain") == pytest.approx(1.0)
+        assert answer_agreement("Pluie demain", "Soleil") == 0.0
+
+
+class TestModelRouterPerformance:
+    """Routing must stay negligible next to an LLM call"""
+
+    @pytest.mark.benchmark
+    def test_route_latency(self):
+        router = ModelRouter("gpt-3.5-turbo", "gpt-4", classifier=ComplexityModel.train(_examples()))
+        queries = [t.format(town) for t in SIMPLE + COMPLEX for town in TOWNS]
+
+        started = time.perf_counter()
+        for i in range(2000):
+            router.route(queries[i % len(queries)], organization_id="org-a")
+        per_route = (time.perf_counter() - started) / 2000
+        print(f"\nRoute with learned classifier: {per_route * 1e6:.1f} µs")
+        # Generous bound for slow CI machines
+        assert per_route < 0.001
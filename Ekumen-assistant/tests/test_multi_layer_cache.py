@@ -0,0 +1,349 @@
+"""
+Unit tests for MultiLayerCacheService.
+
+Tests:
+- O(1) LRU/TTL memory tier (insert timing is a benchmark, run with
+  --run-benchmarks)
+- Data-only serialization round-trip, unreadable entries as misses
+- Redis tier reads, promotion and sharing between workers, cross-worker
+  coalescing with a Redis lease
+- Database spill tier for large values and report cache types
+- Key, pattern and tag invalidation across tiers and workers
+- Tier failure back-off and per-tier stats
+"""
+
+import asyncio
+import json
+import os
+import pickle
+import time
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.core.single_flight import _RELEASE_SCRIPT
+from app.services.multi_layer_cache_service import (
+    CacheLayer,
+    MemoryTier,
+    MultiLayerCacheService,
+    decode_value,
+    encode_value,
+)
+from tests.conftest import FakeRedis, release_lease
+
+
+class FakeDatabaseTier:
+    """In-memory stand-in for DatabaseTier"""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def get(self, key):
+        row = self.rows.get(key)
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0], row[1] - time.time()
+
+    async def set(self, key, blob, ttl, cache_type, tags=()):
+        self.rows[key] = (blob, time.time() + ttl, set(tags))
+
+    async def delete(self, keys):
+        return sum(self.rows.pop(k, None) is not None for k in keys)
+
+    async def delete_pattern(self, pattern):
+        return await self.delete([k for k in self.rows if pattern in k])
+
+    async def delete_tags(self, tags):
+        return await self.delete([k for k, row in self.rows.items() if row[2] & set(tags)])
+
+    async def clear(self):
+        removed = len(self.rows)
+        self.rows.clear()
+        return removed
+
+
+def _service(redis=None, database=None, **kwargs):
+    service = MultiLayerCacheService(redis_client=redis, db_session_factory=None, **kwargs)
+    service.db_cache = database
+    return service
+
+
+@pytest.fixture
+def shared():
+    """Redis and database shared by several workers"""
+    return FakeRedis(scripts={_RELEASE_SCRIPT: release_lease}), FakeDatabaseTier()
+
+
+class TestMemoryTier:
+    """Test suite for the LRU/TTL memory tier"""
+
+    def test_lru_eviction(self):
+        tier = MemoryTier(maxsize=3)
+        for key in "abc":
+            tier.set(key, key, ttl=60)
+        tier.get("a")
+        tier.set("d", "d", ttl=60)
+        assert list(tier.entries) == ["c", "a", "d"]
+        assert tier.evictions == 1
+
+    def test_ttl(self):
+        tier = MemoryTier(maxsize=10)
+        tier.set("a", 1, ttl=-1)
+        assert tier.get("a") is None
+        assert len(tier) == 0
+
+    def test_tags_follow_evictions(self):
+        tier = MemoryTier(maxsize=2)
+        tier.set("a", 1, ttl=60, tags=["farm:1"])
+        tier.set("b", 2, ttl=60, tags=["farm:1"])
+        tier.set("c", 3, ttl=60)
+        assert tier.delete_tags(["farm:1"]) == 1
+        assert list(tier.entries) == ["c"]
+        assert tier._tags == {}
+
+    def test_overflow_evicts_one_oldest_entry_per_insert(self):
+        tier = MemoryTier(maxsize=1000)
+        for i in range(50000):
+            tier.set(f"k{i}", i, ttl=60)
+        assert len(tier) == 1000
+        assert tier.evictions == 49000
+        assert list(tier.entries) == [f"k{i}" for i in range(49000, 50000)]
+
+    @pytest.mark.benchmark
+    def test_overflowing_inserts_are_constant_time(self):
+        tier = MemoryTier(maxsize=1000)
+        started = time.perf_counter()
+        for i in range(50000):
+            tier.set(f"k{i}", i, ttl=60)
+        elapsed = time.perf_counter() - started
+        print(f"50000 overflowing inserts: {elapsed:.3f}s")
+        # The old sort-on-overflow took seconds for this many inserts
+        assert elapsed < 1.0
+
+
+class TestSerialization:
+    """Test suite for binary serialization"""
+
+    def test_round_trip(self):
+        value = {"response": "Blé tendre " * 500, "sources": [("doc", 1)], "score": 0.93}
+        blob = encode_value(value)
+        assert blob[:1] == b"Z"
+        assert len(blob) < len(str(value))
+        assert decode_value(blob) == value
+        assert decode_value(encode_value("court")) == "court"
+
+    def test_types_json_lacks(self):
+        value = (
+            ("weather", "org-a"),
+            {
+                "at": datetime(2026, 5, 4, 8, 30, tzinfo=timezone.utc),
+                "day": date(2026, 5, 4),
+                "dose": Decimal("2.50"),
+                "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "crops": {"blé", "orge"},
+                "raw": b"\x00\x01",
+                (2026, 5): "mai",
+                "__type__": "not a tag",
+            },
+        )
+        assert decode_value(encode_value(value)) == value
+        with pytest.raises(TypeError):
+            encode_value(object())
+
+    def test_data_only(self):
+        # Pickles (the previous format) and unknown tags are rejected, never loaded
+        with pytest.raises(ValueError):
+            decode_value(b"p" + pickle.dumps({"a": 1}))
+        with pytest.raises(ValueError):
+            decode_value(b'J{"__type__":"pickle","value":"..."}')
+
+
+class TestTiers:
+    """Test suite for tier reads, writes and promotion"""
+
+    @pytest.mark.asyncio
+    async def test_second_worker_reads_from_redis(self, shared):
+        redis, database = shared
+        first, second = _service(redis, database), _service(redis, database)
+
+        await first.set("agent_response:q1", {"text": "réponse"}, "agent_response")
+        assert await second.get("agent_response:q1") == {"text": "réponse"}
+        assert second.stats.redis_hits == 1
+
+        # Promoted to the second worker's memory tier with the remaining TTL
+        assert await second.get("agent_response:q1") == {"text": "réponse"}
+        assert second.stats.memory_hits == 1
+        assert second.memory_cache.entries["agent_response:q1"].ttl <= 1800
+
+    @pytest.mark.asyncio
+    async def test_unreadable_entry_is_a_miss(self, shared):
+        redis, database = shared
+        first, second = _service(redis, database), _service(redis, database)
+        await first.set("agent_response:q1", {"text": "réponse"}, "agent_response")
+        [name] = [k for k in redis.data if k.endswith("agent_response:q1")]
+        redis.data[name] = b"p" + pickle.dumps({"text": "réponse"})
+
+        assert await second.get("agent_response:q1") is None
+        assert second.stats.misses == 1
+        # The tier stays in use
+        assert second._tier_available(CacheLayer.REDIS)
+
+    @pytest.mark.asyncio
+    async def test_large_values_spill_to_database(self, shared):
+        redis, database = shared
+        cache = _service(redis, database, spill_min_bytes=10000)
+        report = {"report": os.urandom(20000).hex()}
+
+        await cache.set("report:farm:1", report, "tool_result")
+        assert not any(k.endswith("report:farm:1") for k in redis.data)
+        assert "report:farm:1" in database.rows
+
+        other = _service(redis, database, spill_min_bytes=10000)
+        assert await other.get("report:farm:1") == report
+        assert other.stats.database_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_report_type_written_to_both_tiers(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        await cache.set("report:small", {"ok": True}, "report")
+        assert "report:small" in database.rows
+        assert any(k.endswith("report:small") for k in redis.data)
+
+        # A database hit is promoted back to Redis
+        redis.data.clear()
+        other = _service(redis, database)
+        assert await other.get("report:small") == {"ok": True}
+        assert any(k.endswith("report:small") for k in redis.data)
+
+    @pytest.mark.asyncio
+    async def test_get_or_set_computes_once_across_workers(self, shared):
+        redis, database = shared
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            return "synthèse"
+
+        for worker in (_service(redis, database), _service(redis, database)):
+            assert await worker.get_or_set("routing:q", factory, "routing") == "synthèse"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_coalesce_across_workers(self, shared):
+        redis, database = shared
+        workers = [_service(redis, database) for _ in range(3)]
+        for worker in workers:
+            worker.redis_lease.poll_interval = 0.01
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"forecast": "pluie"}
+
+        results = await asyncio.gather(*[
+            worker.get_or_set("weather:dourdan", factory, "weather", distributed_lock=True)
+            for worker in workers
+        ])
+
+        assert results == [{"forecast": "pluie"}] * 3
+        assert len(calls) == 1
+        assert sum(w.get_stats()["cross_process"]["deduplicated"] for w in workers) == 2
+        assert not any("lock:" in k for k in redis.data)
+
+
+class TestInvalidation:
+    """Test suite for invalidation across tiers and workers"""
+
+    @pytest.mark.asyncio
+    async def test_key_pattern_and_tags(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        await cache.set("weather:paris:1", 1, "weather", tags=["loc:paris"])
+        await cache.set("weather:paris:3", 3, "weather", tags=["loc:paris"])
+        await cache.set("weather:lyon:1", 4, "weather", tags=["loc:lyon"])
+        await cache.set("report:paris", 5, "report", tags=["loc:paris"])
+
+        await cache.invalidate("weather:lyon:1")
+        assert await _service(redis, database).get("weather:lyon:1") is None
+
+        assert await cache.invalidate_tags(["loc:paris"]) >= 3
+        fresh = _service(redis, database)
+        for key in ("weather:paris:1", "weather:paris:3", "report:paris"):
+            assert await cache.get(key) is None
+            assert await fresh.get(key) is None
+
+    @pytest.mark.asyncio
+    async def test_pattern_with_glob_characters(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        await cache.set("q:[blé]*", 1, "routing")
+        await cache.set("q:orge", 2, "routing")
+        await cache.invalidate_pattern("[blé]*")
+        fresh = _service(redis, database)
+        assert await fresh.get("q:[blé]*") is None
+        assert await fresh.get("q:orge") == 2
+
+    @pytest.mark.asyncio
+    async def test_other_workers_drop_memory_copies(self, shared):
+        redis, database = shared
+        first, second = _service(redis, database), _service(redis, database)
+        await first.set("farm_data:1", "v1", "farm_data", tags=["farm:1"])
+        await second.get("farm_data:1")
+        assert "farm_data:1" in second.memory_cache
+
+        await first.invalidate_tags(["farm:1"])
+        _, message = redis.published[-1]
+        assert first.apply_remote_invalidation(json.loads(message)) == 0  # own message
+        assert second.apply_remote_invalidation(json.loads(message)) == 1
+        assert "farm_data:1" not in second.memory_cache
+
+    @pytest.mark.asyncio
+    async def test_clear_all(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        await cache.set("a", 1, "report")
+        await cache.clear_all()
+        assert redis.data == {} and database.rows == {}
+        assert len(cache.memory_cache) == 0
+
+
+class TestFailuresAndStats:
+    """Test suite for tier failures and statistics"""
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_backs_off(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        redis.fail = True
+
+        await cache.set("k", 1, "routing")
+        cache.memory_cache.clear()
+        assert await cache.get("k") is None
+        assert cache.stats.tiers["redis"].errors == 1
+
+        # Skipped while backing off, even after Redis recovers
+        redis.fail = False
+        await cache.set("k2", 2, "routing")
+        assert not any(k.endswith("k2") for k in redis.data)
+
+    @pytest.mark.asyncio
+    async def test_per_tier_stats(self, shared):
+        redis, database = shared
+        cache = _service(redis, database)
+        await cache.set("k", 1, "routing")
+        await cache.get("k")
+        cache.memory_cache.clear()
+        await cache.get("k")
+        await cache.get("missing")
+
+        stats = cache.get_stats()
+        assert stats["tiers"]["memory"]["hits"] == 1
+        assert stats["tiers"]["redis"]["hits"] == 1
+        assert stats["tiers"]["redis"]["writes"] == 1
+        assert stats["tiers"]["database"]["misses"] == 1
+        assert stats["misses"] == 1
+        assert stats["tiers"]["redis"]["avg_read_ms"] >= 0
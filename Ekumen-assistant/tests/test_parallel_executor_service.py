@@ -4,6 +4,9 @@ Unit tests for Parallel Executor Service.
 Tests:
 - Parallel execution
 - Dependency resolution
+- DAG scheduling and critical path
+- Resource class limits
+- Observed runtime estimates
 - Timeout handling
 - Error recovery
 - Performance metrics
@@ -11,8 +14,10 @@ Tests:
 
 import pytest
 import asyncio
+import time
 from app.services.parallel_executor_service import (
     ParallelExecutorService,
+    RuntimeStats,
     ToolStatus,
     ToolResult,
     ExecutionPlan
@@ -339,6 +344,224 @@ class TestParallelExecutorService:
         assert len(results) == 5
 
 
+
+class TestDagScheduling:
+    """Test suite for dependency-driven scheduling"""
+    
+    @pytest.fixture
+    def executor(self):
+        """Create executor instance for testing"""
+        return ParallelExecutorService()
+    
+    @staticmethod
+    def _timed_executor(durations, events):
+        async def run(tool_name, **kwargs):
+            events.append(("start", tool_name, time.perf_counter()))
+            await asyncio.sleep(durations.get(tool_name, 0.1))
+            events.append(("end", tool_name, time.perf_counter()))
+            return {"tool": tool_name}
+        return run
+    
+    @staticmethod
+    def _at(events, kind, tool_name):
+        return next(t for k, name, t in events if k == kind and name == tool_name)
+    
+    def test_plan_levels_and_critical_path(self, executor):
+        """Test plan levels, in-request edges and critical path"""
+        tools = [
+            "check_regulatory_compliance",
+            "get_weather_data",
+            "analyze_weather_risks",
+            "identify_intervention_windows"
+        ]
+        plan = executor._create_execution_plan(tools)
+        
+        assert plan.parallel_groups == [
+            ["check_regulatory_compliance", "get_weather_data"],
+            ["analyze_weather_risks", "identify_intervention_windows"]
+        ]
+        assert plan.dependencies["analyze_weather_risks"] == ["get_weather_data"]
+        # Prior estimates: weather 2s + windows (unknown type) 3s beats regulatory 3s
+        assert plan.critical_path == ["get_weather_data", "identify_intervention_windows"]
+        assert plan.estimated_time == 5.0
+        assert plan.estimated_sequential_time == 10.0
+        # The longest chain is started first
+        assert plan.order[0] == "get_weather_data"
+    
+    @pytest.mark.asyncio
+    async def test_finishes_in_critical_path_time(self, executor):
+        """Test a weather chain plus regulatory checks runs in critical path time"""
+        events = []
+        durations = {
+            "get_weather_data": 0.2,
+            "analyze_weather_risks": 0.2,
+            "identify_intervention_windows": 0.2,
+            "check_regulatory_compliance": 0.3,
+            "lookup_amm_tool": 0.3
+        }
+        
+        start = time.perf_counter()
+        results = await executor.execute_tools_parallel(
+            list(durations), self._timed_executor(durations, events)
+        )
+        elapsed = time.perf_counter() - start
+        
+        # Critical path is 0.4s; the old sequential tail took 0.3s + 0.4s
+        assert elapsed < 0.6
+        assert all(r.status == ToolStatus.SUCCESS for r in results.values())
+        assert list(results) == list(durations)
+        weather_done = self._at(events, "end", "get_weather_data")
+        assert self._at(events, "start", "analyze_weather_risks") >= weather_done
+        assert self._at(events, "start", "identify_intervention_windows") >= weather_done
+        
+        critical = executor.get_stats()["last_critical_path"]
+        assert critical["tools"][0] == "get_weather_data"
+        assert critical["tools"][1] in ("analyze_weather_risks", "identify_intervention_windows")
+        assert critical["observed_time"] == pytest.approx(0.4, abs=0.1)
+    
+    @pytest.mark.asyncio
+    async def test_tool_starts_when_own_dependencies_finish(self, executor):
+        """Test a dependent tool does not wait for unrelated tools"""
+        events = []
+        executor.tool_dependencies = {"step_b": ["step_a"]}
+        durations = {"step_a": 0.05, "step_b": 0.05, "slow_report": 0.4}
+        
+        await executor.execute_tools_parallel(
+            ["slow_report", "step_a", "step_b"], self._timed_executor(durations, events)
+        )
+        
+        assert self._at(events, "start", "step_b") >= self._at(events, "end", "step_a")
+        assert self._at(events, "end", "step_b") < self._at(events, "end", "slow_report")
+    
+    @pytest.mark.asyncio
+    async def test_dependents_see_dependency_results(self, executor):
+        """Test dependency results are passed to dependent tools"""
+        seen = {}
+        
+        async def run(tool_name, previous_results=None, **kwargs):
+            seen[tool_name] = set(previous_results)
+            if tool_name == "diagnose_disease":
+                raise ValueError("no symptoms")
+            return {"tool": tool_name}
+        
+        results = await executor.execute_tools_parallel(
+            ["generate_treatment_plan", "diagnose_disease", "identify_pest"], run
+        )
+        
+        # Runs after both dependencies, even though one failed
+        assert seen["generate_treatment_plan"] >= {"diagnose_disease", "identify_pest"}
+        assert results["diagnose_disease"].status == ToolStatus.FAILED
+        assert results["generate_treatment_plan"].status == ToolStatus.SUCCESS
+    
+    @pytest.mark.asyncio
+    async def test_dependency_cycle_does_not_deadlock(self, executor):
+        """Test cyclic dependencies are broken instead of hanging"""
+        executor.tool_dependencies = {"tool_a": ["tool_b"], "tool_b": ["tool_a"]}
+        
+        async def run(tool_name, **kwargs):
+            return {"tool": tool_name}
+        
+        results = await asyncio.wait_for(
+            executor.execute_tools_parallel(["tool_a", "tool_b"], run), timeout=2
+        )
+        assert {r.status for r in results.values()} == {ToolStatus.SUCCESS}
+    
+    @pytest.mark.asyncio
+    async def test_tool_downstream_of_cycle_waits(self, executor):
+        """Test only the edges on a cycle are dropped, not those leading into it"""
+        executor.tool_dependencies = {"tool_a": ["tool_b"], "tool_b": ["tool_a"], "tool_c": ["tool_a"]}
+        plan = executor._create_execution_plan(["tool_c", "tool_a", "tool_b"])
+        assert plan.dependencies["tool_c"] == ["tool_a"]
+        assert plan.dependencies["tool_a"] == [] and plan.dependencies["tool_b"] == []
+        
+        seen = {}
+        
+        async def run(tool_name, previous_results=None, **kwargs):
+            seen[tool_name] = set(previous_results)
+            return {"tool": tool_name}
+        
+        await asyncio.wait_for(
+            executor.execute_tools_parallel(["tool_c", "tool_a", "tool_b"], run), timeout=2
+        )
+        assert "tool_a" in seen["tool_c"]
+    
+    @pytest.mark.asyncio
+    async def test_resource_class_limit(self):
+        """Test concurrency is capped per resource class"""
+        executor = ParallelExecutorService(resource_limits={"weather_api": 2})
+        running = {"weather_api": 0, "db": 0}
+        peak = {"weather_api": 0, "db": 0}
+        
+        async def run(tool_name, **kwargs):
+            resource_class = executor._get_resource_class(tool_name)
+            running[resource_class] += 1
+            peak[resource_class] = max(peak[resource_class], running[resource_class])
+            await asyncio.sleep(0.05)
+            running[resource_class] -= 1
+            return {}
+        
+        tools = [f"get_weather_data_{i}" for i in range(5)] + [f"get_farm_data_{i}" for i in range(4)]
+        results = await executor.execute_tools_parallel(tools, run, max_parallel=10)
+        
+        assert len(results) == 9
+        assert peak == {"weather_api": 2, "db": 4}
+    
+    def test_resource_classes(self, executor):
+        """Test resource class detection"""
+        assert executor._get_resource_class("get_weather_data") == "weather_api"
+        assert executor._get_resource_class("lookup_amm") == "db"
+        assert executor._get_resource_class("internet_agent") == "llm"
+        assert executor._get_resource_class("tool1") is None
+
+
+class TestRuntimeEstimates:
+    """Test suite for observed runtime estimates"""
+    
+    def test_prior_until_enough_samples(self):
+        """Test static priors are used until runtimes are observed"""
+        executor = ParallelExecutorService()
+        executor._record_runtime("get_weather_data", 0.5)
+        assert executor._estimate_tool_time("get_weather_data") == 2.0
+    
+    def test_observed_percentiles(self):
+        """Test p50/p95 come from observed runtimes"""
+        executor = ParallelExecutorService()
+        for seconds in [0.1] * 18 + [1.0, 2.0]:
+            executor._record_runtime("get_weather_data", seconds)
+        
+        assert executor._estimate_tool_time("get_weather_data") == 0.1
+        assert executor._estimate_tool_time("get_weather_data", percentile=95) == 1.0
+        
+        # Other tools of the same type fall back to the type's runtimes
+        assert executor._estimate_tool_time("analyze_weather_risks") == 0.1
+        
+        stats = executor.get_stats()["runtime_estimates"]["get_weather_data"]
+        assert stats == {"p50": 0.1, "p95": 1.0, "samples": 20}
+    
+    def test_plan_uses_observed_runtimes(self):
+        """Test the critical path follows observed runtimes"""
+        executor = ParallelExecutorService()
+        for _ in range(5):
+            executor._record_runtime("get_weather_data", 0.2)
+            executor._record_runtime("analyze_weather_risks", 0.3)
+            executor._record_runtime("check_regulatory_compliance", 1.5)
+        
+        plan = executor._create_execution_plan(
+            ["get_weather_data", "analyze_weather_risks", "check_regulatory_compliance"]
+        )
+        assert plan.critical_path == ["check_regulatory_compliance"]
+        assert plan.estimated_time == 1.5
+        assert plan.order[0] == "check_regulatory_compliance"
+    
+    def test_window_is_bounded(self):
+        """Test only recent runtimes are kept"""
+        stats = RuntimeStats(window=3)
+        for seconds in (5.0, 1.0, 1.0, 1.0):
+            stats.record(seconds)
+        assert len(stats) == 3
+        assert stats.percentile(95) == 1.0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
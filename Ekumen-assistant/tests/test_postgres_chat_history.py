@@ -0,0 +1,320 @@
+"""
+Unit tests for the windowed PostgreSQL chat history.
+
+Tests:
+- Recent window plus rolling summary
+- Hot window served from Redis on repeat turns, kept current by
+  ChatService.save_message
+- One multi-row INSERT per turn, messages added mid-flush not dropped
+- Background summary refresh (single flight)
+- Sync access inside a running loop
+- Redis failures fall back to the database
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from sqlalchemy.sql.dml import Insert
+
+from app.services import postgres_chat_history as history_module
+from app.services.chat_service import ChatService
+from app.services.postgres_chat_history import (
+    HistoryWindowCache,
+    PostgresChatMessageHistory,
+    StoredMessage,
+    _summary_tasks,
+)
+from tests.conftest import FakeRedis
+
+
+class FakeStore:
+    """Messages table and conversation summary of one conversation"""
+
+    def __init__(self, conversation_id, count=0):
+        self.conversation_id = conversation_id
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.rows = [
+            StoredMessage(str(uuid4()), "user" if i % 2 == 0 else "agent", f"m{i}", start + timedelta(minutes=i))
+            for i in range(count)
+        ]
+        self.summary = None
+        self.through = None
+        self.fetches = 0
+
+    async def fetch_messages(self, db, conversation_id, after=None, before=None, limit=100, newest_first=False):
+        self.fetches += 1
+        rows = sorted(self.rows, key=lambda r: (r.created_at, r.id))
+        if after is not None:
+            rows = [r for r in rows if r.created_at > after[0] or (
+                after[1] is not None and r.created_at == after[0] and r.id > after[1])]
+        if before is not None:
+            rows = [r for r in rows if (r.created_at, r.id) < before]
+        return rows[-limit:] if newest_first else rows[:limit]
+
+    async def load_summary(self, db, conversation_id):
+        return self.summary, self.through
+
+
+class FakeSession:
+    """Async session recording executed statements"""
+
+    def __init__(self, store):
+        self.store = store
+        self.inserts = []
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        if isinstance(statement, Insert):
+            rows = statement._multi_values[0]
+            self.inserts.append(rows)
+            for row in rows:
+                row = {getattr(k, "name", k): v for k, v in row.items()}
+                self.store.rows.append(StoredMessage(str(row["id"]), row["sender"], row["content"], row["created_at"]))
+        else:
+            self.statements.append(str(statement))
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+class FakeOrmSession:
+    """Async ORM session for ChatService.save_message, storing added messages"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def add(self, message):
+        message.id = uuid4()
+        message.created_at = datetime.now(timezone.utc)
+        self.store.rows.append(
+            StoredMessage(str(message.id), message.sender, message.content, message.created_at)
+        )
+
+    async def get(self, model, key):
+        return None
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, instance):
+        pass
+
+
+@pytest.fixture
+def conversation_id():
+    return str(uuid4())
+
+
+@pytest.fixture
+def store(conversation_id, monkeypatch):
+    """Conversation with 30 stored messages"""
+    store = FakeStore(conversation_id, count=30)
+    monkeypatch.setattr(history_module, "fetch_messages", store.fetch_messages)
+    monkeypatch.setattr(history_module, "_load_summary", store.load_summary)
+    return store
+
+
+@pytest.fixture
+def cache():
+    return HistoryWindowCache(redis_client=FakeRedis(), ttl=60, capacity=12)
+
+
+def _history(conversation_id, store, cache=None, summarizer=None):
+    return PostgresChatMessageHistory(
+        conversation_id, FakeSession(store), window=6, summary_batch=6, cache=cache, summarizer=summarizer
+    )
+
+
+class TestWindow:
+    """Test suite for windowed loading"""
+
+    @pytest.mark.asyncio
+    async def test_loads_last_window(self, conversation_id, store):
+        """Test only the last N messages are loaded, oldest first"""
+        messages = await _history(conversation_id, store).aget_messages()
+        assert [m.content for m in messages] == ["m24", "m25", "m26", "m27", "m28", "m29"]
+        assert isinstance(messages[0], HumanMessage) and isinstance(messages[1], AIMessage)
+
+    @pytest.mark.asyncio
+    async def test_summary_precedes_window(self, conversation_id, store):
+        """Test the rolling summary replaces summarized messages"""
+        store.summary, store.through = "Blé tendre, parcelle nord", store.rows[25].created_at
+        messages = await _history(conversation_id, store).aget_messages()
+
+        assert isinstance(messages[0], SystemMessage)
+        assert "Blé tendre, parcelle nord" in messages[0].content
+        assert [m.content for m in messages[1:]] == ["m26", "m27", "m28", "m29"]
+
+    @pytest.mark.asyncio
+    async def test_invalid_conversation_id(self, store):
+        """Test a non-UUID conversation has no history"""
+        assert await _history("not-a-uuid", store).aget_messages() == []
+
+
+class TestCache:
+    """Test suite for the Redis hot window"""
+
+    @pytest.mark.asyncio
+    async def test_repeat_turns_skip_database(self, conversation_id, store, cache):
+        """Test the second turn is served from Redis"""
+        first = await _history(conversation_id, store, cache).aget_messages()
+        fetches = store.fetches
+
+        second = await _history(conversation_id, store, cache).aget_messages()
+        assert [m.content for m in second] == [m.content for m in first]
+        assert store.fetches == fetches
+        assert cache.stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_new_turns_appended_to_cache(self, conversation_id, store, cache):
+        """Test saved turns reach the cached window"""
+        history = _history(conversation_id, store, cache)
+        await history.aget_messages()
+        await history.aadd_messages([HumanMessage(content="Quand semer ?"), AIMessage(content="En octobre.")])
+
+        messages = await _history(conversation_id, store, cache).aget_messages()
+        assert [m.content for m in messages][-2:] == ["Quand semer ?", "En octobre."]
+        assert cache.stats["hits"] == 1
+        messages_key, _ = cache._keys(conversation_id)
+        assert len(cache.redis.data[messages_key]) == 12
+
+    @pytest.mark.asyncio
+    async def test_chat_service_messages_reach_cache(self, conversation_id, store, cache, monkeypatch):
+        """Test messages saved through ChatService show up in the cached window"""
+        monkeypatch.setattr("app.services.chat_service.history_window_cache", cache)
+        await _history(conversation_id, store, cache).aget_messages()
+
+        db = FakeOrmSession(store)
+        await ChatService().save_message(db, conversation_id, "Et le colza ?", "user")
+
+        messages = await _history(conversation_id, store, cache).aget_messages()
+        assert messages[-1].content == "Et le colza ?"
+        assert isinstance(messages[-1], HumanMessage)
+        assert cache.stats["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_to_database(self, conversation_id, store, cache):
+        """Test Redis errors do not break history loading"""
+        cache.redis.fail = True
+        messages = await _history(conversation_id, store, cache).aget_messages()
+        assert len(messages) == 6
+        assert cache.stats["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_clear_invalidates_cache(self, conversation_id, store, cache):
+        """Test clearing a conversation drops its cached window"""
+        history = _history(conversation_id, store, cache)
+        await history.aget_messages()
+        await history.aclear()
+
+        assert cache.redis.data == {}
+        assert await history.aget_messages() == []
+        assert any("summary_through = NULL" in s for s in history.db_session.statements)
+
+
+class TestWrites:
+    """Test suite for batched writes"""
+
+    @pytest.mark.asyncio
+    async def test_turn_saved_with_one_insert(self, conversation_id, store):
+        """Test a turn is one multi-row INSERT and one commit"""
+        history = _history(conversation_id, store)
+        await history.aadd_messages([HumanMessage(content="Q"), AIMessage(content="R")])
+
+        session = history.db_session
+        assert len(session.inserts) == 1
+        assert session.commits == 1
+        assert [r.sender for r in store.rows[-2:]] == ["user", "agent"]
+        assert store.rows[-2].created_at < store.rows[-1].created_at
+
+    @pytest.mark.asyncio
+    async def test_add_message_batches_within_loop(self, conversation_id, store):
+        """Test messages added synchronously in a loop are flushed together"""
+        history = _history(conversation_id, store)
+        history.add_message(HumanMessage(content="Q"))
+        history.add_message(AIMessage(content="R"))
+        await history.aflush()
+        await asyncio.sleep(0)
+
+        assert len(history.db_session.inserts) == 1
+        assert len(history.db_session.inserts[0]) == 2
+
+    @pytest.mark.asyncio
+    async def test_messages_added_during_flush_are_saved(self, conversation_id, store):
+        """Test a message added while a batch is being written is saved after it"""
+        history = _history(conversation_id, store)
+        session = history.db_session
+        saving, release = asyncio.Event(), asyncio.Event()
+        execute = session.execute
+
+        async def slow_execute(statement, params=None):
+            saving.set()
+            await release.wait()
+            return await execute(statement, params)
+
+        session.execute = slow_execute
+        history.add_message(HumanMessage(content="Q"))
+        await saving.wait()
+        history.add_message(AIMessage(content="R"))
+        release.set()
+        await history._background
+
+        assert [r.content for r in store.rows[-2:]] == ["Q", "R"]
+        assert len(session.inserts) == 2
+
+    @pytest.mark.asyncio
+    async def test_sync_messages_inside_running_loop(self, conversation_id, store):
+        """Test sync access fails loudly instead of returning an empty history"""
+        history = _history(conversation_id, store)
+        with pytest.raises(RuntimeError, match="aget_messages"):
+            history.messages
+
+        await history.aget_messages()
+        assert len(history.messages) == 6
+
+
+class TestSummary:
+    """Test suite for the background summary refresh"""
+
+    @pytest.mark.asyncio
+    async def test_refresh_scheduled_once(self, conversation_id, store, monkeypatch):
+        """Test a full batch outside the window schedules one refresh"""
+        refreshes = []
+        release = asyncio.Event()
+
+        async def refresh_summary(conversation_uuid, summarizer, window=None, cache=None):
+            refreshes.append(conversation_uuid)
+            await release.wait()
+
+        async def summarizer(previous, messages):
+            return "résumé"
+
+        monkeypatch.setattr(history_module, "refresh_summary", refresh_summary)
+        await _history(conversation_id, store, summarizer=summarizer).aget_messages()
+        await _history(conversation_id, store, summarizer=summarizer).aget_messages()
+        await asyncio.sleep(0)
+
+        assert len(refreshes) == 1
+        release.set()
+        await asyncio.sleep(0)
+        assert conversation_id not in _summary_tasks
+
+    @pytest.mark.asyncio
+    async def test_no_refresh_for_short_conversations(self, conversation_id, monkeypatch):
+        """Test conversations within window + batch are not summarized"""
+        store = FakeStore(conversation_id, count=8)
+        monkeypatch.setattr(history_module, "fetch_messages", store.fetch_messages)
+        monkeypatch.setattr(history_module, "_load_summary", store.load_summary)
+
+        async def summarizer(previous, messages):
+            raise AssertionError("should not summarize")
+
+        await _history(conversation_id, store, summarizer=summarizer).aget_messages()
+        assert conversation_id not in _summary_tasks
@@ -0,0 +1,379 @@
+"""
+Unit tests for ACL-aware RAG retrieval.
+
+Tests:
+- Access rules (own organization, shared, user shares, Ekumen content, expiry)
+- Chunk ACL metadata + Chroma where-filter agree with the access rules
+- Retrieval filters in the index, off the event loop, and re-checks hits
+- Per-organization accessible-set caching and invalidation
+- Backfill of chunks without ACL metadata, resync on renewal
+"""
+
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services import document_access_cache as access_module
+from app.services.document_access_cache import (
+    NO_EXPIRY,
+    DocumentAccess,
+    DocumentAccessCache,
+    acl_where,
+    chunk_acl_metadata,
+)
+from app.services.embedding_cache import EmbeddingCache
+from app.services.knowledge_base_workflow_service import KnowledgeBaseWorkflowService
+from app.services.rag_service import RAGService
+
+
+ORGS = [str(uuid.UUID(int=i)) for i in range(1, 5)]
+USERS = [str(uuid.UUID(int=100 + i)) for i in range(1, 4)]
+
+
+def _kb_document(rng):
+    visibility = rng.choice(["internal", "shared", "public"])
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        organization_id=rng.choice(ORGS),
+        visibility=visibility,
+        shared_with_organizations=rng.sample(ORGS, rng.randint(0, 2)),
+        shared_with_users=rng.sample(USERS, rng.randint(0, 1)),
+        is_ekumen_provided=rng.random() < 0.2,
+        expiration_date=rng.choice([None, "2000-01-01T00:00:00", "2999-01-01T00:00:00"]),
+        organization_metadata={},
+    )
+
+
+def _access(document):
+    return DocumentAccess(
+        document_id=str(document.id),
+        organization_id=str(document.organization_id),
+        filename="doc.pdf",
+        document_type="manual",
+        visibility=document.visibility,
+        shared_with_organizations=frozenset(document.shared_with_organizations),
+        shared_with_users=frozenset(document.shared_with_users),
+        is_ekumen_provided=document.is_ekumen_provided,
+        expires_at=access_module.document_expires_at(document),
+        quality_score=0.9,
+        version=1,
+        tags=("blé",),
+        description=None,
+        metadata_expiration_date=None,
+    )
+
+
+def _matches(where, metadata):
+    """Minimal evaluator for the Chroma where-filter operators used by acl_where"""
+    if "$and" in where:
+        return all(_matches(w, metadata) for w in where["$and"])
+    if "$or" in where:
+        return any(_matches(w, metadata) for w in where["$or"])
+    (key, condition), = where.items()
+    if key not in metadata:
+        return False
+    value = metadata[key]
+    if isinstance(condition, dict):
+        (op, operand), = condition.items()
+        return {"$in": lambda: value in operand, "$gt": lambda: value > operand}[op]()
+    return value == condition
+
+
+class TestAccessRules:
+    """Test suite for the access rules"""
+
+    def test_rules(self):
+        base = dict(
+            document_id="d", organization_id=ORGS[0], filename="f", document_type=None,
+            visibility="shared", shared_with_organizations=frozenset(), shared_with_users=frozenset(),
+            is_ekumen_provided=False, expires_at=NO_EXPIRY, quality_score=None, version=1,
+            tags=(), description=None, metadata_expiration_date=None,
+        )
+        # Shared with everyone
+        assert DocumentAccess(**base).allows(USERS[0], ORGS[1])
+        # Shared with one other organization only
+        only_org2 = DocumentAccess(**{**base, "shared_with_organizations": frozenset([ORGS[2]])})
+        assert only_org2.allows(USERS[0], ORGS[2])
+        assert not only_org2.allows(USERS[0], ORGS[1])
+        # Public documents of other organizations are not shared
+        public = DocumentAccess(**{**base, "visibility": "public"})
+        assert public.allows(USERS[0], ORGS[0]) and not public.allows(USERS[0], ORGS[1])
+        # User shares and Ekumen content
+        assert DocumentAccess(**{**public._asdict(), "shared_with_users": frozenset([USERS[1]])}).allows(USERS[1], ORGS[1])
+        ekumen = DocumentAccess(**{**public._asdict(), "is_ekumen_provided": True})
+        assert ekumen.allows(USERS[0], ORGS[1])
+        assert not ekumen.allows(USERS[0], ORGS[1], include_ekumen_content=False)
+        # Expired
+        assert not DocumentAccess(**{**base, "expires_at": time.time() - 1}).allows(USERS[0], ORGS[0])
+
+    def test_where_filter_agrees_with_rules(self):
+        rng = random.Random(3)
+        now = time.time()
+        for _ in range(500):
+            document = _kb_document(rng)
+            metadata = {"document_id": str(document.id), **chunk_acl_metadata(document)}
+            access = _access(document)
+            for user in USERS:
+                for org in ORGS:
+                    for include_ekumen in (True, False):
+                        in_index = _matches(acl_where(user, org, include_ekumen, now), metadata)
+                        expected = document.visibility != "internal" and access.allows(user, org, include_ekumen, now)
+                        assert in_index == expected
+
+    def test_expiry_uses_earliest_date(self):
+        document = SimpleNamespace(
+            expiration_date="2999-01-01T00:00:00",
+            organization_metadata={"expiration_date": "2030-01-01T00:00:00Z"},
+        )
+        assert access_module.document_expires_at(document) == pytest.approx(1893456000.0)
+
+
+class FakeVectorStore:
+    """Vector store whose similarity_search applies the where-filter to its chunks"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = []
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        self.calls.append((filter, threading.current_thread()))
+        hits = [c for c in self.chunks if filter is None or _matches(filter, c.metadata)]
+        return [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in hits[:k]]
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    rng = random.Random(5)
+    documents = [_kb_document(rng) for _ in range(60)]
+    chunks = [
+        Document(page_content=f"chunk {i}", metadata={"document_id": str(d.id), **chunk_acl_metadata(d)})
+        for i, d in enumerate(documents)
+    ]
+    cache = DocumentAccessCache(ttl=3600)
+
+    async def load(organization_id, db):
+        return {
+            str(d.id): _access(d) for d in documents
+            if d.visibility != "internal" and _access(d).allows("", organization_id)
+            or d.shared_with_users and d.visibility != "internal"
+        }
+
+    monkeypatch.setattr(cache, "_load", load)
+    monkeypatch.setattr("app.services.rag_service.document_access_cache", cache)
+
+    service = RAGService.__new__(RAGService)
+    service.vectorstore = FakeVectorStore(chunks)
+    service.embeddings = SimpleNamespace(model="fake", embed_query=lambda text: [float(len(text))])
+    monkeypatch.setattr("app.services.rag_service.embedding_cache", EmbeddingCache(store=None))
+
+    async def no_analytics(documents, db, query=None):
+        return None
+
+    service._track_document_analytics = no_analytics
+    return SimpleNamespace(documents=documents, service=service, cache=cache)
+
+
+class TestRetrieval:
+    """Test suite for get_relevant_documents"""
+
+    @pytest.mark.asyncio
+    async def test_only_accessible_documents(self, corpus):
+        by_id = {str(d.id): d for d in corpus.documents}
+        for org in ORGS:
+            for user in USERS:
+                results = await corpus.service.get_relevant_documents("blé", user, org, k=100)
+                for doc in results:
+                    access = _access(by_id[doc.metadata["document_id"]])
+                    assert access.allows(user, org)
+                    assert doc.metadata["quality_score"] == 0.9
+                expected = [
+                    d for d in corpus.documents
+                    if d.visibility != "internal" and _access(d).allows(user, org)
+                ]
+                assert len(results) == len(expected)
+
+    @pytest.mark.asyncio
+    async def test_search_is_filtered_in_index_off_the_loop(self, corpus):
+        await corpus.service.get_relevant_documents("blé", USERS[0], ORGS[0], k=3)
+        where, thread = corpus.service.vectorstore.calls[-1]
+        assert "$in" not in str(where.get("document_id", ""))
+        assert thread is not threading.main_thread()
+
+    @pytest.mark.asyncio
+    async def test_hits_rechecked_against_current_state(self, corpus):
+        results = await corpus.service.get_relevant_documents("blé", USERS[0], ORGS[0], k=100)
+        revoked = results[0].metadata["document_id"]
+
+        # Document deactivated after ingestion; chunk metadata not yet synced
+        corpus.cache._sets[ORGS[0]].documents.pop(revoked)
+        again = await corpus.service.get_relevant_documents("blé", USERS[0], ORGS[0], k=100)
+        assert revoked not in {d.metadata["document_id"] for d in again}
+        assert len(again) == len(results) - 1
+
+    @pytest.mark.asyncio
+    async def test_vector_search_error_returns_nothing(self, corpus):
+        def broken(*args, **kwargs):
+            raise RuntimeError("chroma unavailable")
+
+        corpus.service.vectorstore.similarity_search_by_vector = broken
+        assert await corpus.service.get_relevant_documents("blé", USERS[0], ORGS[0]) == []
+
+    @pytest.mark.asyncio
+    async def test_authentication_required(self, corpus):
+        with pytest.raises(ValueError):
+            await corpus.service.get_relevant_documents("blé", "", ORGS[0])
+
+
+class TestAccessCache:
+    """Test suite for accessible-set caching"""
+
+    @pytest.mark.asyncio
+    async def test_cached_per_organization(self, corpus):
+        for _ in range(3):
+            await corpus.cache.get(ORGS[0])
+        await corpus.cache.get(ORGS[1])
+        assert corpus.cache.stats["loads"] == 2
+        assert corpus.cache.stats["hits"] == 2
+
+        corpus.cache.invalidate([ORGS[0]])
+        await corpus.cache.get(ORGS[0])
+        await corpus.cache.get(ORGS[1])
+        assert corpus.cache.stats["loads"] == 3
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_is_not_cached(self, monkeypatch):
+        cache = DocumentAccessCache(ttl=3600)
+
+        async def load(organization_id, db):
+            cache.invalidate()
+            return {}
+
+        monkeypatch.setattr(cache, "_load", load)
+        await cache.get(ORGS[0], db=object())
+        assert ORGS[0] not in cache._sets
+
+    def test_commit_invalidates_changed_organizations(self, monkeypatch):
+        cache = DocumentAccessCache(ttl=3600)
+        cache._sets = {org: access_module.AccessibleSet({}, time.time()) for org in ORGS}
+        monkeypatch.setattr(access_module, "document_access_cache", cache)
+
+        session = SimpleNamespace(info={access_module._CHANGED_KEY: {ORGS[0]}})
+        access_module._invalidate_after_commit(session)
+        assert set(cache._sets) == set(ORGS[1:])
+
+        session.info[access_module._CHANGED_KEY] = {access_module._ALL}
+        access_module._invalidate_after_commit(session)
+        assert cache._sets == {}
+
+    def test_rollback_discards_changes(self, monkeypatch):
+        cache = DocumentAccessCache(ttl=3600)
+        cache._sets = {ORGS[0]: access_module.AccessibleSet({}, time.time())}
+        monkeypatch.setattr(access_module, "document_access_cache", cache)
+
+        session = SimpleNamespace(info={access_module._CHANGED_KEY: {ORGS[0]}})
+        access_module._discard_after_rollback(session)
+        access_module._invalidate_after_commit(session)
+        assert ORGS[0] in cache._sets
+
+
+class FakeCollection:
+    """Chroma collection holding chunk metadata by ID"""
+
+    def __init__(self, metadatas):
+        self.metadatas = dict(metadatas)
+
+    def get(self, where=None, include=None, limit=None, offset=0):
+        ids = [
+            i for i, m in self.metadatas.items()
+            if where is None or m.get("document_id") == where["document_id"]
+        ]
+        ids = ids[offset:offset + limit] if limit is not None else ids
+        return {"ids": ids, "metadatas": [dict(self.metadatas[i]) for i in ids]}
+
+    def update(self, ids, metadatas):
+        for i, metadata in zip(ids, metadatas):
+            self.metadatas[i].update(metadata)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.added = []
+        self.commits = 0
+
+    async def execute(self, query):
+        return FakeResult(self.rows)
+
+    def add(self, row):
+        self.added.append(row)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _service_with(collection):
+    service = RAGService.__new__(RAGService)
+    service.vectorstore = SimpleNamespace(get=collection.get, _collection=collection)
+    return service
+
+
+class TestAclSync:
+    """Test suite for keeping chunk ACL metadata in step with documents"""
+
+    @pytest.mark.asyncio
+    async def test_backfill_legacy_chunks(self):
+        legacy = SimpleNamespace(
+            id=uuid.uuid4(), organization_id=ORGS[0], visibility="shared",
+            shared_with_organizations=[ORGS[1]], shared_with_users=[], is_ekumen_provided=False,
+            expiration_date=None, organization_metadata={},
+        )
+        current = _kb_document(random.Random(1))
+        collection = FakeCollection({
+            **{f"legacy-{i}": {"document_id": str(legacy.id), "chunk_index": i} for i in range(3)},
+            "current-0": {"document_id": str(current.id), **chunk_acl_metadata(current)},
+        })
+        service = _service_with(collection)
+        where = acl_where(USERS[0], ORGS[1])
+        assert not any(_matches(where, m) for i, m in collection.metadatas.items() if i.startswith("legacy"))
+
+        assert await service.backfill_acl_metadata(db=FakeSession([legacy]), page_size=2) == 1
+        assert all(_matches(where, m) for i, m in collection.metadatas.items() if i.startswith("legacy"))
+        assert collection.metadatas["legacy-0"]["chunk_index"] == 0
+
+        # Nothing left to backfill
+        assert await service.backfill_acl_metadata(db=FakeSession([legacy]), page_size=2) == 0
+
+    @pytest.mark.asyncio
+    async def test_renewal_resyncs_expiry(self, monkeypatch):
+        document = SimpleNamespace(
+            id=uuid.uuid4(), organization_id=ORGS[0], visibility="public",
+            shared_with_organizations=[], shared_with_users=[], is_ekumen_provided=False,
+            expiration_date="2000-01-01T00:00:00",
+            organization_metadata={"expiration_date": "2000-01-01T00:00:00"},
+        )
+        collection = FakeCollection({"c": {"document_id": str(document.id), **chunk_acl_metadata(document)}})
+        monkeypatch.setattr("app.services.rag_service.get_rag_service", lambda: _service_with(collection))
+        assert not _matches(acl_where(USERS[0], ORGS[0]), collection.metadatas["c"])
+
+        db = FakeSession([document])
+        result = await KnowledgeBaseWorkflowService().renew_document(
+            str(document.id), renewed_by=USERS[0], db=db
+        )
+        assert result["success"] and db.commits == 1
+        assert _matches(acl_where(USERS[0], ORGS[0]), collection.metadatas["c"])
@@ -0,0 +1,290 @@
+"""
+Unit tests for knowledge base ingestion.
+
+Tests:
+- Process-wide RAG service with lazy components
+- Identical chunks embedded once, re-ingestion embeds nothing new
+- Bounded concurrent embedding batches with retry
+- Background worker recording processing status
+- Startup claims and re-queues pending and stalled documents
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models.knowledge_base import DocumentStatus, DocumentType
+from app.services import rag_service as rag_module
+from app.services.embedding_cache import EmbeddingCache
+from app.services.document_ingestion_service import DocumentIngestionService, read_document_text
+from app.services.rag_service import RAGService, content_hash, get_rag_service
+
+
+def _kb_document(**overrides):
+    fields = dict(
+        id=uuid.uuid4(),
+        organization_id=uuid.uuid4(),
+        uploaded_by=uuid.uuid4(),
+        filename="fiche.txt",
+        file_path="",
+        file_type="txt",
+        document_type=DocumentType.TECHNICAL_SHEET,
+        created_at=datetime(2026, 1, 1),
+        version=1,
+        visibility="internal",
+        shared_with_organizations=[],
+        shared_with_users=[],
+        is_ekumen_provided=False,
+        expiration_date=None,
+        organization_metadata={},
+        chunk_count=None,
+        processing_status=DocumentStatus.PENDING,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class FakeCollection:
+    def __init__(self, store):
+        self.store = store
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        assert None not in [v for metadata in metadatas for v in metadata.values()]
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.store.chunks[chunk_id] = metadata
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.chunks = {}
+        self._collection = FakeCollection(self)
+
+    def get(self, where=None, include=None):
+        return {"ids": [i for i, m in self.chunks.items() if m["document_id"] == where["document_id"]]}
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            del self.chunks[chunk_id]
+
+
+class FakeEmbeddings:
+    """Records batch sizes and peak concurrency, failing the first calls"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.in_flight = 0
+        self.peak = 0
+
+    async def aembed_documents(self, texts):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("rate limited")
+            self.batches.append(len(texts))
+            return [[float(len(t))] for t in texts]
+        finally:
+            self.in_flight -= 1
+
+
+class FakeSession:
+    def __init__(self, documents=None):
+        self.documents = documents or {}
+        self.commits = 0
+        self.queries = []
+
+    async def execute(self, query):
+        """Document IDs claimed by the recovery query (the test sets which ones)"""
+        self.queries.append(query)
+        return [(uuid.UUID(document_id),) for document_id in self.documents]
+
+    async def get(self, model, document_id):
+        return self.documents.get(document_id)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+def _chunks(*texts):
+    return [{"content": text, "chunk_start": i, "chunk_end": i + 1} for i, text in enumerate(texts)]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(rag_module, "EMBED_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(rag_module, "embedding_cache", EmbeddingCache(store=None))
+    service = RAGService()
+    service.vectorstore = FakeVectorStore()
+    service.embeddings = FakeEmbeddings()
+    return service
+
+
+class TestRagService:
+    """Test suite for the shared RAG service"""
+
+    def test_process_wide_and_lazy(self):
+        """Test the service is shared and opens nothing until used"""
+        service = get_rag_service()
+        assert get_rag_service() is service
+        assert RAGService()._vectorstore is None
+
+
+class TestIngestion:
+    """Test suite for batched, deduplicated embedding"""
+
+    @pytest.mark.asyncio
+    async def test_identical_chunks_embedded_once(self, service, monkeypatch):
+        """Test chunks are keyed by content hash"""
+        document = _kb_document()
+        monkeypatch.setattr(service, "_split_text_into_chunks", lambda text: _chunks("a", "b", "a"))
+
+        assert await service.add_document_to_vectorstore(document, "a b a", FakeSession())
+        assert sum(service.embeddings.batches) == 2
+        assert document.chunk_count == 2
+        assert set(service.vectorstore.chunks) == {f"{document.id}:{content_hash(t)}" for t in "ab"}
+
+    @pytest.mark.asyncio
+    async def test_reingestion_embeds_only_changes(self, service, monkeypatch):
+        """Test indexed chunks are reused and removed chunks dropped"""
+        document = _kb_document()
+        monkeypatch.setattr(service, "_split_text_into_chunks", lambda text: _chunks(*text.split()))
+        await service.add_document_to_vectorstore(document, "a b c", FakeSession())
+        service.embeddings.batches.clear()
+
+        await service.add_document_to_vectorstore(document, "a b d", FakeSession())
+        assert service.embeddings.batches == [1]
+        assert set(service.vectorstore.chunks) == {f"{document.id}:{content_hash(t)}" for t in "abd"}
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrent_batches(self, service, monkeypatch):
+        """Test batch size and concurrency limits"""
+        monkeypatch.setattr(settings, "RAG_EMBED_BATCH_SIZE", 10)
+        monkeypatch.setattr(settings, "RAG_EMBED_CONCURRENCY", 2)
+        texts = [f"chunk {i}" for i in range(45)]
+
+        vectors = await service._embed_in_batches(texts)
+        assert vectors == [[float(len(t))] for t in texts]
+        assert sorted(service.embeddings.batches) == [5, 10, 10, 10, 10]
+        assert service.embeddings.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_chunks_embedded_as_produced(self, service, monkeypatch):
+        """Test chunks are embedded a window at a time, not collected first"""
+        monkeypatch.setattr(settings, "RAG_EMBED_BATCH_SIZE", 10)
+        monkeypatch.setattr(settings, "RAG_EMBED_CONCURRENCY", 2)
+        produced = []
+        pulled_at_upsert = []
+
+        def chunks(text):
+            for chunk in _chunks(*(f"chunk {i}" for i in range(45))):
+                produced.append(chunk)
+                yield chunk
+
+        upsert = service.vectorstore._collection.upsert
+
+        def recording_upsert(**kwargs):
+            pulled_at_upsert.append(len(produced))
+            upsert(**kwargs)
+
+        monkeypatch.setattr(service, "_split_text_into_chunks", chunks)
+        monkeypatch.setattr(service.vectorstore._collection, "upsert", recording_upsert)
+        document = _kb_document()
+
+        assert await service.add_document_to_vectorstore(document, "", FakeSession())
+        assert pulled_at_upsert == [20, 40, 45]
+        assert document.chunk_count == 45
+
+    @pytest.mark.asyncio
+    async def test_failed_batches_retried(self, service, monkeypatch):
+        """Test transient failures are retried, persistent ones fail the document"""
+        monkeypatch.setattr(settings, "RAG_EMBED_MAX_RETRIES", 3)
+        service.embeddings.failures = 2
+        assert len(await service._embed_in_batches(["a", "b"])) == 2
+
+        service.embeddings.failures = 3
+        monkeypatch.setattr(service, "_split_text_into_chunks", lambda text: _chunks("c"))
+        assert not await service.add_document_to_vectorstore(_kb_document(), "c", FakeSession())
+
+
+class TestIngestionWorker:
+    """Test suite for the background ingestion worker"""
+
+    @pytest.mark.asyncio
+    async def test_worker_ingests_and_records_status(self, service, tmp_path):
+        """Test enqueue returns immediately and the worker records the outcome"""
+        path = tmp_path / "fiche.txt"
+        path.write_text("Dose de semis du blé tendre : 180 grains/m².", encoding="utf-8")
+        ok, broken = _kb_document(file_path=str(path)), _kb_document(file_path=str(tmp_path / "x.docx"), file_type="docx")
+        session = FakeSession({str(ok.id): ok, str(broken.id): broken})
+
+        @asynccontextmanager
+        async def session_factory():
+            yield session
+
+        worker = DocumentIngestionService(session_factory=session_factory, rag_service=service)
+        try:
+            assert worker.enqueue(ok.id) and worker.enqueue(broken.id)
+            assert ok.processing_status == DocumentStatus.PENDING
+            await worker.join()
+        finally:
+            await worker.stop()
+
+        assert ok.processing_status == DocumentStatus.COMPLETED
+        assert ok.chunk_count == 1
+        assert broken.processing_status == DocumentStatus.FAILED
+        assert worker.get_stats()["ingested"] == 1 and worker.get_stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_startup_requeues_unfinished_documents(self, service, tmp_path):
+        """Test documents left PENDING/PROCESSING by a stopped process are ingested"""
+        path = tmp_path / "fiche.txt"
+        path.write_text("Dose de semis du blé tendre : 180 grains/m².", encoding="utf-8")
+        pending = _kb_document(file_path=str(path))
+        stalled = _kb_document(file_path=str(path), processing_status=DocumentStatus.PROCESSING)
+        session = FakeSession({str(pending.id): pending, str(stalled.id): stalled})
+
+        @asynccontextmanager
+        async def session_factory():
+            yield session
+
+        worker = DocumentIngestionService(session_factory=session_factory, rag_service=service, queue_size=1)
+        try:
+            worker.start(recover=True)
+            await worker._recovery
+            await worker.join()
+        finally:
+            await worker.stop()
+
+        assert pending.processing_status == stalled.processing_status == DocumentStatus.COMPLETED
+        assert worker.get_stats()["recovered"] == 2
+        claim = str(session.queries[0].compile(dialect=postgresql.dialect()))
+        # Claimed and returned in one statement, so concurrent workers split the documents
+        assert claim.startswith("UPDATE knowledge_base_documents SET processing_status")
+        assert "RETURNING knowledge_base_documents.id" in claim
+        assert "updated_at <" in claim and "approved_at IS NOT NULL" in claim
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects(self, service):
+        """Test a full queue rejects instead of blocking the request"""
+        worker = DocumentIngestionService(rag_service=service, queue_size=1)
+        try:
+            assert worker.enqueue("a")
+            assert not worker.enqueue("b")
+        finally:
+            await worker.stop()
+
+    def test_unsupported_file_type(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            read_document_text(_kb_document(file_path=str(tmp_path / "a.docx"), file_type="docx"))
@@ -0,0 +1,163 @@
+"""
+Unit tests for the shared sliding-window rate limiter.
+
+Tests:
+- Sliding-window counting with a weighted previous window
+- Limits holding across workers sharing Redis
+- In-process fallback while Redis is down
+- Per-organization limits and policy rules
+- Denied requests refunded to the rules they passed
+- 429 responses with Retry-After
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limiting
+from app.core.config import settings
+from app.core.rate_limiting import LocalWindowStore, RateLimiter, check_rate_limit, slide_window
+from tests.conftest import FakeRedis
+
+
+# Shared clock returned by the scripts' redis.call('TIME')
+NOW_MS = 1_000_000_000
+
+
+def _slide(redis, keys, args):
+    """SLIDING_WINDOW_SCRIPT in Python (the window state stands in for its hash)"""
+    limit, window_ms, cost = args
+    allowed, estimated, retry_ms, state = slide_window(redis.data.get(keys[0]), NOW_MS, window_ms, limit, cost)
+    redis.data[keys[0]] = state
+    return [int(allowed), str(estimated).encode(), str(retry_ms).encode()]
+
+
+def _refund(redis, keys, args):
+    """REFUND_SCRIPT in Python"""
+    window_ms, cost = args
+    state = redis.data.get(keys[0])
+    if state and state[0] == NOW_MS - NOW_MS % window_ms:
+        redis.data[keys[0]] = (state[0], max(state[1] - cost, 0), state[2])
+    return 1
+
+
+def _redis():
+    return FakeRedis(scripts={
+        rate_limiting.SLIDING_WINDOW_SCRIPT: _slide,
+        rate_limiting.REFUND_SCRIPT: _refund,
+    })
+
+
+class TestSlidingWindow:
+    """Test suite for the sliding-window algorithm"""
+
+    def test_limit_and_weighted_previous_window(self):
+        state = None
+        start = 600_000
+        for i in range(10):
+            allowed, _, _, state = slide_window(state, start + i, 60_000, 10)
+            assert allowed
+        allowed, _, retry_ms, state = slide_window(state, start + 10, 60_000, 10)
+        assert not allowed
+        assert retry_ms == pytest.approx(60_000 - 10)
+
+        # A quarter into the next window, 75% of the previous one still counts
+        allowed, estimated, _, state = slide_window(state, start + 75_000, 60_000, 10)
+        assert allowed and estimated == pytest.approx(8.5)
+        allowed, _, _, state = slide_window(state, start + 75_001, 60_000, 10)
+        assert allowed
+        allowed, _, retry_ms, state = slide_window(state, start + 75_002, 60_000, 10)
+        assert not allowed
+        # The next request fits once the previous window's weight drops below 8/10
+        allowed, _, _, _ = slide_window(state, start + 75_002 + int(retry_ms) + 1, 60_000, 10)
+        assert allowed
+
+        # Two windows later nothing is left
+        allowed, estimated, _, _ = slide_window(state, start + 200_000, 60_000, 10)
+        assert allowed and estimated == 1
+
+    def test_local_store_is_bounded(self):
+        store = LocalWindowStore(max_keys=3)
+        for key in "abcde":
+            store.hit(key, 5, 60_000)
+        assert list(store.windows) == ["c", "d", "e"]
+
+
+class TestRateLimiter:
+    """Test suite for RateLimiter"""
+
+    @pytest.mark.asyncio
+    async def test_limit_holds_across_workers(self):
+        redis = _redis()
+        workers = [RateLimiter(redis_client=redis) for _ in range(4)]
+
+        decisions = [await workers[i % 4].check("chat", user_id="u1") for i in range(30)]
+        allowed = [d for d in decisions if d.allowed]
+        assert len(allowed) == 20
+        assert all(d.backend == "redis" for d in decisions)
+        assert decisions[-1].retry_after > 0
+        assert sum(w.get_stats()["policies"]["chat"]["denied"] for w in workers) == 10
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_process_while_redis_is_down(self, monkeypatch):
+        redis = _redis()
+        limiter = RateLimiter(redis_client=redis)
+        redis.fail = True
+
+        decision = await limiter.check("kb_upload", user_id="u1")
+        assert decision.allowed and decision.backend == "local"
+        calls = redis.calls
+        for _ in range(4):
+            assert (await limiter.check("kb_upload", user_id="u1")).allowed
+        assert not (await limiter.check("kb_upload", user_id="u1")).allowed
+        # Redis is skipped during the back-off
+        assert redis.calls == calls
+        assert limiter.get_stats()["redis_errors"] == 1
+
+        redis.fail = False
+        monkeypatch.setattr(limiter, "_disabled_until", time.time() - 1)
+        assert (await limiter.check("kb_upload", user_id="u1")).backend == "redis"
+
+    @pytest.mark.asyncio
+    async def test_organization_rules_and_overrides(self, monkeypatch):
+        limiter = RateLimiter(redis_client=_redis())
+        monkeypatch.setattr(settings, "RATE_LIMIT_ORGANIZATION_LIMITS", {"org-small": {"kb_upload": 3}})
+
+        results = [await limiter.check("kb_upload", user_id=f"u{i}", organization_id="org-small") for i in range(5)]
+        assert [d.allowed for d in results] == [True, True, True, False, False]
+
+        results = [await limiter.check("kb_upload", user_id=f"u{i}", organization_id="org-big") for i in range(5)]
+        assert all(d.allowed for d in results)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("redis_down", [False, True])
+    async def test_denied_requests_use_no_quota(self, monkeypatch, redis_down):
+        redis = _redis()
+        redis.fail = redis_down
+        limiter = RateLimiter(redis_client=redis)
+        monkeypatch.setattr(settings, "RATE_LIMIT_ORGANIZATION_LIMITS", {"org-small": {"kb_upload": 3}})
+
+        for i in range(3):
+            assert (await limiter.check("kb_upload", user_id=f"u{i}", organization_id="org-small")).allowed
+        # Denied by the organization rule after passing the user rule
+        for _ in range(5):
+            assert not (await limiter.check("kb_upload", user_id="u9", organization_id="org-small")).allowed
+
+        results = [await limiter.check("kb_upload", user_id="u9", organization_id="org-big") for _ in range(5)]
+        assert all(d.allowed for d in results)
+        assert results[0].backend == ("local" if redis_down else "redis")
+
+    @pytest.mark.asyncio
+    async def test_check_rate_limit_raises_429(self, monkeypatch):
+        monkeypatch.setattr(rate_limiting, "rate_limiter", RateLimiter(redis_client=_redis()))
+        user = SimpleNamespace(id="u1")
+        request = SimpleNamespace(client=SimpleNamespace(host="10.0.0.1"))
+
+        for _ in range(5):
+            await check_rate_limit(request, user, policy="kb_upload", organization_id="org")
+        with pytest.raises(HTTPException) as error:
+            await check_rate_limit(request, user, policy="kb_upload", organization_id="org")
+        assert error.value.status_code == 429
+        assert int(error.value.headers["Retry-After"]) >= 1
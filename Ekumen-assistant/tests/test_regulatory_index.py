@@ -0,0 +1,294 @@
+"""
+Unit tests for the in-memory EPHY regulatory index.
+
+Tests:
+- AMM lookups, prefix and substring name search
+- Crop and substance filters, crop -> usage inverted index
+- ZNT and statistics, the SQL fallback counting the same tables
+- Snapshot round-trip and store swap, building off the event loop
+- Lookup latency (benchmark, run with --run-benchmarks)
+"""
+
+import json
+import pickle
+import threading
+import time
+import zlib
+from datetime import date
+
+import pytest
+
+from app.services.regulatory_index import (
+    ProductRecord,
+    RegulatoryIndex,
+    RegulatoryIndexStore,
+    SNAPSHOT_VERSION,
+    SubstanceRecord,
+    UsageRecord,
+    database_statistics,
+    normalize_text,
+)
+
+
+def _product(amm, name, etat="AUTORISE", product_type="PPP", substances=(), second_names=()):
+    return ProductRecord(
+        numero_amm=amm,
+        nom_produit=name,
+        type_produit=product_type,
+        titulaire="Syngenta France SAS",
+        etat_autorisation=etat,
+        date_retrait_produit=None,
+        seconds_noms_commerciaux=tuple(second_names),
+        substances=tuple((s, 100.0, "g/L") for s in substances),
+    )
+
+
+def _usage(amm, crop, etat="AUTORISE", znt_water=None, dar=None):
+    return UsageRecord(
+        amm, f"{crop}*Trt Part.Aer.*Pucerons", crop,
+        None, 0.075, 0.075, "L/ha", dar, 2, 14,
+        znt_water, None, None, etat, None,
+    )
+
+
+@pytest.fixture
+def index():
+    products = [
+        _product("9800336", "KARATE ZEON", substances=["Lambda-Cyhalothrin"], second_names=["KARAIBE PRO"]),
+        _product("2000001", "KARATE K", substances=["Lambda-Cyhalothrin", "Pirimicarbe"]),
+        _product("2080052", "ROUNDUP INNOVA", substances=["Glyphosate"]),
+        _product("8800006", "DECIS PROTECH", etat="RETIRE", substances=["Deltamethrin"]),
+        _product("1120010", "FERTI AZOTE", product_type="MFSC"),
+    ]
+    usages = [
+        _usage("9800336", "Blé tendre", znt_water=5.0, dar=28),
+        _usage("9800336", "Vigne", znt_water=20.0, dar=7),
+        _usage("2000001", "Blé dur", etat="RETIRE"),
+        _usage("2080052", "Blé tendre", znt_water=5.0),
+        _usage("8800006", "Blé tendre"),
+    ]
+    substances = [
+        SubstanceRecord("Lambda-Cyhalothrin", "91465-08-6", "INSCRITE"),
+        SubstanceRecord("Glyphosate", "1071-83-6", "INSCRITE"),
+        SubstanceRecord("Deltamethrin", "52918-63-5", "NON_INSCRITE"),
+    ]
+    return RegulatoryIndex(products, usages, substances)
+
+
+class TestRegulatoryIndexLookups:
+    """Test suite for lookups and search"""
+
+    def test_normalize_text(self):
+        assert normalize_text("Blé  tendre") == "ble tendre"
+        assert normalize_text("K-OBIOL EC 25") == "k obiol ec 25"
+
+    def test_get_by_amm(self, index):
+        assert index.get("9800336").nom_produit == "KARATE ZEON"
+        assert index.get(" 9800336 ") is not None
+        assert index.get("0000000") is None
+
+    def test_search_by_amm(self, index):
+        assert [p.numero_amm for p in index.search("2080052")] == ["2080052"]
+
+    def test_prefix_before_substring(self, index):
+        results = [p.nom_produit for p in index.search("kara")]
+        assert results == ["KARATE ZEON", "KARATE K"]
+
+        # Substring match, with accents and case ignored
+        assert [p.nom_produit for p in index.search("zeón")] == ["KARATE ZEON"]
+
+    def test_second_commercial_names(self, index):
+        assert [p.numero_amm for p in index.search("karaibe")] == ["9800336"]
+
+    def test_withdrawn_products(self, index):
+        assert index.search("decis") == []
+        assert [p.numero_amm for p in index.search("decis", authorized_only=False)] == ["8800006"]
+
+    def test_type_crop_and_substance_filters(self, index):
+        assert [p.numero_amm for p in index.search(product_type="mfsc")] == ["1120010"]
+        # Karate K's wheat usage is withdrawn, Decis is withdrawn
+        assert {p.numero_amm for p in index.search(crop="blé")} == {"9800336", "2080052"}
+        assert {p.numero_amm for p in index.search(substance="cyhalothrin")} == {"9800336", "2000001"}
+        assert [p.numero_amm for p in index.search("karate", crop="vigne")] == ["9800336"]
+
+    def test_limit_and_offset(self, index):
+        everything = index.search()
+        assert index.search(limit=2, offset=1) == everything[1:3]
+
+
+class TestRegulatoryIndexUsages:
+    """Test suite for usages, ZNT and statistics"""
+
+    def test_usages_for_product_and_crop(self, index):
+        assert len(index.usages_for("9800336")) == 2
+        assert [u.type_culture_libelle for u in index.usages_for("9800336", crop="vigne")] == ["Vigne"]
+        assert index.authorized_crops("2000001") == set()
+
+    def test_crop_inverted_index(self, index):
+        assert {u.numero_amm for u in index.usages_for_crop("Blé tendre")} == {"9800336", "2080052", "8800006"}
+        # Partial crop names match every variety
+        assert len(index.usages_for_crop("ble", authorized_only=False)) == 4
+
+    def test_znt(self, index):
+        assert index.znt("9800336")["aquatique"] == 20.0
+        assert index.znt("9800336", crop="blé")["aquatique"] == 5.0
+        assert index.znt("1120010")["aquatique"] is None
+
+    def test_statistics(self, index):
+        stats = index.statistics()
+        assert stats["total_products"] == 5
+        assert stats["authorized_products"] == 4
+        assert stats["mfsc_products"] == 1
+        assert stats["ppp_products"] == 3
+        assert stats["total_substances"] == 2
+        assert stats["total_usages"] == 4
+
+
+class TestRegulatoryIndexSnapshot:
+    """Test suite for snapshots and the index store"""
+
+    def test_snapshot_round_trip(self, index, tmp_path):
+        path = str(tmp_path / "index.json.z")
+        index.save(path)
+        loaded = RegulatoryIndex.load(path)
+
+        assert loaded.built_at == index.built_at
+        assert loaded.products == index.products
+        assert loaded.usages == index.usages
+        assert [p.numero_amm for p in loaded.search("kara")] == ["9800336", "2000001"]
+
+    def test_snapshot_keeps_dates_and_tuples(self, tmp_path):
+        withdrawn = _product("8800006", "DECIS PROTECH", etat="RETIRE", substances=["Deltamethrin"])
+        withdrawn = withdrawn._replace(date_retrait_produit=date(2023, 6, 30))
+        path = str(tmp_path / "index.json.z")
+        RegulatoryIndex([withdrawn], [], []).save(path)
+
+        loaded = RegulatoryIndex.load(path).get("8800006")
+        assert loaded == withdrawn
+        assert loaded.date_retrait_produit == date(2023, 6, 30)
+        assert loaded.substances == (("Deltamethrin", 100.0, "g/L"),)
+
+    def test_snapshot_is_data_only(self, index, tmp_path):
+        path = tmp_path / "index.json.z"
+        index.save(str(path))
+        snapshot = json.loads(zlib.decompress(path.read_bytes()))
+        assert snapshot["version"] == SNAPSHOT_VERSION
+
+        path.write_bytes(pickle.dumps({"version": SNAPSHOT_VERSION}))
+        assert RegulatoryIndex.load(str(path)) is None
+
+    def test_missing_snapshot(self, tmp_path):
+        assert RegulatoryIndex.load(str(tmp_path / "missing.json.z")) is None
+
+    @pytest.mark.asyncio
+    async def test_store_loads_fresh_snapshot_without_database(self, index, tmp_path):
+        path = str(tmp_path / "index.json.z")
+        index.save(path)
+
+        store = RegulatoryIndexStore(snapshot_path=path)
+        loaded = await store.load()
+        assert loaded is store.index
+        assert store.stats == {"snapshot_loads": 1, "refreshes": 0, "refresh_errors": 0}
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_current_index(self, index, tmp_path, monkeypatch):
+        async def broken(db):
+            raise RuntimeError("database unavailable")
+
+        monkeypatch.setattr(RegulatoryIndex, "from_database", broken)
+        store = RegulatoryIndexStore(snapshot_path=str(tmp_path / "index.json.z"))
+        store.index = index
+
+        assert await store.refresh() is index
+        assert store.stats["refresh_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_from_database_builds_off_the_event_loop(self, monkeypatch):
+        class Result:
+            def __init__(self, rows):
+                self.rows = rows
+
+            def all(self):
+                return self.rows
+
+        class FakeSession:
+            """Returns the rows of from_database's four queries in order"""
+            def __init__(self):
+                self.results = [
+                    [("9800336", "Lambda-Cyhalothrin", 100, "g/L")],
+                    [("9800336", "KARATE ZEON", "PPP", "Syngenta", "AUTORISE", None, "KARAIBE PRO|")],
+                    [("9800336", "Blé*Trt", "Blé tendre", None, 0.075, 0.075, "L/ha", 28, 2, 14, 5, None, None, "Autorisé", None)],
+                    [("Lambda-Cyhalothrin", "91465-08-6", "INSCRITE")],
+                ]
+
+            async def execute(self, query):
+                return Result(self.results.pop(0))
+
+        built_on = []
+        build = RegulatoryIndex._from_rows.__func__
+
+        def recording_build(cls, *rows):
+            built_on.append(threading.get_ident())
+            return build(cls, *rows)
+
+        monkeypatch.setattr(RegulatoryIndex, "_from_rows", classmethod(recording_build))
+        index = await RegulatoryIndex.from_database(FakeSession())
+
+        assert built_on and built_on[0] != threading.get_ident()
+        assert index.get("9800336").substances == (("Lambda-Cyhalothrin", 100.0, "g/L"),)
+        assert index.statistics()["total_substances"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sql_statistics_match_the_index(self):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+        from app.models.ephy import (
+            EtatAutorisation, Produit, ProductType, ProduitSubstance, SubstanceActive, Titulaire, UsageProduit
+        )
+
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        tables = [model.__table__ for model in (Titulaire, Produit, SubstanceActive, ProduitSubstance, UsageProduit)]
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: Produit.metadata.create_all(sync_conn, tables=tables))
+
+        async with AsyncSession(engine) as db:
+            db.add_all([
+                Produit(numero_amm="9800336", nom_produit="KARATE ZEON", type_produit=ProductType.PPP,
+                        etat_autorisation=EtatAutorisation.AUTORISE),
+                Produit(numero_amm="2080052", nom_produit="ROUNDUP INNOVA", type_produit=ProductType.PPP,
+                        etat_autorisation=EtatAutorisation.AUTORISE_FR),
+                Produit(numero_amm="8800006", nom_produit="DECIS PROTECH", type_produit=ProductType.PPP,
+                        etat_autorisation=EtatAutorisation.RETIRE),
+                Produit(numero_amm="1120010", nom_produit="FERTI AZOTE", type_produit=ProductType.MFSC,
+                        etat_autorisation=EtatAutorisation.AUTORISE),
+                SubstanceActive(nom_substance="Lambda-Cyhalothrin", etat_autorisation="INSCRITE"),
+                SubstanceActive(nom_substance="Glyphosate", etat_autorisation="Autorisé"),
+                SubstanceActive(nom_substance="Deltamethrin", etat_autorisation="Non inscrite"),
+                UsageProduit(numero_amm="9800336", type_culture_libelle="Blé tendre", etat_usage="Autorisé"),
+                UsageProduit(numero_amm="9800336", type_culture_libelle="Vigne", etat_usage="AUTORISE"),
+                UsageProduit(numero_amm="8800006", type_culture_libelle="Blé tendre", etat_usage="Retrait"),
+            ])
+            await db.commit()
+
+            index = await RegulatoryIndex.from_database(db)
+            stats = await database_statistics(db)
+        await engine.dispose()
+
+        assert stats == index.statistics()
+        assert stats["authorized_products"] == 3 and stats["mfsc_products"] == 1
+        assert stats["total_substances"] == 2 and stats["total_usages"] == 2
+
+    @pytest.mark.benchmark
+    def test_lookup_latency(self, index):
+        products = [_product(f"{2100000 + i}", f"PRODUIT {i:05d}") for i in range(20000)]
+        usages = [_usage(p.numero_amm, f"Culture {i % 300}") for i, p in enumerate(products)]
+        big = RegulatoryIndex(products, usages, [])
+
+        started = time.perf_counter()
+        for i in range(1000):
+            big.get(f"{2100000 + i}")
+            big.search("produit 012")
+            big.search(crop="culture 42")
+        per_call = (time.perf_counter() - started) / 3000
+        print(f"\nIndex lookup: {per_call * 1e6:.1f} µs")
+        assert per_call < 0.001
@@ -0,0 +1,140 @@
+"""
+Unit tests for the retrieval analytics writer.
+
+Tests:
+- Retrievals and citations aggregated per document per interval
+- Bounded event buffer dropping new events when full
+- Failed flushes keep counters for the next interval
+- Periodic and batch-size triggered background flushes
+- Retrieval tracking does no database work
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services import rag_service as rag_module
+from app.services.rag_service import RAGService
+from app.services.retrieval_analytics_writer import RetrievalAnalyticsWriter
+
+
+def _chunk(document_id, chunk_index=0, filename="fiche.txt"):
+    return Document(
+        page_content="x" * 300,
+        metadata={"document_id": document_id, "chunk_index": chunk_index, "filename": filename},
+    )
+
+
+class RecordingWriter(RetrievalAnalyticsWriter):
+    """Captures flushed batches instead of writing them"""
+
+    def __init__(self, fail=0, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+        self.fail = fail
+
+    async def _persist(self, counters, events):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append((counters, events))
+
+
+class TestRetrievalAnalyticsWriter:
+    """Test suite for RetrievalAnalyticsWriter"""
+
+    @pytest.mark.asyncio
+    async def test_counters_aggregated_per_document(self):
+        writer = RecordingWriter(flush_interval=3600)
+        first, second = str(uuid.uuid4()), str(uuid.uuid4())
+        for _ in range(3):
+            writer.record_retrieval([_chunk(first, 0), _chunk(first, 1), _chunk(second)], "mildiou")
+        writer.record_citation(first, "mildiou", "extrait", 0.9, chunk_index=1)
+        writer.record_citation(first, "mildiou", "extrait", 0.5)
+
+        assert await writer.flush() == 11
+        [(counters, events)] = writer.batches
+        assert set(counters) == {first, second}
+        assert counters[first].retrievals == 6
+        assert counters[first].citations == 2
+        assert counters[first].satisfaction_sum == pytest.approx(1.4)
+        assert counters[first].satisfaction_count == 2
+        assert counters[second].retrievals == 3
+        assert counters[first].document_name == "fiche.txt"
+        assert events[0]["event_type"] == "document_retrieved"
+        assert events[0]["event_data"]["chunk_content_preview"].endswith("...")
+        assert events[-1]["event_data"]["citation_type"] == "indirect"
+
+        assert await writer.flush() == 0
+        assert len(writer.batches) == 1
+        stats = writer.get_stats()
+        assert stats["flushes"] == 1
+        assert stats["flushed_documents"] == 2
+        assert stats["buffered_events"] == 0
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_drops_events_but_keeps_counts(self):
+        writer = RecordingWriter(flush_interval=3600, batch_size=100, max_events=5)
+        document_id = str(uuid.uuid4())
+        writer.record_retrieval([_chunk(document_id, i) for i in range(8)])
+
+        stats = writer.get_stats()
+        assert stats["buffered_events"] == 5
+        assert stats["dropped_events"] == 3
+
+        await writer.flush()
+        [(counters, events)] = writer.batches
+        assert counters[document_id].retrievals == 8
+        assert len(events) == 5
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_counters(self):
+        writer = RecordingWriter(fail=1, flush_interval=3600, max_events=3)
+        document_id = str(uuid.uuid4())
+        writer.record_retrieval([_chunk(document_id), _chunk(document_id)])
+
+        assert await writer.flush() == 0
+        writer.record_retrieval([_chunk(document_id), _chunk(document_id)])
+        assert writer.get_stats()["failed_flushes"] == 1
+        assert writer.get_stats()["dropped_events"] == 1
+
+        assert await writer.flush() == 3
+        [(counters, events)] = writer.batches
+        assert counters[document_id].retrievals == 4
+        assert len(events) == 3
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_background_flushes(self):
+        writer = RecordingWriter(flush_interval=0.05, batch_size=1000)
+        writer.record_retrieval([_chunk(str(uuid.uuid4()))])
+        await asyncio.sleep(0.15)
+        assert len(writer.batches) == 1
+
+        writer.flush_interval = 3600
+        await writer.stop()
+        writer.batch_size = 4
+        writer.record_retrieval([_chunk(str(uuid.uuid4()), i) for i in range(4)])
+        await asyncio.sleep(0.05)
+        assert len(writer.batches) == 2
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_rag_tracking_does_no_database_work(self, monkeypatch):
+        writer = RecordingWriter(flush_interval=3600)
+        monkeypatch.setattr(rag_module, "retrieval_analytics_writer", writer)
+        service = RAGService()
+        document_id = str(uuid.uuid4())
+
+        await service._track_document_analytics([_chunk(document_id)], db=object(), query="blé")
+        await service.track_document_citation(document_id, "blé", "contexte", chunk_index=0, db=object())
+
+        assert writer.get_stats()["buffered_events"] == 2
+        await writer.stop()
+        [(counters, _)] = writer.batches
+        assert counters[document_id].retrievals == 1
+        assert counters[document_id].citations == 1
@@ -0,0 +1,237 @@
+"""
+Unit tests for the semantic answer cache.
+
+Tests:
+- Query normalization, anchors and freshness classes
+- Paraphrases served within a scope, never across scopes or anchors
+- Per-class TTLs and thresholds, LRU bound, embedding failures
+- Namespaces keeping answer types apart
+- Offline replay of logged queries
+- Lookups in a full partition (latency is a benchmark, run with --run-benchmarks)
+"""
+
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from app.services.semantic_answer_cache import (
+    SemanticAnswerCache,
+    freshness_class,
+    normalize_query,
+    query_anchors,
+    replay,
+)
+
+STOP_WORDS = {"quelle", "quel", "a", "de", "du", "la", "le", "sur", "pour", "est", "il", "va", "faire", "t"}
+THRESHOLDS = {"weather": 0.95, "farm_data": 0.94, "regulatory": 0.93, "general": 0.92}
+TTLS = {"weather": 900, "farm_data": 3600, "regulatory": 86400, "general": 1800}
+
+
+class Embedder:
+    """Bag of content words: paraphrases with the same content words are identical"""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+        self.calls = 0
+        self.fail = False
+
+    async def __call__(self, texts):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("embedding API down")
+        vectors = []
+        for text in texts:
+            vector = np.zeros(self.dimensions)
+            for word in text.split():
+                if word not in STOP_WORDS:
+                    vector[zlib.crc32(word.encode()) % self.dimensions] += 1
+            vectors.append(vector.tolist())
+        return vectors
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(embedder=None, clock=None, **kwargs):
+    kwargs.setdefault("thresholds", THRESHOLDS)
+    kwargs.setdefault("ttls", TTLS)
+    cache = SemanticAnswerCache(
+        embed_fn=embedder or Embedder(), embedding_cache=None, clock=clock or Clock(), **kwargs
+    )
+    cache.enabled = True
+    return cache
+
+
+ORG_A = {"organization_id": "org-a", "farm_siret": "12345678901234", "agent_type": "weather"}
+ORG_B = {"organization_id": "org-b", "farm_siret": "12345678901234", "agent_type": "weather"}
+
+
+class TestQueryFeatures:
+    """Test suite for normalization, anchors and freshness"""
+
+    def test_normalize(self):
+        assert normalize_query("  Quelle MÉTÉO demain à Dourdan ?") == "quelle meteo demain a dourdan"
+
+    def test_anchors(self):
+        assert query_anchors("Quelle météo demain à Dourdan ?") == {"demain", "dourdan"}
+        assert query_anchors("météo de demain sur Dourdan") == {"demain", "dourdan"}
+        assert query_anchors("Météo après-demain à Dourdan") == {"apres demain", "dourdan"}
+        assert query_anchors("Quelle dose de Karaté Zeon à 2,5 L/ha ?") == {"karate", "zeon", "2_5"}
+        assert query_anchors("quelle dose de Karaté Zeon a 2.5 l/ha") == {"karate", "zeon", "2_5"}
+
+    def test_freshness_class(self):
+        assert freshness_class(normalize_query("Va-t-il pleuvoir demain ?")) == "weather"
+        assert freshness_class(normalize_query("Quelle ZNT pour ce produit ?")) == "regulatory"
+        # Weather answers expire first, so they win over regulatory ones
+        assert freshness_class(normalize_query("Puis-je traiter avant la pluie avec cette dose ?")) == "weather"
+        assert freshness_class(normalize_query("Comment semer du lin ?")) == "general"
+
+
+class TestSemanticAnswerCache:
+    """Test suite for SemanticAnswerCache"""
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_served_within_scope(self):
+        embedder = Embedder()
+        cache = _cache(embedder)
+        assert await cache.get("Quelle météo demain à Dourdan ?", ORG_A) is None
+        await cache.set("Quelle météo demain à Dourdan ?", ORG_A, "Pluie faible, 12°C.")
+
+        match = await cache.get("météo de demain sur Dourdan", ORG_A)
+        assert match.answer == "Pluie faible, 12°C."
+        assert match.freshness == "weather" and not match.exact
+        assert match.similarity == pytest.approx(1.0)
+
+        assert await cache.get("météo de demain sur Dourdan", ORG_B) is None
+        stats = cache.get_stats()
+        assert stats["semantic_hits"] == 1 and stats["misses"] == 2
+        assert stats["by_freshness"]["weather"]["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_namespaces_are_separate(self):
+        cache = _cache()
+        await cache.set("Quelle météo demain à Dourdan ?", ORG_A, "Pluie faible, 12°C.", namespace="streamed_answer")
+        await cache.set("Quelle météo demain à Dourdan ?", ORG_A, {"answer": "Pluie"}, namespace="query_result")
+
+        match = await cache.get("météo de demain sur Dourdan", ORG_A, namespace="query_result")
+        assert match.answer == {"answer": "Pluie"}
+        match = await cache.get("météo de demain sur Dourdan", ORG_A, namespace="streamed_answer")
+        assert match.answer == "Pluie faible, 12°C."
+        assert await cache.get("météo de demain sur Dourdan", ORG_A) is None
+
+    @pytest.mark.asyncio
+    async def test_identical_query_skips_embedding(self):
+        embedder = Embedder()
+        cache = _cache(embedder)
+        await cache.set("Quelle ZNT pour le Karaté Zeon ?", ORG_A, "20 m")
+        calls = embedder.calls
+        match = await cache.get("quelle znt pour le karate zeon", ORG_A)
+        assert match.exact and match.answer == "20 m"
+        assert embedder.calls == calls
+
+    @pytest.mark.asyncio
+    async def test_anchors_must_match(self):
+        loose = {name: 0.5 for name in THRESHOLDS}
+        cache = _cache(thresholds=loose)
+        await cache.set("Quelle météo demain à Dourdan ?", ORG_A, "demain")
+        assert await cache.get("Quelle météo après-demain à Dourdan ?", ORG_A) is None
+        assert await cache.get("Quelle météo demain à Étampes ?", ORG_A) is None
+        assert cache.get_stats()["anchor_rejections"] == 2
+
+    @pytest.mark.asyncio
+    async def test_threshold_per_freshness_class(self):
+        cache = _cache(thresholds={**THRESHOLDS, "general": 0.6})
+        await cache.set("Comment semer du lin fibre ?", ORG_A, "En mars")
+        # 3 of 4 content words shared: similarity 0.75
+        match = await cache.get("Comment semer du lin oléagineux ?", ORG_A)
+        assert match is not None and match.similarity == pytest.approx(0.75)
+
+        cache = _cache()
+        await cache.set("Comment semer du lin fibre ?", ORG_A, "En mars")
+        assert await cache.get("Comment semer du lin oléagineux ?", ORG_A) is None
+
+    @pytest.mark.asyncio
+    async def test_ttl_per_freshness_class(self):
+        clock = Clock()
+        cache = _cache(clock=clock)
+        await cache.set("Quelle météo demain à Dourdan ?", ORG_A, "Pluie")
+        await cache.set("Quelle ZNT pour le Karaté Zeon ?", ORG_A, "20 m")
+
+        clock.now += 901
+        assert await cache.get("météo de demain sur Dourdan", ORG_A) is None
+        assert (await cache.get("ZNT du Karaté Zeon", ORG_A)).answer == "20 m"
+        assert cache.get_stats()["expired"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_and_failures_are_misses(self):
+        embedder = Embedder()
+        cache = _cache(embedder, max_entries=3)
+        for i in range(5):
+            await cache.set(f"Comment semer la variété {i} ?", ORG_A, i)
+        assert cache.get_stats()["entries"] == 3 and cache.get_stats()["evictions"] == 2
+
+        embedder.fail = True
+        assert await cache.get("Comment bien semer la variété 4 ?", ORG_A) is None
+        assert await cache.set("Quand récolter ?", ORG_A, "Août") is False
+        assert cache.get_stats()["embedding_errors"] == 2
+
+
+class TestReplay:
+    """Test suite for the offline evaluation harness"""
+
+    @pytest.mark.asyncio
+    async def test_threshold_sweep(self):
+        log = [
+            {"query": "Quelle météo demain à Dourdan ?", "context": ORG_A, "at": 0, "label": "meteo-dourdan"},
+            {"query": "météo de demain sur Dourdan", "context": ORG_A, "at": 60, "label": "meteo-dourdan"},
+            {"query": "Comment semer du lin fibre ?", "context": ORG_A, "at": 120, "label": "lin-fibre"},
+            {"query": "Comment semer du lin oléagineux ?", "context": ORG_A, "at": 180, "label": "lin-oleagineux"},
+            {"query": "météo de demain sur Dourdan", "context": ORG_A, "at": 2000, "label": "meteo-dourdan"},
+        ]
+        report = await replay(log, Embedder(), [0.7, 0.95])
+
+        loose, strict = report
+        assert loose["hit_rate"] == pytest.approx(0.4)
+        assert loose["wrong_hit_rate"] == pytest.approx(0.5)
+        assert strict["hit_rate"] == pytest.approx(0.2)
+        assert strict["wrong_hit_rate"] == 0.0
+        assert strict["by_freshness"]["weather"] == pytest.approx(1 / 3, abs=1e-3)
+
+
+class TestSemanticCachePerformance:
+    """Lookups in a full partition"""
+
+    @staticmethod
+    async def _full_cache():
+        cache = _cache(max_entries=5000)
+        for i in range(5000):
+            await cache.set(f"Comment semer la variété {i} de blé ?", ORG_A, i)
+        return cache
+
+    @pytest.mark.asyncio
+    async def test_full_partition_serves_paraphrases(self):
+        cache = await self._full_cache()
+        for i in range(200):
+            match = await cache.get(f"Comment semer pour la variété {i * 7} du blé ?", ORG_A)
+            assert match.answer == i * 7 and not match.exact
+        assert cache.get_stats()["entries"] == 5000
+
+    @pytest.mark.benchmark
+    @pytest.mark.asyncio
+    async def test_lookup_latency(self):
+        cache = await self._full_cache()
+
+        started = time.perf_counter()
+        for i in range(200):
+            await cache.get(f"Comment bien semer la variété {i * 7} de blé ?", ORG_A)
+        per_lookup = (time.perf_counter() - started) / 200
+        print(f"\nSemantic lookup over 5000 entries: {per_lookup * 1000:.2f} ms")
+        # Generous bound for slow CI machines
+        assert per_lookup < 0.05
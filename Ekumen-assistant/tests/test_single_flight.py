@@ -0,0 +1,98 @@
+"""
+Unit tests for request coalescing (single-flight).
+
+Tests:
+- Concurrent callers share one computation
+- Exceptions are shared and the key is released afterwards
+- Cancelling one caller does not cancel the shared computation
+- Redis lease leader/follower behaviour
+"""
+
+import asyncio
+import pytest
+
+from app.core.single_flight import SingleFlight, RedisLease, _RELEASE_SCRIPT
+from tests.conftest import FakeRedis, release_lease
+
+
+class TestSingleFlight:
+    """Test suite for SingleFlight"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_are_coalesced(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "météo"
+
+        results = await asyncio.gather(*[flight.do("dourdan", compute) for _ in range(50)])
+
+        assert results == ["météo"] * 50
+        assert calls == 1
+        assert flight.get_stats()["deduplicated"] == 49
+        assert flight.get_stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared_then_released(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(
+            flight.do("k", failing), flight.do("k", failing), return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+        async def ok():
+            return 42
+
+        assert await flight.do("k", ok) == 42
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        first = asyncio.create_task(flight.do("k", compute))
+        second = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "ok"
+
+
+class TestRedisLease:
+    """Test suite for RedisLease"""
+
+    @pytest.mark.asyncio
+    async def test_follower_reads_leader_result(self):
+        redis_client = FakeRedis(scripts={_RELEASE_SCRIPT: release_lease}, asynchronous=False)
+        shared_cache = {}
+        lease = RedisLease(redis_client, poll_interval=0.01)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            shared_cache["k"] = "value"
+            return "value"
+
+        results = await asyncio.gather(
+            lease.run("k", compute, lambda: shared_cache.get("k")),
+            lease.run("k", compute, lambda: shared_cache.get("k")),
+        )
+
+        assert results == ["value", "value"]
+        assert calls == 1
+        assert lease.get_stats()["deduplicated"] == 1
+        assert not redis_client.exists("lock:k")
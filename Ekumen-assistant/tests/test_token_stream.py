@@ -0,0 +1,215 @@
+"""
+Unit tests for delta-only answer streaming.
+
+Tests:
+- Coalescing tokens into delta frames with seq and offset
+- Resuming a session from an offset
+- Final-only answers from the LCEL stream
+- Registry ownership and expiry
+- Sessions ended by a cancelled or finished producer
+- Bytes per answer against per-token full-answer frames (CPU is a benchmark,
+  run with --run-benchmarks)
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.token_stream import FrameCoalescer, StreamRegistry, StreamSession, collect_answer
+
+
+def _tokens(count):
+    """A long agronomic answer, one LLM token at a time"""
+    words = "Pour le mildiou de la vigne , appliquer 2.5 L/ha avant la pluie .".split()
+    return [f" {words[i % len(words)]}" for i in range(count)]
+
+
+async def _read(session, offset=0, **budget):
+    return [frame async for frame in session.frames(offset, **budget)]
+
+
+class TestFrameCoalescer:
+    """Test suite for FrameCoalescer"""
+
+    def test_frames_are_contiguous_deltas(self):
+        tokens = _tokens(300)
+        coalescer = FrameCoalescer(message_id="msg-1", interval_ms=10_000, max_chars=100)
+        frames = [f for f in map(coalescer.push, tokens) if f] + [coalescer.flush()]
+
+        assert "".join(f["text"] for f in frames) == "".join(tokens)
+        assert [f["seq"] for f in frames] == list(range(len(frames)))
+        offset = 0
+        for frame in frames:
+            assert frame["offset"] == offset and frame["message_id"] == "msg-1"
+            assert "partial_response" not in frame
+            offset += len(frame["text"])
+        assert len(frames) < len(tokens) / 10
+        assert coalescer.flush() is None
+
+    def test_interval_sends_pending_tokens(self):
+        coalescer = FrameCoalescer(interval_ms=0, max_chars=1000)
+        assert coalescer.push("Bonjour")["text"] == "Bonjour"
+        assert coalescer.push("") is None
+
+
+class TestStreamSession:
+    """Test suite for StreamSession"""
+
+    @pytest.mark.asyncio
+    async def test_resume_from_offset(self):
+        session = StreamSession("msg-1", owner="conv-1")
+        for token in ["Traiter ", "avant ", "la ", "pluie."]:
+            session.append(token)
+        session.close({"type": "done"})
+
+        assert session.text_from(10) == session.text[10:]
+        frames = await _read(session, 10, interval_ms=0)
+        assert "".join(f["text"] for f in frames) == session.text[10:]
+        assert frames[0]["offset"] == 10
+        assert await _read(session, session.length) == []
+
+    @pytest.mark.asyncio
+    async def test_frames_follow_the_producer(self):
+        session = StreamSession("msg-1")
+        tokens = _tokens(200)
+
+        async def produce():
+            for token in tokens:
+                session.append(token)
+                await asyncio.sleep(0)
+            session.close()
+
+        producer = asyncio.create_task(produce())
+        frames = await _read(session, interval_ms=5, max_chars=80)
+        await producer
+        assert "".join(f["text"] for f in frames) == "".join(tokens)
+        assert all(len(f["text"]) for f in frames)
+
+    @pytest.mark.asyncio
+    async def test_collect_answer_streams_final_only_answer(self):
+        async def events():
+            yield {"final": {"answer": "Réponse complète.", "context": ["doc"]}}
+
+        session = StreamSession("msg-1")
+        answer, docs = await collect_answer(session, events())
+        assert answer == "Réponse complète." and docs == ["doc"]
+        assert session.text == answer
+
+
+    @pytest.mark.asyncio
+    async def test_cancelled_producer_ends_the_session(self):
+        session = StreamSession("msg")
+
+        async def produce():
+            session.append("Pour le mildiou")
+            await asyncio.sleep(3600)
+
+        session.attach(asyncio.create_task(produce()))
+        reader = asyncio.create_task(_read(session, interval_ms=0))
+        await asyncio.sleep(0.01)
+        session.task.cancel()
+
+        frames = await asyncio.wait_for(reader, timeout=1)
+        assert "".join(f["text"] for f in frames) == "Pour le mildiou"
+        assert session.final_event["type"] == "error"
+
+
+class TestStreamRegistry:
+    """Test suite for StreamRegistry"""
+
+    def test_owner_and_expiry(self, monkeypatch):
+        registry = StreamRegistry(ttl=60)
+        session = registry.open("msg-1", owner="conv-1")
+        assert registry.resume("msg-1", owner="conv-2") is None
+        assert registry.resume("msg-1", owner="conv-1") is session
+        assert registry.get_stats() == {"opened": 1, "resumed": 1, "resume_misses": 1, "active": 1}
+
+        session.close()
+        session.closed_at = time.monotonic() - 61
+        assert registry.resume("msg-1", owner="conv-1") is None
+        assert registry.sessions == {}
+
+    @pytest.mark.asyncio
+    async def test_finished_producer_expires(self):
+        registry = StreamRegistry(ttl=60)
+        session = registry.open("msg-1")
+        # A task that ended without closing its session
+        session.task = asyncio.create_task(asyncio.sleep(0))
+        await session.task
+
+        registry.open("msg-2")
+        assert session.closed and session.final_event["type"] == "error"
+        session.closed_at = time.monotonic() - 61
+        assert registry.resume("msg-1") is None
+        assert list(registry.sessions) == ["msg-2"]
+
+
+def _legacy_frames(tokens, sink):
+    """One frame per token carrying the whole answer so far"""
+    partial = []
+    for token in tokens:
+        partial.append(token)
+        sink.append(json.dumps({"type": "token", "token": token, "partial_response": "".join(partial)}))
+
+
+async def _delta_frames(tokens, sink):
+    session = StreamSession("msg")
+
+    async def produce():
+        for i, token in enumerate(tokens):
+            session.append(token)
+            if i % 25 == 0:
+                await asyncio.sleep(0)
+        session.close()
+
+    producer = asyncio.create_task(produce())
+    async for frame in session.frames(interval_ms=60):
+        sink.append(json.dumps(frame))
+    await producer
+
+
+class TestStreamingLoad:
+    """Many concurrent long answers, delta frames against full-answer frames"""
+
+    @pytest.mark.asyncio
+    async def test_delta_frames_cut_bytes(self):
+        streams, tokens = 50, _tokens(1500)
+        answer = "".join(tokens)
+
+        legacy_bytes = 0
+        for _ in range(streams):
+            sink = []
+            _legacy_frames(tokens, sink)
+            legacy_bytes += sum(len(s) for s in sink)
+
+        sinks = [[] for _ in range(streams)]
+        await asyncio.gather(*(_delta_frames(tokens, sink) for sink in sinks))
+        delta_bytes = sum(len(s) for sink in sinks for s in sink)
+
+        for sink in sinks:
+            assert "".join(json.loads(s)["text"] for s in sink) == answer
+        # Bytes grow with the answer, not its square
+        assert delta_bytes < legacy_bytes / 50
+
+    @pytest.mark.benchmark
+    @pytest.mark.asyncio
+    async def test_delta_frames_cut_cpu(self):
+        streams, tokens = 50, _tokens(1500)
+
+        started = time.process_time()
+        for _ in range(streams):
+            _legacy_frames(tokens, [])
+        legacy_cpu = time.process_time() - started
+
+        started = time.process_time()
+        await asyncio.gather(*(_delta_frames(tokens, []) for _ in range(streams)))
+        delta_cpu = time.process_time() - started
+
+        print(
+            f"\n{streams} streams x {len(tokens)} tokens: "
+            f"CPU {legacy_cpu * 1000 / streams:.2f} -> {delta_cpu * 1000 / streams:.2f} ms per stream"
+        )
+        # Generous bound for slow CI machines
+        assert delta_cpu < legacy_cpu
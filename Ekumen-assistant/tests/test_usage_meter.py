@@ -0,0 +1,238 @@
+"""
+Unit tests for usage metering.
+
+Tests:
+- Usage aggregated per hour and dimension, scopes and their tallies
+- Provider token usage read by the LangChain callback, tool attribution,
+  estimates when the provider reports none, failed calls
+- Embedding calls metered only on cache misses
+- Batched flushes, failed flushes and daily token quotas
+- Many calls aggregated into one row (recording cost is a benchmark, run with --run-benchmarks)
+"""
+
+import time
+from typing import Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from app.services import embedding_cache as embedding_cache_module
+from app.services.embedding_cache import EmbeddingCache
+from app.services.usage_meter import (
+    UsageMeter,
+    UsageMeteringCallback,
+    model_prices,
+    usage_scope,
+)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering with a fixed text and provider-style token usage"""
+
+    model_name: str = "gpt-4o-mini"
+    answer: str = "Semez entre le 15 et le 30 mars."
+    usage: Optional[dict] = {"prompt_tokens": 42, "completion_tokens": 9, "total_tokens": 51}
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-metered"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.fail:
+            raise ConnectionError("provider unavailable")
+        llm_output = {"token_usage": self.usage, "model_name": self.model_name} if self.usage else {}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))], llm_output=llm_output)
+
+
+class RecordingMeter(UsageMeter):
+    """Captures flushed aggregates instead of writing them"""
+
+    def __init__(self, fail=0, today=None, **kwargs):
+        kwargs.setdefault("flush_interval", 3600)
+        super().__init__(**kwargs)
+        self.batches = []
+        self.fail = fail
+        self.today = today or {}
+
+    async def _persist(self, aggregates):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append(aggregates)
+
+    async def _refresh_today(self):
+        self._flushed_today = dict(self.today)
+
+
+def _only(aggregates):
+    [(key, counters)] = aggregates.items()
+    return key, counters
+
+
+class TestUsageMeter:
+    """Test suite for UsageMeter"""
+
+    def test_aggregated_per_dimension(self):
+        meter = RecordingMeter()
+        with usage_scope(organization_id="org-a", user_id=7, agent_type="weather") as tally:
+            for _ in range(3):
+                meter.record("gpt-4o-mini", 1000, 200, 0.8)
+            with usage_scope(tool_name="get_forecast", request_type="synthesis") as inner:
+                meter.record("gpt-4o-mini-2024-07-18", 500, 100, 0.4)
+
+        assert len(meter._aggregates) == 2
+        assert tally.calls == 4 and inner.calls == 1
+        assert tally.prompt_tokens == 3500 and tally.completion_tokens == 700
+        # Dated model names are priced as their base model
+        assert tally.cost_usd == pytest.approx(3500 * 0.00015 / 1000 + 700 * 0.0006 / 1000)
+
+        keys = sorted(meter._aggregates, key=lambda key: key[4])
+        assert keys[0][1:] == ("org-a", "7", "weather", "", "llm", "gpt-4o-mini")
+        assert keys[1][1:] == ("org-a", "7", "weather", "get_forecast", "synthesis", "gpt-4o-mini-2024-07-18")
+        assert meter._aggregates[keys[0]].calls == 3
+
+        stats = meter.get_stats()
+        assert stats["tokens_by_agent"] == {"weather": 4200}
+        assert stats["by_request_type"]["llm"]["calls"] == 3
+        assert stats["by_request_type"]["synthesis"]["p95_tokens"] == 1000
+
+    def test_scopes(self):
+        with pytest.raises(ValueError):
+            with usage_scope(farm="12345678901234"):
+                pass
+        meter = RecordingMeter()
+        meter.record("unknown-model", 10, 10, 0.1)
+        key, counters = _only(meter._aggregates)
+        assert key[1:6] == ("", "", "", "", "llm") and counters.cost_usd == 0
+        assert meter.get_stats()["unpriced_calls"] == 1
+        assert model_prices("text-embedding-3-small") == (0.00002, 0.0)
+
+    def test_callback_reads_provider_usage(self):
+        meter = RecordingMeter()
+        callback = UsageMeteringCallback(meter)
+        with usage_scope(organization_id="org-a", agent_type="planning") as tally:
+            answer = FakeChatModel().invoke("Quand semer le lin ?", config={"callbacks": [callback]})
+
+        assert answer.content.startswith("Semez")
+        key, counters = _only(meter._aggregates)
+        assert key[1:] == ("org-a", "", "planning", "", "llm", "gpt-4o-mini")
+        assert (counters.prompt_tokens, counters.completion_tokens) == (42, 9)
+        assert counters.estimated_calls == 0
+        assert tally.calls == 1 and callback._runs == {}
+
+    def test_llm_calls_inside_tools_are_attributed_to_them(self):
+        meter = RecordingMeter()
+        callback = UsageMeteringCallback(meter)
+        model = FakeChatModel()
+
+        @tool
+        def summarize_interventions(question: str) -> str:
+            """Summarize the interventions of a parcel"""
+            return model.invoke(question).content
+
+        summarize_interventions.invoke({"question": "Bilan de la parcelle 12"}, config={"callbacks": [callback]})
+        key, _ = _only(meter._aggregates)
+        assert key[4] == "summarize_interventions"
+        assert callback._parents == {}
+
+    def test_estimated_without_provider_usage(self):
+        meter = RecordingMeter()
+        FakeChatModel(usage=None).invoke("Quand semer le lin ?", config={"callbacks": [UsageMeteringCallback(meter)]})
+        _, counters = _only(meter._aggregates)
+        assert counters.estimated_calls == 1
+        assert counters.prompt_tokens > 0 and counters.completion_tokens > 0
+
+    def test_failed_calls(self):
+        meter = RecordingMeter()
+        with pytest.raises(ConnectionError):
+            FakeChatModel(fail=True).invoke("Météo ?", config={"callbacks": [UsageMeteringCallback(meter)]})
+        _, counters = _only(meter._aggregates)
+        assert counters.errors == 1 and counters.prompt_tokens == 0
+
+    def test_embeddings_metered_on_misses_only(self, monkeypatch):
+        meter = RecordingMeter()
+        monkeypatch.setattr(embedding_cache_module, "usage_meter", meter)
+        cache = EmbeddingCache(store=None)
+        embed = lambda texts: [[1.0, 0.0] for _ in texts]
+
+        cache.embed("text-embedding-3-small", ["mildiou", "oïdium"], embed)
+        cache.embed("text-embedding-3-small", ["mildiou", "oïdium", "rouille"], embed)
+
+        assert meter.stats["calls"] == 2
+        assert meter.get_stats()["by_request_type"]["embedding"]["calls"] == 2
+
+
+class TestUsageFlush:
+    """Test suite for batched flushes and quotas"""
+
+    @pytest.mark.asyncio
+    async def test_flush_and_failed_flush(self):
+        meter = RecordingMeter(fail=1)
+        try:
+            with usage_scope(organization_id="org-a"):
+                meter.record("gpt-4", 100, 50, 1.0)
+                assert await meter.flush() == 0
+                meter.record("gpt-4", 100, 50, 1.0)
+
+            assert meter.stats["failed_flushes"] == 1
+            _, counters = _only(meter._aggregates)
+            assert counters.calls == 2 and counters.prompt_tokens == 200
+
+            assert await meter.flush() == 1
+            assert meter._aggregates == {} and len(meter.batches) == 1
+        finally:
+            # record() started the background flusher on this loop
+            await meter.stop()
+
+    @pytest.mark.asyncio
+    async def test_daily_quota(self, monkeypatch):
+        monkeypatch.setattr("app.services.usage_meter.settings.USAGE_DAILY_TOKEN_QUOTA", 1000)
+        monkeypatch.setattr("app.services.usage_meter.settings.USAGE_ORG_TOKEN_QUOTAS", {"org-b": 100000})
+        # Other workers already used 800 tokens of org-a today
+        meter = RecordingMeter(today={"org-a": 800})
+        try:
+            await meter.flush()
+            assert meter.tokens_today("org-a") == 800 and not meter.quota_exceeded("org-a")
+
+            with usage_scope(organization_id="org-a"):
+                meter.record("gpt-4", 150, 60, 1.0)
+            assert meter.quota_exceeded("org-a")
+            assert not meter.quota_exceeded("org-b") and not meter.quota_exceeded(None)
+
+            # Flushed usage is counted once the totals are reloaded
+            meter.today = {"org-a": 1010}
+            await meter.flush()
+            assert meter.tokens_today("org-a") == 1010
+        finally:
+            await meter.stop()
+
+
+class TestUsageMeterPerformance:
+    """Metering must stay negligible next to an LLM call"""
+
+    def test_many_calls_aggregate_in_one_row(self):
+        meter = RecordingMeter()
+        with usage_scope(organization_id="org-a", agent_type="weather") as tally:
+            for i in range(10000):
+                meter.record("gpt-4o-mini", 800 + i % 50, 150, 0.9, request_type="synthesis")
+
+        [(_, counters)] = meter._aggregates.items()
+        assert counters.calls == 10000 and tally.calls == 10000
+        assert tally.prompt_tokens == sum(800 + i % 50 for i in range(10000))
+        assert tally.completion_tokens == 1_500_000
+
+    @pytest.mark.benchmark
+    def test_record_latency(self):
+        meter = RecordingMeter()
+        started = time.perf_counter()
+        with usage_scope(organization_id="org-a", agent_type="weather"):
+            for i in range(10000):
+                meter.record("gpt-4o-mini", 800 + i % 50, 150, 0.9, request_type="synthesis")
+        per_record = (time.perf_counter() - started) / 10000
+        print(f"\nUsage record: {per_record * 1e6:.1f} µs")
+        # Generous bound for slow CI machines
+        assert per_record < 0.0005
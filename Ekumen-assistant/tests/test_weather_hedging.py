@@ -0,0 +1,132 @@
+"""
+Unit tests for hedged weather provider requests and shared HTTP client.
+
+Tests:
+- First successful provider wins
+- Slow primary triggers hedge to backup provider
+- Primary 404 maps to location-not-found
+- Latency histogram bookkeeping
+- One shared HTTP client per event loop
+"""
+
+import asyncio
+import pytest
+import httpx
+
+from app.core import http_client
+from app.core.http_client import LatencyHistogram, close_http_client, get_http_client
+from app.tools.exceptions import WeatherLocationNotFoundError, WeatherTimeoutError
+from app.tools.weather_agent.get_weather_data_tool import WeatherService
+
+
+def _provider(name: str, delay: float = 0.0, error: Exception = None):
+    """Build a fake provider coroutine factory"""
+    async def call():
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return {"data_source": name}
+    return name, call
+
+
+class TestHedgedProviders:
+    """Test suite for WeatherService._race_providers"""
+
+    @pytest.fixture
+    def service(self, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "WEATHER_HEDGE_DELAY_SECONDS", 0.05)
+        return WeatherService()
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_wins_without_hedge(self, service):
+        errors = []
+        result = await service._race_providers(
+            "Dourdan", [_provider("weatherapi"), _provider("openweathermap")], errors
+        )
+        assert result["data_source"] == "weatherapi"
+        assert errors == []
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self, service):
+        errors = []
+        result = await service._race_providers(
+            "Dourdan",
+            [_provider("weatherapi", delay=1.0), _provider("openweathermap", delay=0.01)],
+            errors
+        )
+        assert result["data_source"] == "openweathermap"
+
+    @pytest.mark.asyncio
+    async def test_primary_failure_falls_back_immediately(self, service):
+        errors = []
+        result = await service._race_providers(
+            "Dourdan",
+            [_provider("weatherapi", error=RuntimeError("boom")), _provider("openweathermap")],
+            errors
+        )
+        assert result["data_source"] == "openweathermap"
+        assert len(errors) == 1
+
+    @pytest.mark.asyncio
+    async def test_primary_404_raises_location_not_found(self, service):
+        request = httpx.Request("GET", "http://api.weatherapi.com/v1/forecast.json")
+        not_found = httpx.HTTPStatusError(
+            "not found", request=request, response=httpx.Response(404, request=request)
+        )
+        with pytest.raises(WeatherLocationNotFoundError):
+            await service._race_providers(
+                "Nulle-Part", [_provider("weatherapi", error=not_found)], []
+            )
+
+    @pytest.mark.asyncio
+    async def test_all_timeouts_raise_timeout_error(self, service):
+        timeout = httpx.ReadTimeout("timeout")
+        with pytest.raises(WeatherTimeoutError):
+            await service._race_providers(
+                "Dourdan",
+                [_provider("weatherapi", error=timeout), _provider("openweathermap", error=timeout)],
+                []
+            )
+
+
+class TestLatencyHistogram:
+    """Test suite for LatencyHistogram"""
+
+    def test_observe_and_percentiles(self):
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        for duration in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(duration)
+
+        stats = histogram.to_dict()
+        assert stats["count"] == 4
+        assert stats["buckets"] == {"le_0.1": 2, "le_1.0": 3, "le_inf": 4}
+        assert histogram.percentile(50) == 0.1
+        assert histogram.percentile(99) == float("inf")
+
+    def test_empty_histogram(self):
+        assert LatencyHistogram().percentile(95) is None
+
+
+class TestSharedHttpClient:
+    """Test suite for the per-loop shared HTTP client"""
+
+    def test_one_client_per_loop(self):
+        async def client_of_loop():
+            return get_http_client()
+
+        main_loop = asyncio.new_event_loop()
+        try:
+            main_client = main_loop.run_until_complete(client_of_loop())
+            assert main_loop.run_until_complete(client_of_loop()) is main_client
+
+            # Another loop gets its own client and leaves this one usable
+            other_client = asyncio.run(client_of_loop())
+            assert other_client is not main_client
+            assert not main_client.is_closed
+
+            main_loop.run_until_complete(close_http_client())
+            assert main_client.is_closed
+            assert len(http_client._clients) == 0
+        finally:
+            main_loop.close()
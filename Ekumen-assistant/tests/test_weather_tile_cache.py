@@ -0,0 +1,166 @@
+"""
+Unit tests for the geospatial forecast tile cache.
+
+Tests:
+- Location name normalization
+- Grid cell snapping
+- Bounded in-memory alias resolution
+- Tile slicing (14-day tile serves 1/3/7-day requests), provider horizons
+- Freshness by requested horizon
+- Coalesced tile fetches
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.weather_tile_cache import (
+    ForecastTile,
+    ForecastTileCache,
+    LocationResolver,
+    grid_cell,
+    normalize_location_name,
+)
+
+
+def _tile(cell, days: int, fetched_at: float = None) -> ForecastTile:
+    start = date.today()
+    return ForecastTile(
+        cell_key=cell.key,
+        lat=cell.center[0],
+        lon=cell.center[1],
+        conditions=[{"date": (start + timedelta(days=i)).isoformat()} for i in range(days)],
+        data_source="weatherapi.com",
+        retrieved_at="2025-01-01T06:00:00Z",
+        fetched_at=fetched_at or time.time(),
+    )
+
+
+class TestLocationKeys:
+    """Test suite for location normalization and grid cells"""
+
+    def test_normalize_location_name(self):
+        assert normalize_location_name("Dourdan") == normalize_location_name(" dourdan ")
+        assert normalize_location_name("Saint-Rémy-lès-Chevreuse") == "saint remy les chevreuse"
+
+    def test_nearby_points_share_a_cell(self):
+        # Two parcels a few hundred metres apart in Dourdan
+        assert grid_cell(48.531, 2.011, 0.1).key == grid_cell(48.538, 2.019, 0.1).key
+
+    def test_distant_points_differ(self):
+        assert grid_cell(48.53, 2.01, 0.1).key != grid_cell(49.18, 0.37, 0.1).key
+
+    def test_cell_center_inside_cell(self):
+        cell = grid_cell(48.531, 2.011, 0.1)
+        assert grid_cell(*cell.center, 0.1) == cell
+
+    @pytest.mark.asyncio
+    async def test_coordinates_resolve_without_geocoding(self):
+        resolver = LocationResolver()
+        assert await resolver.resolve(location="Dourdan", coordinates=(48.53, 2.01)) == (48.53, 2.01)
+        assert resolver.geocode_calls == 0
+
+    @pytest.mark.asyncio
+    async def test_resolved_aliases_are_bounded(self, monkeypatch):
+        resolver = LocationResolver(maxsize=2)
+
+        async def geocode(query):
+            resolver.geocode_calls += 1
+            return None if query["nom"] == "Normandie" else (48.53, 2.01)
+
+        monkeypatch.setattr(resolver, "_geocode", geocode)
+        monkeypatch.setattr("app.services.weather_tile_cache.redis_client", None)
+        for name in ("Dourdan", "Normandie", "Dourdan", "Étampes"):
+            await resolver.resolve(location=name)
+
+        # "Not a commune" is remembered too; the least recently used alias goes first
+        assert resolver.geocode_calls == 3
+        assert list(resolver._points) == ["name:dourdan", "name:etampes"]
+        assert await resolver.resolve(location="Dourdan") == (48.53, 2.01)
+        assert await resolver.resolve(location="Normandie") is None
+        assert resolver.geocode_calls == 4
+
+
+class TestForecastTileCache:
+    """Test suite for ForecastTileCache"""
+
+    def test_long_tile_serves_shorter_requests(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        cache._store(_tile(cell, 14))
+
+        for days in (1, 3, 7, 14):
+            tile, conditions = cache.get(cell, days, max_age=3600)
+            assert len(conditions) == days
+        assert cache.stats["slice_hits"] == 3
+
+    def test_short_tile_misses_longer_request(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        cache._store(_tile(cell, 3))
+
+        assert cache.get(cell, 7, max_age=3600) is None
+
+    @pytest.mark.asyncio
+    async def test_provider_horizon_serves_longer_requests(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        fetches = 0
+
+        async def fetch():
+            nonlocal fetches
+            fetches += 1
+            return _tile(cell, 5)  # e.g. OpenWeatherMap
+
+        for _ in range(2):
+            if cache.get(cell, 7, max_age=3600) is None:
+                await cache.fill(cell, 7, fetch)
+
+        assert fetches == 1
+        tile, conditions = cache.get(cell, 7, max_age=3600)
+        assert tile.max_available == 5 and len(conditions) == 5
+
+    def test_tile_still_covers_its_horizon_after_midnight(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        tile = _tile(cell, 14)
+        for condition in tile.conditions:
+            condition["date"] = (date.fromisoformat(condition["date"]) - timedelta(days=1)).isoformat()
+        cache._store(tile)
+
+        _, conditions = cache.get(cell, 14, max_age=3600)
+        assert len(conditions) == 13
+        assert conditions[0]["date"] == date.today().isoformat()
+
+    def test_stale_tile_misses_short_horizon(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        cache._store(_tile(cell, 14, fetched_at=time.time() - 7000))
+
+        assert cache.get(cell, 1, max_age=1800) is None
+        assert cache.get(cell, 7, max_age=7200) is not None
+
+    def test_past_days_are_dropped(self):
+        cell = grid_cell(48.53, 2.01, 0.1)
+        tile = _tile(cell, 7)
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        tile.conditions.insert(0, {"date": yesterday})
+
+        assert tile.slice(7)[0]["date"] == date.today().isoformat()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_fills_fetch_once(self):
+        cache = ForecastTileCache()
+        cell = grid_cell(48.53, 2.01, 0.1)
+        fetches = 0
+
+        async def fetch():
+            nonlocal fetches
+            fetches += 1
+            await asyncio.sleep(0.02)
+            return _tile(cell, 7)
+
+        await asyncio.gather(*[cache.fill(cell, 7, fetch) for _ in range(20)])
+        assert fetches == 1
@@ -18,7 +18,7 @@ router = APIRouter()
 
 
 @router.get("/intervention/{uuid_intervention}", response_model=ValidationInterventionResponse)
-async def get_intervention_validation(
+def get_intervention_validation(
     uuid_intervention: str,
     db: Session = Depends(get_db)
 ):
@@ -34,7 +34,7 @@ async def get_intervention_validation(
 
 
 @router.post("/intervention/{uuid_intervention}", response_model=ValidationInterventionResponse)
-async def validate_intervention(
+def validate_intervention(
     uuid_intervention: str,
     validation: ValidationInterventionCreate,
     db: Session = Depends(get_db)
@@ -66,7 +66,7 @@ async def validate_intervention(
 
 
 @router.get("/exploitation/{siret}", response_model=ConformiteReglementaireResponse)
-async def get_exploitation_compliance(
+def get_exploitation_compliance(
     siret: str,
     year: int = Query(..., description="Year to check compliance"),
     db: Session = Depends(get_db)
@@ -84,7 +84,7 @@ async def get_exploitation_compliance(
 
 
 @router.post("/exploitation/{siret}", response_model=ConformiteReglementaireResponse)
-async def create_exploitation_compliance(
+def create_exploitation_compliance(
     siret: str,
     compliance: ConformiteReglementaireCreate,
     db: Session = Depends(get_db)
@@ -3,8 +3,9 @@ EPHY data endpoints.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.api.v1.pagination import keyset_page, next_cursor
 from app.core.database import get_db
 from app.models.ephy import Produit, SubstanceActive, UsageProduit
 from app.schemas.ephy import ProduitResponse, SubstanceActiveResponse, UsageProduitResponse
@@ -15,9 +16,11 @@ router = APIRouter()
 
 
 @router.get("/produits", response_model=List[ProduitResponse])
-async def get_produits(
+def get_produits(
+    response: Response,
     type_produit: Optional[str] = Query(None, description="Product type (PPP or MFSC)"),
     etat_autorisation: Optional[str] = Query(None, description="Authorization status"),
+    after: Optional[str] = Query(None, description="AMM number to continue after (X-Next-Cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
@@ -31,12 +34,12 @@ async def get_produits(
     if etat_autorisation:
         query = query.filter(Produit.etat_autorisation == etat_autorisation)
     
-    produits = query.offset(skip).limit(limit).all()
+    produits = keyset_page(query, Produit.numero_amm, after, skip, limit, response)
     return produits
 
 
 @router.get("/produits/{numero_amm}", response_model=ProduitResponse)
-async def get_produit(numero_amm: str, db: Session = Depends(get_db)):
+def get_produit(numero_amm: str, db: Session = Depends(get_db)):
     """Get a specific EPHY product by AMM number."""
     produit = db.query(Produit).filter(Produit.numero_amm == numero_amm).first()
     if not produit:
@@ -45,18 +48,20 @@ async def get_produit(numero_amm: str, db: Session = Depends(get_db)):
 
 
 @router.get("/substances-actives", response_model=List[SubstanceActiveResponse])
-async def get_substances_actives(
+def get_substances_actives(
+    response: Response,
+    after: Optional[int] = Query(None, description="Substance id to continue after (X-Next-Cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """Get active substances."""
-    substances = db.query(SubstanceActive).offset(skip).limit(limit).all()
+    substances = keyset_page(db.query(SubstanceActive), SubstanceActive.id, after, skip, limit, response)
     return substances
 
 
 @router.get("/usages/{numero_amm}", response_model=List[UsageProduitResponse])
-async def get_produit_usages(
+def get_produit_usages(
     numero_amm: str,
     db: Session = Depends(get_db)
 ):
@@ -72,8 +77,9 @@ async def get_produit_usages(
 
 
 @router.get("/search")
-async def search_produits(
+def search_produits(
     q: str = Query(..., description="Search query"),
+    after: Optional[str] = Query(None, description="AMM number to continue after (next_cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db)
@@ -84,10 +90,11 @@ async def search_produits(
         (Produit.numero_amm.ilike(f"%{q}%"))
     )
     
-    produits = query.offset(skip).limit(limit).all()
+    produits = keyset_page(query, Produit.numero_amm, after, skip, limit)
     
     return {
         "query": q,
         "results": produits,
-        "total": query.count()
+        "total": query.count(),
+        "next_cursor": next_cursor(produits, Produit.numero_amm, limit),
     }
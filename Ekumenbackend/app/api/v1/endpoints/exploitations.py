@@ -3,8 +3,9 @@ Exploitations (farms/enterprises) endpoints.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.api.v1.pagination import keyset_page
 from app.core.database import get_db
 from app.models.mesparcelles import Exploitation, ServiceActivation
 from app.schemas.mesparcelles import ExploitationCreate, ExploitationResponse, ServiceActivationResponse
@@ -15,18 +16,20 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[ExploitationResponse])
-async def get_exploitations(
+def get_exploitations(
+    response: Response,
+    after: Optional[str] = Query(None, description="SIRET to continue after (X-Next-Cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
     """Get all exploitations with pagination."""
-    exploitations = db.query(Exploitation).offset(skip).limit(limit).all()
+    exploitations = keyset_page(db.query(Exploitation), Exploitation.siret, after, skip, limit, response)
     return exploitations
 
 
 @router.get("/{siret}", response_model=ExploitationResponse)
-async def get_exploitation(siret: str, db: Session = Depends(get_db)):
+def get_exploitation(siret: str, db: Session = Depends(get_db)):
     """Get a specific exploitation by SIRET."""
     exploitation = db.query(Exploitation).filter(Exploitation.siret == siret).first()
     if not exploitation:
@@ -35,7 +38,7 @@ async def get_exploitation(siret: str, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=ExploitationResponse)
-async def create_exploitation(
+def create_exploitation(
     exploitation: ExploitationCreate,
     db: Session = Depends(get_db)
 ):
@@ -55,7 +58,7 @@ async def create_exploitation(
 
 
 @router.delete("/{siret}")
-async def delete_exploitation(siret: str, db: Session = Depends(get_db)):
+def delete_exploitation(siret: str, db: Session = Depends(get_db)):
     """Delete an exploitation."""
     exploitation = db.query(Exploitation).filter(Exploitation.siret == siret).first()
     if not exploitation:
@@ -69,7 +72,7 @@ async def delete_exploitation(siret: str, db: Session = Depends(get_db)):
 
 
 @router.get("/{siret}/service-activation", response_model=ServiceActivationResponse)
-async def get_service_activation(siret: str, db: Session = Depends(get_db)):
+def get_service_activation(siret: str, db: Session = Depends(get_db)):
     """Get service activation status for an exploitation."""
     service_activation = db.query(ServiceActivation).filter(
         ServiceActivation.siret == siret
@@ -82,7 +85,7 @@ async def get_service_activation(siret: str, db: Session = Depends(get_db)):
 
 
 @router.post("/{siret}/service-activation", response_model=ServiceActivationResponse)
-async def create_service_activation(
+def create_service_activation(
     siret: str,
     millesime_active: List[int],
     millesime_deja_actif: List[int],
@@ -3,8 +3,10 @@ Interventions endpoints.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.api.v1.pagination import keyset_page
 from app.core.database import get_db
 from app.models.mesparcelles import Intervention
 from app.schemas.mesparcelles import InterventionCreate, InterventionResponse
@@ -15,9 +17,11 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[InterventionResponse])
-async def get_interventions(
+def get_interventions(
+    response: Response,
     siret_exploitation: Optional[str] = Query(None, description="SIRET of the exploitation"),
     uuid_parcelle: Optional[str] = Query(None, description="Parcelle UUID"),
+    after: Optional[UUID] = Query(None, description="Intervention UUID to continue after (X-Next-Cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
@@ -31,12 +35,12 @@ async def get_interventions(
     if uuid_parcelle:
         query = query.filter(Intervention.uuid_parcelle == uuid_parcelle)
     
-    interventions = query.offset(skip).limit(limit).all()
+    interventions = keyset_page(query, Intervention.uuid_intervention, after, skip, limit, response)
     return interventions
 
 
 @router.get("/{uuid_intervention}", response_model=InterventionResponse)
-async def get_intervention(uuid_intervention: str, db: Session = Depends(get_db)):
+def get_intervention(uuid_intervention: str, db: Session = Depends(get_db)):
     """Get a specific intervention by UUID."""
     intervention = db.query(Intervention).filter(
         Intervention.uuid_intervention == uuid_intervention
@@ -47,7 +51,7 @@ async def get_intervention(uuid_intervention: str, db: Session = Depends(get_db)
 
 
 @router.post("/", response_model=InterventionResponse)
-async def create_intervention(
+def create_intervention(
     intervention: InterventionCreate,
     db: Session = Depends(get_db)
 ):
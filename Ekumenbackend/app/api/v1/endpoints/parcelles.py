@@ -3,8 +3,10 @@ Parcelles endpoints.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from app.api.v1.pagination import keyset_page
 from app.core.database import get_db
 from app.models.mesparcelles import Parcelle
 from app.schemas.mesparcelles import ParcelleCreate, ParcelleResponse
@@ -15,9 +17,11 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[ParcelleResponse])
-async def get_parcelles(
+def get_parcelles(
+    response: Response,
     siret_exploitation: Optional[str] = Query(None, description="SIRET of the exploitation"),
     millesime: Optional[int] = Query(None, description="Year"),
+    after: Optional[UUID] = Query(None, description="Parcelle UUID to continue after (X-Next-Cursor)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     db: Session = Depends(get_db)
@@ -31,12 +35,12 @@ async def get_parcelles(
     if millesime:
         query = query.filter(Parcelle.millesime == millesime)
     
-    parcelles = query.offset(skip).limit(limit).all()
+    parcelles = keyset_page(query, Parcelle.uuid_parcelle, after, skip, limit, response)
     return parcelles
 
 
 @router.get("/{uuid_parcelle}", response_model=ParcelleResponse)
-async def get_parcelle(uuid_parcelle: str, db: Session = Depends(get_db)):
+def get_parcelle(uuid_parcelle: str, db: Session = Depends(get_db)):
     """Get a specific parcelle by UUID."""
     parcelle = db.query(Parcelle).filter(Parcelle.uuid_parcelle == uuid_parcelle).first()
     if not parcelle:
@@ -45,7 +49,7 @@ async def get_parcelle(uuid_parcelle: str, db: Session = Depends(get_db)):
 
 
 @router.post("/", response_model=ParcelleResponse)
-async def create_parcelle(
+def create_parcelle(
     parcelle: ParcelleCreate,
     db: Session = Depends(get_db)
 ):
@@ -66,22 +66,29 @@ async def sync_all_exploitations(
 @router.post("/ephy/import-zip")
 async def import_ephy_zip(
     zip_path: str,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    bulk: bool = False,
+    incremental: bool = False
 ):
     """Start EPHY ZIP import task."""
     try:
         # Start Celery task
         task = celery_app.send_task(
             'app.tasks.ephy_import.import_zip_file',
-            args=[zip_path]
+            args=[zip_path, bulk, incremental]
         )
         
-        logger.info("EPHY ZIP import task started", zip_path=zip_path, task_id=task.id)
+        logger.info(
+            "EPHY ZIP import task started",
+            zip_path=zip_path, bulk=bulk, incremental=incremental, task_id=task.id
+        )
         
         return {
             "message": "EPHY ZIP import task started",
             "task_id": task.id,
-            "zip_path": zip_path
+            "zip_path": zip_path,
+            "bulk": bulk,
+            "incremental": incremental
         }
     except Exception as e:
         logger.error("Failed to start EPHY ZIP import task", error=str(e))
@@ -92,23 +99,25 @@ async def import_ephy_zip(
 async def import_ephy_csv(
     file_path: str,
     csv_type: str,
-    background_tasks: BackgroundTasks
+    background_tasks: BackgroundTasks,
+    bulk: bool = False
 ):
     """Start EPHY CSV import task."""
     try:
         # Start Celery task
         task = celery_app.send_task(
             'app.tasks.ephy_import.import_csv',
-            args=[file_path, csv_type]
+            args=[file_path, csv_type, bulk]
         )
         
-        logger.info("EPHY import task started", file_path=file_path, csv_type=csv_type, task_id=task.id)
+        logger.info("EPHY import task started", file_path=file_path, csv_type=csv_type, bulk=bulk, task_id=task.id)
         
         return {
             "message": "EPHY import task started",
             "task_id": task.id,
             "file_path": file_path,
-            "csv_type": csv_type
+            "csv_type": csv_type,
+            "bulk": bulk
         }
     except Exception as e:
         logger.error("Failed to start EPHY import task", error=str(e))
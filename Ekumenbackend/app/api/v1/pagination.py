@@ -0,0 +1,46 @@
+"""
+Keyset pagination for list endpoints.
+
+Pages are ordered by primary key and continue from the last key of the
+previous page (``after``), so deep pages cost an index seek instead of
+scanning and discarding ``skip`` rows. The key to pass for the next page is
+returned in the ``X-Next-Cursor`` header when the page is full. ``skip`` is
+still accepted for existing clients and ignored once a cursor is given.
+"""
+
+from typing import Any, List, Optional
+
+from fastapi import Response
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def keyset_page(
+    query: Query,
+    key_column,
+    after: Optional[Any],
+    skip: int,
+    limit: int,
+    response: Optional[Response] = None,
+) -> List[Any]:
+    """Return one page of ``query`` ordered by ``key_column``."""
+    query = query.order_by(key_column)
+    if after is not None:
+        query = query.filter(key_column > after)
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit).all()
+    if response is not None:
+        cursor = next_cursor(rows, key_column, limit)
+        if cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+    return rows
+
+
+def next_cursor(rows: List[Any], key_column, limit: int) -> Optional[str]:
+    """Key to continue after, or None if this was the last page."""
+    if len(rows) < limit:
+        return None
+    return str(getattr(rows[-1], key_column.key))
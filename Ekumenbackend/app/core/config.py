@@ -3,7 +3,8 @@ Application configuration settings.
 """
 
 from typing import List, Optional
-from pydantic import BaseSettings, validator
+from pydantic import validator
+from pydantic_settings import BaseSettings
 import os
 
 
@@ -24,6 +25,12 @@ class Settings(BaseSettings):
     database_name: str = "agri_db"
     database_user: str = "agri_user"
     database_password: str = "agri_password"
+    database_pool_size: int = 10
+    database_max_overflow: int = 10
+    database_pool_timeout: int = 30  # seconds to wait for a free connection
+    # Worker threads running sync endpoints; defaults to the connection
+    # pool capacity so a request never waits on the pool inside a thread
+    database_threadpool_size: Optional[int] = None
     
     # Security
     secret_key: str = "your-super-secret-key-minimum-32-characters-long"
@@ -43,6 +50,8 @@ class Settings(BaseSettings):
     # EPHY Data
     ephy_data_path: str = "/data/ephy"
     ephy_csv_encoding: str = "utf-8"
+    # Redis channel for incremental import change-sets (cache invalidation)
+    ephy_changes_channel: str = "ephy:changes"
     
     # Celery
     celery_broker_url: str = "redis://localhost:6379/1"
@@ -2,16 +2,19 @@
 Database configuration and session management.
 """
 
+from anyio import to_thread
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 from .config import settings
 
-# Create database engine
+# Create database engine. Sync endpoints run in a threadpool, so the pool
+# hands each worker thread its own connection.
 engine = create_engine(
     settings.database_url,
-    poolclass=StaticPool,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
     pool_pre_ping=True,
     echo=settings.debug,
 )
@@ -32,6 +35,24 @@ def get_db():
         db.close()
 
 
+def threadpool_size() -> int:
+    """Number of threads allowed to run sync endpoints at once."""
+    if settings.database_threadpool_size:
+        return settings.database_threadpool_size
+    return settings.database_pool_size + settings.database_max_overflow
+
+
+def configure_threadpool():
+    """
+    Bound the threadpool FastAPI runs sync endpoints and dependencies in.
+
+    Endpoints using a database session are plain ``def`` functions so their
+    blocking queries run off the event loop; requests beyond this limit wait
+    for a thread instead of for a pool connection.
+    """
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_size()
+
+
 def create_tables():
     """Create all database tables."""
     Base.metadata.create_all(bind=engine)
@@ -11,8 +11,9 @@ import time
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import create_tables
+from app.core.database import configure_threadpool, create_tables, threadpool_size
 from app.api.v1.api import api_router
+from app.api.v1.pagination import NEXT_CURSOR_HEADER
 
 
 # Configure structured logging
@@ -44,6 +45,8 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Agricultural Backend API", version=settings.app_version)
     create_tables()
     logger.info("Database tables created")
+    configure_threadpool()
+    logger.info("Database threadpool configured", threads=threadpool_size())
     
     yield
     
@@ -69,6 +72,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from scripts otherwise
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Add trusted host middleware
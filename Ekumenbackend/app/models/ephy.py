@@ -4,7 +4,7 @@ EPHY database models.
 
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean, Text, 
-    ForeignKey, DECIMAL, Date, Enum
+    ForeignKey, ForeignKeyConstraint, DECIMAL, Date, Enum
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -112,7 +112,7 @@ class Produit(Base):
     
     # Self-referencing foreign key
     __table_args__ = (
-        ForeignKey(["numero_amm_reference"], ["produits.numero_amm"]),
+        ForeignKeyConstraint(["numero_amm_reference"], ["produits.numero_amm"]),
     )
     
     # Relationships
@@ -336,3 +336,23 @@ class UsageProduit(Base):
     # Relationships
     produit = relationship("Produit", back_populates="usages_produits")
     type_culture = relationship("TypeCulture", back_populates="usages_produits")
+
+
+class ImportFileChecksum(Base):
+    """Checksums of imported EPHY CSV files (incremental import)."""
+    __tablename__ = "ephy_import_files"
+    
+    filename = Column(String(200), primary_key=True)
+    checksum = Column(String(64), nullable=False)  # SHA-256
+    row_count = Column(Integer)
+    imported_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ImportRowHash(Base):
+    """Row hashes of imported EPHY CSV files, one per key (incremental import)."""
+    __tablename__ = "ephy_import_row_hashes"
+    
+    kind = Column(String(50), primary_key=True)  # produits, usages, ...
+    row_key = Column(String(300), primary_key=True)  # AMM number, or substance name
+    row_hash = Column(String(32), nullable=False)  # Hash of all CSV rows of the key
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -4,7 +4,7 @@ MesParcelles database models.
 
 from sqlalchemy import (
     Column, Integer, String, DateTime, Boolean, Text, 
-    ForeignKey, DECIMAL, UUID, ARRAY, JSON, Date
+    ForeignKey, ForeignKeyConstraint, DECIMAL, UUID, ARRAY, JSON, Date
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
@@ -151,8 +151,8 @@ class Parcelle(Base):
     
     # Self-referencing foreign key
     __table_args__ = (
-        ForeignKey(
-            ["uuid_parcelle_millesime_precedent"], 
+        ForeignKeyConstraint(
+            ["uuid_parcelle_millesime_precedent"],
             ["parcelles.uuid_parcelle"]
         ),
     )
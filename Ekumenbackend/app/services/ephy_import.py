@@ -4,8 +4,16 @@ EPHY data import service.
 
 import pandas as pd
 import zipfile
+import hashlib
+import io
+import json
 import os
-from typing import Dict, List, Any, Optional
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any, Optional, Iterator, Iterable, Tuple, Callable
+import redis
+from sqlalchemy import Numeric, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.models.ephy import (
@@ -13,7 +21,8 @@ from app.models.ephy import (
     ProduitSubstance, ProduitFonction, ProduitFormulation,
     UsageProduit, TypeCulture, PhraseRisque, ProduitPhraseRisque,
     CategorieClassification, ProduitClassification, ConditionEmploi,
-    CategorieConditionEmploi, CompositionFertilisant
+    CategorieConditionEmploi, CompositionFertilisant, CommercialType, GammeUsage,
+    EtatAutorisation, ImportFileChecksum, ImportRowHash
 )
 from app.core.config import settings
 import structlog
@@ -22,6 +31,34 @@ import re
 
 logger = structlog.get_logger()
 
+# CSV files by import kind, in dependency order (substances before products,
+# products before the rows that reference them)
+CSV_IMPORT_ORDER = [
+    ("substance_active", "substances"),
+    ("produits_Windows", "produits"),
+    ("usages_des_produits_autorises", "usages"),
+    ("produits_phrases_de_risque", "phrases_risque"),
+    ("produits_condition_emploi", "conditions_emploi"),
+    ("mfsc_et_mixte_composition", "compositions_fertilisants"),
+]
+
+# Rows per CSV chunk in bulk mode
+BULK_CHUNK_SIZE = 10000
+
+
+def csv_import_kind(filename: str) -> Optional[str]:
+    """Return the import kind of an EPHY CSV file, or None if unknown."""
+    for pattern, kind in CSV_IMPORT_ORDER:
+        if pattern in filename:
+            return kind
+    return None
+
+
+def _csv_import_rank(filename: str) -> int:
+    kind = csv_import_kind(filename)
+    kinds = [k for _, k in CSV_IMPORT_ORDER]
+    return kinds.index(kind) if kind else len(kinds)
+
 
 class EPHYImporter:
     """EPHY data importer service."""
@@ -48,8 +85,11 @@ class EPHYImporter:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
                 zip_ref.extractall(extract_path)
             
-            # Import each CSV file
-            csv_files = [f for f in os.listdir(extract_path) if f.endswith('.csv')]
+            # Import each CSV file (reference data first)
+            csv_files = sorted(
+                (f for f in os.listdir(extract_path) if f.endswith('.csv')),
+                key=_csv_import_rank
+            )
             
             for csv_file in csv_files:
                 csv_path = os.path.join(extract_path, csv_file)
@@ -523,3 +563,765 @@ class EPHYImporter:
     def close(self):
         """Close database connection."""
         self.db.close()
+
+
+def _normalize_header(header: str) -> str:
+    """Normalize a CSV header for lookups ("Etat d’autorisation " -> "etat d'autorisation")."""
+    return header.strip().lower().replace('’', "'")
+
+
+class EPHYBulkImporter(EPHYImporter):
+    """
+    Set-based EPHY importer for full ANSES dumps.
+
+    Each CSV is streamed in chunks. Reference tables (titulaires, types de
+    culture, fonctions, ...) are resolved through in-memory dictionaries,
+    rows are loaded with PostgreSQL COPY into temporary staging tables and
+    merged with one INSERT ... ON CONFLICT per table. Rows attached to a
+    product (usages, conditions, compositions, ...) are replaced per AMM,
+    so re-importing a dump does not accumulate duplicates.
+    """
+
+    def __init__(self, chunk_size: int = BULK_CHUNK_SIZE):
+        super().__init__()
+        self.chunk_size = chunk_size
+        self.import_stats.update({"files": {}, "rows": 0, "seconds": 0.0, "rows_per_sec": 0.0})
+        self._refs: Dict[str, Dict[str, int]] = {}
+        self._substance_ids: Optional[Dict[str, int]] = None
+
+    def import_zip_file(self, zip_path: str) -> Dict[str, Any]:
+        """Import EPHY data from ZIP file (bulk mode)."""
+        started = time.perf_counter()
+        stats = super().import_zip_file(zip_path)
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["rows_per_sec"] = round(stats["rows"] / elapsed, 1) if elapsed else 0.0
+        return stats
+
+    def _import_csv_file(self, csv_path: str) -> bool:
+        """Import a specific CSV file in one transaction (True on success)."""
+        filename = os.path.basename(csv_path)
+        kind = csv_import_kind(filename)
+        if kind is None:
+            logger.warning("Unknown CSV file type", filename=filename)
+            return False
+
+        logger.info("Bulk importing CSV file", filename=filename, kind=kind)
+        started = time.perf_counter()
+        counters = {k: self.import_stats[k] for k in ("produits", "substances", "titulaires", "usages")}
+        try:
+            rows = self._load_csv(csv_path, kind)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            self.import_stats.update(counters)
+            # Reference ids created in the rolled back transaction are gone
+            self._refs.clear()
+            self._substance_ids = None
+            logger.error("Failed to bulk import CSV file", filename=filename, error=str(e))
+            self.import_stats["errors"].append({"file": filename, "error": str(e)})
+            return False
+
+        elapsed = time.perf_counter() - started
+        self.import_stats["rows"] += rows
+        self.import_stats["files"][filename] = {
+            "rows": rows,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(rows / elapsed, 1) if elapsed else 0.0,
+        }
+        logger.info("Bulk imported CSV file", filename=filename, **self.import_stats["files"][filename])
+        return True
+
+    def _load_csv(self, csv_path: str, kind: str) -> int:
+        """Load one CSV inside the file transaction (returns rows read)."""
+        return getattr(self, f"_bulk_{kind}")(self._read_csv_chunks(csv_path))
+
+    # CSV reading
+    def _read_csv_chunks(self, csv_path: str) -> Iterator[pd.DataFrame]:
+        """Stream a CSV as string DataFrames of at most chunk_size rows."""
+        encoding = self._detect_encoding(csv_path)
+        separator = self._detect_separator(csv_path, encoding)
+        reader = pd.read_csv(
+            csv_path,
+            encoding=encoding,
+            sep=separator,
+            dtype=str,
+            keep_default_na=False,
+            index_col=False,
+            chunksize=self.chunk_size,
+        )
+        for chunk in reader:
+            chunk.columns = [_normalize_header(c) for c in chunk.columns]
+            yield chunk
+
+    @staticmethod
+    def _column(chunk: pd.DataFrame, *headers: str) -> pd.Series:
+        """First matching column (stripped), or empty strings."""
+        for header in headers:
+            if header in chunk.columns:
+                return chunk[header].str.strip()
+        return pd.Series([''] * len(chunk), index=chunk.index, dtype=object)
+
+    @staticmethod
+    def _as_int(series: pd.Series) -> pd.Series:
+        """Nullable integer column (so COPY doesn't receive "12.0")."""
+        return pd.to_numeric(series, errors='coerce').astype("Int64")
+
+    # COPY / merge helpers
+    def _create_staging(self, model, columns: List[str]) -> str:
+        """Create a temporary all-text staging table, dropped at commit."""
+        staging = f"staging_{model.__tablename__}"
+        self.db.execute(text(
+            f"CREATE TEMP TABLE {staging} ({', '.join(f'{c} text' for c in columns)}) ON COMMIT DROP"
+        ))
+        return staging
+
+    def _copy(self, staging: str, columns: List[str], frame: pd.DataFrame) -> int:
+        """COPY a DataFrame into a staging table (empty strings become NULL)."""
+        if frame.empty:
+            return 0
+        buffer = io.StringIO()
+        frame[columns].to_csv(buffer, index=False, header=False, na_rep='')
+        buffer.seek(0)
+
+        # Raw DBAPI connection of the session transaction
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {staging} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+        return len(frame)
+
+    def _cast(self, model, column: str, alias: str = "s") -> str:
+        """
+        Cast a staging text column to the target column type.
+
+        Decimals that don't fit the column (e.g. 1e9 UFC/g spore counts in
+        DECIMAL(10, 4)) become NULL instead of failing the whole file.
+        """
+        column_type = model.__table__.c[column].type
+        sql_type = column_type.compile(dialect=self.db.get_bind().dialect)
+        cast = f"CAST({alias}.{column} AS {sql_type})"
+        precision = getattr(column_type, "precision", None)
+        if isinstance(column_type, Numeric) and precision:
+            limit = 10 ** (precision - (column_type.scale or 0))
+            cast = f"CASE WHEN abs(CAST({alias}.{column} AS numeric)) < {limit} THEN {cast} END"
+        return cast
+
+    def _merge(
+        self,
+        model,
+        staging: str,
+        columns: List[str],
+        key: Optional[str] = None,
+        replace_by_amm: bool = False
+    ) -> int:
+        """
+        Merge a staging table into its target table.
+
+        Args:
+            model: Target model
+            staging: Staging table name
+            columns: Staged columns
+            key: Natural key; rows are upserted on it (ON CONFLICT when the
+                key is unique, UPDATE + INSERT ... WHERE NOT EXISTS otherwise)
+            replace_by_amm: Replace the target rows of every staged AMM
+                (rows of unknown products are skipped)
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        table = model.__table__
+        target_columns = list(columns)
+        values = [self._cast(model, c) for c in columns]
+        for timestamp in ("created_at", "updated_at"):
+            if timestamp in table.c and timestamp not in columns:
+                target_columns.append(timestamp)
+                values.append("now()")
+
+        conditions = []
+        distinct, order, conflict = "", "", ""
+        updated = 0
+
+        if replace_by_amm:
+            self.db.execute(text(
+                f"DELETE FROM {table.name} WHERE numero_amm IN (SELECT numero_amm FROM {staging})"
+            ))
+            conditions.append("EXISTS (SELECT 1 FROM produits p WHERE p.numero_amm = s.numero_amm)")
+
+        if key:
+            conditions.append(f"s.{key} IS NOT NULL")
+            distinct, order = f"DISTINCT ON (s.{key}) ", f" ORDER BY s.{key}"
+            key_column = table.c[key]
+            updates = [c for c in columns if c != key]
+            if key_column.primary_key or key_column.unique:
+                assignments = [f"{c} = EXCLUDED.{c}" for c in updates]
+                if "updated_at" in table.c:
+                    assignments.append("updated_at = now()")
+                conflict = f" ON CONFLICT ({key}) DO " + (
+                    f"UPDATE SET {', '.join(assignments)}" if assignments else "NOTHING"
+                )
+            else:
+                if updates:
+                    assignments = [f"{c} = {self._cast(model, c)}" for c in updates]
+                    updated = self.db.execute(text(
+                        f"UPDATE {table.name} t SET {', '.join(assignments)} "
+                        f"FROM (SELECT DISTINCT ON ({key}) * FROM {staging} ORDER BY {key}) s "
+                        f"WHERE t.{key} = {self._cast(model, key)}"
+                    )).rowcount
+                conditions.append(
+                    f"NOT EXISTS (SELECT 1 FROM {table.name} t WHERE t.{key} = {self._cast(model, key)})"
+                )
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        inserted = self.db.execute(text(
+            f"INSERT INTO {table.name} ({', '.join(target_columns)}) "
+            f"SELECT {distinct}{', '.join(values)} FROM {staging} s{where}{order}{conflict}"
+        )).rowcount
+        return inserted + updated
+
+    # Reference dictionaries
+    def _resolve(self, model, column: str, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Map reference labels to ids, creating missing ones in one statement.
+
+        The whole reference table is loaded on first use and kept for the
+        rest of the import.
+        """
+        label = getattr(model, column)
+        ids = self._refs.get(model.__tablename__)
+        if ids is None:
+            ids = dict(self.db.execute(select(label, model.id)).all())
+            self._refs[model.__tablename__] = ids
+
+        missing = {n for n in names if n and n not in ids}
+        if missing:
+            self.db.execute(
+                pg_insert(model)
+                .values([{column: n} for n in missing])
+                .on_conflict_do_nothing(index_elements=[column])
+            )
+            ids.update(self.db.execute(select(label, model.id).where(label.in_(missing))).all())
+            if model is Titulaire:
+                self.import_stats["titulaires"] += len(missing)
+        return ids
+
+    def _substance_lookup(self) -> Dict[str, int]:
+        """Substance ids by lowercased name and variant names."""
+        if self._substance_ids is None:
+            self._substance_ids = {}
+            rows = self.db.execute(
+                select(SubstanceActive.id, SubstanceActive.nom_substance, SubstanceActive.variants)
+            ).all()
+            for substance_id, nom, variants in rows:
+                for name in [nom, *(variants or '').split('|')]:
+                    name = name.strip().lower()
+                    if name:
+                        self._substance_ids.setdefault(name, substance_id)
+        return self._substance_ids
+
+    # Per-file loaders (return the number of CSV rows read)
+    def _bulk_substances(self, chunks: Iterator[pd.DataFrame]) -> int:
+        columns = ["nom_substance", "numero_cas", "etat_autorisation", "variants"]
+        staging = self._create_staging(SubstanceActive, columns)
+        rows = 0
+        for chunk in chunks:
+            rows += self._copy(staging, columns, pd.DataFrame({
+                "nom_substance": self._column(chunk, "nom substance active", "nom substance"),
+                "numero_cas": self._column(chunk, "numero cas"),
+                "etat_autorisation": self._column(chunk, "etat d'autorisation", "etat autorisation"),
+                "variants": self._column(chunk, "variant", "variants"),
+            }))
+        self.import_stats["substances"] += self._merge(
+            SubstanceActive, staging, columns, key="nom_substance"
+        )
+        self._substance_ids = None
+        return rows
+
+    def _bulk_produits(self, chunks: Iterator[pd.DataFrame]) -> int:
+        columns = [
+            "numero_amm", "nom_produit", "type_produit", "seconds_noms_commerciaux",
+            "titulaire_id", "type_commercial", "gamme_usage", "mentions_autorisees",
+            "restrictions_usage", "restrictions_usage_libelle", "etat_autorisation",
+            "date_retrait_produit", "date_premiere_autorisation",
+            "numero_amm_reference", "nom_produit_reference",
+        ]
+        link_columns = {
+            ProduitSubstance: ["numero_amm", "substance_id", "concentration", "unite_concentration"],
+            ProduitFonction: ["numero_amm", "fonction_id"],
+            ProduitFormulation: ["numero_amm", "formulation_id"],
+        }
+        staging = self._create_staging(Produit, columns)
+        link_staging = {
+            model: self._create_staging(model, cols) for model, cols in link_columns.items()
+        }
+
+        rows = 0
+        for chunk in chunks:
+            amm = self._column(chunk, "numero amm")
+            titulaires = self._column(chunk, "titulaire")
+            titulaire_ids = self._resolve(Titulaire, "nom", titulaires.unique())
+
+            # Enum columns take the member names
+            rows += self._copy(staging, columns, pd.DataFrame({
+                "numero_amm": amm,
+                "nom_produit": self._column(chunk, "nom produit"),
+                "type_produit": self._column(chunk, "type produit").map(self._map_product_type),
+                "seconds_noms_commerciaux": self._column(chunk, "seconds noms commerciaux"),
+                "titulaire_id": self._as_int(titulaires.map(titulaire_ids)),
+                "type_commercial": self._column(chunk, "type commercial").map(
+                    lambda v: self._enum_name(CommercialType, self._map_commercial_type(v))
+                ),
+                "gamme_usage": self._column(chunk, "gamme usage").map(
+                    lambda v: self._enum_name(GammeUsage, self._map_gamme_usage(v))
+                ),
+                "mentions_autorisees": self._column(chunk, "mentions autorisees"),
+                "restrictions_usage": self._column(chunk, "restrictions usage"),
+                "restrictions_usage_libelle": self._column(chunk, "restrictions usage libelle"),
+                "etat_autorisation": self._column(chunk, "etat d'autorisation").map(
+                    self._map_etat_autorisation
+                ),
+                "date_retrait_produit": self._column(chunk, "date de retrait du produit").map(
+                    self._parse_date
+                ),
+                "date_premiere_autorisation": self._column(
+                    chunk, "date de première autorisation"
+                ).map(self._parse_date),
+                # "8100099 | 8100099" -> "8100099"
+                "numero_amm_reference": self._column(
+                    chunk, "numéro amm du produit de référence"
+                ).str.split('|').str[0].str.strip(),
+                "nom_produit_reference": self._column(chunk, "nom du produit de référence"),
+            }))
+
+            substances, fonctions, formulations = self._product_links(
+                amm,
+                self._column(chunk, "substances actives"),
+                self._column(chunk, "fonctions"),
+                self._column(chunk, "formulations"),
+            )
+            self._copy(link_staging[ProduitSubstance], link_columns[ProduitSubstance], substances)
+            self._copy(link_staging[ProduitFonction], link_columns[ProduitFonction], fonctions)
+            self._copy(link_staging[ProduitFormulation], link_columns[ProduitFormulation], formulations)
+
+        # Drop references to products missing from the dump (self-referencing FK)
+        self.db.execute(text(
+            f"UPDATE {staging} s SET numero_amm_reference = NULL "
+            f"WHERE numero_amm_reference IS NOT NULL "
+            f"AND NOT EXISTS (SELECT 1 FROM {staging} r WHERE r.numero_amm = s.numero_amm_reference) "
+            f"AND NOT EXISTS (SELECT 1 FROM produits p WHERE p.numero_amm = s.numero_amm_reference)"
+        ))
+        self.import_stats["produits"] += self._merge(Produit, staging, columns, key="numero_amm")
+        for model, cols in link_columns.items():
+            self._merge(model, link_staging[model], cols, replace_by_amm=True)
+        return rows
+
+    def _product_links(
+        self,
+        amm: pd.Series,
+        substances: pd.Series,
+        fonctions: pd.Series,
+        formulations: pd.Series
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Explode pipe-separated substances/fonctions/formulations into link rows."""
+        substance_ids = self._substance_lookup()
+        substance_rows = []
+        for numero_amm, value in zip(amm, substances):
+            seen = set()
+            for substance_info in value.split('|'):
+                # "diméthoate (Dimethoate) 400.0 g/L"
+                match = re.match(r'([^(]+)\s*\(([^)]+)\)\s*([0-9.]+)\s*([^|]*)', substance_info.strip())
+                if not match:
+                    continue
+                substance_id = (
+                    substance_ids.get(match.group(2).strip().lower())
+                    or substance_ids.get(match.group(1).strip().lower())
+                )
+                if substance_id and substance_id not in seen:
+                    seen.add(substance_id)
+                    substance_rows.append(
+                        (numero_amm, substance_id, match.group(3), match.group(4).strip())
+                    )
+
+        def explode(model, id_column: str, values: pd.Series) -> pd.DataFrame:
+            pairs = {
+                (numero_amm, name.strip())
+                for numero_amm, value in zip(amm, values)
+                for name in value.split('|') if name.strip()
+            }
+            ids = self._resolve(model, "libelle", {name for _, name in pairs})
+            return pd.DataFrame(
+                [(numero_amm, ids[name]) for numero_amm, name in pairs],
+                columns=["numero_amm", id_column]
+            )
+
+        return (
+            pd.DataFrame(
+                substance_rows,
+                columns=["numero_amm", "substance_id", "concentration", "unite_concentration"]
+            ),
+            explode(Fonction, "fonction_id", fonctions),
+            explode(Formulation, "formulation_id", formulations),
+        )
+
+    def _bulk_usages(self, chunks: Iterator[pd.DataFrame]) -> int:
+        parsers: Dict[str, Tuple[Tuple[str, ...], Optional[Callable]]] = {
+            "numero_amm": (("numero amm",), None),
+            "identifiant_usage": (("identifiant usage",), None),
+            "identifiant_usage_lib_court": (("identifiant usage lib court",), None),
+            "culture_commentaire": (("culture commentaire",), None),
+            "dose_min_par_apport": (("dose min par apport",), self._parse_decimal),
+            "dose_min_unite": (("dose min par apport unite", "dose min unite"), None),
+            "dose_max_par_apport": (("dose max par apport",), self._parse_decimal),
+            "dose_max_unite": (("dose max par apport unite", "dose max unite"), None),
+            "dose_retenue": (("dose retenue",), self._parse_decimal),
+            "dose_retenue_unite": (("dose retenue unite",), None),
+            "stade_cultural_min_bbch": (("stade cultural min (bbch)", "stade cultural min bbch"), self._parse_int),
+            "stade_cultural_max_bbch": (("stade cultural max (bbch)", "tade cultural max (bbch)", "stade cultural max bbch"), self._parse_int),
+            "etat_usage": (("etat usage",), self._map_etat_autorisation),
+            "date_decision": (("date decision",), self._parse_date),
+            "saison_application_min": (("saison application min",), None),
+            "saison_application_max": (("saison application max",), None),
+            "saison_application_min_commentaire": (("saison application min commentaire",), None),
+            "saison_application_max_commentaire": (("saison application max commentaire",), None),
+            "delai_avant_recolte_jour": (("delai avant recolte jour",), self._parse_int),
+            "delai_avant_recolte_bbch": (("delai avant recolte bbch",), self._parse_int),
+            "nombre_max_application": (("nombre max d'application", "nombre max application"), self._parse_int),
+            "date_fin_distribution": (("date fin distribution",), self._parse_date),
+            "date_fin_utilisation": (("date fin utilisation",), self._parse_date),
+            "condition_emploi": (("condition emploi",), None),
+            "znt_aquatique_m": (("znt aquatique (en m)", "znt aquatique m"), self._parse_decimal),
+            "znt_arthropodes_non_cibles_m": (("znt arthropodes non cibles (en m)", "znt arthropodes non cibles m"), self._parse_decimal),
+            "znt_plantes_non_cibles_m": (("znt plantes non cibles (en m)", "znt plantes non cibles m"), self._parse_decimal),
+            # Second "mentions autorisees" column of the usages file (the first is the product's)
+            "mentions_autorisees_usage": (("mentions autorisees usage", "mentions autorisees.1"), None),
+            "intervalle_minimum_entre_applications_jour": (("intervalle minimum entre applications (jour)", "intervalle minimum entre applications jour"), self._parse_int),
+        }
+        columns = [*parsers, "type_culture_id"]
+        staging = self._create_staging(UsageProduit, columns)
+
+        rows = 0
+        for chunk in chunks:
+            frame = pd.DataFrame(index=chunk.index)
+            for column, (headers, parse) in parsers.items():
+                values = self._column(chunk, *headers)
+                if parse is not None:
+                    values = values.map(parse)
+                if parse == self._parse_int:
+                    values = self._as_int(values)
+                frame[column] = values
+
+            # Crop type: explicit column, else first segment of "Blé*Trt Part.Aer.*Pucerons"
+            cultures = self._column(chunk, "type culture libelle", "type culture")
+            cultures = cultures.where(
+                cultures != '', frame["identifiant_usage"].str.split('*').str[0].str.strip()
+            )
+            culture_ids = self._resolve(TypeCulture, "libelle", cultures.dropna().unique())
+            frame["type_culture_id"] = self._as_int(cultures.map(culture_ids))
+
+            rows += self._copy(staging, columns, frame)
+
+        self.import_stats["usages"] += self._merge(UsageProduit, staging, columns, replace_by_amm=True)
+        return rows
+
+    def _bulk_phrases_risque(self, chunks: Iterator[pd.DataFrame]) -> int:
+        columns = ["numero_amm", "code", "libelle_court", "libelle_long", "type_phrase"]
+        staging = self._create_staging(PhraseRisque, columns)
+        rows = 0
+        for chunk in chunks:
+            codes = self._column(chunk, "libellé court phrase de risque", "code")
+            rows += self._copy(staging, columns, pd.DataFrame({
+                "numero_amm": self._column(chunk, "numero amm"),
+                "code": codes,
+                "libelle_court": codes,
+                "libelle_long": self._column(chunk, "libellé long phrase de risque", "libelle long"),
+                # H226 -> H, EUH066 -> EUH, P280 -> P
+                "type_phrase": codes.str.extract(r'^([A-Z]+)', expand=False),
+            }))
+
+        self._merge(PhraseRisque, staging, columns[1:], key="code")
+        self.db.execute(text(
+            f"DELETE FROM produit_phrases_risque WHERE numero_amm IN (SELECT numero_amm FROM {staging})"
+        ))
+        self.db.execute(text(
+            f"INSERT INTO produit_phrases_risque (numero_amm, phrase_id) "
+            f"SELECT DISTINCT s.numero_amm, p.id FROM {staging} s "
+            f"JOIN (SELECT code, min(id) AS id FROM phrases_risque GROUP BY code) p ON p.code = s.code "
+            f"WHERE EXISTS (SELECT 1 FROM produits pr WHERE pr.numero_amm = s.numero_amm)"
+        ))
+        return rows
+
+    def _bulk_conditions_emploi(self, chunks: Iterator[pd.DataFrame]) -> int:
+        columns = ["numero_amm", "categorie_id", "condition_libelle"]
+        staging = self._create_staging(ConditionEmploi, columns)
+        rows = 0
+        for chunk in chunks:
+            categories = self._column(chunk, "catégorie de condition d'emploi", "categorie")
+            category_ids = self._resolve(CategorieConditionEmploi, "libelle", categories.unique())
+            frame = pd.DataFrame({
+                "numero_amm": self._column(chunk, "numero amm"),
+                "categorie_id": self._as_int(categories.map(category_ids)),
+                "condition_libelle": self._column(chunk, "condition d'emploi libelle", "condition libelle"),
+            })
+            rows += len(chunk)
+            self._copy(staging, columns, frame[frame["condition_libelle"] != ''])
+
+        self._merge(ConditionEmploi, staging, columns, replace_by_amm=True)
+        return rows
+
+    def _bulk_compositions_fertilisants(self, chunks: Iterator[pd.DataFrame]) -> int:
+        columns = ["numero_amm", "element", "valeur_min", "valeur_max", "unite", "type_element"]
+        staging = self._create_staging(CompositionFertilisant, columns)
+        # "Matière sèche (Min: 11.0 %, Max: 11.0 %)"
+        pattern = re.compile(
+            r'^(?P<element>.*?)\s*\(Min:\s*(?P<min>[-0-9.,]*)\s*(?P<unite>[^,]*),\s*Max:\s*(?P<max>[-0-9.,]*)'
+        )
+        rows = 0
+        for chunk in chunks:
+            records = []
+            for numero_amm, composition in zip(
+                self._column(chunk, "numero amm"), self._column(chunk, "composition")
+            ):
+                for part in composition.split('|'):
+                    match = pattern.match(part.strip())
+                    if match and match.group("element"):
+                        records.append((
+                            numero_amm,
+                            match.group("element"),
+                            self._parse_decimal(match.group("min")),
+                            self._parse_decimal(match.group("max")),
+                            match.group("unite").strip(),
+                            None,
+                        ))
+            rows += len(chunk)
+            self._copy(staging, columns, pd.DataFrame(records, columns=columns))
+
+        self._merge(CompositionFertilisant, staging, columns, replace_by_amm=True)
+        return rows
+
+    @staticmethod
+    def _enum_name(enum_cls, value: Optional[str]) -> Optional[str]:
+        """Enum member name for a value (the label stored by SQLAlchemy Enum)."""
+        if not value:
+            return None
+        try:
+            return enum_cls(value).name
+        except ValueError:
+            return None
+
+
+# Key column of each CSV kind for change detection
+INCREMENTAL_KEY_HEADERS = {
+    "substances": ("nom substance active", "nom substance"),
+}
+DEFAULT_KEY_HEADERS = ("numero amm",)
+
+# Tables holding the rows of each per-AMM CSV kind (deleted when an AMM leaves the file)
+INCREMENTAL_CHILD_TABLES = {
+    "usages": UsageProduit,
+    "phrases_risque": ProduitPhraseRisque,
+    "conditions_emploi": ConditionEmploi,
+    "compositions_fertilisants": CompositionFertilisant,
+}
+
+
+@dataclass
+class EPHYChangeSet:
+    """
+    Keys changed by an incremental import, by CSV kind.
+
+    Keys are AMM numbers, except for substances (substance names).
+    Downstream caches use it to invalidate only the affected entries.
+    """
+    inserted: Dict[str, List[str]] = field(default_factory=dict)
+    updated: Dict[str, List[str]] = field(default_factory=dict)
+    removed: Dict[str, List[str]] = field(default_factory=dict)
+    withdrawn_products: List[str] = field(default_factory=list)
+    skipped_files: List[str] = field(default_factory=list)
+
+    def affected_amms(self) -> List[str]:
+        """AMM numbers with any inserted, updated or removed row."""
+        amms = set(self.withdrawn_products)
+        for changes in (self.inserted, self.updated, self.removed):
+            for kind, keys in changes.items():
+                if kind != "substances":
+                    amms.update(keys)
+        return sorted(amms)
+
+    def is_empty(self) -> bool:
+        return not (self.inserted or self.updated or self.removed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["affected_amms"] = self.affected_amms()
+        return data
+
+
+class EPHYIncrementalImporter(EPHYBulkImporter):
+    """
+    Delta EPHY importer.
+
+    Unchanged files (same SHA-256 as the last import) are skipped. For the
+    others, rows are grouped by key (AMM number, or substance name) and
+    hashed; only inserted and changed keys go through the bulk loaders,
+    and the rows of keys that left a per-AMM file are deleted. Products
+    missing from the dump are reported but kept. The resulting
+    EPHYChangeSet lists every affected key.
+    """
+
+    def __init__(self, chunk_size: int = BULK_CHUNK_SIZE):
+        super().__init__(chunk_size)
+        self.change_set = EPHYChangeSet()
+        self._pending: Optional[EPHYChangeSet] = None
+
+    def import_zip_file(self, zip_path: str) -> Dict[str, Any]:
+        """Import the files of a ZIP that changed since the last import."""
+        stats = super().import_zip_file(zip_path)
+        stats["change_set"] = self.change_set.to_dict()
+        logger.info(
+            "EPHY incremental import change-set",
+            skipped_files=len(self.change_set.skipped_files),
+            affected_amms=len(stats["change_set"]["affected_amms"]),
+            withdrawn_products=len(self.change_set.withdrawn_products),
+        )
+        return stats
+
+    def _import_csv_file(self, csv_path: str) -> bool:
+        """Import a CSV file, recording its changes once committed."""
+        self._pending = EPHYChangeSet()
+        imported = super()._import_csv_file(csv_path)
+        if imported:
+            for name in ("inserted", "updated", "removed"):
+                getattr(self.change_set, name).update(getattr(self._pending, name))
+            self.change_set.withdrawn_products.extend(self._pending.withdrawn_products)
+            self.change_set.skipped_files.extend(self._pending.skipped_files)
+        self._pending = None
+        return imported
+
+    def _load_csv(self, csv_path: str, kind: str) -> int:
+        filename = os.path.basename(csv_path)
+        checksum = self._file_checksum(csv_path)
+        previous = self.db.get(ImportFileChecksum, filename)
+        if previous is not None and previous.checksum == checksum:
+            logger.info("EPHY file unchanged, skipping", filename=filename)
+            self._pending.skipped_files.append(filename)
+            return 0
+
+        key_headers = INCREMENTAL_KEY_HEADERS.get(kind, DEFAULT_KEY_HEADERS)
+        hashes, row_count = self._key_hashes(csv_path, key_headers)
+        stored = dict(self.db.execute(
+            select(ImportRowHash.row_key, ImportRowHash.row_hash).where(ImportRowHash.kind == kind)
+        ).all())
+
+        inserted = sorted(hashes.keys() - stored.keys())
+        removed = sorted(stored.keys() - hashes.keys())
+        updated = sorted(k for k in hashes.keys() & stored.keys() if hashes[k] != stored[k])
+        changed = set(inserted) | set(updated)
+
+        etats_before = self._product_etats(updated) if kind == "produits" else {}
+        if changed:
+            chunks = (
+                chunk[self._column(chunk, *key_headers).isin(changed)]
+                for chunk in self._read_csv_chunks(csv_path)
+            )
+            chunks = (chunk for chunk in chunks if not chunk.empty)
+            getattr(self, f"_bulk_{kind}")(chunks)
+        if removed and kind in INCREMENTAL_CHILD_TABLES:
+            model = INCREMENTAL_CHILD_TABLES[kind]
+            self.db.execute(model.__table__.delete().where(model.numero_amm.in_(removed)))
+        if etats_before:
+            etats_after = self._product_etats(list(etats_before))
+            self._pending.withdrawn_products.extend(sorted(
+                amm for amm, etat in etats_after.items()
+                if etat == EtatAutorisation.RETIRE and etats_before[amm] != EtatAutorisation.RETIRE
+            ))
+
+        self._store_fingerprints(kind, {k: hashes[k] for k in changed}, removed)
+        self.db.merge(ImportFileChecksum(filename=filename, checksum=checksum, row_count=row_count))
+
+        for name, keys in (("inserted", inserted), ("updated", updated), ("removed", removed)):
+            if keys:
+                getattr(self._pending, name)[kind] = keys
+        logger.info(
+            "EPHY file delta", filename=filename,
+            inserted=len(inserted), updated=len(updated), removed=len(removed)
+        )
+        return row_count
+
+    @staticmethod
+    def _file_checksum(csv_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _key_hashes(self, csv_path: str, key_headers: Tuple[str, ...]) -> Tuple[Dict[str, str], int]:
+        """
+        Hash the rows of each key.
+
+        Row order within the file doesn't change the hash of a key.
+
+        Returns:
+            ({key: hash}, number of rows)
+        """
+        row_digests: Dict[str, List[bytes]] = {}
+        row_count = 0
+        for chunk in self._read_csv_chunks(csv_path):
+            row_count += len(chunk)
+            keys = self._column(chunk, *key_headers)
+            for key, row in zip(keys, chunk.itertuples(index=False, name=None)):
+                if key:
+                    row_digests.setdefault(key, []).append(
+                        hashlib.blake2b('\x1f'.join(row).encode(), digest_size=16).digest()
+                    )
+
+        return {
+            key: hashlib.blake2b(b''.join(sorted(digests)), digest_size=16).hexdigest()
+            for key, digests in row_digests.items()
+        }, row_count
+
+    def _product_etats(self, amms: List[str]) -> Dict[str, Optional[EtatAutorisation]]:
+        if not amms:
+            return {}
+        return dict(self.db.execute(
+            select(Produit.numero_amm, Produit.etat_autorisation).where(Produit.numero_amm.in_(amms))
+        ).all())
+
+    def _store_fingerprints(self, kind: str, hashes: Dict[str, str], removed: List[str]):
+        if removed:
+            self.db.execute(ImportRowHash.__table__.delete().where(
+                ImportRowHash.kind == kind, ImportRowHash.row_key.in_(removed)
+            ))
+        if hashes:
+            columns = ["kind", "row_key", "row_hash"]
+            staging = self._create_staging(ImportRowHash, columns)
+            self._copy(staging, columns, pd.DataFrame(
+                [(kind, k, h) for k, h in hashes.items()], columns=columns
+            ))
+            self.db.execute(text(
+                f"INSERT INTO ephy_import_row_hashes (kind, row_key, row_hash, updated_at) "
+                f"SELECT kind, row_key, row_hash, now() FROM {staging} "
+                f"ON CONFLICT (kind, row_key) DO UPDATE "
+                f"SET row_hash = EXCLUDED.row_hash, updated_at = now()"
+            ))
+
+
+def publish_change_set(change_set: EPHYChangeSet) -> bool:
+    """
+    Publish a change-set on the EPHY changes Redis channel.
+
+    Subscribers (e.g. the assistant's regulatory caches) invalidate the
+    entries of the affected AMMs. Returns False if Redis is unavailable.
+    """
+    if change_set.is_empty():
+        return True
+    try:
+        client = redis.from_url(settings.redis_url)
+        client.publish(settings.ephy_changes_channel, json.dumps(change_set.to_dict()))
+        return True
+    except Exception as e:
+        logger.warning("Failed to publish EPHY change-set", error=str(e))
+        return False
@@ -4,7 +4,9 @@ EPHY data import tasks.
 
 from celery import current_task
 from app.core.celery import celery_app
-from app.services.ephy_import import EPHYImporter
+from app.services.ephy_import import (
+    EPHYImporter, EPHYBulkImporter, EPHYIncrementalImporter, publish_change_set
+)
 import structlog
 import os
 
@@ -12,8 +14,13 @@ logger = structlog.get_logger()
 
 
 @celery_app.task(bind=True)
-def import_zip_file(self, zip_path: str):
-    """Import EPHY data from ZIP file."""
+def import_zip_file(self, zip_path: str, bulk: bool = False, incremental: bool = False):
+    """
+    Import EPHY data from ZIP file.
+
+    bulk: COPY-based set import. incremental: only files and AMMs changed
+    since the last import; the change-set is published for cache invalidation.
+    """
     try:
         # Update task status
         self.update_state(
@@ -21,7 +28,7 @@ def import_zip_file(self, zip_path: str):
             meta={'current': 0, 'total': 100, 'status': 'Starting EPHY import...'}
         )
         
-        logger.info("Starting EPHY ZIP import", zip_path=zip_path)
+        logger.info("Starting EPHY ZIP import", zip_path=zip_path, bulk=bulk, incremental=incremental)
         
         # Check if file exists
         if not os.path.exists(zip_path):
@@ -34,7 +41,10 @@ def import_zip_file(self, zip_path: str):
         )
         
         # Initialize importer
-        importer = EPHYImporter()
+        if incremental:
+            importer = EPHYIncrementalImporter()
+        else:
+            importer = EPHYBulkImporter() if bulk else EPHYImporter()
         
         try:
             # Update progress
@@ -46,13 +56,20 @@ def import_zip_file(self, zip_path: str):
             # Import data
             result = importer.import_zip_file(zip_path)
             
+            # Let downstream caches invalidate the affected AMMs
+            if incremental:
+                publish_change_set(importer.change_set)
+            
             # Update progress
             self.update_state(
                 state='PROGRESS',
                 meta={'current': 100, 'total': 100, 'status': 'Import completed'}
             )
             
-            logger.info("EPHY ZIP import completed", result=result)
+            logger.info(
+                "EPHY ZIP import completed",
+                result={k: v for k, v in result.items() if k != "change_set"}
+            )
             
             return {
                 "status": "completed",
@@ -74,8 +91,8 @@ def import_zip_file(self, zip_path: str):
 
 
 @celery_app.task(bind=True)
-def import_csv(self, file_path: str, csv_type: str):
-    """Import EPHY data from individual CSV file."""
+def import_csv(self, file_path: str, csv_type: str, bulk: bool = False):
+    """Import EPHY data from individual CSV file (bulk: COPY-based set import)."""
     try:
         # Update task status
         self.update_state(
@@ -96,7 +113,7 @@ def import_csv(self, file_path: str, csv_type: str):
         )
         
         # Initialize importer
-        importer = EPHYImporter()
+        importer = EPHYBulkImporter() if bulk else EPHYImporter()
         
         try:
             # Update progress
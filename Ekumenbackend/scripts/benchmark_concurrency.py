@@ -0,0 +1,89 @@
+"""
+Concurrent-request load benchmark for the API.
+
+Fires the same read requests at increasing concurrency levels and reports
+throughput and latency percentiles. Run it against a server started from
+each revision to compare them, e.g. before and after moving database
+endpoints off the event loop:
+
+    python scripts/benchmark_concurrency.py --base-url http://localhost:8000 \
+        --concurrency 1 10 50 --requests 500
+
+Requests that block the event loop show up as throughput that stays flat
+while concurrency grows.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/v1/exploitations/?limit=50",
+    "/api/v1/parcelles/?limit=50",
+    "/api/v1/interventions/?limit=50",
+    "/api/v1/ephy/produits?limit=50",
+    "/api/v1/ephy/substances-actives?limit=50",
+    "/api/v1/health/detailed",
+]
+
+
+async def run_level(client: httpx.AsyncClient, paths: List[str], concurrency: int, total: int) -> Dict:
+    """Send ``total`` requests with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get(paths[i % len(paths)])
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        # Warm up connections and the database pool
+        await run_level(client, args.paths, min(args.concurrency), len(args.paths))
+
+        print(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for concurrency in args.concurrency:
+            result = await run_level(client, args.paths, concurrency, args.requests)
+            print(
+                f"{result['concurrency']:>11} {result['throughput']:>9.1f} "
+                f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['errors']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    asyncio.run(main(parser.parse_args()))